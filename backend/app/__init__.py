@@ -16,7 +16,8 @@ def create_app(config_object=None):
     CORS(app, resources={r"/*": {
         "origins": "*",
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"]
+        "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
+        "expose_headers": ["X-Next-Cursor", "Content-Disposition"]
     }})
     
     # Load configuration
@@ -1,7 +1,7 @@
-from flask_sqlalchemy import SQLAlchemy
+from app.db.engine_profile import ProfiledSQLAlchemy
 
-# Create the db instance
-db = SQLAlchemy()
+# Create the db instance; engine options come from the database engine profile
+db = ProfiledSQLAlchemy()
 
 def init_db():
     """Initialize the database by creating all tables."""
@@ -0,0 +1,115 @@
+"""
+Database engine profiles
+
+Picks pool settings and per-connection SQLite pragmas for the database the
+application actually connects to, so the same configuration serves a local
+SQLite file and a PostgreSQL server.
+"""
+
+import logging
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Engine option consumed by ProfiledSQLAlchemy.create_engine, never passed to SQLAlchemy
+PRAGMAS_OPTION = 'sqlite_pragmas'
+
+def _is_memory_database(sa_url):
+    return sa_url.database in (None, '', ':memory:')
+
+def sqlite_pragmas(config, sa_url):
+    """Pragmas run on every new SQLite connection, in order
+
+    WAL lets readers continue while one writer commits, synchronous=NORMAL
+    syncs the WAL at checkpoints instead of on every commit, and busy_timeout
+    makes a second writer wait for the lock instead of failing at once.
+
+    Args:
+        config: Flask config
+        sa_url: SQLAlchemy URL of the database
+
+    Returns:
+        List of (pragma, value) tuples
+    """
+    pragmas = []
+    if not _is_memory_database(sa_url):
+        pragmas.append(('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')))
+        pragmas.append(('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))))
+    pragmas.append(('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')))
+    pragmas.append(('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))))
+    # A negative cache_size is in KiB rather than pages
+    pragmas.append(('cache_size', -int(config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))))
+    return pragmas
+
+def engine_options(config, sa_url):
+    """Engine options of the configured profile for a database URL
+
+    Args:
+        config: Flask config
+        sa_url: SQLAlchemy URL of the database
+
+    Returns:
+        Dictionary of create_engine() options; empty for the 'plain' profile
+    """
+    if config.get('DB_ENGINE_PROFILE', 'tuned') != 'tuned':
+        return {}
+    pool = {
+        'pool_size': int(config.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(config.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(config.get('DB_POOL_TIMEOUT', 30))
+    }
+    if sa_url.get_backend_name() == 'sqlite':
+        options = {PRAGMAS_OPTION: sqlite_pragmas(config, sa_url)}
+        if not _is_memory_database(sa_url):
+            # Keep connections (and their page cache and mmap) instead of reopening the file per checkout
+            options.update(pool, poolclass=QueuePool, connect_args={'check_same_thread': False})
+        return options
+    return dict(
+        pool,
+        pool_recycle=int(config.get('DB_POOL_RECYCLE', 1800)),
+        pool_pre_ping=bool(config.get('DB_POOL_PRE_PING', True)),
+        # Reuse the most recent connection so idle ones can time out on the server
+        pool_use_lifo=True
+    )
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the pragmas on every connection the engine opens
+
+    Args:
+        engine: SQLAlchemy engine of a SQLite database
+        pragmas: List of (pragma, value) tuples
+    """
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+class ProfiledSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with engine options from the database engine profile
+
+    Options in SQLALCHEMY_ENGINE_OPTIONS still take precedence.
+    """
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        profile = engine_options(app.config, sa_url)
+        if profile.get('poolclass') is QueuePool:
+            # Replaces the NullPool Flask-SQLAlchemy picks for SQLite files
+            options.pop('poolclass', None)
+        for key, value in profile.items():
+            options.setdefault(key, value)
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+        pragmas = engine_opts.pop(PRAGMAS_OPTION, None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if pragmas:
+            apply_sqlite_pragmas(engine, pragmas)
+        logger.info("Created %s engine with pool %s", engine.dialect.name, type(engine.pool).__name__)
+        return engine
@@ -4,6 +4,10 @@ from app.models.tax_advisor import TaxAdvisor
 from app.models.work_order import WorkOrder
 from app.models.placeholder import Placeholder
 from app.models.user import User
+from app.models.job import Job
+from app.models.document_text import DocumentText
+from app.models.client_match_key import ClientMatchKey
+from app.models import document_search  # full-text search tables created with the documents table
 
 # This helps to expose the models at the package level
 __all__ = [
@@ -14,5 +18,8 @@ __all__ = [
     'Placeholder',
     'Salutation',
     'LegalForm',
-    'User'
+    'User',
+    'Job',
+    'DocumentText',
+    'ClientMatchKey'
 ] 
\ No newline at end of file
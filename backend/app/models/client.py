@@ -18,6 +18,12 @@ class LegalForm(enum.Enum):
 class Client(db.Model):
     """Client model that supports both natural persons and companies."""
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Keyset pagination of the list endpoint: (sort column, id)
+        db.Index('ix_clients_created_at_id', 'created_at', 'id'),
+        db.Index('ix_clients_company_name_id', 'company_name', 'id'),
+        db.Index('ix_clients_last_name_id', 'last_name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     client_type = db.Column(db.String(20), nullable=False)  # 'natural' or 'company'
@@ -27,8 +33,8 @@ class Client(db.Model):
     # Common fields for both types
     mandate_manager = db.Column(db.String(100))  # Mandatsmanager
     mandate_responsible = db.Column(db.String(100))  # Mandatsverantwortlicher
-    email = db.Column(db.String(120))
-    tax_number = db.Column(db.String(50))  # Steuernummer
+    email = db.Column(db.String(120), index=True)
+    tax_number = db.Column(db.String(50), index=True)  # Steuernummer
     tax_office = db.Column(db.String(100))  # Finanzamt
     tax_court = db.Column(db.String(100))  # Finanzgericht
 
@@ -72,6 +78,13 @@ class Client(db.Model):
         else:
             return f'<Client {self.company_name}>'
 
+    @property
+    def display_name(self):
+        """Company name or full name of the client."""
+        if self.client_type == 'company':
+            return self.company_name
+        return ' '.join(part for part in (self.first_name, self.last_name) if part) or None
+
     def to_dict(self):
         """Convert client object to dictionary."""
         base_dict = {
@@ -0,0 +1,148 @@
+import re
+from sqlalchemy import event
+from app.db import db
+from app.models.client import Client
+
+# SQLite FTS5 table with trigram tokens over client names; substring matches of 3+ characters
+CLIENT_NAME_FTS_TABLE = 'client_name_fts'
+CLIENT_NAME_FTS_DDL = f"CREATE VIRTUAL TABLE IF NOT EXISTS {CLIENT_NAME_FTS_TABLE} USING fts5(name, contact, tokenize='trigram')"
+
+# Digits kept from a phone number; the tail survives different prefix notations (+49 / 0049 / 0)
+PHONE_KEY_DIGITS = 7
+
+class ClientMatchKey(db.Model):
+    """Normalised identifier of a client used to find matching candidates.
+
+    Rows are derived from the client by match_keys() and kept in sync by the
+    mapper events below; (kind, value) lookups replace scanning all clients.
+    """
+    __tablename__ = 'client_match_keys'
+    __table_args__ = (
+        db.Index('ix_client_match_keys_kind_value', 'kind', 'value'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'tax_number', 'vat_id', 'email', 'phone', 'zip'
+    value = db.Column(db.String(120), nullable=False)
+
+    def __repr__(self):
+        return f'<ClientMatchKey {self.kind}={self.value}>'
+
+def normalize_key(kind, value):
+    """Normalise an identifier the same way for clients and extracted data.
+
+    Args:
+        kind: Key kind, e.g. 'tax_number' or 'phone'
+        value: Raw value
+
+    Returns:
+        Normalised value, or None if nothing usable is left
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if kind in ('tax_number', 'tax_id'):
+        value = re.sub(r'\D', '', value)
+        return value if len(value) >= 6 else None
+    if kind == 'vat_id':
+        value = re.sub(r'[^0-9A-Za-z]', '', value).upper()
+        return value if len(value) >= 6 else None
+    if kind == 'email':
+        value = value.lower()
+        return value if '@' in value else None
+    if kind == 'phone':
+        value = re.sub(r'\D', '', value)
+        return value[-PHONE_KEY_DIGITS:] if len(value) >= PHONE_KEY_DIGITS else None
+    if kind == 'zip':
+        value = re.sub(r'\D', '', value)
+        return value if len(value) == 5 else None
+    return value or None
+
+def match_keys(client):
+    """Normalised (kind, value) pairs of a client."""
+    sources = [
+        ('tax_number', client.tax_number),
+        ('tax_id', client.tax_id),
+        ('vat_id', client.vat_id),
+        ('email', client.email),
+        ('email', client.contact_email),
+        ('phone', client.contact_phone),
+        ('zip', client.address_zip)
+    ]
+    keys = []
+    for kind, value in sources:
+        value = normalize_key(kind, value)
+        if value and (kind, value) not in keys:
+            keys.append((kind, value))
+    return keys
+
+def name_document(client):
+    """Name and contact person text indexed for fuzzy name matching."""
+    name = ' '.join(part for part in (client.company_name, client.first_name, client.last_name) if part)
+    return name, client.contact_last_name or ''
+
+def has_name_index(connection):
+    """Whether the FTS5 name table exists on this connection's database."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CLIENT_NAME_FTS_TABLE,)
+    ).first() is not None
+
+def write_client_index(connection, clients, replace=True):
+    """Write match keys and name rows of clients on an open connection.
+
+    Args:
+        connection: SQLAlchemy connection, part of the caller's transaction
+        clients: Client objects with their IDs assigned
+        replace: Delete existing rows of these clients first
+    """
+    ids = [client.id for client in clients]
+    if not ids:
+        return
+    keys_table = ClientMatchKey.__table__
+    fts = has_name_index(connection)
+    if replace:
+        connection.execute(keys_table.delete().where(keys_table.c.client_id.in_(ids)))
+        if fts:
+            connection.exec_driver_sql(
+                f"DELETE FROM {CLIENT_NAME_FTS_TABLE} WHERE rowid IN ({','.join('?' * len(ids))})", tuple(ids)
+            )
+    rows = [{'client_id': client.id, 'kind': kind, 'value': value} for client in clients for kind, value in match_keys(client)]
+    if rows:
+        connection.execute(keys_table.insert(), rows)
+    if fts:
+        connection.exec_driver_sql(
+            f"INSERT INTO {CLIENT_NAME_FTS_TABLE} (rowid, name, contact) VALUES (?, ?, ?)",
+            [(client.id, *name_document(client)) for client in clients]
+        )
+
+@event.listens_for(Client, 'after_insert')
+@event.listens_for(Client, 'after_update')
+def _index_client(mapper, connection, client):
+    """Keep the match index in the same transaction as the client change."""
+    write_client_index(connection, [client])
+
+@event.listens_for(Client, 'after_delete')
+def _unindex_client(mapper, connection, client):
+    keys_table = ClientMatchKey.__table__
+    connection.execute(keys_table.delete().where(keys_table.c.client_id == client.id))
+    if has_name_index(connection):
+        connection.exec_driver_sql(f"DELETE FROM {CLIENT_NAME_FTS_TABLE} WHERE rowid = ?", (client.id,))
+
+def _fts5_trigram_available(ddl, target, bind, **kw):
+    """Create the FTS5 table only where SQLite supports trigram tokens (3.34+)."""
+    if bind.dialect.name != 'sqlite':
+        return False
+    version = tuple(int(part) for part in bind.exec_driver_sql('SELECT sqlite_version()').scalar().split('.'))
+    return version >= (3, 34, 0)
+
+event.listen(
+    ClientMatchKey.__table__, 'after_create',
+    db.DDL(CLIENT_NAME_FTS_DDL).execute_if(callable_=_fts5_trigram_available)
+)
+event.listen(
+    ClientMatchKey.__table__, 'after_drop',
+    db.DDL(f"DROP TABLE IF EXISTS {CLIENT_NAME_FTS_TABLE}").execute_if(dialect='sqlite')
+)
@@ -1,9 +1,19 @@
 from datetime import datetime
+from sqlalchemy.orm import selectinload, joinedload, defer
 from app.db import db
 
 class Document(db.Model):
     """Document model."""
     __tablename__ = 'documents'
+    __table_args__ = (
+        # Keyset pagination of the list endpoints: (sort column, id), optionally behind a filter
+        # (the composites leading with status and document_type also serve plain filters on them)
+        db.Index('ix_documents_created_at_id', 'created_at', 'id'),
+        db.Index('ix_documents_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_documents_title_id', 'title', 'id'),
+        db.Index('ix_documents_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_documents_document_type_created_at_id', 'document_type', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -16,110 +26,152 @@ class Document(db.Model):
     placeholders = db.Column(db.JSON)
 
     # Foreign Keys - made nullable
-    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=True)
-    tax_advisor_id = db.Column(db.Integer, db.ForeignKey('tax_advisors.id'), nullable=True)
-    work_order_id = db.Column(db.Integer, db.ForeignKey('work_orders.id'), nullable=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=True, index=True)
+    tax_advisor_id = db.Column(db.Integer, db.ForeignKey('tax_advisors.id'), nullable=True, index=True)
+    work_order_id = db.Column(db.Integer, db.ForeignKey('work_orders.id'), nullable=True, index=True)
+
+    # Relationships - lazy by default; use load_options() when serializing many documents
+    client = db.relationship('Client', lazy='select')
+    tax_advisor = db.relationship('TaxAdvisor', back_populates='documents', lazy='select')
     
     def __repr__(self):
         return f'<Document {self.title}>'
 
-    def to_dict(self):
-        """Convert document object to dictionary with client and tax advisor data."""
-        from app.models.client import Client
-        from app.models.tax_advisor import TaxAdvisor
-        
-        client = None
-        tax_advisor = None
-        
-        # Get client if client_id exists
-        if self.client_id:
-            client = Client.query.get(self.client_id)
-        
-        # Get tax advisor if tax_advisor_id exists  
-        if self.tax_advisor_id:
-            tax_advisor = TaxAdvisor.query.get(self.tax_advisor_id)
-
-        # Basis-Dokumentdaten
-        doc_dict = {
-            'id': self.id,
-            'title': self.title,
-            'content': self.content,
-            'document_type': self.document_type,
-            'status': self.status,
-            'file_path': self.file_path,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'client_id': self.client_id,
-            'tax_advisor_id': self.tax_advisor_id,
-            'work_order_id': self.work_order_id,
+    # Keys of the lightweight list view; content and placeholders are left out
+    LIST_FIELDS = (
+        'id', 'title', 'document_type', 'status', 'created_at', 'updated_at',
+        'client_id', 'client_name', 'tax_advisor_id', 'work_order_id'
+    )
+
+    @classmethod
+    def load_options(cls, fields=None, strategy='selectin'):
+        """Loader options for serializing many documents with to_dict(fields)
+
+        Related rows are only loaded when the requested fields need them, and
+        then for all documents at once; large columns that are not requested
+        are deferred.
+
+        Args:
+            fields: Top-level keys that will be serialized, None for all
+            strategy: 'selectin' (one extra query per relationship) or 'joined' (LEFT OUTER JOIN)
+
+        Returns:
+            List of options for Query.options()
+        """
+        loader = joinedload if strategy == 'joined' else selectinload
+        options = []
+        if fields is None or {'client', 'client_name'} & set(fields):
+            options.append(loader(cls.client))
+        if fields is None or 'tax_advisor' in fields:
+            options.append(loader(cls.tax_advisor))
+        for column in ('content', 'placeholders'):
+            if fields is not None and column not in fields:
+                options.append(defer(getattr(cls, column)))
+        return options
+
+    def to_dict(self, fields=None):
+        """Convert document object to dictionary with client and tax advisor data.
+
+        Args:
+            fields: Top-level keys to include, e.g. Document.LIST_FIELDS; all keys when None.
+                Related rows are only touched when 'client', 'client_name' or
+                'tax_advisor' is requested.
+
+        Returns:
+            Dictionary of the document
+        """
+        values = {
+            'id': lambda: self.id,
+            'title': lambda: self.title,
+            'content': lambda: self.content,
+            'document_type': lambda: self.document_type,
+            'status': lambda: self.status,
+            'file_path': lambda: self.file_path,
+            'placeholders': lambda: self.placeholders,
+            'created_at': lambda: self.created_at.isoformat() if self.created_at else None,
+            'updated_at': lambda: self.updated_at.isoformat() if self.updated_at else None,
+            'client_id': lambda: self.client_id,
+            'tax_advisor_id': lambda: self.tax_advisor_id,
+            'work_order_id': lambda: self.work_order_id,
+            'client_name': lambda: self.client.display_name if self.client else None,
+            'client': lambda: self._client_dict() if self.client else None,
+            'tax_advisor': lambda: self._tax_advisor_dict() if self.tax_advisor else None
         }
 
-        # Client-Daten (only if client exists)
-        if client:
-            client_data = {
-                'client': {
-                    'type': client.client_type,
-                    'mandate_manager': client.mandate_manager,
-                    'mandate_responsible': client.mandate_responsible,
-                    'email': client.email,
-                    'tax_number': client.tax_number,
-                    'tax_office': client.tax_office,
-                    'tax_court': client.tax_court,
-                    'address': {
-                        'zip': client.address_zip,
-                        'city': client.address_city,
-                        'street': client.address_street,
-                        'number': client.address_number
-                    },
-                    'tax_office_address': {
-                        'zip': client.tax_office_zip,
-                        'city': client.tax_office_city,
-                        'street': client.tax_office_street,
-                        'number': client.tax_office_number,
-                        'email': client.tax_office_email,
-                        'fax': client.tax_office_fax
-                    }
-                }
-            }
+        if fields is not None:
+            return {key: values[key]() for key in fields if key in values}
 
-            # Typ-spezifische Client-Daten
-            if client.client_type == 'natural':
-                client_data['client'].update({
-                    'salutation': client.salutation.value if client.salutation else None,
-                    'title': client.title,
-                    'first_name': client.first_name,
-                    'last_name': client.last_name,
-                    'birth_date': client.birth_date.isoformat() if client.birth_date else None,
-                    'tax_id': client.tax_id
-                })
-            else:  # company
-                client_data['client'].update({
-                    'company_name': client.company_name,
-                    'legal_form': client.legal_form.value if client.legal_form else None,
-                    'vat_id': client.vat_id,
-                    'contact': {
-                        'salutation': client.contact_salutation.value if client.contact_salutation else None,
-                        'last_name': client.contact_last_name,
-                        'phone': client.contact_phone,
-                        'email': client.contact_email,
-                        'fax': client.contact_fax
-                    }
-                })
-
-            doc_dict.update(client_data)
-
-        # Steuerberater-Daten (only if tax advisor exists)
-        if tax_advisor:
-            doc_dict['tax_advisor'] = {
-                'name': tax_advisor.name,
-                'email': tax_advisor.email,
-                'phone': tax_advisor.phone,
-                'address': tax_advisor.address,
-                'tax_number': tax_advisor.tax_number,
-                'specialization': tax_advisor.specialization
+        # Full view: nested data only when the related row exists
+        doc_dict = {key: build() for key, build in values.items() if key not in ('placeholders', 'client_name')}
+        for key in ('client', 'tax_advisor'):
+            if doc_dict[key] is None:
+                del doc_dict[key]
+        return doc_dict
+
+    def _client_dict(self):
+        """Nested client data of the full document view"""
+        client = self.client
+        # Client-Daten
+        client_data = {
+            'type': client.client_type,
+            'mandate_manager': client.mandate_manager,
+            'mandate_responsible': client.mandate_responsible,
+            'email': client.email,
+            'tax_number': client.tax_number,
+            'tax_office': client.tax_office,
+            'tax_court': client.tax_court,
+            'address': {
+                'zip': client.address_zip,
+                'city': client.address_city,
+                'street': client.address_street,
+                'number': client.address_number
+            },
+            'tax_office_address': {
+                'zip': client.tax_office_zip,
+                'city': client.tax_office_city,
+                'street': client.tax_office_street,
+                'number': client.tax_office_number,
+                'email': client.tax_office_email,
+                'fax': client.tax_office_fax
             }
+        }
 
-        return doc_dict
+        # Typ-spezifische Client-Daten
+        if client.client_type == 'natural':
+            client_data.update({
+                'salutation': client.salutation.value if client.salutation else None,
+                'title': client.title,
+                'first_name': client.first_name,
+                'last_name': client.last_name,
+                'birth_date': client.birth_date.isoformat() if client.birth_date else None,
+                'tax_id': client.tax_id
+            })
+        else:  # company
+            client_data.update({
+                'company_name': client.company_name,
+                'legal_form': client.legal_form.value if client.legal_form else None,
+                'vat_id': client.vat_id,
+                'contact': {
+                    'salutation': client.contact_salutation.value if client.contact_salutation else None,
+                    'last_name': client.contact_last_name,
+                    'phone': client.contact_phone,
+                    'email': client.contact_email,
+                    'fax': client.contact_fax
+                }
+            })
+        return client_data
+
+    def _tax_advisor_dict(self):
+        """Nested tax advisor data of the full document view"""
+        tax_advisor = self.tax_advisor
+        return {
+            'name': tax_advisor.name,
+            'email': tax_advisor.email,
+            'phone': tax_advisor.phone,
+            'address': tax_advisor.address,
+            'tax_number': tax_advisor.tax_number,
+            'specialization': tax_advisor.specialization
+        }
 
     @classmethod
     def create_with_client_data(cls, **kwargs):
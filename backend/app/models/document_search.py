@@ -0,0 +1,48 @@
+from sqlalchemy import event
+from app.db import db
+from app.models.document import Document
+
+# SQLite FTS5 table over document text; rowid is the document ID
+DOCUMENT_SEARCH_FTS_TABLE = 'document_search_fts'
+DOCUMENT_SEARCH_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {DOCUMENT_SEARCH_FTS_TABLE} "
+    "USING fts5(title, description, placeholders, body, tokenize='unicode61 remove_diacritics 2')"
+)
+
+# PostgreSQL table with a weighted tsvector kept up to date by the database
+DOCUMENT_SEARCH_TABLE = 'document_search'
+DOCUMENT_SEARCH_PG_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {DOCUMENT_SEARCH_TABLE} ("
+    " document_id INTEGER PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,"
+    " title TEXT, description TEXT, placeholders TEXT, body TEXT,"
+    " search_vector tsvector GENERATED ALWAYS AS ("
+    "  setweight(to_tsvector('german', coalesce(title, '')), 'A') ||"
+    "  setweight(to_tsvector('german', coalesce(description, '')), 'B') ||"
+    "  setweight(to_tsvector('german', coalesce(placeholders, '')), 'B') ||"
+    "  setweight(to_tsvector('german', coalesce(body, '')), 'C')"
+    " ) STORED)"
+)
+DOCUMENT_SEARCH_PG_INDEX_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_document_search_vector ON {DOCUMENT_SEARCH_TABLE} USING GIN (search_vector)"
+)
+
+def _fts5_available(ddl, target, bind, **kw):
+    """Create the FTS5 table only where SQLite was built with FTS5."""
+    if bind.dialect.name != 'sqlite':
+        return False
+    return bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar() == 1
+
+event.listen(
+    Document.__table__, 'after_create',
+    db.DDL(DOCUMENT_SEARCH_FTS_DDL).execute_if(callable_=_fts5_available)
+)
+event.listen(Document.__table__, 'after_create', db.DDL(DOCUMENT_SEARCH_PG_DDL).execute_if(dialect='postgresql'))
+event.listen(Document.__table__, 'after_create', db.DDL(DOCUMENT_SEARCH_PG_INDEX_DDL).execute_if(dialect='postgresql'))
+event.listen(
+    Document.__table__, 'before_drop',
+    db.DDL(f"DROP TABLE IF EXISTS {DOCUMENT_SEARCH_FTS_TABLE}").execute_if(dialect='sqlite')
+)
+event.listen(
+    Document.__table__, 'before_drop',
+    db.DDL(f"DROP TABLE IF EXISTS {DOCUMENT_SEARCH_TABLE}").execute_if(dialect='postgresql')
+)
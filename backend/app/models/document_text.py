@@ -0,0 +1,22 @@
+from datetime import datetime
+from app.db import db
+
+class DocumentText(db.Model):
+    """Extracted text of a stored document file.
+
+    Rows are keyed by the absolute file path and validated against the file's
+    mtime and size; the content hash lets identical files share one extraction.
+    """
+    __tablename__ = 'document_texts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # SHA-256 of the file content
+    file_mtime = db.Column(db.Float, nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DocumentText {self.file_path}>'
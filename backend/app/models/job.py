@@ -0,0 +1,52 @@
+import uuid
+from datetime import datetime
+from app.db import db
+
+class Job(db.Model):
+    """Background job for long-running AI agent requests"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type = db.Column(db.String(50), nullable=False)  # e.g., 'process_documents', 'create_workflow'
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)  # 'queued', 'running', 'completed', 'failed', 'cancelled'
+    stage = db.Column(db.String(50))  # Current pipeline stage
+    progress = db.Column(db.JSON, default=dict)  # Stage name -> 'running' / 'done'
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    owner = db.Column(db.String(120))  # host:pid of the server process running the job
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed by the owner while the job is queued or running
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} {self.status}>'
+    
+    @property
+    def is_finished(self):
+        """Whether the job has reached a terminal state"""
+        return self.status in self.FINISHED_STATUSES
+    
+    def to_dict(self, include_result=True):
+        """Convert job to dictionary"""
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress or {},
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
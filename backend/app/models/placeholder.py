@@ -4,6 +4,10 @@ from datetime import datetime
 class Placeholder(db.Model):
     """Placeholder model for document templates."""
     __tablename__ = 'placeholders'
+    __table_args__ = (
+        # Keyset pagination of the list endpoint: (sort column, id)
+        db.Index('ix_placeholders_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -16,7 +20,7 @@ class Placeholder(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Optional relationship to document
-    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=True, index=True)
     document = db.relationship('Document', backref='document_placeholders', lazy=True)
     
     def __repr__(self):
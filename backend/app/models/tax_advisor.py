@@ -4,6 +4,10 @@ from datetime import datetime
 class TaxAdvisor(db.Model):
     """Tax Advisor (Steuerberater) model."""
     __tablename__ = 'tax_advisors'
+    __table_args__ = (
+        # Keyset pagination of the list endpoint: (sort column, id)
+        db.Index('ix_tax_advisors_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -16,7 +20,7 @@ class TaxAdvisor(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    documents = db.relationship('Document', backref='tax_advisor', lazy=True)
+    documents = db.relationship('Document', back_populates='tax_advisor', lazy=True)
     work_orders = db.relationship('WorkOrder', backref='tax_advisor', lazy=True)
 
     def __repr__(self):
@@ -4,6 +4,13 @@ from datetime import datetime
 class WorkOrder(db.Model):
     """Work Order (Arbeitsauftrag) model."""
     __tablename__ = 'work_orders'
+    __table_args__ = (
+        # Keyset pagination of the list endpoint: (sort column, id), optionally behind a filter
+        # (the composites leading with status also serve plain filters on them)
+        db.Index('ix_work_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_work_orders_due_date_id', 'due_date', 'id'),
+        db.Index('ix_work_orders_status_due_date_id', 'status', 'due_date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -15,9 +22,9 @@ class WorkOrder(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Foreign keys
-    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
-    tax_advisor_id = db.Column(db.Integer, db.ForeignKey('tax_advisors.id'), nullable=False)
-    template_id = db.Column(db.Integer, db.ForeignKey('documents.id', name='fk_work_order_template'), nullable=True)  # Link to document template
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False, index=True)
+    tax_advisor_id = db.Column(db.Integer, db.ForeignKey('tax_advisors.id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('documents.id', name='fk_work_order_template'), nullable=True, index=True)  # Link to document template
 
     # Relationships
     documents = db.relationship('Document', backref='work_order', lazy=True, foreign_keys='Document.work_order_id')
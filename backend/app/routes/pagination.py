@@ -0,0 +1,194 @@
+import json
+import base64
+import binascii
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from flask import current_app, jsonify
+from sqlalchemy import tuple_
+
+class PaginationError(ValueError):
+    """Invalid limit, cursor, filter or sort parameter of a list request"""
+
+class Filter:
+    """A query parameter that filters one column
+
+    Comma separated values of an 'eq' filter match any of the values, e.g.
+    ?status=open,in_progress.
+    """
+
+    OPERATORS = {
+        'eq': lambda column, value: column == value,
+        'gte': lambda column, value: column >= value,
+        'lt': lambda column, value: column < value
+    }
+
+    def __init__(self, column, op: str = 'eq', value_type: type = str):
+        self.column = column
+        self.op = op
+        self.value_type = value_type
+
+    def condition(self, name: str, raw: str):
+        """Build the SQL condition for a raw query parameter value"""
+        if self.op == 'eq':
+            values = [_parse_value(name, part.strip(), self.value_type) for part in raw.split(',') if part.strip()]
+            if not values:
+                raise PaginationError(f"Empty value for filter '{name}'")
+            return self.column == values[0] if len(values) == 1 else self.column.in_(values)
+        return self.OPERATORS[self.op](self.column, _parse_value(name, raw, self.value_type))
+
+def _parse_value(name: str, raw: str, value_type: type) -> Any:
+    """Convert a query parameter or cursor value to the column's Python type"""
+    try:
+        if value_type is datetime:
+            return datetime.fromisoformat(raw)
+        if value_type is date:
+            return date.fromisoformat(raw)
+        if value_type is bool:
+            if raw.lower() not in ('true', 'false', '1', '0'):
+                raise ValueError(raw)
+            return raw.lower() in ('true', '1')
+        return value_type(raw)
+    except (TypeError, ValueError):
+        raise PaginationError(f"Invalid value for '{name}': {raw}")
+
+class ListSpec:
+    """Sorting, filtering and keyset pagination of a list endpoint
+
+    Pages are addressed by an opaque cursor holding the sort key value and ID
+    of the last row, so fetching a page is an index range scan on (sort
+    column, id) no matter how deep it is. Ties are broken by id, and NULL
+    counts as the smallest value: rows without a value come first in
+    ascending and last in descending order. They are read as a separate
+    segment so neither part needs an OR condition that defeats the index.
+
+    Query parameters:
+        limit: Page size, at most PAGINATION_MAX_LIMIT; defaults to PAGINATION_DEFAULT_LIMIT (0 = all rows)
+        after: Cursor from the X-Next-Cursor header of the previous page
+        sort: Sort key, prefixed with '-' for descending order
+        <filter>: Any of the endpoint's filters
+    """
+
+    def __init__(self, model, sort_keys: Iterable[str] = (), filters: Optional[Dict[str, Filter]] = None, default_sort: str = 'id'):
+        self.id_column = model.id
+        self.sort_keys = {'id': model.id}
+        self.sort_keys.update((name, getattr(model, name)) for name in sort_keys)
+        self.filters = filters or {}
+        self.default_sort = default_sort
+
+    def paginate(self, query, args) -> Tuple[List[Any], Optional[str]]:
+        """Apply the request's filters, sort order and page to a query
+
+        Args:
+            query: Base query of the endpoint
+            args: Request query parameters
+
+        Returns:
+            Tuple of (rows of the page, cursor of the next page or None)
+
+        Raises:
+            PaginationError: If a parameter is invalid
+        """
+        segments = self.build_queries(query, args)
+        limit = self._get_limit(args)
+        if not limit:
+            return [row for segment in segments for row in segment.all()], None
+
+        rows = []
+        for segment in segments:
+            rows.extend(segment.limit(limit + 1 - len(rows)).all())
+            if len(rows) > limit:
+                break
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        sort = self._get_sort(args)
+        column = self.sort_keys[sort.lstrip('-')]
+        return rows, self._encode_cursor(sort, getattr(rows[-1], column.key), rows[-1].id)
+
+    def build_queries(self, query, args) -> list:
+        """Apply the request's filters, cursor position and sort order, without a limit
+
+        Args:
+            query: Base query of the endpoint
+            args: Request query parameters
+
+        Returns:
+            Ordered queries whose results, concatenated, are the rows behind the cursor
+
+        Raises:
+            PaginationError: If a parameter is invalid
+        """
+        for name, spec in self.filters.items():
+            raw = args.get(name)
+            if raw is not None and raw != '':
+                query = query.filter(spec.condition(name, raw))
+
+        sort = self._get_sort(args)
+        descending = sort.startswith('-')
+        column = self.sort_keys[sort.lstrip('-')]
+        id_order = self.id_column.desc() if descending else self.id_column.asc()
+        cursor = args.get('after')
+        value, last_id = self._decode_cursor(cursor, sort, column) if cursor else (None, None)
+
+        if column is self.id_column:
+            if cursor:
+                query = query.filter(self.id_column < last_id if descending else self.id_column > last_id)
+            return [query.order_by(id_order)]
+
+        # Rows with a value, by (column, id)
+        values = query.filter(column.isnot(None)).order_by(column.desc() if descending else column.asc(), id_order)
+        # Rows without a value, by id
+        nulls = query.filter(column.is_(None)).order_by(id_order)
+        if cursor and value is not None:
+            position = tuple_(column, self.id_column)
+            values = values.filter(position < tuple_(value, last_id) if descending else position > tuple_(value, last_id))
+        elif cursor:
+            nulls = nulls.filter(self.id_column < last_id if descending else self.id_column > last_id)
+
+        if not column.nullable:
+            return [values]
+        if descending:
+            return [values, nulls] if value is not None or not cursor else [nulls]
+        return [nulls, values] if not cursor or value is None else [values]
+
+    def _get_sort(self, args) -> str:
+        sort = args.get('sort') or self.default_sort
+        if sort.lstrip('-') not in self.sort_keys:
+            raise PaginationError(f"Unsupported sort key '{sort}'. Use one of: {', '.join(sorted(self.sort_keys))}")
+        return sort
+
+    def _get_limit(self, args) -> int:
+        default = int(current_app.config.get('PAGINATION_DEFAULT_LIMIT', 0))
+        maximum = int(current_app.config.get('PAGINATION_MAX_LIMIT', 500))
+        raw = args.get('limit')
+        if raw is None:
+            return min(default, maximum) if default > 0 else 0
+        limit = _parse_value('limit', raw, int)
+        if not 1 <= limit <= maximum:
+            raise PaginationError(f"limit must be between 1 and {maximum}")
+        return limit
+
+    def _encode_cursor(self, sort: str, value: Any, last_id: int) -> str:
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        payload = json.dumps([sort, value, last_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, cursor: str, sort: str, column) -> Tuple[Any, int]:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (ValueError, TypeError, binascii.Error):
+            raise PaginationError("Invalid cursor")
+        if cursor_sort != sort or not isinstance(last_id, int):
+            raise PaginationError("Cursor does not match the requested sort order")
+        if value is not None and column is not self.id_column:
+            value = _parse_value('after', str(value), column.type.python_type)
+        return value, last_id
+
+def list_response(items: List[Any], next_cursor: Optional[str]):
+    """JSON array response with the next page's cursor in the X-Next-Cursor header"""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
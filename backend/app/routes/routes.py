@@ -2,14 +2,28 @@ from flask import jsonify, request, send_file, current_app
 from app import db
 from app.models import Client, Document, TaxAdvisor, WorkOrder, Placeholder, Salutation, LegalForm, User
 from app.routes import api_bp
+from app.routes.serialization import parse_fields, root_fields, project
+from app.routes.pagination import ListSpec, Filter, PaginationError, list_response
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
+from werkzeug.utils import secure_filename
 from app.services.llm_service import ollama_service
 from app.services.document_service import document_service
+from app.services.template_cache import template_cache
+from app.services.render_cache import render_cache
+from app.services.office_conversion import get_conversion_metrics
 from app.services.user_service import UserService
-import base64
+from app.services.job_service import job_service
+from app.services.batch_service import batch_service
+from app.services.client_index import client_match_index
+from app.services.search_service import search_service, SearchUnavailableError
+from app.services.blob_store import blob_store
+from app.services.passage_retrieval import passage_retriever
+from app.services.rule_extractors import rule_extractors
+import json
 import os
-import tempfile
+import queue
+import threading
 import logging
 from datetime import datetime
 
@@ -17,11 +31,38 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 # Document
+def _send_rendered_document(rendered, as_attachment=False):
+    """Stream a rendered document from disk and delete it afterwards if temporary
+    
+    The file is sent in chunks with conditional and range request support, so
+    memory use does not depend on the document size.
+    """
+    response = send_file(
+        rendered['path'],
+        mimetype=rendered['mime_type'],
+        as_attachment=as_attachment,
+        download_name=rendered['filename'],
+        conditional=True
+    )
+    
+    if rendered.get('temporary'):
+        # A passthrough file response hands the bare file wrapper to the server,
+        # whose close() would skip the callbacks below
+        response.direct_passthrough = False
+        
+        @response.call_on_close
+        def cleanup():
+            document_service.release_rendered_document(rendered)
+    
+    return response
+
 @api_bp.route('/documents/preview/<int:document_id>', methods=['POST'])
 def preview_document(document_id):
     """Generate a preview of a document with placeholders filled in.
     
-    Request body should contain placeholder values as JSON.
+    Request body should contain placeholder values as JSON. The rendered file is
+    streamed; legacy clients can pass ?format=base64 to get the JSON form with
+    base64 encoded preview_data.
     """
     logger.info("Received request to preview document with ID: %d", document_id)
     try:
@@ -31,9 +72,14 @@ def preview_document(document_id):
             return jsonify({'error': 'No placeholder values provided'}), 400
             
         logger.debug("Placeholder values: %s", placeholder_values)
-        preview_data = document_service.create_document_preview(document_id, placeholder_values)
+        if request.args.get('format') == 'base64':
+            preview_data = document_service.create_document_preview(document_id, placeholder_values)
+            logger.info("Successfully created base64 preview for document with ID: %d", document_id)
+            return jsonify(preview_data), 200
+        
+        rendered = document_service.render_document(document_id, placeholder_values)
         logger.info("Successfully created preview for document with ID: %d", document_id)
-        return jsonify(preview_data), 200
+        return _send_rendered_document(rendered)
     except ValueError as e:
         logger.error("Error value when creating preview for document %d: %s", document_id, str(e))
         return jsonify({'error': str(e)}), 400
@@ -110,50 +156,31 @@ def upload_document():
         logger.error("Exception when uploading document: %s", str(e), exc_info=True)
         return jsonify({'error': f'Failed to upload document: {str(e)}'}), 500
 
-@api_bp.route('/documents/download/<int:document_id>', methods=['POST'])
+@api_bp.route('/documents/download/<int:document_id>', methods=['GET', 'POST'])
 def download_document_with_placeholders(document_id):
     """Generate and download a document with placeholders filled in.
     
-    Request body should contain placeholder values as JSON.
+    Request body should contain placeholder values as JSON. GET requests pass
+    them as query parameters instead; browsers and PDF viewers can then resume
+    or fetch byte ranges of the download.
     """
     logger.info("Received request to download document with ID: %d", document_id)
     try:
-        placeholder_values = request.get_json()
+        if request.method == 'GET':
+            placeholder_values = request.args.to_dict()
+        else:
+            placeholder_values = request.get_json()
         if not placeholder_values:
             logger.warning("No placeholder values provided for document with ID: %d", document_id)
             return jsonify({'error': 'No placeholder values provided'}), 400
             
         logger.debug("Placeholder values: %s", placeholder_values)
         
-        # Generate preview
-        preview_data = document_service.create_document_preview(document_id, placeholder_values)
-        
-        # Decode base64 data
-        file_data = base64.b64decode(preview_data['preview_data'])
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.' + preview_data['filename'].split('.')[-1]) as tmp:
-            tmp.write(file_data)
-            tmp_path = tmp.name
-            logger.debug("Temporary file created at path: %s", tmp_path)
-        
-        # Send file
-        logger.info("Sending filled document: %s", preview_data['filename'])
-        response = send_file(
-            tmp_path,
-            mimetype=preview_data['mime_type'],
-            as_attachment=False,
-            download_name=preview_data['filename']
-        )
+        # Render the document and stream it from disk
+        rendered = document_service.render_document(document_id, placeholder_values)
         
-        # Clean up temp file after sending
-        @response.call_on_close
-        def cleanup():
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-                logger.debug("Temporary file deleted: %s", tmp_path)
-                
-        return response
+        logger.info("Sending filled document: %s", rendered['filename'])
+        return _send_rendered_document(rendered)
     except ValueError as e:
         logger.error("Error value when downloading document %d: %s", document_id, str(e))
         return jsonify({'error': str(e)}), 400
@@ -168,6 +195,9 @@ def preview_uploaded_document():
     Expected multipart/form-data with:
     - file: The document file
     - placeholders: JSON string of placeholder values
+    
+    The rendered file is streamed; legacy clients can pass ?format=base64 to get
+    the JSON form with base64 encoded preview_data.
     """
     logger.info("Received request to preview temporary document")
     try:
@@ -195,10 +225,12 @@ def preview_uploaded_document():
                 return jsonify({'error': 'Invalid placeholders JSON'}), 400
                 
         # Generate preview
-        preview_data = document_service.create_preview_from_uploaded_file(file, placeholder_values)
+        rendered = document_service.create_preview_from_uploaded_file(file, placeholder_values)
         logger.info("Successfully created preview for temporary document: %s", file.filename)
         
-        return jsonify(preview_data), 200
+        if request.args.get('format') == 'base64':
+            return jsonify(document_service.encode_rendered_document(rendered)), 200
+        return _send_rendered_document(rendered)
     except ValueError as e:
         logger.error("Error value when creating preview for temporary document: %s", str(e))
         return jsonify({'error': str(e)}), 400
@@ -252,18 +284,75 @@ def update_placeholder_name_in_temp():
 
 # Dashboard
 
+# List endpoints: sort keys and filters accepted next to limit/after (see ListSpec)
+CLIENT_LIST = ListSpec(Client, sort_keys=('created_at', 'company_name', 'last_name'), filters={
+    'client_type': Filter(Client.client_type),
+    'tax_office': Filter(Client.tax_office),
+    'address_city': Filter(Client.address_city),
+    'created_after': Filter(Client.created_at, 'gte', datetime),
+    'created_before': Filter(Client.created_at, 'lt', datetime)
+})
+
+DOCUMENT_LIST = ListSpec(Document, sort_keys=('created_at', 'updated_at', 'title'), filters={
+    'status': Filter(Document.status),
+    'document_type': Filter(Document.document_type),
+    'client_id': Filter(Document.client_id, value_type=int),
+    'tax_advisor_id': Filter(Document.tax_advisor_id, value_type=int),
+    'work_order_id': Filter(Document.work_order_id, value_type=int),
+    'created_after': Filter(Document.created_at, 'gte', datetime),
+    'created_before': Filter(Document.created_at, 'lt', datetime),
+    'updated_after': Filter(Document.updated_at, 'gte', datetime),
+    'updated_before': Filter(Document.updated_at, 'lt', datetime)
+})
+
+TEMPLATE_LIST = ListSpec(Document, sort_keys=('created_at', 'title'), filters={
+    'document_type': Filter(Document.document_type),
+    'created_after': Filter(Document.created_at, 'gte', datetime),
+    'created_before': Filter(Document.created_at, 'lt', datetime)
+})
+
+TAX_ADVISOR_LIST = ListSpec(TaxAdvisor, sort_keys=('name',), filters={
+    'specialization': Filter(TaxAdvisor.specialization)
+})
+
+WORK_ORDER_LIST = ListSpec(WorkOrder, sort_keys=('created_at', 'due_date'), filters={
+    'status': Filter(WorkOrder.status),
+    'priority': Filter(WorkOrder.priority),
+    'client_id': Filter(WorkOrder.client_id, value_type=int),
+    'tax_advisor_id': Filter(WorkOrder.tax_advisor_id, value_type=int),
+    'template_id': Filter(WorkOrder.template_id, value_type=int),
+    'due_after': Filter(WorkOrder.due_date, 'gte', datetime),
+    'due_before': Filter(WorkOrder.due_date, 'lt', datetime),
+    'created_after': Filter(WorkOrder.created_at, 'gte', datetime),
+    'created_before': Filter(WorkOrder.created_at, 'lt', datetime)
+})
+
+PLACEHOLDER_LIST = ListSpec(Placeholder, sort_keys=('name',), filters={
+    'document_id': Filter(Placeholder.document_id, value_type=int),
+    'type': Filter(Placeholder.type),
+    'is_required': Filter(Placeholder.is_required, value_type=bool)
+})
+
 # Client routes
 @api_bp.route('/clients', methods=['GET'])
 def get_clients():
-    """Get all clients."""
-    clients = Client.query.all()
-    return jsonify([client.to_dict() for client in clients])
+    """Get clients, paginated and filtered as described by CLIENT_LIST.
+
+    Query parameters:
+        fields: Comma separated keys to return, e.g. 'id,company_name,email'
+    """
+    fields = parse_fields(request.args.get('fields'))
+    try:
+        clients, next_cursor = CLIENT_LIST.paginate(Client.query, request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([project(client.to_dict(), fields) for client in clients], next_cursor)
 
 @api_bp.route('/clients/<int:client_id>', methods=['GET'])
 def get_client(client_id):
     """Get a specific client."""
     client = Client.query.get_or_404(client_id)
-    return jsonify(client.to_dict())
+    return jsonify(project(client.to_dict(), parse_fields(request.args.get('fields'))))
 
 @api_bp.route('/clients/<int:client_id>', methods=['DELETE'])
 def delete_client(client_id):
@@ -339,9 +428,12 @@ def create_client():
 # Tax Advisor routes
 @api_bp.route('/tax-advisors', methods=['GET'])
 def get_tax_advisors():
-    """Get all tax advisors."""
-    advisors = TaxAdvisor.query.all()
-    return jsonify([{
+    """Get tax advisors, paginated and filtered as described by TAX_ADVISOR_LIST."""
+    try:
+        advisors, next_cursor = TAX_ADVISOR_LIST.paginate(TaxAdvisor.query, request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([{
         'id': advisor.id,
         'name': advisor.name,
         'email': advisor.email,
@@ -349,7 +441,7 @@ def get_tax_advisors():
         'address': advisor.address,
         'tax_number': advisor.tax_number,
         'specialization': advisor.specialization
-    } for advisor in advisors])
+    } for advisor in advisors], next_cursor)
 
 @api_bp.route('/tax-advisors/<int:advisor_id>', methods=['GET'])
 def get_tax_advisor(advisor_id):
@@ -368,15 +460,39 @@ def get_tax_advisor(advisor_id):
 # Document routes
 @api_bp.route('/documents', methods=['GET'])
 def get_documents():
-    """Get all documents."""
-    documents = Document.query.all()
-    return jsonify([doc.to_dict() for doc in documents])
+    """Get documents, paginated and filtered as described by DOCUMENT_LIST.
+
+    Returns the list view (Document.LIST_FIELDS, without content) by default.
+    Related clients and tax advisors are loaded in one query each, so the
+    number of queries does not grow with the number of documents.
+
+    Query parameters:
+        fields: Comma separated keys to return; nested keys use dots, e.g. 'id,title,client.email'
+        view: 'full' returns every key including content and nested client data
+    """
+    fields = parse_fields(request.args.get('fields'))
+    if fields is None and request.args.get('view') != 'full':
+        fields = list(Document.LIST_FIELDS)
+    roots = root_fields(fields)
+    try:
+        documents, next_cursor = DOCUMENT_LIST.paginate(
+            Document.query.options(*Document.load_options(roots)), request.args
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([project(doc.to_dict(roots), fields) for doc in documents], next_cursor)
 
 @api_bp.route('/documents/<int:document_id>', methods=['GET'])
 def get_document(document_id):
-    """Get a specific document."""
-    document = Document.query.get_or_404(document_id)
-    return jsonify(document.to_dict())
+    """Get a specific document.
+
+    Query parameters:
+        fields: Comma separated keys to return; nested keys use dots
+    """
+    fields = parse_fields(request.args.get('fields'))
+    roots = root_fields(fields)
+    document = Document.query.options(*Document.load_options(roots, strategy='joined')).get_or_404(document_id)
+    return jsonify(project(document.to_dict(roots), fields))
 
 @api_bp.route('/documents/<int:document_id>/file', methods=['GET'])
 def get_document_file(document_id):
@@ -422,8 +538,8 @@ def get_document_text(document_id):
             logger.error("Document file not found for ID %d at path: %s", document_id, document.file_path)
             return jsonify({"error": "Document file not found"}), 404
         
-        # Extract text using document service
-        text_content = document_service.extract_text_from_file(document.file_path)
+        # Extract text using document service (served from the extracted-text cache)
+        text_content = document_service.get_document_text(document.file_path)
         
         logger.info("Successfully extracted text content for document ID: %d", document_id)
         return jsonify({"text": text_content}), 200
@@ -441,13 +557,9 @@ def delete_document(document_id):
         document = Document.query.get_or_404(document_id)
         logger.info("Found document with ID: %d for deletion", document_id)
         
-        # Delete the document file if it exists
-        if document.file_path and os.path.exists(document.file_path):
-            try:
-                os.remove(document.file_path)
-                logger.info("Deleted document file: %s", document.file_path)
-            except OSError as e:
-                logger.warning("Could not delete document file %s: %s", document.file_path, str(e))
+        # Delete the document file unless another document shares the blob
+        document_service.invalidate_template(document_id, document.file_path)
+        document_service.release_document_file(document)
         
         # Delete the document from database
         db.session.delete(document)
@@ -475,6 +587,7 @@ def update_document(document_id):
         # Get the document record
         document = Document.query.get_or_404(document_id)
         logger.info("Found document with ID: %d for update", document_id)
+        document_service.invalidate_template(document_id, document.file_path)
         
         # Update document metadata
         if 'name' in request.form:
@@ -491,19 +604,16 @@ def update_document(document_id):
             if file.filename != '':
                 logger.debug("Updating document file: %s", file.filename)
                 
-                # Delete old file if it exists
-                if document.file_path and os.path.exists(document.file_path):
-                    try:
-                        os.remove(document.file_path)
-                        logger.info("Deleted old document file: %s", document.file_path)
-                    except OSError as e:
-                        logger.warning("Could not delete old document file %s: %s", document.file_path, str(e))
-                
-                # Save new file
+                # Save new file; identical content keeps the same blob
+                old_file_path = document.file_path
                 new_file_path = document_service.save_document(file, file.filename)
                 document.file_path = new_file_path
                 document.document_type = file.content_type
                 logger.debug("New file saved at path: %s", new_file_path)
+                
+                # Delete old file unless another document shares it
+                if old_file_path and old_file_path != new_file_path:
+                    document_service.release_document_file(document, old_file_path)
         
         # Update placeholders if provided
         if 'placeholders' in request.form:
@@ -550,12 +660,69 @@ def create_document():
         db.session.rollback()
         return jsonify({'error': 'Invalid data provided'}), 400
 
+@api_bp.route('/search', methods=['GET'])
+def search_documents():
+    """Full-text search over document titles, descriptions, placeholders and file text.
+
+    Results are documents in the list view (Document.LIST_FIELDS), best match
+    first, each with a relevance 'score' and an HTML 'snippet' marking the
+    matched words with <mark>.
+
+    Query parameters:
+        q: Search words (required); all must occur, the last one also as a prefix
+        client_id: Only documents of this client
+        work_order_id: Only documents of this work order
+        limit: Maximum number of results (default SEARCH_DEFAULT_LIMIT, at most SEARCH_MAX_LIMIT)
+        fields: Comma separated document keys to return
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    params = {}
+    for name in ('client_id', 'work_order_id', 'limit'):
+        raw = request.args.get(name)
+        if raw is None:
+            continue
+        try:
+            params[name] = int(raw)
+        except ValueError:
+            return jsonify({'error': f'{name} must be an integer'}), 400
+    if params.get('limit') is not None and params['limit'] < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+
+    try:
+        hits = search_service.search(query, **params)
+    except SearchUnavailableError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error("Error searching documents for %r: %s", query, str(e), exc_info=True)
+        return jsonify({'error': f'Failed to search documents: {str(e)}'}), 500
+
+    fields = parse_fields(request.args.get('fields')) or list(Document.LIST_FIELDS)
+    roots = root_fields(fields)
+    ids = [hit['document_id'] for hit in hits]
+    documents = {
+        document.id: document
+        for document in Document.query.options(*Document.load_options(roots)).filter(Document.id.in_(ids)).all()
+    } if ids else {}
+    results = []
+    for hit in hits:
+        document = documents.get(hit['document_id'])
+        if document is not None:
+            item = project(document.to_dict(roots), fields)
+            item.update(score=hit['score'], snippet=hit['snippet'])
+            results.append(item)
+    return jsonify(results), 200
+
 # Work Order routes
 @api_bp.route('/work-orders', methods=['GET'])
 def get_work_orders():
-    """Get all work orders."""
-    work_orders = WorkOrder.query.all()
-    return jsonify([{
+    """Get work orders, paginated and filtered as described by WORK_ORDER_LIST."""
+    try:
+        work_orders, next_cursor = WORK_ORDER_LIST.paginate(WorkOrder.query, request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([{
         'id': order.id,
         'title': order.title,
         'description': order.description,
@@ -565,7 +732,7 @@ def get_work_orders():
         'client_id': order.client_id,
         'tax_advisor_id': order.tax_advisor_id,
         'template_id': order.template_id
-    } for order in work_orders])
+    } for order in work_orders], next_cursor)
 
 @api_bp.route('/work-orders/<int:order_id>', methods=['GET'])
 def get_work_order(order_id):
@@ -1041,16 +1208,8 @@ def delete_work_order_document(order_id, document_id):
         if not document:
             return jsonify({'error': 'Document not found or does not belong to this work order'}), 404
         
-        # Delete file from disk if it exists
-        if document.file_path:
-            import os
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], document.file_path)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.info("Document file deleted from disk: %s", file_path)
-                except OSError as e:
-                    logger.warning("Could not delete document file from disk: %s - %s", file_path, str(e))
+        # Delete file from disk unless another document shares it
+        document_service.release_document_file(document)
         
         # Delete document record from database
         db.session.delete(document)
@@ -1094,9 +1253,12 @@ def get_file_size(file_path):
 # Placeholder routes
 @api_bp.route('/placeholders', methods=['GET'])
 def get_placeholders():
-    """Get all placeholders."""
-    placeholders = Placeholder.query.all()
-    return jsonify([{
+    """Get placeholders, paginated and filtered as described by PLACEHOLDER_LIST."""
+    try:
+        placeholders, next_cursor = PLACEHOLDER_LIST.paginate(Placeholder.query, request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([{
         'id': ph.id,
         'name': ph.name,
         'description': ph.description,
@@ -1104,7 +1266,7 @@ def get_placeholders():
         'type': ph.type,
         'is_required': ph.is_required,
         'document_id': ph.document_id
-    } for ph in placeholders])
+    } for ph in placeholders], next_cursor)
 
 @api_bp.route('/placeholders/<int:placeholder_id>', methods=['GET'])
 def get_placeholder(placeholder_id):
@@ -1158,14 +1320,20 @@ def update_placeholder_name(document_id):
 
 @api_bp.route('/documents/templates', methods=['GET'])
 def get_document_templates():
-    """Get all document templates with their placeholders.
+    """Get document templates with their placeholders.
     
-    Returns a list of templates that can be used to create new documents.
+    Returns a list of templates that can be used to create new documents,
+    paginated and filtered as described by TEMPLATE_LIST.
     """
     logger.info("Received request to get all document templates")
     try:
-        # Get all documents
-        documents = Document.query.all()
+        # Templates are the documents with extracted content
+        try:
+            documents, next_cursor = TEMPLATE_LIST.paginate(
+                Document.query.filter(Document.content.isnot(None)), request.args
+            )
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Format document data with placeholders
         result = []
@@ -1173,9 +1341,6 @@ def get_document_templates():
             # Get placeholders from JSON field instead of querying the Placeholder table
             placeholders_data = doc.placeholders or []
             
-            if doc.content is None:
-                continue
-            
             doc_dict = {
                 'id': doc.id,
                 'name': doc.title,  # Use title as name for frontend consistency
@@ -1188,7 +1353,7 @@ def get_document_templates():
             result.append(doc_dict)
         
         logger.info("Successfully retrieved %d document templates", len(result))
-        return jsonify(result), 200
+        return list_response(result, next_cursor), 200
     except Exception as e:
         logger.error("Error retrieving document templates: %s", str(e), exc_info=True)
         return jsonify({'error': f'Failed to retrieve templates: {str(e)}'}), 500
@@ -1241,6 +1406,60 @@ def create_from_template(template_id):
         logger.error("Exception creating document from template %d: %s", template_id, str(e), exc_info=True)
         return jsonify({'error': f'Failed to create document: {str(e)}'}), 500
 
+@api_bp.route('/documents/batch/<int:template_id>', methods=['POST'])
+def generate_documents_batch(template_id):
+    """Generate one document per client or value set from a template.
+    
+    Request body should contain one of:
+    - client_ids: list of client IDs
+    - client_filter: object of client column values, e.g. {"address_city": "Berlin"}
+    - value_sets: list of placeholder value objects
+    
+    Optional fields:
+    - values: placeholder values added to every document
+    - format: 'docx' (default) or 'pdf'
+    - output: 'zip' (default) streams a ZIP archive with a manifest.json of
+      per-item results; 'folder' writes the files to the upload folder and
+      returns the report as JSON
+    """
+    logger.info("Received request for batch generation from template with ID: %d", template_id)
+    try:
+        data = request.get_json() or {}
+        output_format = data.get('format', 'docx')
+        output = data.get('output', 'zip')
+        if output_format not in ('docx', 'pdf'):
+            return jsonify({'error': "format must be 'docx' or 'pdf'"}), 400
+        if output not in ('zip', 'folder'):
+            return jsonify({'error': "output must be 'zip' or 'folder'"}), 400
+        
+        batch = batch_service.prepare(
+            template_id,
+            client_ids=data.get('client_ids'),
+            client_filter=data.get('client_filter'),
+            value_sets=data.get('value_sets'),
+            shared_values=data.get('values')
+        )
+        logger.info("Batch for template %d contains %d documents", template_id, len(batch['items']))
+        
+        if output == 'folder':
+            summary = batch_service.write_to_folder(batch, output_format)
+            return jsonify(summary), 200
+        
+        filename = f"{secure_filename(batch['document'].title) or 'dokumente'}_batch.zip"
+        return current_app.response_class(
+            batch_service.stream_zip(batch, output_format),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+        )
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        logger.error("Invalid batch request for template %d: %s", template_id, str(e))
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Exception during batch generation for template %d: %s", template_id, str(e), exc_info=True)
+        return jsonify({'error': f'Failed to generate documents: {str(e)}'}), 500
+
 # User Settings Routes
 @api_bp.route('/users/settings/<int:user_id>', methods=['GET'])
 def get_user_settings(user_id):
@@ -1322,10 +1541,12 @@ def get_available_models():
     """Get available Ollama models and system status.
     
     Returns Ollama installation status and categorized models.
+    Pass ?refresh=true to bypass the cached Ollama status.
     """
     logger.info("Received request to get available models")
     try:
-        models_data = UserService.get_available_models()
+        force_refresh = request.args.get('refresh', 'false').lower() == 'true'
+        models_data = UserService.get_available_models(force_refresh=force_refresh)
         logger.info("Successfully retrieved available models")
         return jsonify(models_data), 200
     except Exception as e:
@@ -1347,6 +1568,34 @@ def get_ollama_installer_info():
         logger.error("Error retrieving Ollama installer info: %s", str(e), exc_info=True)
         return jsonify({'error': f'Failed to retrieve installer info: {str(e)}'}), 500
 
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose service metrics for scraping.
+    
+    Returns Prometheus text format by default, or JSON with ?format=json.
+    """
+    metrics = {}
+    metrics.update(ollama_service.get_pool_metrics())
+    metrics.update(ollama_service.get_cache_metrics())
+    metrics.update(template_cache.get_metrics())
+    metrics.update(render_cache.get_metrics())
+    metrics.update(get_conversion_metrics())
+    metrics.update(client_match_index.get_metrics())
+    metrics.update(search_service.get_metrics())
+    metrics.update(blob_store.get_metrics())
+    metrics.update(passage_retriever.get_metrics())
+    metrics.update(rule_extractors.get_metrics())
+    
+    if request.args.get('format') == 'json':
+        return jsonify(metrics), 200
+    
+    lines = []
+    for name, value in sorted(metrics.items()):
+        metric_type = 'counter' if name.endswith('_total') else 'gauge'
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return current_app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4'), 200
+
 @api_bp.route('/work-orders/<int:order_id>/extract-fields', methods=['POST'])
 def extract_fields_from_workflow_documents(order_id):
     """Extract template fields from all documents in a workflow using AI
@@ -1414,7 +1663,7 @@ def extract_fields_from_workflow_documents(order_id):
                 if doc.file_path:
                     file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], doc.file_path)
                     if os.path.exists(file_path):
-                        text_content = document_service.extract_text_from_file(file_path)
+                        text_content = document_service.get_document_text(file_path)
                         if text_content.strip():
                             combined_text.append(f"--- Document: {doc.title} ---\n{text_content}")
                             processed_documents.append({
@@ -1510,7 +1759,7 @@ def get_workflow_documents_summary(order_id):
                 if doc.file_path:
                     file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], doc.file_path)
                     if os.path.exists(file_path):
-                        text_content = document_service.extract_text_from_file(file_path)
+                        text_content = document_service.get_document_text(file_path)
                         if text_content.strip():
                             # Get individual document summary
                             summary_result = ollama_service.summarize_document_content(
@@ -1593,6 +1842,17 @@ def create_user():
         return jsonify({'error': f'Failed to create user: {str(e)}'}), 500
 
 # AI Agent Routes
+def _wants_async():
+    """Whether the client asked for the request to run as a background job"""
+    return request.args.get('async', request.form.get('async', 'false')).lower() == 'true'
+
+def _job_accepted_response(job):
+    """Build the 202 response for a queued job"""
+    response = jsonify(job.to_dict(include_result=False))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
 @api_bp.route('/ai-agent/process-documents', methods=['POST'])
 def ai_agent_process_documents():
     """
@@ -1601,6 +1861,8 @@ def ai_agent_process_documents():
     Multipart form data with:
     - documents: List of files to process
     - user_preferences: JSON string with user preferences (optional)
+    
+    With ?async=true the request is queued as a job and 202 is returned.
     """
     logger.info("Received request for AI agent document processing")
     try:
@@ -1620,6 +1882,15 @@ def ai_agent_process_documents():
             except json.JSONDecodeError:
                 logger.warning("Invalid user_preferences JSON, using defaults")
         
+        if _wants_async():
+            job = job_service.submit(
+                'process_documents',
+                ai_agent_service.process_documents_intelligently,
+                uploaded_files,
+                user_preferences=user_preferences
+            )
+            return _job_accepted_response(job)
+        
         # Process documents intelligently
         result = ai_agent_service.process_documents_intelligently(
             uploaded_files=uploaded_files,
@@ -1637,6 +1908,89 @@ def ai_agent_process_documents():
         logger.error("Error in AI agent document processing: %s", str(e), exc_info=True)
         return jsonify({'error': f'AI agent processing failed: {str(e)}'}), 500
 
+def _format_sse(event, data):
+    """Serialize one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api_bp.route('/ai-agent/process-documents/stream', methods=['POST'])
+def ai_agent_process_documents_stream():
+    """
+    AI Agent: Intelligent document processing with progress as Server-Sent Events
+    
+    Accepts the same multipart form data as /ai-agent/process-documents.
+    Emits 'stage', 'file_extracted', 'summary_token', 'client_matched',
+    'template_selected', 'fields_extracted' and 'document_ready' events,
+    followed by a final 'result' (or 'error') event.
+    """
+    logger.info("Received request for streamed AI agent document processing")
+    from app.services.agent_service import ai_agent_service
+    from app.services.job_service import JobCancelledError
+    
+    uploaded_files = request.files.getlist('documents')
+    if not uploaded_files:
+        return jsonify({'error': 'No documents provided'}), 400
+    
+    user_preferences = {}
+    if 'user_preferences' in request.form:
+        try:
+            user_preferences = json.loads(request.form['user_preferences'])
+        except json.JSONDecodeError:
+            logger.warning("Invalid user_preferences JSON, using defaults")
+    
+    # Spool the uploads to disk so the pipeline thread does not read from the request stream
+    files = [blob_store.spool(file) for file in uploaded_files if file and file.filename]
+    
+    events = queue.Queue()
+    disconnected = threading.Event()
+    app = current_app._get_current_object()
+    
+    def on_progress(stage):
+        # Stop the pipeline at the next stage once the client has gone away
+        if disconnected.is_set():
+            raise JobCancelledError(stage)
+        events.put(('stage', {'stage': stage}))
+    
+    def run_pipeline():
+        with app.app_context():
+            try:
+                result = ai_agent_service.process_documents_intelligently(
+                    uploaded_files=files,
+                    user_preferences=user_preferences,
+                    progress_callback=on_progress,
+                    event_callback=lambda event, data: events.put((event, data))
+                )
+                events.put(('result', result))
+            except JobCancelledError:
+                logger.info("Streamed document processing stopped after client disconnect")
+            except Exception as e:
+                logger.error("Error in streamed AI agent processing: %s", str(e), exc_info=True)
+                events.put(('error', {'error': f'AI agent processing failed: {str(e)}'}))
+            finally:
+                for file in files:
+                    file.release()
+                events.put(None)
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _format_sse(*item)
+        finally:
+            disconnected.set()
+    
+    threading.Thread(target=run_pipeline, name='agent-stream', daemon=True).start()
+    return current_app.response_class(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @api_bp.route('/ai-agent/create-workflow', methods=['POST'])
 def ai_agent_create_workflow():
     """
@@ -1647,6 +2001,8 @@ def ai_agent_create_workflow():
     - workflow_name: Name for the workflow
     - workflow_description: Description (optional)
     - user_preferences: JSON string with user preferences (optional)
+    
+    With ?async=true the request is queued as a job and 202 is returned.
     """
     logger.info("Received request for AI agent workflow creation")
     try:
@@ -1673,6 +2029,17 @@ def ai_agent_create_workflow():
             except json.JSONDecodeError:
                 logger.warning("Invalid user_preferences JSON, using defaults")
         
+        if _wants_async():
+            job = job_service.submit(
+                'create_workflow',
+                ai_agent_service.create_intelligent_workflow,
+                uploaded_files,
+                workflow_name=workflow_name,
+                workflow_description=workflow_description,
+                user_preferences=user_preferences
+            )
+            return _job_accepted_response(job)
+        
         # Create intelligent workflow
         result = ai_agent_service.create_intelligent_workflow(
             uploaded_files=uploaded_files,
@@ -1692,6 +2059,32 @@ def ai_agent_create_workflow():
         logger.error("Error in AI agent workflow creation: %s", str(e), exc_info=True)
         return jsonify({'error': f'AI agent workflow creation failed: {str(e)}'}), 500
 
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status, per-stage progress and (once finished) the result of a job"""
+    logger.debug("Received request for job %s", job_id)
+    try:
+        job = job_service.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        logger.error("Error retrieving job %s: %s", job_id, str(e), exc_info=True)
+        return jsonify({'error': f'Failed to retrieve job: {str(e)}'}), 500
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    logger.info("Received request to cancel job %s", job_id)
+    try:
+        job = job_service.cancel_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict(include_result=False)), 200
+    except Exception as e:
+        logger.error("Error cancelling job %s: %s", job_id, str(e), exc_info=True)
+        return jsonify({'error': f'Failed to cancel job: {str(e)}'}), 500
+
 @api_bp.route('/ai-agent/analyze-client-match', methods=['POST'])
 def ai_agent_analyze_client_match():
     """
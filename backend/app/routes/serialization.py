@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a ?fields= query parameter
+
+    Args:
+        value: Comma separated field names; nested keys use dots, e.g. 'id,title,client.email'
+
+    Returns:
+        List of field paths in request order, or None if no projection was requested
+    """
+    if value is None:
+        return None
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    return fields or None
+
+def root_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Top-level keys needed to serve the given field paths
+
+    Args:
+        fields: Field paths from parse_fields()
+
+    Returns:
+        List of top-level keys, or None for all keys
+    """
+    if fields is None:
+        return None
+    roots = []
+    for field in fields:
+        root = field.split('.', 1)[0]
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+def project(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested field paths of a serialized object
+
+    Unknown fields are ignored. A path into a missing or non-object value
+    yields None for its top-level key.
+
+    Args:
+        data: Serialized object
+        fields: Field paths from parse_fields(), None keeps everything
+
+    Returns:
+        Projected dictionary
+    """
+    if fields is None:
+        return data
+    result = {}
+    for field in fields:
+        root, _, rest = field.partition('.')
+        if root not in data:
+            continue
+        if not rest:
+            result[root] = data[root]
+            continue
+        value = data[root]
+        if not isinstance(value, dict):
+            result.setdefault(root, None)
+            continue
+        nested = result.get(root)
+        if not isinstance(nested, dict):
+            nested = result[root] = {}
+        nested.update(project(value, [rest]))
+    return result
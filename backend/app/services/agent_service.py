@@ -1,17 +1,42 @@
 import os
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from flask import current_app
 from app.models import Client, Document, WorkOrder
 from app.services.llm_service import ollama_service
 from app.services.document_service import document_service
+from app.services.blob_store import blob_store
+from app.services.client_index import client_match_index
+from app.services.config_values import get_config_value
+from app.models.client_match_key import normalize_key
+from app.services.concurrency import map_with_app_context, map_llm_calls, submit_with_app_context
+from app.services.text_chunking import flatten, unflatten, merge_extractions
+from app.services.rule_extractors import rule_extractors
+from app.services.validation import digits, extract_json
+from app.services.job_service import JobCancelledError
 from app import db
 import json
-import re
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Sections and fields of the client extraction answer, used when merging windows
+CLIENT_INFO_TEMPLATE = {
+    'person_info': dict.fromkeys(['first_name', 'last_name', 'full_name', 'title', 'birth_date']),
+    'company_info': dict.fromkeys(['company_name', 'legal_form', 'contact_person']),
+    'contact_info': dict.fromkeys(['email', 'phone', 'street', 'city', 'postal_code']),
+    'identification': dict.fromkeys(['tax_number', 'vat_id', 'business_reg_number'])
+}
+
+# Client fields with a fixed format, filled by the rule extractors under these placeholder names
+CLIENT_RULE_FIELDS = {
+    ('identification', 'tax_number'): {'name': 'Steuernummer', 'type': 'text'},
+    ('identification', 'vat_id'): {'name': 'Umsatzsteuer-ID', 'type': 'text'},
+    ('contact_info', 'email'): {'name': 'E-Mail', 'type': 'text'},
+    ('contact_info', 'phone'): {'name': 'Telefon', 'type': 'text'},
+    ('contact_info', 'postal_code'): {'name': 'PLZ', 'type': 'text'}
+}
+
 class AIAgentService:
     """
     AI Agent that automatically processes documents:
@@ -31,7 +56,9 @@ class AIAgentService:
         self, 
         uploaded_files: List[Any], 
         work_order_id: Optional[int] = None,
-        user_preferences: Optional[Dict[str, Any]] = None
+        user_preferences: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
     ) -> Dict[str, Any]:
         """
         Main entry point for intelligent document processing
@@ -40,6 +67,11 @@ class AIAgentService:
             uploaded_files: List of uploaded file objects
             work_order_id: Optional work order ID to associate documents with
             user_preferences: Optional user preferences for models, etc.
+            progress_callback: Optional callable invoked with the name of each stage
+                as it starts; it may raise JobCancelledError to stop processing
+            event_callback: Optional callable receiving (event name, data) for intermediate
+                results: file_extracted, summary_token, client_matched, template_selected,
+                fields_extracted and document_ready. It may be called from worker threads.
             
         Returns:
             Processing result with generated document and metadata
@@ -48,21 +80,41 @@ class AIAgentService:
         
         try:
             # Step 1: Extract and analyze text from all documents
-            extraction_result = self._extract_and_analyze_documents(uploaded_files)
+            self._report_progress(progress_callback, 'extracting_text')
+            extraction_result = self._extract_and_analyze_documents(uploaded_files, event_callback)
             if not extraction_result['success']:
                 return extraction_result
             
-            # Step 2: Extract client information and match with existing clients
-            client_matching_result = self._analyze_and_match_clients(
-                extraction_result['combined_text'],
-                extraction_result['document_summaries']
-            )
+            self._report_progress(progress_callback, 'matching_client_and_template')
+            
+            # Step 2 and 3 are independent: match the client on a worker thread while
+            # the template is selected here. Template hints come from the per-file
+            # summaries because the client extraction result is not available yet.
+            def match_clients():
+                result = self._analyze_and_match_clients(
+                    extraction_result['combined_text'],
+                    extraction_result['document_summaries']
+                )
+                self._emit_event(event_callback, 'client_matched', {
+                    'client_match': result.get('client_match'),
+                    'match_confidence': result.get('match_confidence', result.get('confidence', 0.0))
+                })
+                return result
+            
+            client_matching_future = submit_with_app_context(match_clients)
             
-            # Step 3: Select optimal template based on document content
             template_selection_result = self._select_optimal_template(
                 extraction_result['combined_text'],
-                client_matching_result.get('document_type_hints', [])
+                self._summary_type_hints(extraction_result['document_summaries'])
             )
+            selected = template_selection_result.get('selected_template') or {}
+            self._emit_event(event_callback, 'template_selected', {
+                'template_id': selected.get('id'),
+                'title': selected.get('title'),
+                'confidence': template_selection_result.get('confidence', 0.0)
+            })
+            
+            client_matching_result = client_matching_future.result()
             
             # Step 4: Extract non-client fields using selected template
             selected_template_dict = template_selection_result['selected_template']
@@ -70,13 +122,19 @@ class AIAgentService:
                 # Get the actual Document object for template operations
                 template_obj = Document.query.get(selected_template_dict['id'])
                 
+                self._report_progress(progress_callback, 'extracting_fields')
                 field_extraction_result = self._extract_template_fields(
                     extraction_result['combined_text'],
                     template_obj,
                     user_preferences
                 )
+                self._emit_event(event_callback, 'fields_extracted', {
+                    'extracted_values': field_extraction_result.get('extracted_values', {}),
+                    'confidence': field_extraction_result.get('confidence', 0.0)
+                })
                 
                 # Step 5: Generate final PDF document
+                self._report_progress(progress_callback, 'generating_document')
                 document_generation_result = self._generate_final_document(
                     template_obj,
                     {
@@ -95,6 +153,13 @@ class AIAgentService:
                     'error': 'No template available for document generation'
                 }
             
+            self._emit_event(event_callback, 'document_ready', {
+                'success': document_generation_result.get('success', False),
+                'template_name': document_generation_result.get('template_name'),
+                'field_count': document_generation_result.get('field_count', 0),
+                'error': document_generation_result.get('error')
+            })
+            
             # Compile final result
             result = {
                 'success': True,
@@ -113,6 +178,8 @@ class AIAgentService:
             logger.info("Successfully completed intelligent document processing")
             return result
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error("Error in intelligent document processing: %s", str(e), exc_info=True)
             return {
@@ -121,48 +188,51 @@ class AIAgentService:
                 'step': 'initialization'
             }
     
-    def _extract_and_analyze_documents(self, uploaded_files: List[Any]) -> Dict[str, Any]:
-        """Extract text content from all uploaded documents"""
+    def _report_progress(self, progress_callback: Optional[Callable[[str], None]], stage: str) -> None:
+        """Notify the caller that a pipeline stage starts"""
+        logger.debug("Agent pipeline stage: %s", stage)
+        if progress_callback is not None:
+            progress_callback(stage)
+    
+    def _emit_event(
+        self,
+        event_callback: Optional[Callable[[str, Dict[str, Any]], None]],
+        event: str,
+        data: Dict[str, Any]
+    ) -> None:
+        """Pass an intermediate result to the caller, if it asked for them"""
+        if event_callback is not None:
+            event_callback(event, data)
+    
+    def _extract_and_analyze_documents(
+        self,
+        uploaded_files: List[Any],
+        event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Extract text content from all uploaded documents
+        
+        Files are extracted and summarized concurrently on the shared worker pool.
+        """
         logger.info("Extracting text from %d documents", len(uploaded_files))
         
         try:
             combined_text = []
             document_summaries = []
             
-            for i, file in enumerate(uploaded_files):
-                if not file or not file.filename:
-                    continue
-                    
-                try:
-                    # Extract text from file
-                    text_content = self.document_service.extract_text_from_uploaded_file(file)
-                    
-                    if text_content and text_content.strip():
-                        doc_summary = {
-                            'filename': file.filename,
-                            'text_length': len(text_content),
-                            'content_preview': text_content[:200] + "..." if len(text_content) > 200 else text_content
-                        }
-                        
-                        # Generate AI summary for the document
-                        if self.ollama_service.is_ollama_available():
-                            summary_result = self.ollama_service.summarize_document_content(
-                                document_text=text_content,
-                                max_summary_length=300
-                            )
-                            doc_summary['ai_summary'] = summary_result.get('summary', '')
-                            doc_summary['confidence'] = summary_result.get('confidence', 0.0)
-                        
-                        combined_text.append(f"--- Dokument: {file.filename} ---\n{text_content}")
-                        document_summaries.append(doc_summary)
-                        
-                        logger.debug("Extracted %d characters from %s", len(text_content), file.filename)
-                    else:
-                        logger.warning("No text content extracted from %s", file.filename)
-                        
-                except Exception as e:
-                    logger.error("Error extracting text from %s: %s", file.filename, str(e))
+            files = [file for file in uploaded_files if file and file.filename]
+            summarize = self.ollama_service.is_ollama_available()
+            
+            results = map_with_app_context(
+                lambda file: self._extract_and_summarize_file(file, summarize, event_callback),
+                files
+            )
+            
+            for file, result in zip(files, results):
+                if result is None:
                     continue
+                text_content, doc_summary = result
+                combined_text.append(f"--- Dokument: {file.filename} ---\n{text_content}")
+                document_summaries.append(doc_summary)
             
             if not combined_text:
                 return {
@@ -183,36 +253,104 @@ class AIAgentService:
                 'error': f"Document extraction failed: {str(e)}"
             }
     
-    def _analyze_and_match_clients(self, combined_text: str, document_summaries: List[Dict]) -> Dict[str, Any]:
-        """Analyze documents to extract client information and match with existing clients"""
-        logger.info("Analyzing client information and matching with database")
+    def _extract_and_summarize_file(
+        self,
+        file: Any,
+        summarize: bool,
+        event_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Extract the text of one uploaded file and optionally summarize it
         
+        Args:
+            file: Uploaded file object
+            summarize: Whether to generate an AI summary
+            event_callback: Optional callable receiving file_extracted and summary_token events
+            
+        Returns:
+            Tuple of (text content, document summary), or None if nothing was extracted
+        """
         try:
-            if not self.ollama_service.is_ollama_available():
-                logger.warning("Ollama not available for client analysis")
-                return {
-                    'client_match': None,
-                    'confidence': 0.0,
-                    'error': 'AI service not available'
-                }
+            # Extract text from file
+            text_content = self.document_service.extract_text_from_uploaded_file(file)
             
-            # Extract client information using AI
-            client_info = self._extract_client_information(combined_text)
+            if not text_content or not text_content.strip():
+                logger.warning("No text content extracted from %s", file.filename)
+                return None
             
-            # Get all existing clients from database
-            existing_clients = Client.query.all()
+            doc_summary = {
+                'filename': file.filename,
+                'text_length': len(text_content),
+                'content_preview': text_content[:200] + "..." if len(text_content) > 200 else text_content
+            }
             
-            if not existing_clients:
-                logger.warning("No existing clients in database")
-                return {
-                    'client_match': None,
-                    'client_info': client_info,
-                    'confidence': 0.0,
-                    'message': 'No existing clients found in database'
-                }
+            self._emit_event(event_callback, 'file_extracted', {
+                'filename': file.filename,
+                'text_length': len(text_content)
+            })
+            
+            # Generate AI summary for the document, streaming it if events are requested
+            if summarize:
+                on_token = None
+                if event_callback is not None:
+                    on_token = lambda token: event_callback('summary_token', {'filename': file.filename, 'token': token})
+                summary_result = self.ollama_service.summarize_document_content(
+                    document_text=text_content,
+                    max_summary_length=300,
+                    on_token=on_token
+                )
+                doc_summary['ai_summary'] = summary_result.get('summary', '')
+                doc_summary['confidence'] = summary_result.get('confidence', 0.0)
             
-            # Find best matching client
-            best_match = self._find_best_client_match(client_info, existing_clients)
+            logger.debug("Extracted %d characters from %s", len(text_content), file.filename)
+            return text_content, doc_summary
+            
+        except Exception as e:
+            logger.error("Error extracting text from %s: %s", file.filename, str(e))
+            return None
+    
+    def _analyze_and_match_clients(self, combined_text: str, document_summaries: List[Dict]) -> Dict[str, Any]:
+        """Analyze documents to extract client information and match with existing clients"""
+        logger.info("Analyzing client information and matching with database")
+        
+        try:
+            # Identifiers found by rule may already match a client without the LLM
+            rule_info = self._extract_client_information_by_rule(combined_text)
+            rule_match = None
+            if rule_info:
+                rule_match = self._find_best_client_match(rule_info, client_match_index.candidates(rule_info))
+            min_confidence = get_config_value('RULE_CLIENT_MATCH_MIN_CONFIDENCE', 0.4)
+            
+            if rule_match and rule_match['client'] and rule_match['confidence'] >= min_confidence:
+                logger.info("Client matched by rule-extracted identifiers, skipping AI client extraction")
+                rule_extractors.record_avoided_call()
+                client_info = rule_info
+                best_match = rule_match
+            else:
+                if not self.ollama_service.is_ollama_available():
+                    logger.warning("Ollama not available for client analysis")
+                    return {
+                        'client_match': None,
+                        'confidence': 0.0,
+                        'error': 'AI service not available'
+                    }
+                
+                # Extract client information using AI
+                client_info = self._extract_client_information(combined_text, rule_info)
+                
+                # Get the clients sharing an identifier or a name with the extracted profile
+                existing_clients = client_match_index.candidates(client_info)
+                
+                if not existing_clients and Client.query.first() is None:
+                    logger.warning("No existing clients in database")
+                    return {
+                        'client_match': None,
+                        'client_info': client_info,
+                        'confidence': 0.0,
+                        'message': 'No existing clients found in database'
+                    }
+                
+                # Find best matching client
+                best_match = self._find_best_client_match(client_info, existing_clients)
             
             # Extract client field values for form filling
             client_fields = self._extract_client_field_values(best_match['client']) if best_match['client'] else {}
@@ -234,14 +372,34 @@ class AIAgentService:
                 'error': f"Client matching failed: {str(e)}"
             }
     
-    def _extract_client_information(self, text: str) -> Dict[str, Any]:
-        """Extract client information from document text using AI"""
+    def _extract_client_information_by_rule(self, text: str) -> Dict[str, Any]:
+        """Extract the client identifiers and contact fields a rule resolves with high confidence
+        
+        Returns:
+            Client information in the structure of CLIENT_INFO_TEMPLATE, only
+            with the resolved fields; empty if none was resolved
+        """
+        resolved, _ = rule_extractors.extract(text, list(CLIENT_RULE_FIELDS.values()))
+        client_info = {}
+        for (section, field), placeholder in CLIENT_RULE_FIELDS.items():
+            if placeholder['name'] in resolved:
+                client_info.setdefault(section, {})[field] = resolved[placeholder['name']].value
+        return client_info
+    
+    def _extract_client_information(self, text: str, rule_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract client information from document text using AI
+        
+        Texts longer than the model context are split into windows that are
+        analysed concurrently and merged field by field. Fields in rule_info
+        were found by the rule extractors and take precedence over the AI.
+        """
         logger.debug("Extracting client information from document text")
         
         system_prompt = """You are an expert at extracting client information from German legal and business documents. 
         Extract client/customer information with high accuracy."""
         
-        user_prompt = f"""
+        def build_prompt(window: str) -> str:
+            return f"""
 Analyze the following document text and extract client/customer information.
 Focus on identifying:
 
@@ -272,7 +430,7 @@ Focus on identifying:
    - What legal area? (tax law, business law, etc.)
 
 DOCUMENT TEXT:
-{text[:4000]}
+{window}
 
 Return ONLY a JSON object with this structure:
 {{
@@ -305,12 +463,35 @@ Return ONLY a JSON object with this structure:
 }}
 """
         
+        windows, num_ctx = self.ollama_service.document_windows(
+            text, system_prompt + build_prompt(''), max_tokens=800
+        )
+        results = [
+            result for result in map_llm_calls(
+                lambda window: self._extract_client_information_window(build_prompt(window), system_prompt, num_ctx),
+                windows
+            ) if result
+        ]
+        if len(results) <= 1:
+            client_info = results[0] if results else {}
+        else:
+            client_info = self._merge_client_information(results)
+        for section, fields in (rule_info or {}).items():
+            if not isinstance(client_info.get(section), dict):
+                client_info[section] = {}
+            client_info[section].update(fields)
+        return client_info
+    
+    def _extract_client_information_window(self, user_prompt: str, system_prompt: str, num_ctx: Optional[int]) -> Dict[str, Any]:
+        """Run the client extraction prompt for one document window"""
         try:
             response = self.ollama_service.generate_completion(
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 temperature=0.1,
-                max_tokens=800
+                max_tokens=800,
+                use_cache=True,
+                num_ctx=num_ctx
             )
             
             if "error" in response:
@@ -320,87 +501,120 @@ Return ONLY a JSON object with this structure:
             ai_text = response.get("response", "").strip()
             
             # Parse JSON response
-            json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group())
-                except json.JSONDecodeError as e:
-                    logger.error("Failed to parse AI client extraction JSON: %s", str(e))
-                    
-            return {}
+            result = extract_json(ai_text)
+            if result is None:
+                logger.error("Failed to parse AI client extraction JSON")
+                return {}
+            return result
             
         except Exception as e:
             logger.error("Error in AI client information extraction: %s", str(e))
             return {}
     
+    def _merge_client_information(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge the client information extracted from several windows of a document
+        
+        Each field keeps the value with the highest combined confidence over the
+        windows; document type hints are collected from all windows.
+        """
+        hints = []
+        window_results = []
+        for result in results:
+            for hint in result.get('document_type_hints') or []:
+                if isinstance(hint, str) and hint not in hints:
+                    hints.append(hint)
+            sections = {key: value for key, value in result.items() if isinstance(value, dict)}
+            window_results.append({'values': flatten(sections), 'confidence': result.get('confidence')})
+        values, confidences = merge_extractions(window_results)
+        merged = unflatten(values, CLIENT_INFO_TEMPLATE)
+        merged['document_type_hints'] = hints
+        merged['confidence'] = max(confidences.values()) if confidences else 0.0
+        merged['chunks'] = len(results)
+        return merged
+    
     def _find_best_client_match(self, client_info: Dict[str, Any], existing_clients: List[Client]) -> Dict[str, Any]:
-        """Find the best matching client from existing database entries"""
-        logger.debug("Finding best client match among %d existing clients", len(existing_clients))
+        """Find the best matching client among the candidates from the client match index"""
+        logger.debug("Finding best client match among %d candidate clients", len(existing_clients))
         
         best_match = {'client': None, 'confidence': 0.0, 'reasons': []}
         
         try:
+            # Extract info from AI analysis, normalised once for all candidates
+            person_info = client_info.get('person_info') or {}
+            company_info = client_info.get('company_info') or {}
+            contact_info = client_info.get('contact_info') or {}
+            identification = client_info.get('identification') or {}
+            
+            tax_number = identification.get('tax_number')
+            tax_number_lower = tax_number.lower() if tax_number else None
+            tax_number_key = normalize_key('tax_number', tax_number)
+            vat_id_key = normalize_key('vat_id', identification.get('vat_id'))
+            email = contact_info['email'].lower() if contact_info.get('email') else None
+            first_name = person_info['first_name'].lower() if person_info.get('first_name') else None
+            last_name = person_info['last_name'].lower() if person_info.get('last_name') else None
+            company_name = company_info['company_name'].lower() if company_info.get('company_name') else None
+            phone_digits = digits(contact_info['phone']) if contact_info.get('phone') else ''
+            city = contact_info['city'].lower() if contact_info.get('city') else None
+            postal_code = contact_info.get('postal_code')
+            
             for client in existing_clients:
                 match_score = 0.0
                 reasons = []
                 
-                # Extract info from AI analysis
-                person_info = client_info.get('person_info', {})
-                company_info = client_info.get('company_info', {})
-                contact_info = client_info.get('contact_info', {})
-                identification = client_info.get('identification', {})
-                
                 # Exact matches (high score)
-                if identification.get('tax_number') and client.tax_number:
-                    if identification['tax_number'].lower() in client.tax_number.lower():
+                if tax_number and client.tax_number:
+                    if (tax_number_lower in client.tax_number.lower()
+                            or (tax_number_key and tax_number_key == normalize_key('tax_number', client.tax_number))):
                         match_score += 0.4
-                        reasons.append(f"Tax number match: {identification['tax_number']}")
+                        reasons.append(f"Tax number match: {tax_number}")
                 
-                if contact_info.get('email') and client.email:
-                    if contact_info['email'].lower() == client.email.lower():
+                if vat_id_key and client.vat_id:
+                    if vat_id_key == normalize_key('vat_id', client.vat_id):
+                        match_score += 0.4
+                        reasons.append(f"VAT ID match: {identification['vat_id']}")
+                
+                if email and client.email:
+                    if email == client.email.lower():
                         match_score += 0.3
                         reasons.append(f"Email exact match: {contact_info['email']}")
                 
                 # Name matching for persons
-                if client.client_type == 'person' and (person_info.get('first_name') or person_info.get('last_name')):
+                if client.client_type in ('natural', 'person') and (first_name or last_name):
                     name_score = 0.0
-                    if person_info.get('first_name') and client.first_name:
-                        if person_info['first_name'].lower() in client.first_name.lower():
+                    if first_name and client.first_name:
+                        if first_name in client.first_name.lower():
                             name_score += 0.15
                             reasons.append(f"First name match: {person_info['first_name']}")
                     
-                    if person_info.get('last_name') and client.last_name:
-                        if person_info['last_name'].lower() in client.last_name.lower():
+                    if last_name and client.last_name:
+                        if last_name in client.last_name.lower():
                             name_score += 0.15
                             reasons.append(f"Last name match: {person_info['last_name']}")
                     
                     match_score += name_score
                 
                 # Company name matching
-                if client.client_type == 'company' and company_info.get('company_name') and client.company_name:
-                    if company_info['company_name'].lower() in client.company_name.lower():
+                if client.client_type == 'company' and company_name and client.company_name:
+                    if company_name in client.company_name.lower():
                         match_score += 0.25
                         reasons.append(f"Company name match: {company_info['company_name']}")
                 
-                # Phone number matching (partial)
-                if contact_info.get('phone') and client.contact_phone:
-                    # Extract digits only for comparison
-                    extracted_digits = re.sub(r'\D', '', contact_info['phone'])
-                    client_digits = re.sub(r'\D', '', client.contact_phone)
-                    if len(extracted_digits) >= 6 and extracted_digits in client_digits:
+                # Phone number matching (partial, digits only)
+                if len(phone_digits) >= 6 and client.contact_phone:
+                    if phone_digits in digits(client.contact_phone):
                         match_score += 0.1
                         reasons.append(f"Phone number match")
                 
                 # Address matching (city, postal code)
-                if contact_info.get('city') and client.address_city:
-                    if contact_info['city'].lower() in client.address_city.lower():
+                if city and client.address_city:
+                    if city in client.address_city.lower():
                         match_score += 0.05
                         reasons.append(f"City match: {contact_info['city']}")
                 
-                if contact_info.get('postal_code') and client.address_zip:
-                    if contact_info['postal_code'] == client.address_zip:
+                if postal_code and client.address_zip:
+                    if postal_code == client.address_zip:
                         match_score += 0.05
-                        reasons.append(f"Postal code match: {contact_info['postal_code']}")
+                        reasons.append(f"Postal code match: {postal_code}")
                 
                 # Update best match if this client has higher score
                 if match_score > best_match['confidence']:
@@ -425,7 +639,7 @@ Return ONLY a JSON object with this structure:
             client_fields = {}
             
             # Person fields
-            if client.client_type == 'person':
+            if client.client_type in ('natural', 'person'):
                 if client.first_name:
                     client_fields['client_first_name'] = client.first_name
                     client_fields['client_vorname'] = client.first_name
@@ -485,6 +699,15 @@ Return ONLY a JSON object with this structure:
             logger.error("Error extracting client field values: %s", str(e))
             return {}
     
+    def _summary_type_hints(self, document_summaries: List[Dict]) -> List[str]:
+        """Build template selection hints from the per-file AI summaries"""
+        hints = []
+        for summary in document_summaries:
+            ai_summary = (summary.get('ai_summary') or '').strip()
+            if ai_summary:
+                hints.append(f"{summary['filename']}: {ai_summary[:150]}")
+        return hints
+    
     def _select_optimal_template(self, combined_text: str, document_type_hints: List[str]) -> Dict[str, Any]:
         """Select the most suitable template based on document content"""
         logger.info("Selecting optimal template based on document analysis")
@@ -616,7 +839,8 @@ Return ONLY a JSON object:
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 temperature=0.2,
-                max_tokens=300
+                max_tokens=300,
+                use_cache=True
             )
             
             if "error" in response:
@@ -626,29 +850,27 @@ Return ONLY a JSON object:
             ai_text = response.get("response", "").strip()
             
             # Parse AI response
-            json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-            if json_match:
-                try:
-                    ai_result = json.loads(json_match.group())
-                    template_index = ai_result.get('selected_template_index', 0)
-                    
-                    if 0 <= template_index < len(templates):
-                        selected_template = templates[template_index]
-                        template_dict = {
-                            'id': selected_template.id,
-                            'title': selected_template.title,
-                            'content': selected_template.content,
-                            'document_type': selected_template.document_type,
-                            'placeholders': selected_template.placeholders or []
-                        }
-                        return {
-                            'selected_template': template_dict,
-                            'confidence': ai_result.get('confidence', 0.5),
-                            'selection_reason': ai_result.get('reasoning', 'AI selection'),
-                            'matching_fields': ai_result.get('matching_fields', [])
-                        }
-                except json.JSONDecodeError as e:
-                    logger.error("Failed to parse AI template selection: %s", str(e))
+            ai_result = extract_json(ai_text)
+            if ai_result is None:
+                logger.error("Failed to parse AI template selection")
+            else:
+                template_index = ai_result.get('selected_template_index', 0)
+                
+                if isinstance(template_index, int) and 0 <= template_index < len(templates):
+                    selected_template = templates[template_index]
+                    template_dict = {
+                        'id': selected_template.id,
+                        'title': selected_template.title,
+                        'content': selected_template.content,
+                        'document_type': selected_template.document_type,
+                        'placeholders': selected_template.placeholders or []
+                    }
+                    return {
+                        'selected_template': template_dict,
+                        'confidence': ai_result.get('confidence', 0.5),
+                        'selection_reason': ai_result.get('reasoning', 'AI selection'),
+                        'matching_fields': ai_result.get('matching_fields', [])
+                    }
             
             return {'selected_template': None, 'confidence': 0.0}
             
@@ -730,7 +952,8 @@ Return ONLY a JSON object:
         uploaded_files: List[Any], 
         workflow_name: str,
         workflow_description: str = "",
-        user_preferences: Optional[Dict[str, Any]] = None
+        user_preferences: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
         Create a complete workflow with intelligent document processing
@@ -740,22 +963,47 @@ Return ONLY a JSON object:
             workflow_name: Name for the workflow
             workflow_description: Description for the workflow
             user_preferences: User preferences and settings
+            progress_callback: Optional callable invoked with the name of each stage
             
         Returns:
             Complete workflow result with work order, processed documents, and generated PDF
         """
         logger.info("Creating intelligent workflow: %s", workflow_name)
         
+        # Spool each upload once; text extraction, conversion and storage all read the same file
+        files = [file for file in uploaded_files if file and file.filename]
+        uploads = [blob_store.spool(file) for file in files]
+        try:
+            return self._create_workflow(
+                uploads, workflow_name, workflow_description, user_preferences, progress_callback
+            )
+        finally:
+            for upload, file in zip(uploads, files):
+                if upload is not file:
+                    upload.release()
+    
+    def _create_workflow(
+        self,
+        uploaded_files: List[Any],
+        workflow_name: str,
+        workflow_description: str,
+        user_preferences: Optional[Dict[str, Any]],
+        progress_callback: Optional[Callable[[str], None]]
+    ) -> Dict[str, Any]:
+        """Run the workflow creation of create_intelligent_workflow on spooled uploads"""
         try:
             # Step 1: Process documents intelligently
             processing_result = self.process_documents_intelligently(
                 uploaded_files=uploaded_files,
-                user_preferences=user_preferences
+                user_preferences=user_preferences,
+                progress_callback=progress_callback
             )
             
             if not processing_result['success']:
                 return processing_result
             
+            self._report_progress(progress_callback, 'creating_workflow')
+            
             # Step 2: Create work order with matched client
             client_match = processing_result['client_match']['client_match']
             
@@ -834,6 +1082,9 @@ Return ONLY a JSON object:
                 'message': f'Intelligent workflow created successfully with {len(saved_documents)} documents'
             }
             
+        except JobCancelledError:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             logger.error("Error creating intelligent workflow: %s", str(e), exc_info=True)
@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Any, Iterator, List, Optional
+from flask import Flask, current_app
+from werkzeug.utils import secure_filename
+from app.models import Client, Document
+from app.services.config_values import get_config_value
+from app.services.template_cache import template_cache, RenderPlan
+from app.services.document_service import document_service
+from app.services.office_conversion import OfficeConverterPool, get_converter_pool
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Client columns that may be used in a batch client filter
+CLIENT_FILTER_FIELDS = {
+    'client_type', 'mandate_manager', 'mandate_responsible', 'tax_office',
+    'address_zip', 'address_city', 'legal_form'
+}
+
+class BatchGenerationService:
+    """Generates one document per client or value set from a single template
+
+    The template is compiled once and every item is spliced into the same
+    render plan on a worker pool. Results are streamed as a ZIP or written to
+    the upload folder; failed items are reported instead of failing the batch.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the batch worker pool, created on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    max_workers = max(1, get_config_value('BATCH_MAX_WORKERS', 4))
+                    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-worker')
+                    logger.info("Started batch generation pool with %d threads", max_workers)
+        return self._executor
+
+    def client_values(self, client: Client) -> Dict[str, Any]:
+        """Placeholder values of a client
+
+        Every client field is available under its own name and with a
+        'client_' prefix, e.g. {{company_name}} and {{client_company_name}}.
+
+        Args:
+            client: Client row
+
+        Returns:
+            Dictionary of placeholder values
+        """
+        values = {}
+        for key, value in client.to_dict().items():
+            if value is None or key in ('created_at', 'updated_at'):
+                continue
+            values[key] = value
+            values[f'client_{key}'] = value
+        if client.display_name:
+            values.setdefault('client_name', client.display_name)
+        return values
+
+    def prepare(
+        self,
+        template_id: int,
+        client_ids: Optional[List[int]] = None,
+        client_filter: Optional[Dict[str, Any]] = None,
+        value_sets: Optional[List[Dict[str, Any]]] = None,
+        shared_values: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Resolve the template and the items of a batch
+
+        Clients are loaded with a single query. Shared values are applied to
+        every item and override client fields.
+
+        Args:
+            template_id: ID of the DOCX template
+            client_ids: Generate one document per client ID
+            client_filter: Generate one document per client matching these column values
+            value_sets: Generate one document per placeholder value dictionary
+            shared_values: Values added to every item
+
+        Returns:
+            Dictionary with the template, its render plan and the items
+
+        Raises:
+            LookupError: If the template does not exist
+            ValueError: If the template or the item selection is invalid
+        """
+        document = Document.query.get(template_id)
+        if not document:
+            raise LookupError(f"Template with ID {template_id} not found")
+        if document.document_type != DOCX_MIME_TYPE:
+            raise ValueError("Batch generation requires a DOCX template")
+
+        shared_values = shared_values or {}
+        items = []
+        if value_sets is not None:
+            for index, values in enumerate(value_sets):
+                if not isinstance(values, dict):
+                    raise ValueError("Every value set must be an object")
+                items.append({'index': index, 'client_id': None, 'label': f"dokument_{index + 1}", 'values': {**values, **shared_values}})
+        elif client_ids is not None or client_filter is not None:
+            query = Client.query
+            if client_ids is not None:
+                query = query.filter(Client.id.in_(client_ids))
+            for key, value in (client_filter or {}).items():
+                if key not in CLIENT_FILTER_FIELDS:
+                    raise ValueError(f"Unsupported client filter: {key}")
+                query = query.filter(getattr(Client, key) == value)
+            for index, client in enumerate(query.order_by(Client.id).all()):
+                values = self.client_values(client)
+                items.append({
+                    'index': index,
+                    'client_id': client.id,
+                    'label': str(values.get('client_name') or f"mandant_{client.id}"),
+                    'values': {**values, **shared_values}
+                })
+        else:
+            raise ValueError("Provide client_ids, client_filter or value_sets")
+
+        max_items = get_config_value('BATCH_MAX_ITEMS', 1000)
+        if len(items) > max_items:
+            raise ValueError(f"A batch may contain at most {max_items} documents")
+
+        required = [p.get('name') for p in (document.placeholders or []) if p.get('required', False)]
+        return {
+            'document': document,
+            'plan': template_cache.get_plan(document.id, document.file_path),
+            'required': required,
+            'items': items
+        }
+
+    def render_items(
+        self,
+        plan: RenderPlan,
+        items: List[Dict[str, Any]],
+        output_dir: str,
+        output_format: str = 'docx',
+        required: Optional[List[str]] = None,
+        app: Optional[Flask] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Render items on the worker pool, yielding results as they finish
+
+        PDF batches are converted by the LibreOffice pool in groups of its
+        batch size, one soffice run per group. Without LibreOffice each item
+        goes through the document service's conversion fallbacks.
+
+        Args:
+            plan: Compiled template
+            items: Items from prepare()
+            output_dir: Directory for the rendered files
+            output_format: 'docx' or 'pdf'
+            required: Placeholder names every item must provide
+            app: Application for the workers; required when the results are
+                consumed outside the app context, e.g. in a streamed response
+
+        Yields:
+            Item results with 'index', 'client_id', 'label' and either 'path' or 'error'
+        """
+        app = app or current_app._get_current_object()
+        pool = None
+        if output_format == 'pdf':
+            with app.app_context():
+                pool = get_converter_pool()
+
+        def render(item):
+            result = {key: item[key] for key in ('index', 'client_id', 'label')}
+            missing = [name for name in (required or []) if name not in item['values']]
+            if missing:
+                result['error'] = f"Missing required placeholders: {', '.join(missing)}"
+                return result
+            name = f"{item['index'] + 1:04d}_{secure_filename(item['label']) or 'dokument'}"
+            docx_path = os.path.join(output_dir, name + '.docx')
+            try:
+                plan.render_to_file(item['values'], docx_path)
+                if output_format == 'pdf' and pool is None:
+                    success, pdf_path, error = document_service.convert_docx_to_pdf(docx_path)
+                    os.unlink(docx_path)
+                    if not success:
+                        result['error'] = f"PDF conversion failed: {error}"
+                        return result
+                    docx_path = pdf_path
+                result['path'] = docx_path
+            except Exception as e:
+                logger.warning("Batch item %d failed: %s", item['index'], str(e))
+                result['error'] = str(e)
+            return result
+
+        def run(item):
+            # PDF conversion reads the configuration, so it needs the app context
+            with app.app_context():
+                return render(item)
+
+        futures = [self._get_executor().submit(run, item) for item in items]
+        conversions = []
+        try:
+            if pool is None:
+                for future in as_completed(futures):
+                    yield future.result()
+            else:
+                yield from self._convert_in_groups(pool, futures, conversions, output_dir)
+        finally:
+            # Stop queued items and let running ones finish before the caller cleans up
+            for future in futures + conversions:
+                future.cancel()
+            wait(futures + conversions)
+
+    def _convert_in_groups(
+        self,
+        pool: OfficeConverterPool,
+        futures: List,
+        conversions: List,
+        output_dir: str
+    ) -> Iterator[Dict[str, Any]]:
+        """Convert rendered DOCX results to PDF, a group of pool.batch_size per LibreOffice run
+
+        Conversions run on the batch workers and are added to conversions, so
+        the caller can wait for them.
+        """
+        def convert(group):
+            try:
+                converted = pool.convert_batch([result['path'] for result in group], output_dir)
+            except Exception as e:
+                converted = {result['path']: {'error': str(e)} for result in group}
+            for result in group:
+                docx_path = result.pop('path')
+                pdf = converted[docx_path]
+                os.unlink(docx_path)
+                if 'path' in pdf:
+                    result['path'] = pdf['path']
+                else:
+                    result['error'] = f"PDF conversion failed: {pdf['error']}"
+            return group
+
+        group = []
+        for future in as_completed(futures):
+            result = future.result()
+            if 'path' not in result:
+                yield result
+                continue
+            group.append(result)
+            if len(group) == pool.batch_size:
+                conversions.append(self._get_executor().submit(convert, group))
+                group = []
+        if group:
+            conversions.append(self._get_executor().submit(convert, group))
+        for conversion in as_completed(conversions):
+            yield from conversion.result()
+
+    def stream_zip(self, batch: Dict[str, Any], output_format: str = 'docx') -> Iterator[bytes]:
+        """Render a batch and stream it as a ZIP archive
+
+        Each file is added as soon as it is rendered and its bytes are yielded
+        right away, so memory use does not grow with the batch. The archive ends
+        with manifest.json listing every item and its error, if any.
+
+        Args:
+            batch: Result of prepare()
+            output_format: 'docx' or 'pdf'
+
+        Returns:
+            Iterator over the chunks of the ZIP archive
+        """
+        # Werkzeug iterates the response after the app context is gone
+        return self._stream_zip(batch, output_format, current_app._get_current_object())
+
+    def _stream_zip(self, batch: Dict[str, Any], output_format: str, app: Flask) -> Iterator[bytes]:
+        buffer = _ChunkBuffer()
+        work_dir = tempfile.mkdtemp(prefix='batch-')
+        started = time.perf_counter()
+        manifest = []
+        try:
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for result in self.render_items(
+                    batch['plan'], batch['items'], work_dir, output_format, batch['required'], app=app
+                ):
+                    if 'path' in result:
+                        arcname = os.path.basename(result['path'])
+                        archive.write(result['path'], arcname)
+                        os.unlink(result['path'])
+                        manifest.append(dict({key: result[key] for key in ('index', 'client_id', 'label')}, file=arcname))
+                    else:
+                        manifest.append(result)
+                    chunk = buffer.take()
+                    if chunk:
+                        yield chunk
+                archive.writestr('manifest.json', json.dumps(
+                    self._summary(manifest, started), ensure_ascii=False, indent=2
+                ))
+            yield buffer.take()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def write_to_folder(self, batch: Dict[str, Any], output_format: str = 'docx') -> Dict[str, Any]:
+        """Render a batch into a new folder below the upload folder
+
+        Args:
+            batch: Result of prepare()
+            output_format: 'docx' or 'pdf'
+
+        Returns:
+            Summary with the batch ID, folder, per-item results and throughput
+        """
+        batch_id = uuid.uuid4().hex
+        folder = os.path.join(document_service._get_upload_folder(), 'batches', batch_id)
+        os.makedirs(folder, exist_ok=True)
+        started = time.perf_counter()
+        results = list(self.render_items(batch['plan'], batch['items'], folder, output_format, batch['required']))
+        summary = self._summary(results, started)
+        summary.update({'batch_id': batch_id, 'folder': folder})
+        return summary
+
+    def _summary(self, results: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+        """Build the per-item report of a batch"""
+        results = sorted(results, key=lambda result: result['index'])
+        elapsed = time.perf_counter() - started
+        generated = [result for result in results if 'error' not in result]
+        logger.info("Generated %d of %d batch documents in %.2fs", len(generated), len(results), elapsed)
+        return {
+            'total': len(results),
+            'generated': generated,
+            'failed': [result for result in results if 'error' in result],
+            'elapsed': round(elapsed, 3),
+            'docs_per_second': round(len(generated) / elapsed, 2) if elapsed > 0 else None
+        }
+
+class _ChunkBuffer:
+    """Write-only, unseekable file object collecting ZIP output between yields"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+# Singleton instance
+batch_service = BatchGenerationService()
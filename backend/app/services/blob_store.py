@@ -0,0 +1,221 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Iterator
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+class SpooledUpload(FileStorage):
+    """An upload written to disk once, with its SHA-256 and size
+
+    Behaves like the werkzeug FileStorage it replaces (filename, content_type,
+    read, seek, save), so it can be handed to every consumer of the upload;
+    consumers that need a path use .path instead of copying the stream again.
+    """
+
+    def __init__(self, path: str, filename: str, content_type: Optional[str], sha256: str, size: int, owned: bool = True):
+        super().__init__(stream=open(path, 'rb'), filename=filename, content_type=content_type)
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.owned = owned
+
+    @property
+    def extension(self) -> str:
+        """Lower-case extension of the original filename, without the dot"""
+        return self.filename.rsplit('.', 1)[1].lower() if self.filename and '.' in self.filename else ''
+
+    def release(self) -> None:
+        """Close the stream and delete the spool file if this upload owns it"""
+        self.stream.close()
+        if self.owned:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+class BlobStore:
+    """Content-addressed storage of uploaded files
+
+    Uploads are streamed to a spool file in BLOB_CHUNK_SIZE chunks while their
+    SHA-256 is computed, so memory use does not grow with the file size. A
+    stored blob lives at <root>/<hash[:2]>/<hash>.<ext>; it is hard-linked (or
+    renamed) from the spool file where the filesystem allows it, so the data is
+    written to disk once. Identical uploads share one blob, and uploads with
+    the same name but different content no longer overwrite each other. Files
+    generated from an upload (PDF renditions) are stored under the upload's
+    hash, so converting identical content again is skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'spooled': 0, 'spooled_bytes': 0, 'stored': 0, 'dedup_hits': 0, 'dedup_bytes': 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def get_root(self) -> str:
+        """Directory of the stored blobs (default: <UPLOAD_FOLDER>/blobs)"""
+        root = get_config_value('BLOB_FOLDER', '') or os.path.join(
+            get_config_value('UPLOAD_FOLDER', 'uploads'), 'blobs'
+        )
+        return os.path.abspath(root)
+
+    def get_spool_folder(self) -> str:
+        """Directory of spool files; inside the blob root so storing is a link, not a copy"""
+        return os.path.join(self.get_root(), '.spool')
+
+    def spool(self, file, filename: Optional[str] = None, content_type: Optional[str] = None,
+              folder: Optional[str] = None) -> SpooledUpload:
+        """Stream an upload to disk, hashing it on the way
+
+        Args:
+            file: Uploaded file object (werkzeug FileStorage or any binary stream);
+                a SpooledUpload is returned as is
+            filename: Original filename (default: file.filename)
+            content_type: MIME type (default: file.content_type)
+            folder: Directory of the spool file (default: get_spool_folder())
+
+        Returns:
+            SpooledUpload owning its spool file; call release() when done
+        """
+        if isinstance(file, SpooledUpload):
+            return file
+        filename = filename or getattr(file, 'filename', None) or 'upload'
+        content_type = content_type or getattr(file, 'content_type', None)
+        folder = folder or self.get_spool_folder()
+        os.makedirs(folder, exist_ok=True)
+        chunk_size = get_config_value('BLOB_CHUNK_SIZE', 1024 * 1024)
+
+        try:
+            file.seek(0)
+        except (AttributeError, OSError):
+            pass
+        # Keep the extension; text extraction and conversion dispatch on it
+        suffix = '.' + filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        digest = hashlib.sha256()
+        size = 0
+        descriptor, path = tempfile.mkstemp(dir=folder, suffix=suffix)
+        try:
+            with os.fdopen(descriptor, 'wb') as spool_file:
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    spool_file.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.unlink(path)
+            raise
+        self._count('spooled')
+        self._count('spooled_bytes', size)
+        logger.debug("Spooled %s (%d bytes) to %s", filename, size, path)
+        return SpooledUpload(path, filename, content_type, digest.hexdigest(), size)
+
+    @contextmanager
+    def spooled(self, file, filename: Optional[str] = None, content_type: Optional[str] = None) -> Iterator[SpooledUpload]:
+        """Context manager around spool() that releases only spool files it created"""
+        upload = self.spool(file, filename, content_type)
+        try:
+            yield upload
+        finally:
+            if upload is not file:
+                upload.release()
+
+    def blob_path(self, sha256: str, extension: str = '') -> str:
+        """Path of the blob with this content hash"""
+        name = f"{sha256}.{extension}" if extension else sha256
+        return os.path.join(self.get_root(), sha256[:2], name)
+
+    def store(self, upload: SpooledUpload) -> str:
+        """Store a spooled upload under its content hash
+
+        Args:
+            upload: Result of spool()
+
+        Returns:
+            Path of the blob; the same path for identical content
+        """
+        extension = secure_filename(upload.extension)
+        target = self.blob_path(upload.sha256, extension)
+        if os.path.exists(target):
+            self._count('dedup_hits')
+            self._count('dedup_bytes', upload.size)
+            logger.info("Upload %s is identical to stored blob %s", upload.filename, target)
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        self._link_or_copy(upload.path, target)
+        self._count('stored')
+        logger.debug("Stored blob %s for %s", target, upload.filename)
+        return target
+
+    def derived_path(self, upload: SpooledUpload, extension: str) -> str:
+        """Path of a file derived from an upload, e.g. its PDF rendition <hash>.docx.pdf"""
+        return self.blob_path(upload.sha256, f"{secure_filename(upload.extension)}.{extension}")
+
+    def get_derived(self, upload: SpooledUpload, extension: str) -> Optional[str]:
+        """Stored file derived from identical content earlier, if any"""
+        path = self.derived_path(upload, extension)
+        if os.path.exists(path):
+            self._count('dedup_hits')
+            self._count('dedup_bytes', upload.size)
+            return path
+        return None
+
+    def store_derived(self, upload: SpooledUpload, path: str, extension: str) -> str:
+        """Move a file generated from an upload (e.g. a converted PDF) into the store
+
+        Args:
+            upload: The source upload
+            path: Generated file; it is moved, not copied
+            extension: Extension of the generated file, without the dot
+
+        Returns:
+            Path of the stored file
+        """
+        target = self.derived_path(upload, extension)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        self._count('stored')
+        return target
+
+    def _link_or_copy(self, source: str, target: str) -> None:
+        """Hard-link source to target, copying only across filesystems"""
+        partial = f"{target}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.link(source, partial)
+        except OSError:
+            shutil.copyfile(source, partial)
+        # Concurrent stores of the same content both end with one complete file
+        os.replace(partial, target)
+
+    def is_blob(self, path: Optional[str]) -> bool:
+        """Whether a path points into the blob store"""
+        return bool(path) and os.path.abspath(path).startswith(self.get_root() + os.sep)
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get ingestion counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'blob_spooled_total': self.stats['spooled'],
+                'blob_spooled_bytes_total': self.stats['spooled_bytes'],
+                'blob_stored_total': self.stats['stored'],
+                'blob_dedup_hits_total': self.stats['dedup_hits'],
+                'blob_dedup_bytes_total': self.stats['dedup_bytes']
+            }
+
+# Singleton instance
+blob_store = BlobStore()
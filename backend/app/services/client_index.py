@@ -0,0 +1,191 @@
+import re
+import logging
+import threading
+from typing import Dict, Any, List, Tuple
+from sqlalchemy import and_, case, func, or_
+from app import db
+from app.models import Client
+from app.models.client_match_key import (
+    ClientMatchKey, CLIENT_NAME_FTS_TABLE, has_name_index, normalize_key, write_client_index
+)
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+# Words that say nothing about which client is meant
+NAME_STOPWORDS = {'gmbh', 'mbh', 'und', 'co.', 'ohg', 'gbr', 'e.k.', 'e.v.', 'herr', 'frau', 'firma'}
+
+class ClientMatchIndex:
+    """Retrieves a small set of candidate clients for an extracted client profile
+
+    Exact identifiers (tax number, Steuer-ID, VAT ID, email, phone digits,
+    postal code) are looked up in the client_match_keys table; names go
+    through a SQLite FTS5 trigram index, which also finds partial and
+    substring matches. Both indexes are maintained by mapper events on Client
+    (see app/models/client_match_key.py), so they follow every create, update
+    and delete. The agent's scorer then ranks only these candidates.
+    """
+
+    def __init__(self):
+        self._built_for = set()
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'candidates': 0, 'rebuilds': 0}
+
+    def _lookup_keys(self, client_info: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """Normalised (kind, value) pairs of an extracted client profile"""
+        identification = client_info.get('identification') or {}
+        contact_info = client_info.get('contact_info') or {}
+        sources = [
+            ('tax_number', identification.get('tax_number')),
+            ('tax_id', identification.get('tax_number')),
+            ('vat_id', identification.get('vat_id')),
+            ('email', contact_info.get('email')),
+            ('phone', contact_info.get('phone')),
+            ('zip', contact_info.get('postal_code'))
+        ]
+        keys = []
+        for kind, value in sources:
+            value = normalize_key(kind, value)
+            if value and (kind, value) not in keys:
+                keys.append((kind, value))
+        return keys
+
+    def _name_terms(self, client_info: Dict[str, Any]) -> List[str]:
+        """Name words of an extracted client profile usable for trigram search"""
+        person_info = client_info.get('person_info') or {}
+        company_info = client_info.get('company_info') or {}
+        names = [
+            person_info.get('first_name'), person_info.get('last_name'), person_info.get('full_name'),
+            company_info.get('company_name'), company_info.get('contact_person')
+        ]
+        terms = []
+        for name in names:
+            if not isinstance(name, str) or name.strip().lower() in ('', 'null', 'none'):
+                continue
+            for word in re.split(r'[\s,/&+]+', name.lower()):
+                word = word.strip('"()')
+                if len(word) >= 3 and word not in NAME_STOPWORDS and word not in terms:
+                    terms.append(word)
+        return terms
+
+    def candidates(self, client_info: Dict[str, Any], limit: int = None) -> List[Client]:
+        """Find the clients that may match an extracted client profile
+
+        Args:
+            client_info: Result of the agent's client extraction
+            limit: Maximum number of candidates (default: CLIENT_MATCH_MAX_CANDIDATES)
+
+        Returns:
+            Candidate clients; those sharing the most identifiers first (a postal
+            code counts less than an identifier), then those found by name
+        """
+        limit = limit or get_config_value('CLIENT_MATCH_MAX_CANDIDATES', 50)
+        self.ensure_built()
+
+        ids = []
+        keys = self._lookup_keys(client_info)
+        if keys:
+            hits = db.session.query(ClientMatchKey.client_id).filter(
+                or_(*[and_(ClientMatchKey.kind == kind, ClientMatchKey.value == value) for kind, value in keys])
+            ).group_by(ClientMatchKey.client_id).order_by(
+                func.sum(case((ClientMatchKey.kind == 'zip', 1), else_=10)).desc(), ClientMatchKey.client_id
+            ).limit(limit)
+            ids.extend(client_id for client_id, in hits)
+
+        terms = self._name_terms(client_info)
+        if terms and len(ids) < limit:
+            for client_id in self._search_names(terms, limit):
+                if client_id not in ids:
+                    ids.append(client_id)
+        ids = ids[:limit]
+
+        clients = {client.id: client for client in Client.query.filter(Client.id.in_(ids)).all()} if ids else {}
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['candidates'] += len(clients)
+        logger.debug("Client index returned %d candidates for %d keys and %d name terms", len(clients), len(keys), len(terms))
+        return [clients[client_id] for client_id in ids if client_id in clients]
+
+    def _search_names(self, terms: List[str], limit: int) -> List[int]:
+        """IDs of clients whose names contain any of the terms, best matches first"""
+        connection = db.session.connection()
+        if has_name_index(connection):
+            # Clients containing every term first; any term only when that finds nothing
+            quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+            for operator in (' AND ', ' OR '):
+                rows = connection.exec_driver_sql(
+                    f"SELECT rowid FROM {CLIENT_NAME_FTS_TABLE} WHERE {CLIENT_NAME_FTS_TABLE} MATCH ? ORDER BY rank LIMIT ?",
+                    (operator.join(quoted), limit)
+                ).fetchall()
+                if rows or len(terms) == 1:
+                    return [row[0] for row in rows]
+            return []
+
+        # Without FTS5 (e.g. PostgreSQL) fall back to substring filters
+        columns = (Client.company_name, Client.first_name, Client.last_name, Client.contact_last_name)
+        conditions = [column.ilike(f'%{term}%') for term in terms for column in columns]
+        return [client_id for client_id, in db.session.query(Client.id).filter(or_(*conditions)).limit(limit)]
+
+    def ensure_built(self) -> None:
+        """Build the index once for databases whose clients predate it"""
+        engine_key = str(db.engine.url)
+        if engine_key in self._built_for:
+            return
+        with self._lock:
+            if engine_key in self._built_for:
+                return
+            has_clients = db.session.query(Client.id).first() is not None
+            has_keys = db.session.query(ClientMatchKey.id).first() is not None
+            connection = db.session.connection()
+            has_names = has_name_index(connection) and connection.exec_driver_sql(
+                f"SELECT 1 FROM {CLIENT_NAME_FTS_TABLE} LIMIT 1"
+            ).first() is not None
+            self._built_for.add(engine_key)
+        if has_clients and not has_keys and not has_names:
+            logger.info("Client match index is empty, building it")
+            self.rebuild()
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Recreate the index of all clients
+
+        Args:
+            batch_size: Clients written per statement
+
+        Returns:
+            Number of indexed clients
+        """
+        connection = db.session.connection()
+        connection.execute(ClientMatchKey.__table__.delete())
+        if has_name_index(connection):
+            connection.exec_driver_sql(f"DELETE FROM {CLIENT_NAME_FTS_TABLE}")
+        count = 0
+        batch = []
+        for client in Client.query.order_by(Client.id).yield_per(batch_size):
+            batch.append(client)
+            if len(batch) >= batch_size:
+                write_client_index(connection, batch, replace=False)
+                count += len(batch)
+                batch = []
+        write_client_index(connection, batch, replace=False)
+        count += len(batch)
+        db.session.commit()
+        with self._lock:
+            self.stats['rebuilds'] += 1
+        logger.info("Indexed %d clients for matching", count)
+        return count
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get lookup counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'client_index_lookups_total': self.stats['lookups'],
+                'client_index_candidates_total': self.stats['candidates'],
+                'client_index_rebuilds_total': self.stats['rebuilds']
+            }
+
+# Singleton instance
+client_match_index = ClientMatchIndex()
@@ -0,0 +1,113 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Iterable, List
+from flask import current_app
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_llm_executor = None
+_executor_lock = threading.Lock()
+
+def _get_max_workers() -> int:
+    """Get the configured size of the shared worker pool"""
+    return get_config_value('AGENT_MAX_WORKERS', 4)
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the bounded thread pool shared by the agent pipeline
+
+    Returns:
+        Process-wide executor, created on first use
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = max(1, _get_max_workers())
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agent-worker')
+                logger.info("Started agent worker pool with %d threads", max_workers)
+    return _executor
+
+def submit_with_app_context(func: Callable[..., Any], *args, **kwargs) -> Future:
+    """Run a function on the shared pool inside the caller's Flask app context
+
+    Each task pushes its own app context, so it gets its own database session,
+    which is removed again when the task finishes.
+
+    Args:
+        func: Function to run
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Future of the function result
+    """
+    return _submit(get_executor(), func, *args, **kwargs)
+
+def _submit(executor: ThreadPoolExecutor, func: Callable[..., Any], *args, **kwargs) -> Future:
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return executor.submit(run)
+
+def map_with_app_context(func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+    """Apply a function to all items concurrently, preserving input order
+
+    Args:
+        func: Function taking a single item
+        items: Items to process
+
+    Returns:
+        List of results in the order of items
+    """
+    futures = [submit_with_app_context(func, item) for item in items]
+    return [future.result() for future in futures]
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """Get the thread pool for independent LLM calls of one pipeline step
+
+    It is separate from the agent pool, so a step already running on an agent
+    worker can fan out without waiting for a free agent worker. Its size
+    follows OLLAMA_MAX_CONCURRENCY, which also bounds the calls Ollama sees.
+
+    Returns:
+        Process-wide executor, created on first use
+    """
+    global _llm_executor
+    if _llm_executor is None:
+        with _executor_lock:
+            if _llm_executor is None:
+                max_workers = get_config_value('OLLAMA_MAX_CONCURRENCY', 2)
+                _llm_executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='llm-worker')
+    return _llm_executor
+
+def map_llm_calls(func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+    """Apply a function making one LLM call to all items concurrently, preserving input order
+
+    Args:
+        func: Function taking a single item; it must not submit further work to this pool
+        items: Items to process
+
+    Returns:
+        List of results in the order of items
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    futures = [_submit(get_llm_executor(), func, item) for item in items]
+    return [future.result() for future in futures]
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Stop the shared worker pools (they are recreated on next use)"""
+    global _executor, _llm_executor
+    with _executor_lock:
+        executors = [_executor, _llm_executor]
+        _executor = _llm_executor = None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,39 @@
+"""
+Configuration lookup shared by the services
+
+Services read their settings on use rather than at import, so tests and
+deployments can change them per app. Outside an application context
+(worker threads and processes, CLI scripts) the environment is used.
+"""
+
+import os
+from typing import Any
+from flask import current_app
+
+TRUE_STRINGS = frozenset(('true', '1', 'yes', 'on'))
+
+def get_config_value(key: str, default: Any) -> Any:
+    """Read a setting from the application config, falling back to the environment
+
+    Args:
+        key: Configuration key
+        default: Value used when the key is not configured
+
+    Returns:
+        Configured value converted to the type of the default; strings such
+        as 'false' or '0' read as False for boolean settings, and values that
+        cannot be converted give the default
+    """
+    try:
+        value = current_app.config.get(key, default)
+    except RuntimeError:
+        # Not in application context, use environment variable
+        value = os.getenv(key, default)
+    if value is None or isinstance(default, str) or default is None:
+        return value
+    if isinstance(default, bool) and isinstance(value, str):
+        return value.strip().lower() in TRUE_STRINGS
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
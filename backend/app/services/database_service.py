@@ -137,6 +137,11 @@ class DatabaseService:
             if not document:
                 raise Exception("Document not found")
             
+            from app.services.document_service import document_service
+            document_service.invalidate_template(document_id, document.file_path)
+            if 'file_path' in document_data and document_data['file_path'] != document.file_path:
+                document_service.invalidate_document_text(document.file_path)
+            
             for key, value in document_data.items():
                 setattr(document, key, value)
             
@@ -3,19 +3,25 @@ import tempfile
 import logging
 import platform
 import subprocess
-import shutil
+import hashlib
 from typing import Dict, Any, List, Optional, BinaryIO, Tuple
 import base64
+import io
 
 import docx2pdf
 
 from flask import current_app
 
-from werkzeug.utils import secure_filename
-
 from app.db import db
 from app.models.document import Document
 from app.models.placeholder import Placeholder
+from app.models.document_text import DocumentText
+from app.services.docx_render import render_placeholders, rename_placeholder
+from app.services.template_cache import template_cache
+from app.services.render_cache import render_cache, RENDER_MIME_TYPES
+from app.services.office_conversion import get_converter_pool, OfficeConversionError
+from app.services.blob_store import blob_store
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
@@ -98,7 +104,11 @@ class DocumentService:
         return is_allowed
     
     def save_document(self, file: BinaryIO, filename: str, content_type: str = None) -> str:
-        """Save uploaded document and return the path"""
+        """Save uploaded document and return the path
+        
+        The upload is streamed to disk once and stored under its SHA-256 in the
+        blob store, so identical uploads share one file.
+        """
         logger.info("Saving document: %s (type: %s)", filename, content_type)
         
         # If content type is not provided, try to determine it from the filename
@@ -114,22 +124,19 @@ class DocumentService:
             logger.error("File type not allowed for file: %s (type: %s)", filename, content_type)
             raise ValueError(f"File type not allowed. Allowed types: {', '.join(self.allowed_extensions)}")
         
-        upload_folder = self._get_upload_folder()
-        os.makedirs(upload_folder, exist_ok=True)
-        logger.debug("Created upload folder: %s", upload_folder)
-        
-        secure_name = secure_filename(filename)
-        file_path = os.path.join(upload_folder, secure_name)
-        logger.debug("Saving file to: %s", file_path)
-        
-        with open(file_path, 'wb') as f:
-            f.write(file.read())
+        with blob_store.spooled(file, filename, content_type) as upload:
+            file_path = blob_store.store(upload)
+            content_hash = upload.sha256
         
         logger.info("Successfully saved document to: %s", file_path)
+        self.cache_document_text(file_path, content_hash)
         return file_path
     
     def create_document_preview(self, document_id: int, placeholder_values: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a preview of a document with placeholders filled in
+        """Create a preview of a document with placeholders filled in, base64 encoded
+        
+        Kept for JSON clients; new callers should use render_document() and stream
+        the resulting file instead.
         
         Args:
             document_id: ID of the document template
@@ -138,7 +145,43 @@ class DocumentService:
         Returns:
             Dictionary with preview info including base64 data and mime type
         """
-        logger.info("Creating document preview for document ID: %d", document_id)
+        return self.encode_rendered_document(self.render_document(document_id, placeholder_values))
+    
+    def encode_rendered_document(self, rendered: Dict[str, Any]) -> Dict[str, Any]:
+        """Read a rendered document into the base64 JSON form and release it
+        
+        Args:
+            rendered: Result of render_document() or create_preview_from_uploaded_file()
+            
+        Returns:
+            Dictionary with preview_data (base64), mime_type and filename
+        """
+        try:
+            with open(rendered['path'], 'rb') as f:
+                base64_data = base64.b64encode(f.read()).decode('utf-8')
+        finally:
+            self.release_rendered_document(rendered)
+        
+        return {
+            'preview_data': base64_data,
+            'mime_type': rendered['mime_type'],
+            'filename': rendered['filename']
+        }
+    
+    def render_document(self, document_id: int, placeholder_values: Dict[str, Any], output_format: str = 'pdf') -> Dict[str, Any]:
+        """Render a document with placeholders filled in to a file on disk
+        
+        Args:
+            document_id: ID of the document template
+            placeholder_values: Dictionary of placeholder values keyed by placeholder name
+            output_format: 'pdf' (DOCX templates fall back to DOCX when conversion
+                is unavailable) or 'docx' to skip the conversion
+            
+        Returns:
+            Dictionary with 'path', 'mime_type', 'filename' and 'temporary'. Temporary
+            files belong to the caller and must be released with release_rendered_document().
+        """
+        logger.info("Rendering document ID: %d", document_id)
         logger.debug("Placeholder values: %s", placeholder_values)
         
         document = Document.query.get(document_id)
@@ -166,11 +209,24 @@ class DocumentService:
             return self._process_pdf_preview(document, placeholder_values)
         elif document.document_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
             logger.info("Processing DOCX document: %s", document.title)
-            return self._process_docx_preview(document, placeholder_values)
+            return self._process_docx_preview(document, placeholder_values, output_format)
         else:
             logger.error("Unsupported document type: %s", document.document_type)
             raise ValueError(f"Unsupported document type: {document.document_type}")
     
+    def release_rendered_document(self, rendered: Dict[str, Any]) -> None:
+        """Delete the file of a rendered document if it is temporary
+        
+        Args:
+            rendered: Result of render_document()
+        """
+        if rendered.get('temporary') and os.path.exists(rendered['path']):
+            try:
+                os.unlink(rendered['path'])
+                logger.debug("Temporary rendered file deleted: %s", rendered['path'])
+            except OSError as e:
+                logger.warning("Could not delete rendered file %s: %s", rendered['path'], str(e))
+    
     def _process_pdf_preview(self, document: Document, placeholder_values: Dict[str, Any]) -> Dict[str, Any]:
         """Process PDF document with placeholders
         
@@ -180,17 +236,16 @@ class DocumentService:
         try:
             logger.debug("Processing PDF preview for document: %s", document.title)
             # In a real implementation, you would manipulate the PDF here
-            # For now, we'll just read the original file
-            with open(document.file_path, 'rb') as f:
-                file_data = f.read()
+            # For now, the stored file is served as it is, without copying it
+            if not os.path.exists(document.file_path):
+                raise FileNotFoundError(f"File not found: {document.file_path}")
             
-            # Return base64 encoded data
-            base64_data = base64.b64encode(file_data).decode('utf-8')
             logger.info("Successfully created PDF preview for: %s", document.title)
             return {
-                'preview_data': base64_data,
+                'path': document.file_path,
                 'mime_type': 'application/pdf',
-                'filename': f"{document.title}_preview.pdf"
+                'filename': f"{document.title}_preview.pdf",
+                'temporary': False
             }
         except Exception as e:
             logger.error("Error processing PDF preview: %s", str(e), exc_info=True)
@@ -293,6 +348,41 @@ class DocumentService:
             logger.error("Error using pypdf-docx2pdf for conversion: %s", str(e), exc_info=True)
             return False, "", str(e)
     
+    def _convert_with_soffice(self, docx_path: str) -> Tuple[bool, str, str]:
+        """
+        Convert DOCX to PDF using the headless LibreOffice worker pool
+        
+        Args:
+            docx_path: Path to the DOCX file
+            
+        Returns:
+            Tuple of (success, pdf_path, error_message)
+        """
+        pool = get_converter_pool()
+        if pool is None:
+            logger.info("LibreOffice is not installed, skipping this conversion method")
+            return False, "", "LibreOffice (soffice) is not installed"
+        
+        try:
+            pdf_path = pool.convert(docx_path)
+            logger.info("Successfully converted DOCX to PDF using LibreOffice")
+            return True, pdf_path, ""
+        except OfficeConversionError as e:
+            logger.error("Error using LibreOffice for conversion: %s", str(e))
+            return False, "", str(e)
+    
+    def convert_docx_to_pdf(self, docx_path: str) -> Tuple[bool, str, str]:
+        """
+        Convert DOCX to PDF with the first conversion method that works
+        
+        Args:
+            docx_path: Path to the DOCX file
+            
+        Returns:
+            Tuple of (success, pdf_path, error_message)
+        """
+        return self._try_convert_docx_to_pdf(docx_path)
+    
     def _try_convert_docx_to_pdf(self, docx_path: str) -> Tuple[bool, str, str]:
         """
         Try to convert DOCX to PDF using available methods
@@ -306,7 +396,16 @@ class DocumentService:
         docx_dir = os.path.dirname(docx_path)
         pdf_path = os.path.splitext(docx_path)[0] + '.pdf'
         
-        # Try using docx2pdf library first
+        # Prefer the LibreOffice pool, which works on Linux servers
+        try:
+            success, soffice_path, error_msg = self._convert_with_soffice(docx_path)
+            if success:
+                return True, soffice_path, ""
+            logger.warning("LibreOffice conversion failed: %s. Trying next method.", error_msg)
+        except Exception as e:
+            logger.warning("LibreOffice conversion error: %s. Trying next method.", str(e))
+        
+        # Try using docx2pdf library next
         try:
             success, error_msg = self._convert_with_docx2pdf(docx_path, pdf_path)
             if success:
@@ -329,98 +428,80 @@ class DocumentService:
         logger.info("All PDF conversion methods failed, falling back to DOCX format")
         return False, "", "All PDF conversion methods failed"
     
-    def _process_docx_preview(self, document: Document, placeholder_values: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_docx_preview(self, document: Document, placeholder_values: Dict[str, Any], output_format: str = 'pdf') -> Dict[str, Any]:
         """Process DOCX document with placeholders
         
-        First replaces placeholders in the document, then converts to PDF
+        First replaces placeholders in the document, then converts to PDF. Results
+        are kept in the rendered-output cache, so repeating a render with the same
+        values (e.g. a download right after a preview) skips both steps.
         """
         try:
-            import docx
-            from docx.shared import Pt
-            
             logger.debug("Processing DOCX preview for document: %s", document.title)
             
-            # Open the template document
-            logger.debug("Opening template document: %s", document.file_path)
-            doc = docx.Document(document.file_path)
-            
-            # Replace placeholders in all paragraphs
-            placeholder_replacements = 0
-            for paragraph in doc.paragraphs:
-                for key, value in placeholder_values.items():
-                    placeholder = '{{' + key + '}}'
-                    if placeholder in paragraph.text:
-                        logger.debug("Replacing placeholder '%s' in paragraph", key)
-                        paragraph.text = paragraph.text.replace(placeholder, str(value))
-                        placeholder_replacements += 1
-            
-            # Replace placeholders in tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for key, value in placeholder_values.items():
-                            placeholder = '{{' + key + '}}'
-                            if placeholder in cell.text:
-                                logger.debug("Replacing placeholder '%s' in table cell", key)
-                                cell.text = cell.text.replace(placeholder, str(value))
-                                placeholder_replacements += 1
+            # Look up the rendered-output cache first
+            cache_key = None
+            if render_cache.is_enabled():
+                file_hash = template_cache.file_hash(document.file_path)
+                cache_key = render_cache.make_key(document.id, file_hash, placeholder_values, output_format)
+                cached_path = render_cache.get(document.id, cache_key)
+                if cached_path:
+                    extension = os.path.splitext(cached_path)[1]
+                    logger.info("Serving cached render of document: %s", document.title)
+                    return {
+                        'path': cached_path,
+                        'mime_type': RENDER_MIME_TYPES[extension],
+                        'filename': f"{document.title}_preview{extension}",
+                        'temporary': False
+                    }
             
-            logger.info("Replaced %d placeholders in document", placeholder_replacements)
+            # Get the compiled template; it is only parsed again when the file changes
+            plan = template_cache.get_plan(document.id, document.file_path)
             
-            # Save to temporary file with placeholders replaced
+            # Splice the values into the plan and write the filled DOCX to a temporary file
             with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_docx:
-                doc.save(tmp_docx.name)
                 tmp_docx_path = tmp_docx.name
-                logger.debug("Saved document with replacements to temp file: %s", tmp_docx_path)
+            placeholder_replacements = plan.render_to_file(placeholder_values, tmp_docx_path)
             
-            # Convert DOCX to PDF 
-            success, pdf_path, error_msg = self._try_convert_docx_to_pdf(tmp_docx_path)
+            logger.info("Filled %d placeholders in document", placeholder_replacements)
+            logger.debug("Saved document with replacements to temp file: %s", tmp_docx_path)
             
-            if success:
-                # PDF conversion succeeded, read the file
-                logger.debug("PDF created at: %s", pdf_path)
+            rendered = None
+            if output_format == 'pdf':
+                # Convert DOCX to PDF 
+                success, pdf_path, error_msg = self._try_convert_docx_to_pdf(tmp_docx_path)
                 
-                try:
-                    with open(pdf_path, 'rb') as f:
-                        file_data = f.read()
-                    
-                    # Clean up temporary files
+                if success and pdf_path and os.path.exists(pdf_path):
+                    logger.debug("PDF created at: %s", pdf_path)
                     os.unlink(tmp_docx_path)
-                    os.unlink(pdf_path)
-                    logger.debug("Temporary files cleaned up")
-                    
-                    # Return base64 encoded PDF data
-                    base64_data = base64.b64encode(file_data).decode('utf-8')
                     logger.info("Successfully created PDF preview from DOCX for: %s", document.title)
-                    return {
-                        'preview_data': base64_data,
+                    rendered = {
+                        'path': pdf_path,
                         'mime_type': 'application/pdf',
-                        'filename': f"{document.title}_preview.pdf"
+                        'filename': f"{document.title}_preview.pdf",
+                        'temporary': True
                     }
-                except Exception as e:
-                    logger.error("Error reading created PDF file: %s", str(e))
-                    # Continue to fallback
-            
-            # If we got here, either conversion failed or reading the PDF failed
-            # Fall back to returning the DOCX
-            logger.warning("PDF conversion failed or unavailable: %s. Falling back to DOCX format", error_msg)
-            
-            # Read the DOCX file
-            with open(tmp_docx_path, 'rb') as f:
-                file_data = f.read()
-            
-            # Clean up temporary file
-            os.unlink(tmp_docx_path)
-            logger.debug("Temporary DOCX file cleaned up")
+                else:
+                    # Conversion failed: fall back to returning the DOCX
+                    logger.warning("PDF conversion failed or unavailable: %s. Falling back to DOCX format", error_msg)
+                    logger.info("Successfully created DOCX preview as fallback for: %s", document.title)
+            
+            if rendered is None:
+                rendered = {
+                    'path': tmp_docx_path,
+                    'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                    'filename': f"{document.title}_preview.docx",
+                    'temporary': True
+                }
             
-            # Return base64 encoded DOCX data
-            base64_data = base64.b64encode(file_data).decode('utf-8')
-            logger.info("Successfully created DOCX preview as fallback for: %s", document.title)
-            return {
-                'preview_data': base64_data,
-                'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                'filename': f"{document.title}_preview.docx"
-            }
+            # A DOCX fallback for a failed PDF conversion is not cached under the PDF
+            # key, so the next render tries the conversion again
+            produced_format = os.path.splitext(rendered['path'])[1].lstrip('.').lower()
+            if cache_key and produced_format == output_format:
+                # The rendered file is ours to hand over; serve it from the cache
+                cached_path = render_cache.store(document.id, cache_key, rendered['path'], move=True)
+                if cached_path:
+                    rendered = dict(rendered, path=cached_path, temporary=False)
+            return rendered
                 
         except Exception as e:
             logger.error("Error processing DOCX preview: %s", str(e), exc_info=True)
@@ -460,6 +541,10 @@ class DocumentService:
             
             db.session.commit()
             logger.info("Successfully saved document with ID %d and %d placeholders", document.id, len(placeholders))
+            
+            # Compile DOCX templates at upload so the first preview does not pay for parsing
+            if document.file_path and document.file_path.lower().endswith('.docx'):
+                self.compile_template(document.id, document.file_path)
             return document
         except Exception as e:
             logger.error("Failed to save document with placeholders: %s", str(e), exc_info=True)
@@ -467,27 +552,21 @@ class DocumentService:
             raise Exception(f"Failed to save document with placeholders: {str(e)}")
 
     def create_preview_from_uploaded_file(self, file: BinaryIO, placeholder_values: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a preview from an uploaded file without saving to database
+        """Render an uploaded file with placeholders filled in, without saving to database
         
         Args:
             file: The uploaded file object (BytesIO or similar)
             placeholder_values: Dictionary of placeholder values keyed by placeholder name
             
         Returns:
-            Dictionary with preview info including base64 data and mime type
+            Dictionary with 'path', 'mime_type', 'filename' and 'temporary', like
+            render_document(); release it with release_rendered_document()
         """
         try:
             filename = getattr(file, 'filename', 'document')
             logger.info("Creating preview from uploaded file: %s", filename)
             logger.debug("Placeholder values count: %d", len(placeholder_values))
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                file.seek(0)  # Reset file pointer to beginning
-                tmp.write(file.read())
-                tmp_path = tmp.name
-                logger.debug("Saved to temporary file: %s", tmp_path)
-            
             # Determine file type
             content_type = None
             
@@ -497,25 +576,22 @@ class DocumentService:
                 content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
             else:
                 logger.error("Unsupported file type: %s", filename)
-                os.unlink(tmp_path)
                 raise ValueError("Unsupported file type")
             
             logger.debug("Determined content type: %s", content_type)
             
-            # Process based on file type
+            # Process the spooled upload based on file type
             if content_type == 'application/pdf':
                 logger.info("Processing temporary PDF file")
-                result = self._process_temp_pdf_preview(tmp_path, placeholder_values, filename)
-            elif content_type.endswith('document'):
-                logger.info("Processing temporary DOCX file")
-                result = self._process_temp_docx_preview(tmp_path, placeholder_values, filename)
+                # The spool file itself is served and deleted once the response is sent
+                upload = blob_store.spool(file)
+                upload.stream.close()
+                result = self._process_temp_pdf_preview(upload.path, placeholder_values, filename)
+                result['temporary'] = upload is not file
             else:
-                logger.error("Unsupported content type: %s", content_type)
-                raise ValueError(f"Unsupported content type: {content_type}")
-                
-            # Clean up temporary file
-            os.unlink(tmp_path)
-            logger.debug("Temporary file cleaned up")
+                with blob_store.spooled(file) as upload:
+                    logger.info("Processing temporary DOCX file")
+                    result = self._process_temp_docx_preview(upload.path, placeholder_values, filename)
             
             logger.info("Successfully created preview for uploaded file: %s", filename)
             return result
@@ -529,24 +605,16 @@ class DocumentService:
         
         Note: In a real implementation, you would use PDF manipulation libraries here
         """
-        try:
-            logger.debug("Processing temporary PDF preview: %s", file_path)
-            # In a real implementation, you would manipulate the PDF with placeholders here
-            # For now, we'll just read the file
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-            
-            # Return base64 encoded data
-            base64_data = base64.b64encode(file_data).decode('utf-8')
-            logger.info("Successfully created PDF preview from temporary file")
-            return {
-                'preview_data': base64_data,
-                'mime_type': 'application/pdf',
-                'filename': f"{os.path.splitext(filename)[0]}_preview.pdf"
-            }
-        except Exception as e:
-            logger.error("Failed to process temporary PDF preview: %s", str(e), exc_info=True)
-            raise Exception(f"Failed to process PDF preview: {str(e)}")
+        logger.debug("Processing temporary PDF preview: %s", file_path)
+        # In a real implementation, you would manipulate the PDF with placeholders here
+        # For now, the uploaded file is served as it is
+        logger.info("Successfully created PDF preview from temporary file")
+        return {
+            'path': file_path,
+            'mime_type': 'application/pdf',
+            'filename': f"{os.path.splitext(filename)[0]}_preview.pdf",
+            'temporary': True
+        }
     
     def _process_temp_docx_preview(self, file_path: str, placeholder_values: Dict[str, Any], filename: str) -> Dict[str, Any]:
         """Process a temporary DOCX file for preview with placeholders
@@ -562,26 +630,8 @@ class DocumentService:
             logger.debug("Opening DOCX file")
             doc = docx.Document(file_path)
             
-            # Replace placeholders in all paragraphs
-            placeholder_replacements = 0
-            for paragraph in doc.paragraphs:
-                for key, value in placeholder_values.items():
-                    placeholder = '{{' + key + '}}'
-                    if placeholder in paragraph.text:
-                        logger.debug("Replacing placeholder '%s' with value '%s'", key, value)
-                        paragraph.text = paragraph.text.replace(placeholder, str(value))
-                        placeholder_replacements += 1
-            
-            # Replace placeholders in tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for key, value in placeholder_values.items():
-                            placeholder = '{{' + key + '}}'
-                            if placeholder in cell.text:
-                                logger.debug("Replacing placeholder '%s' in table cell", key)
-                                cell.text = cell.text.replace(placeholder, str(value))
-                                placeholder_replacements += 1
+            # Replace all placeholders in one pass over body, tables, headers, footers and text boxes
+            placeholder_replacements = render_placeholders(doc, placeholder_values)
             
             logger.info("Replaced %d placeholders in temporary DOCX", placeholder_replacements)
             
@@ -594,50 +644,25 @@ class DocumentService:
             # Convert DOCX to PDF
             success, pdf_path, error_msg = self._try_convert_docx_to_pdf(tmp_docx_path)
             
-            if success:
-                # PDF conversion succeeded, read the file
-                logger.debug("PDF created at: %s", pdf_path)
-                
-                try:
-                    with open(pdf_path, 'rb') as f:
-                        file_data = f.read()
-                    
-                    # Clean up temporary files
-                    os.unlink(tmp_docx_path)
-                    os.unlink(pdf_path)
-                    logger.debug("Temporary files cleaned up")
-                    
-                    # Return base64 encoded PDF data
-                    base64_data = base64.b64encode(file_data).decode('utf-8')
-                    logger.info("Successfully created PDF preview from temporary DOCX")
-                    return {
-                        'preview_data': base64_data,
-                        'mime_type': 'application/pdf',
-                        'filename': f"{os.path.splitext(filename)[0]}_preview.pdf"
-                    }
-                except Exception as e:
-                    logger.error("Error reading created PDF file: %s", str(e))
-                    # Continue to fallback
+            if success and pdf_path and os.path.exists(pdf_path):
+                # The PDF is streamed and deleted after the response; the DOCX is no longer needed
+                os.unlink(tmp_docx_path)
+                logger.info("Successfully created PDF preview from temporary DOCX")
+                return {
+                    'path': pdf_path,
+                    'mime_type': 'application/pdf',
+                    'filename': f"{os.path.splitext(filename)[0]}_preview.pdf",
+                    'temporary': True
+                }
             
-            # If we got here, either conversion failed or reading the PDF failed
-            # Fall back to returning the DOCX
+            # Conversion failed or unavailable: fall back to the filled-in DOCX
             logger.warning("PDF conversion failed or unavailable: %s. Falling back to DOCX format", error_msg)
-            
-            # Read the DOCX file
-            with open(tmp_docx_path, 'rb') as f:
-                file_data = f.read()
-            
-            # Clean up temporary file
-            os.unlink(tmp_docx_path)
-            logger.debug("Temporary DOCX file cleaned up")
-            
-            # Return base64 encoded DOCX data
-            base64_data = base64.b64encode(file_data).decode('utf-8')
             logger.info("Successfully created DOCX preview as fallback from temporary file")
             return {
-                'preview_data': base64_data,
+                'path': tmp_docx_path,
                 'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                'filename': f"{os.path.splitext(filename)[0]}_preview.docx"
+                'filename': f"{os.path.splitext(filename)[0]}_preview.docx",
+                'temporary': True
             }
                 
         except Exception as e:
@@ -688,7 +713,18 @@ class DocumentService:
             # 3. Update the document file content based on its type
             if document.document_type.endswith('document'):  # DOCX file
                 logger.info("Updating placeholder in DOCX document")
-                self._update_placeholder_in_docx(document.file_path, old_name, new_name)
+                self.invalidate_template(document_id, document.file_path)
+                if blob_store.is_blob(document.file_path):
+                    # Blobs may be shared and are named by their content, so store the result as a new blob
+                    output = io.BytesIO()
+                    if self._update_placeholder_in_docx(document.file_path, old_name, new_name, output):
+                        old_path = document.file_path
+                        with blob_store.spooled(output, os.path.basename(old_path)) as upload:
+                            document.file_path = blob_store.store(upload)
+                        db.session.commit()
+                        self.release_document_file(document, old_path)
+                else:
+                    self._update_placeholder_in_docx(document.file_path, old_name, new_name)
             elif document.document_type == 'application/pdf':
                 logger.info("Updating placeholder in PDF document")
                 # PDF editing is more complex and might require more specialized handling
@@ -704,13 +740,17 @@ class DocumentService:
             db.session.rollback()
             raise Exception(f"Failed to update placeholder: {str(e)}")
     
-    def _update_placeholder_in_docx(self, file_path: str, old_name: str, new_name: str) -> None:
+    def _update_placeholder_in_docx(self, file_path: str, old_name: str, new_name: str, output: Optional[BinaryIO] = None) -> int:
         """Update placeholder names in a DOCX document.
         
         Args:
             file_path: Path to the DOCX file
             old_name: Current placeholder name
             new_name: New placeholder name
+            output: Stream receiving the updated document; by default the file is changed in place
+            
+        Returns:
+            Number of replacements
         """
         try:
             import docx
@@ -718,30 +758,16 @@ class DocumentService:
             logger.debug("Opening DOCX document at %s to update placeholders", file_path)
             doc = docx.Document(file_path)
             
-            # Replace in paragraphs
-            replacements = 0
-            old_placeholder = '{{' + old_name + '}}'
-            new_placeholder = '{{' + new_name + '}}'
-            
-            for paragraph in doc.paragraphs:
-                if old_placeholder in paragraph.text:
-                    paragraph.text = paragraph.text.replace(old_placeholder, new_placeholder)
-                    replacements += 1
-            
-            # Replace in tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if old_placeholder in cell.text:
-                            cell.text = cell.text.replace(old_placeholder, new_placeholder)
-                            replacements += 1
+            # Rename the token everywhere, keeping run formatting
+            replacements = rename_placeholder(doc, old_name, new_name)
             
             # Save the document if changes were made
             if replacements > 0:
                 logger.info("Made %d placeholder replacements in document, saving changes", replacements)
-                doc.save(file_path)
+                doc.save(output if output is not None else file_path)
             else:
                 logger.warning("No placeholders found to replace in document")
+            return replacements
                 
         except Exception as e:
             logger.error("Error updating placeholders in DOCX: %s", str(e), exc_info=True)
@@ -762,13 +788,6 @@ class DocumentService:
             filename = getattr(file, 'filename', 'document')
             logger.info("Updating placeholder from '%s' to '%s' in temporary file: %s", old_name, new_name, filename)
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                file.seek(0)  # Reset file pointer to beginning
-                tmp.write(file.read())
-                tmp_path = tmp.name
-                logger.debug("Saved to temporary file: %s", tmp_path)
-            
             # Determine file type
             content_type = None
             
@@ -778,62 +797,39 @@ class DocumentService:
                 content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
             else:
                 logger.error("Unsupported file type: %s", filename)
-                os.unlink(tmp_path)
                 raise ValueError("Unsupported file type")
             
             logger.debug("Determined content type: %s", content_type)
             
-            # Process based on file type
-            if content_type.endswith('document'):  # DOCX file
-                logger.info("Updating placeholder in DOCX file")
-                # Create a new temporary file for the updated document
-                updated_file_path = tmp_path + '_updated'
-                
-                # Copy the file first
-                shutil.copy2(tmp_path, updated_file_path)
-                
-                # Update placeholder in the copy
-                self._update_placeholder_in_docx(updated_file_path, old_name, new_name)
-                
-                # Read updated file
-                with open(updated_file_path, 'rb') as f:
-                    file_data = f.read()
-                
-                # Clean up temporary files
-                os.unlink(tmp_path)
-                os.unlink(updated_file_path)
-                logger.debug("Temporary files cleaned up")
-                
-                # Return base64 encoded DOCX data
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                logger.info("Successfully updated placeholder in DOCX file")
-                return {
-                    'preview_data': base64_data,
-                    'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    'filename': filename
-                }
-            elif content_type == 'application/pdf':
-                logger.info("PDF placeholder update not fully implemented")
-                # For PDF files, we might need more complex handling
-                # For now, return the original file
-                with open(tmp_path, 'rb') as f:
-                    file_data = f.read()
-                
-                # Clean up temporary file
-                os.unlink(tmp_path)
-                logger.debug("Temporary file cleaned up")
-                
-                # Return base64 encoded PDF data
-                base64_data = base64.b64encode(file_data).decode('utf-8')
-                logger.info("Returning original PDF (placeholder update not implemented)")
-                return {
-                    'preview_data': base64_data,
-                    'mime_type': 'application/pdf',
-                    'filename': filename
-                }
-            else:
-                logger.error("Unsupported content type: %s", content_type)
-                raise ValueError(f"Unsupported content type: {content_type}")
+            with blob_store.spooled(file) as upload:
+                if content_type.endswith('document'):  # DOCX file
+                    logger.info("Updating placeholder in DOCX file")
+                    # The updated document is written to memory; the spooled upload stays unchanged
+                    output = io.BytesIO()
+                    if not self._update_placeholder_in_docx(upload.path, old_name, new_name, output):
+                        upload.seek(0)
+                        output = io.BytesIO(upload.read())
+                    
+                    # Return base64 encoded DOCX data
+                    base64_data = base64.b64encode(output.getvalue()).decode('utf-8')
+                    logger.info("Successfully updated placeholder in DOCX file")
+                    return {
+                        'preview_data': base64_data,
+                        'mime_type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                        'filename': filename
+                    }
+                else:
+                    logger.info("PDF placeholder update not fully implemented")
+                    # For PDF files, we might need more complex handling
+                    # For now, return the original file
+                    upload.seek(0)
+                    base64_data = base64.b64encode(upload.read()).decode('utf-8')
+                    logger.info("Returning original PDF (placeholder update not implemented)")
+                    return {
+                        'preview_data': base64_data,
+                        'mime_type': 'application/pdf',
+                        'filename': filename
+                    }
                 
         except Exception as e:
             logger.error("Error updating placeholder in temporary file: %s", str(e), exc_info=True)
@@ -877,6 +873,181 @@ class DocumentService:
             logger.error("Error extracting text from file %s: %s", file_path, str(e), exc_info=True)
             raise Exception(f"Failed to extract text from file: {str(e)}")
     
+    def _hash_file(self, file_path: str) -> str:
+        """Compute the SHA-256 of a file in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def get_document_text(self, file_path: str, content_hash: Optional[str] = None) -> str:
+        """Get the text of a stored document, using the extracted-text cache
+        
+        A cached entry is used as long as the file's mtime and size are unchanged,
+        which costs a single indexed lookup. Otherwise the file is hashed, and the
+        text of any file with identical content is reused before re-extracting.
+        
+        Args:
+            file_path: Path to the document file
+            content_hash: SHA-256 of the file if already known, e.g. from ingestion
+            
+        Returns:
+            String containing the text content of the document
+        """
+        if not os.path.exists(file_path):
+            logger.error("File does not exist: %s", file_path)
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        
+        # Use a separate session so cache writes never commit the caller's pending changes
+        with Session(bind=db.engine) as session:
+            entry = session.query(DocumentText).filter_by(file_path=key).first()
+            if entry is not None and entry.file_mtime == stat.st_mtime and entry.file_size == stat.st_size:
+                logger.debug("Extracted text cache hit for %s", key)
+                return entry.text
+            
+            content_hash = content_hash or self._hash_file(key)
+            if entry is not None and entry.content_hash == content_hash:
+                text_content = entry.text
+            else:
+                same_content = session.query(DocumentText).filter_by(content_hash=content_hash).first()
+                if same_content is not None:
+                    logger.debug("Reusing extracted text of %s for %s", same_content.file_path, key)
+                    text_content = same_content.text
+                else:
+                    text_content = self.extract_text_from_file(key)
+            
+            if entry is None:
+                entry = DocumentText(file_path=key)
+                session.add(entry)
+            entry.content_hash = content_hash
+            entry.file_mtime = stat.st_mtime
+            entry.file_size = stat.st_size
+            entry.text = text_content
+            session.commit()
+            return text_content
+    
+    def cache_document_text(self, file_path: str, content_hash: Optional[str] = None) -> None:
+        """Extract and cache the text of a newly stored file
+        
+        Failures are logged only, so an unreadable file never breaks an upload.
+        
+        Args:
+            file_path: Path to the document file
+            content_hash: SHA-256 of the file if already known
+        """
+        try:
+            self.get_document_text(file_path, content_hash)
+        except Exception as e:
+            logger.warning("Could not cache extracted text for %s: %s", file_path, str(e))
+    
+    def compile_template(self, document_id: int, file_path: str) -> None:
+        """Compile a DOCX template into the render plan cache
+        
+        Failures are logged only; the template is compiled again on first render.
+        
+        Args:
+            document_id: ID of the document template
+            file_path: Path to the DOCX template
+        """
+        try:
+            template_cache.get_plan(document_id, file_path)
+        except Exception as e:
+            logger.warning("Could not compile template %s: %s", file_path, str(e))
+    
+    def invalidate_template(self, document_id: int, file_path: Optional[str] = None) -> None:
+        """Drop the compiled render plan and rendered output of a changed or deleted template
+        
+        Args:
+            document_id: ID of the document template
+            file_path: Path to the template file
+        """
+        template_cache.invalidate(document_id, file_path)
+        render_cache.invalidate(document_id)
+    
+    def invalidate_document_text(self, file_path: str) -> None:
+        """Drop the cached text of a file that is replaced or deleted
+        
+        Args:
+            file_path: Path to the document file
+        """
+        if not file_path:
+            return
+        with Session(bind=db.engine) as session:
+            session.query(DocumentText).filter_by(file_path=os.path.abspath(file_path)).delete()
+            session.commit()
+        logger.debug("Invalidated extracted text cache for %s", file_path)
+    
+    def resolve_file_path(self, file_path: str) -> str:
+        """Absolute path of a stored document file
+        
+        Work order documents store their path relative to UPLOAD_FOLDER,
+        templates an absolute (or working directory relative) path.
+        
+        Args:
+            file_path: Path as stored in Document.file_path
+            
+        Returns:
+            Absolute path; the file may not exist
+        """
+        if os.path.isabs(file_path) or os.path.exists(file_path):
+            return os.path.abspath(file_path)
+        return os.path.abspath(os.path.join(self._get_upload_folder(), file_path))
+    
+    def release_document_file(self, document: Document, file_path: Optional[str] = None) -> bool:
+        """Delete a document's file and cached text unless another document uses the file
+        
+        Blobs are shared by documents with identical content, so a file is only
+        removed with its last reference. The PDF rendition stored for an
+        uploaded DOCX (<hash>.docx.pdf) is removed with it, unless a document
+        uses the rendition itself.
+        
+        Args:
+            document: Document that no longer uses the file
+            file_path: Stored path to release (default: document.file_path)
+            
+        Returns:
+            True if the file was deleted
+        """
+        file_path = file_path or document.file_path
+        if not file_path:
+            return False
+        absolute = self.resolve_file_path(file_path)
+        if self._file_in_use(document, file_path, absolute):
+            return False
+        deleted = self._remove_file(absolute)
+        rendition = f"{absolute}.pdf"
+        if os.path.exists(rendition) and not self._file_in_use(document, rendition, rendition):
+            self._remove_file(rendition)
+        return deleted
+    
+    def _file_in_use(self, document: Document, file_path: str, absolute: str) -> bool:
+        """Whether a document other than the given one references a stored file"""
+        stored_forms = {file_path, absolute, os.path.relpath(absolute, os.path.abspath(self._get_upload_folder()))}
+        in_use = db.session.query(Document.id).filter(
+            Document.id != document.id, Document.file_path.in_(stored_forms)
+        ).first()
+        if in_use is not None:
+            logger.info("Keeping file %s, still used by document %d", absolute, in_use[0])
+            return True
+        return False
+    
+    def _remove_file(self, absolute: str) -> bool:
+        """Delete a stored file and its cached text"""
+        self.invalidate_document_text(absolute)
+        try:
+            os.remove(absolute)
+            logger.info("Deleted document file: %s", absolute)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning("Could not delete document file %s: %s", absolute, str(e))
+            return False
+    
     def extract_text_from_uploaded_file(self, file) -> str:
         """Extract text content from an uploaded file object
         
@@ -889,26 +1060,9 @@ class DocumentService:
         logger.info("Extracting text from uploaded file: %s", getattr(file, 'filename', 'unknown'))
         
         try:
-            # Save file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{getattr(file, 'filename', 'temp')}") as temp_file:
-                # Reset file pointer to beginning
-                file.seek(0)
-                temp_file.write(file.read())
-                temp_file_path = temp_file.name
-                
-            logger.debug("Saved uploaded file to temporary location: %s", temp_file_path)
-            
-            # Extract text from temporary file
-            text_content = self.extract_text_from_file(temp_file_path)
-            
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file_path)
-                logger.debug("Cleaned up temporary file: %s", temp_file_path)
-            except OSError as e:
-                logger.warning("Could not delete temporary file %s: %s", temp_file_path, str(e))
-            
-            return text_content
+            # Extract text from the spooled upload, which keeps the file extension
+            with blob_store.spooled(file) as upload:
+                return self.extract_text_from_file(upload.path)
             
         except Exception as e:
             logger.error("Error extracting text from uploaded file %s: %s", 
@@ -954,22 +1108,17 @@ class DocumentService:
             # Try to use PyPDF2 if available
             try:
                 import PyPDF2
+                from app.services.pdf_extraction import extract_pdf_text
                 
                 logger.debug("Extracting text from PDF using PyPDF2: %s", file_path)
-                text_content = []
-                
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text.strip():
-                                text_content.append(page_text)
-                        except Exception as page_error:
-                            logger.warning("Failed to extract text from page %d: %s", page_num, str(page_error))
+                # Long PDFs are split into page ranges across a process pool
+                extraction = extract_pdf_text(file_path)
                 
-                result = '\n'.join(text_content)
-                logger.info("Successfully extracted %d characters from PDF file using PyPDF2", len(result))
+                result = extraction['text']
+                logger.info(
+                    "Successfully extracted %d characters from %d PDF pages using PyPDF2 in %.2fs (parallel: %s)",
+                    len(result), extraction['page_count'], extraction['elapsed'], extraction['parallel']
+                )
                 return result
                 
             except ImportError:
@@ -997,11 +1146,12 @@ class DocumentService:
                     
                 except ImportError:
                     logger.warning("Neither PyPDF2 nor pdfplumber available for PDF text extraction")
-                    return "PDF-Textextraktion ist nicht verfügbar. Bitte installieren Sie PyPDF2 oder pdfplumber."
+                    raise Exception("PDF-Textextraktion ist nicht verfügbar. Bitte installieren Sie PyPDF2 oder pdfplumber.")
                     
         except Exception as e:
+            # Raised rather than returned, so a failure is never cached as the document's text
             logger.error("Error extracting text from PDF: %s", str(e), exc_info=True)
-            return f"Fehler beim Extrahieren des Textes aus der PDF-Datei: {str(e)}"
+            raise Exception(f"Fehler beim Extrahieren des Textes aus der PDF-Datei: {str(e)}")
 
     def convert_file_to_pdf(self, file: BinaryIO, filename: str, content_type: str = None) -> Tuple[str, str]:
         """Convert uploaded file to PDF format and return the PDF file path and filename
@@ -1033,51 +1183,28 @@ class DocumentService:
         # If it's a DOCX file, convert to PDF
         elif file_extension == 'docx':
             logger.info("Converting DOCX file to PDF")
-            
-            # Save the original DOCX file temporarily
-            upload_folder = self._get_upload_folder()
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            # Create temporary file for the original DOCX
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_docx:
-                tmp_docx.write(file.read())
-                tmp_docx_path = tmp_docx.name
-                logger.debug("Saved temporary DOCX file: %s", tmp_docx_path)
-            
-            try:
-                # Convert DOCX to PDF
-                success, pdf_path, error_msg = self._try_convert_docx_to_pdf(tmp_docx_path)
+            base_name = os.path.splitext(filename)[0]
+            pdf_filename = f"{base_name}.pdf"
+            
+            with blob_store.spooled(file, filename, content_type) as upload:
+                # Identical DOCX content was converted before
+                final_pdf_path = blob_store.get_derived(upload, 'pdf')
+                if final_pdf_path:
+                    logger.info("Reusing stored PDF of identical DOCX for %s", filename)
+                    return final_pdf_path, pdf_filename
+                
+                # Convert the spooled DOCX; the PDF is written next to it
+                success, pdf_path, error_msg = self._try_convert_docx_to_pdf(upload.path)
                 
                 if not success:
                     logger.error("Failed to convert DOCX to PDF: %s", error_msg)
-                    # Clean up temporary file
-                    os.unlink(tmp_docx_path)
                     raise ValueError(f"Failed to convert DOCX to PDF: {error_msg}")
                 
-                # Create final PDF filename
-                base_name = os.path.splitext(filename)[0]
-                pdf_filename = f"{base_name}.pdf"
-                
-                # Create unique filename for storage
-                from datetime import datetime
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
-                unique_pdf_filename = f"{timestamp}_{pdf_filename}"
-                
-                # Move the converted PDF to the upload folder
-                final_pdf_path = os.path.join(upload_folder, unique_pdf_filename)
-                shutil.move(pdf_path, final_pdf_path)
-                
-                # Clean up temporary DOCX file
-                os.unlink(tmp_docx_path)
-                
-                logger.info("Successfully converted DOCX to PDF: %s -> %s", filename, pdf_filename)
-                return final_pdf_path, pdf_filename
-                
-            except Exception as e:
-                # Clean up temporary file on error
-                if os.path.exists(tmp_docx_path):
-                    os.unlink(tmp_docx_path)
-                raise
+                final_pdf_path = blob_store.store_derived(upload, pdf_path, 'pdf')
+            
+            logger.info("Successfully converted DOCX to PDF: %s -> %s", filename, pdf_filename)
+            self.cache_document_text(final_pdf_path)
+            return final_pdf_path, pdf_filename
         
         # For other file types (DOC), try to handle them
         elif file_extension == 'doc':
@@ -0,0 +1,140 @@
+import re
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Callable, Iterator, Union
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+
+logger = logging.getLogger(__name__)
+
+# One pattern for all placeholders: {{name}}
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+
+# Text nodes that belong directly to a paragraph (not to a paragraph nested in a text box)
+_PARAGRAPH_TEXT_XPATH = (
+    './w:r/w:t'
+    ' | ./w:hyperlink/w:r/w:t'
+    ' | ./w:ins/w:r/w:t'
+    ' | ./w:smartTag/w:r/w:t'
+    ' | ./w:fldSimple/w:r/w:t'
+    ' | ./w:sdt/w:sdtContent/w:r/w:t'
+)
+
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+def iter_paragraph_elements(doc) -> Iterator[Any]:
+    """Yield every w:p element of a document
+
+    Covers the body (including nested tables and text boxes) and every header
+    and footer part, each part exactly once.
+
+    Args:
+        doc: python-docx Document
+
+    Yields:
+        lxml w:p elements
+    """
+    parts = [doc.part]
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.HEADER, RT.FOOTER):
+            parts.append(rel.target_part)
+
+    for part in parts:
+        yield from part.element.iter(qn('w:p'))
+
+def replace_in_paragraph(paragraph, replace: Callable[[str], Union[str, None]]) -> int:
+    """Replace placeholders in one paragraph, keeping run formatting
+
+    The paragraph's text nodes are joined once and scanned with the compiled
+    pattern, so tokens split across runs are found. Each replacement is written
+    into the run holding the token's first character and the rest of the token
+    is removed from the following runs.
+
+    Args:
+        paragraph: lxml w:p element
+        replace: Callable returning the replacement for a placeholder name,
+            or None to leave the token untouched
+
+    Returns:
+        Number of replaced tokens
+    """
+    nodes = paragraph.xpath(_PARAGRAPH_TEXT_XPATH)
+    if not nodes:
+        return 0
+
+    texts = [node.text or '' for node in nodes]
+    full_text = ''.join(texts)
+    if '{{' not in full_text:
+        return 0
+
+    matches = []
+    for match in PLACEHOLDER_PATTERN.finditer(full_text):
+        value = replace(match.group(1))
+        if value is not None:
+            matches.append((match.start(), match.end(), value))
+    if not matches:
+        return 0
+
+    # Start offset of every node in the joined text
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+
+    changed = set()
+    # Work backwards so earlier offsets stay valid
+    for start, end, value in reversed(matches):
+        # Node holding the first character and node holding the last character
+        first = bisect_right(starts, start) - 1
+        last = bisect_left(starts, end) - 1
+        first_offset = start - starts[first]
+        last_offset = end - starts[last]
+        if first == last:
+            texts[first] = texts[first][:first_offset] + value + texts[first][last_offset:]
+        else:
+            texts[first] = texts[first][:first_offset] + value
+            for index in range(first + 1, last):
+                texts[index] = ''
+            texts[last] = texts[last][last_offset:]
+        changed.update(range(first, last + 1))
+
+    for index in changed:
+        nodes[index].text = texts[index]
+        nodes[index].set(_XML_SPACE, 'preserve')
+
+    return len(matches)
+
+def render_placeholders(doc, placeholder_values: Dict[str, Any]) -> int:
+    """Fill all {{name}} placeholders of a document in a single pass
+
+    Args:
+        doc: python-docx Document, modified in place
+        placeholder_values: Dictionary of placeholder values keyed by placeholder name
+
+    Returns:
+        Number of replaced tokens
+    """
+    values = {key: str(value) for key, value in placeholder_values.items()}
+    replacements = 0
+    for paragraph in iter_paragraph_elements(doc):
+        replacements += replace_in_paragraph(paragraph, values.get)
+    logger.debug("Replaced %d placeholder tokens", replacements)
+    return replacements
+
+def rename_placeholder(doc, old_name: str, new_name: str) -> int:
+    """Rename a placeholder token throughout a document
+
+    Args:
+        doc: python-docx Document, modified in place
+        old_name: Current placeholder name
+        new_name: New placeholder name
+
+    Returns:
+        Number of renamed tokens
+    """
+    new_token = '{{' + new_name + '}}'
+    replacements = 0
+    for paragraph in iter_paragraph_elements(doc):
+        replacements += replace_in_paragraph(paragraph, lambda name: new_token if name == old_name else None)
+    return replacements
@@ -0,0 +1,81 @@
+"""
+Precompiled patterns for structured values in German business documents
+
+Shared by the passage retrieval in front of the LLM, which boosts passages
+containing a value of the kind a placeholder asks for, and by the rule
+extractors, which fill such values without the LLM.
+"""
+
+import re
+from typing import Any, Dict, List
+
+_MONTHS = 'Januar|Februar|März|Maerz|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember'
+
+FIELD_PATTERNS = {
+    'date': re.compile(
+        rf'\b\d{{1,2}}\.\s?\d{{1,2}}\.\s?(?:\d{{4}}|\d{{2}})\b|\b\d{{4}}-\d{{2}}-\d{{2}}\b|\b\d{{1,2}}\.\s?(?:{_MONTHS})\s\d{{4}}\b',
+        re.IGNORECASE
+    ),
+    'iban': re.compile(r'\b[A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){3,7}(?:\s?[A-Z0-9]{1,4})?\b'),
+    'amount': re.compile(
+        r'(?:€|EUR)\s?-?\d{1,3}(?:\.?\d{3})*(?:,\d{2})?(?![\d,])'
+        r'|(?<![\d.,])-?\d{1,3}(?:\.?\d{3})*(?:,\d{2})?\s?(?:€|EUR\b|Euro\b)'
+    ),
+    'number': re.compile(r'(?<![\w/.,-])-?\d+(?:[.,]\d+)?(?![\w/])'),
+    'tax_number': re.compile(r'\b\d{2,3}/\d{3,4}/\d{4,5}\b|\b\d{10,13}\b'),
+    'vat_id': re.compile(r'\bDE\s?\d{9}\b'),
+    'postal_code': re.compile(r'\b\d{5}\b'),
+    'email': re.compile(r'\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b'),
+    'phone': re.compile(r'(?:\+49|\b0)[\d\s/()-]{6,}\d')
+}
+
+# Placeholder name fragments (lower case, umlauts folded) naming the kind of value;
+# a fragment matches the start of a word of the name, or anywhere if it is long
+NAME_HINTS = (
+    ('iban', ('iban', 'bankverbindung', 'kontonummer')),
+    ('vat_id', ('ustid', 'ust', 'umsatzsteuerid', 'umsatzsteueridentifikation', 'vat')),
+    ('tax_number', ('steuernummer', 'stnr', 'steuerid', 'steueridentifikationsnummer')),
+    ('amount', ('betrag', 'summe', 'kosten', 'preis', 'honorar', 'gebuehr', 'zahlung', 'amount', 'euro')),
+    ('postal_code', ('plz', 'postleitzahl', 'zip')),
+    ('email', ('email', 'mail')),
+    ('phone', ('telefon', 'tel', 'phone', 'mobil')),
+    ('date', ('datum', 'frist', 'termin', 'date', 'stichtag', 'geburtstag'))
+)
+
+# Placeholder types and the value patterns they imply
+TYPE_HINTS = {
+    'date': ('date',),
+    'number': ('amount', 'number')
+}
+
+def fold(text: str) -> str:
+    """Lower-case text with German umlauts and ß spelled out"""
+    return (text.casefold()
+            .replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss'))
+
+_NAME_WORD = re.compile(r'[A-ZÄÖÜ]?[a-zäöüß]+|[A-ZÄÖÜ]+(?![a-zäöüß])|\d+')
+
+def name_words(name: str) -> List[str]:
+    """Folded words of a placeholder name ('kundenNr_Datum' -> ['kunden', 'nr', 'datum'])"""
+    return [fold(word) for word in _NAME_WORD.findall(name or '')]
+
+def patterns_for_placeholder(placeholder: Dict[str, Any]) -> List[str]:
+    """Names of the FIELD_PATTERNS matching values a placeholder asks for
+
+    Args:
+        placeholder: Placeholder definition with name, type and description
+
+    Returns:
+        Pattern names, most specific first
+    """
+    words = name_words(placeholder.get('name', ''))
+    compact = ''.join(words)
+    kinds = [
+        kind for kind, fragments in NAME_HINTS
+        if any(any(word.startswith(fragment) for word in words) or (len(fragment) >= 5 and fragment in compact)
+               for fragment in fragments)
+    ]
+    for kind in TYPE_HINTS.get(placeholder.get('type', 'text'), ()):
+        if kind not in kinds:
+            kinds.append(kind)
+    return kinds
@@ -0,0 +1,366 @@
+import os
+import shutil
+import socket
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+from flask import current_app
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Job
+from app.services.config_values import get_config_value
+from app.services.blob_store import blob_store, SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+class JobCancelledError(Exception):
+    """Raised from a progress callback when the job was cancelled"""
+
+class JobService:
+    """Runs long AI agent requests on a local worker pool
+
+    Job state lives in the jobs table so status, per-stage progress and the
+    result can be polled from any request. Uploaded files are spooled to disk
+    before the request returns, because the request's file streams are closed
+    once the response has been sent.
+
+    Several server processes may share the jobs table, so each job records
+    its owning process, which keeps a heartbeat on its queued and running
+    jobs. Only jobs whose owner is gone or whose heartbeat is stale are
+    treated as orphaned.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._futures = {}
+        self._heartbeat = None
+        self._orphans_checked_at = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the job worker pool, created on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    max_workers = max(1, get_config_value('JOB_MAX_WORKERS', 2))
+                    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+                    logger.info("Started job worker pool with %d threads", max_workers)
+        return self._executor
+
+    def _start_heartbeat(self, app) -> None:
+        """Start the thread refreshing the heartbeat of this process's jobs"""
+        with self._executor_lock:
+            if self._heartbeat is not None and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(
+                target=self._heartbeat_loop, args=(app,), name='job-heartbeat', daemon=True
+            )
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self, app) -> None:
+        with app.app_context():
+            interval = max(1.0, get_config_value('JOB_HEARTBEAT_INTERVAL', 30.0))
+            while True:
+                time.sleep(interval)
+                try:
+                    self.beat()
+                except Exception as e:
+                    logger.warning("Could not refresh job heartbeats: %s", str(e))
+
+    def beat(self) -> int:
+        """Refresh the heartbeat of the unfinished jobs run by this process
+
+        Returns:
+            Number of jobs updated
+        """
+        job_ids = list(self._futures)
+        if not job_ids:
+            return 0
+        with Session(bind=db.engine) as session:
+            updated = session.query(Job).filter(
+                Job.id.in_(job_ids), Job.status.in_(['queued', 'running'])
+            ).update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            session.commit()
+        return updated
+
+    @staticmethod
+    def _owner() -> str:
+        """Identify this server process as host:pid"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _owner_is_gone(job: Job) -> bool:
+        """Whether the process that owns a job has exited
+
+        Only other processes on this host can be checked; jobs of other
+        hosts, and of an earlier process that had this process's pid, are
+        left to the heartbeat timeout.
+        """
+        host, _, pid = (job.owner or '').rpartition(':')
+        if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _get_spool_folder(self, job_id: str) -> str:
+        """Get the directory holding the spooled uploads of a job"""
+        root = get_config_value('JOB_SPOOL_FOLDER', '') or os.path.join(
+            current_app.config.get('INSTANCE_PATH', current_app.instance_path), 'jobs'
+        )
+        return os.path.join(root, job_id)
+
+    def _update_job(self, job_id: str, **changes) -> Optional[Job]:
+        """Apply changes to a job in its own short-lived session
+
+        A separate session keeps job bookkeeping from committing work that the
+        pipeline still has pending in the thread's regular session.
+
+        Args:
+            job_id: Job ID
+            **changes: Column values to set
+
+        Returns:
+            The updated (detached) job, or None if it does not exist
+        """
+        with Session(bind=db.engine, expire_on_commit=False) as session:
+            job = session.get(Job, job_id)
+            if job is None:
+                return None
+            for key, value in changes.items():
+                setattr(job, key, value)
+            session.commit()
+            return job
+
+    def _recover_orphaned_jobs(self) -> None:
+        """Recover orphaned jobs, at most once per heartbeat interval"""
+        now = time.monotonic()
+        interval = get_config_value('JOB_HEARTBEAT_INTERVAL', 30.0)
+        if self._orphans_checked_at is not None and now - self._orphans_checked_at < interval:
+            return
+        self._orphans_checked_at = now
+        self.recover_orphaned_jobs()
+
+    def recover_orphaned_jobs(self) -> int:
+        """Fail queued or running jobs whose server process is gone
+
+        A job is orphaned when its owner is a process on this host that has
+        exited, or when its heartbeat (for jobs from before owners were
+        recorded, its last update) is older than JOB_HEARTBEAT_TIMEOUT.
+        Jobs of live processes, including other workers sharing the
+        database, are left alone.
+
+        Returns:
+            Number of jobs marked as failed
+        """
+        timeout = get_config_value('JOB_HEARTBEAT_TIMEOUT', 120.0)
+        stale_before = datetime.utcnow() - timedelta(seconds=timeout)
+
+        orphaned = []
+        for job in Job.query.filter(Job.status.in_(['queued', 'running'])).all():
+            if job.id in self._futures:
+                continue
+            last_seen = job.heartbeat_at or job.updated_at or job.created_at
+            if self._owner_is_gone(job) or last_seen is None or last_seen < stale_before:
+                orphaned.append(job)
+        for job in orphaned:
+            job.status = 'failed'
+            job.error = 'Job was interrupted by a server restart'
+            job.finished_at = datetime.utcnow()
+            shutil.rmtree(self._get_spool_folder(job.id), ignore_errors=True)
+        if orphaned:
+            db.session.commit()
+            logger.warning("Marked %d orphaned jobs as failed", len(orphaned))
+        return len(orphaned)
+
+    def submit(
+        self,
+        job_type: str,
+        func: Callable[..., Dict[str, Any]],
+        uploaded_files: List[Any],
+        **kwargs
+    ) -> Job:
+        """Spool uploaded files and queue a pipeline run
+
+        Args:
+            job_type: Job type name, e.g. 'process_documents'
+            func: Pipeline function accepting uploaded_files, progress_callback and kwargs
+            uploaded_files: Uploaded file objects (werkzeug FileStorage)
+            **kwargs: Additional keyword arguments for func
+
+        Returns:
+            The queued job
+        """
+        self._recover_orphaned_jobs()
+        self.purge_finished_jobs()
+
+        job = Job(
+            job_type=job_type, status='queued', progress={}, owner=self._owner(), heartbeat_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.flush()
+
+        spool_folder = self._get_spool_folder(job.id)
+        os.makedirs(spool_folder, exist_ok=True)
+        spooled_files = []
+        for file in uploaded_files:
+            if not file or not file.filename:
+                continue
+            # Hashed while spooling, so storing the upload later needs no second pass
+            upload = blob_store.spool(file, folder=spool_folder)
+            upload.stream.close()
+            spooled_files.append({
+                'path': upload.path,
+                'filename': upload.filename,
+                'content_type': upload.content_type,
+                'sha256': upload.sha256,
+                'size': upload.size
+            })
+
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        self._start_heartbeat(app)
+        self._futures[job.id] = self._get_executor().submit(
+            self._run, app, job.id, func, spooled_files, kwargs
+        )
+        logger.info("Queued %s job %s with %d files", job_type, job.id, len(spooled_files))
+        return job
+
+    def _run(
+        self,
+        app,
+        job_id: str,
+        func: Callable[..., Dict[str, Any]],
+        spooled_files: List[Dict[str, Any]],
+        kwargs: Dict[str, Any]
+    ) -> None:
+        """Execute a job on a worker thread"""
+        with app.app_context():
+            files = []
+            try:
+                job = self._update_job(job_id)
+                if job is None:
+                    return
+                if job.cancel_requested:
+                    self._update_job(job_id, status='cancelled', finished_at=datetime.utcnow())
+                    return
+
+                self._update_job(job_id, status='running', started_at=datetime.utcnow())
+                progress = {}
+
+                def progress_callback(stage: str) -> None:
+                    job = self._update_job(job_id)
+                    if job is not None and job.cancel_requested:
+                        raise JobCancelledError(job_id)
+                    for name, state in progress.items():
+                        if state == 'running':
+                            progress[name] = 'done'
+                    progress[stage] = 'running'
+                    self._update_job(job_id, stage=stage, progress=dict(progress))
+
+                for spooled in spooled_files:
+                    # The spool folder is removed with the job, not by the upload
+                    files.append(SpooledUpload(owned=False, **spooled))
+
+                result = func(uploaded_files=files, progress_callback=progress_callback, **kwargs)
+
+                for name in progress:
+                    progress[name] = 'done'
+                success = bool(result.get('success'))
+                self._update_job(
+                    job_id,
+                    status='completed' if success else 'failed',
+                    progress=progress,
+                    result=result,
+                    error=None if success else result.get('error'),
+                    finished_at=datetime.utcnow()
+                )
+                logger.info("Job %s finished with status %s", job_id, 'completed' if success else 'failed')
+
+            except JobCancelledError:
+                db.session.rollback()
+                self._update_job(job_id, status='cancelled', finished_at=datetime.utcnow())
+                logger.info("Job %s was cancelled", job_id)
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Job %s failed: %s", job_id, str(e), exc_info=True)
+                self._update_job(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+
+            finally:
+                for file in files:
+                    file.release()
+                shutil.rmtree(self._get_spool_folder(job_id), ignore_errors=True)
+                self._futures.pop(job_id, None)
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job or None if not found
+        """
+        self._recover_orphaned_jobs()
+        return Job.query.get(job_id)
+
+    def cancel_job(self, job_id: str) -> Optional[Job]:
+        """Request cancellation of a job
+
+        Queued jobs are cancelled immediately; running jobs stop at the next
+        pipeline stage boundary.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Updated job or None if not found
+        """
+        job = Job.query.get(job_id)
+        if job is None or job.is_finished:
+            return job
+
+        job.cancel_requested = True
+        future = self._futures.get(job_id)
+        if job.status == 'queued' and future is not None and future.cancel():
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+            shutil.rmtree(self._get_spool_folder(job_id), ignore_errors=True)
+            self._futures.pop(job_id, None)
+        db.session.commit()
+        logger.info("Cancellation requested for job %s", job_id)
+        return job
+
+    def purge_finished_jobs(self, retention_hours: Optional[float] = None) -> int:
+        """Delete finished jobs older than the retention period
+
+        Args:
+            retention_hours: Retention in hours (default: JOB_RETENTION_HOURS)
+
+        Returns:
+            Number of deleted jobs
+        """
+        if retention_hours is None:
+            retention_hours = get_config_value('JOB_RETENTION_HOURS', 24.0)
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+
+        deleted = Job.query.filter(
+            Job.status.in_(Job.FINISHED_STATUSES),
+            Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            logger.info("Purged %d finished jobs older than %s hours", deleted, retention_hours)
+        return deleted
+
+# Singleton instance
+job_service = JobService()
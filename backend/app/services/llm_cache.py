@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """Two-tier cache for deterministic LLM responses
+
+    Responses are keyed by a SHA-256 hash of (model, system prompt, prompt,
+    sampling parameters). The first tier is an in-memory LRU, the second an
+    SQLite file that survives restarts. Both tiers are bounded by size in bytes
+    and evict the least recently used entries first.
+    """
+
+    def __init__(self, db_path: str, max_memory_bytes: int = 8 * 1024 * 1024, max_disk_bytes: int = 64 * 1024 * 1024):
+        """Initialize the cache
+
+        Args:
+            db_path: Path of the SQLite file for the on-disk tier
+            max_memory_bytes: Size budget of the in-memory tier
+            max_disk_bytes: Size budget of the on-disk tier
+        """
+        self.db_path = db_path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()  # key -> (model, serialized response)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._disk_bytes = 0
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, params: Dict[str, Any]) -> str:
+        """Build the content-addressed cache key for a request
+
+        Args:
+            model: Model name
+            system_prompt: Optional system prompt
+            prompt: User prompt
+            params: Sampling parameters (temperature, max tokens, ...)
+
+        Returns:
+            Hex encoded SHA-256 digest
+        """
+        material = json.dumps([model, system_prompt or '', prompt, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the on-disk tier, creating the schema on first use"""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_llm_responses_model ON llm_responses (model)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_llm_responses_last_access ON llm_responses (last_access)')
+            self._disk_bytes = connection.execute('SELECT COALESCE(SUM(size), 0) FROM llm_responses').fetchone()[0]
+            self._connection = connection
+            logger.info("LLM response cache opened at %s (%d bytes)", self.db_path, self._disk_bytes)
+        return self._connection
+
+    def _remember(self, key: str, model: str, serialized: str) -> None:
+        """Put an entry into the in-memory tier and evict down to the size budget"""
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[1])
+        self._memory[key] = (model, serialized)
+        self._memory_bytes += len(serialized)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Cached response dictionary or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return json.loads(entry[1])
+
+            try:
+                connection = self._get_connection()
+                row = connection.execute('SELECT model, response FROM llm_responses WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    connection.execute('UPDATE llm_responses SET last_access = ? WHERE key = ?', (time.time(), key))
+                    self._remember(key, row[0], row[1])
+                    self.stats['disk_hits'] += 1
+                    return json.loads(row[1])
+            except sqlite3.Error as e:
+                logger.warning("LLM response cache lookup failed: %s", str(e))
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, model: str, response: Dict[str, Any]) -> None:
+        """Store a response in both tiers
+
+        Args:
+            key: Cache key from make_key()
+            model: Model that produced the response (used for invalidation)
+            response: Response dictionary
+        """
+        serialized = json.dumps(response, ensure_ascii=False)
+        size = len(serialized.encode('utf-8'))
+
+        with self._lock:
+            self._remember(key, model, serialized)
+            self.stats['stores'] += 1
+
+            if size > self.max_disk_bytes:
+                return
+
+            try:
+                connection = self._get_connection()
+                now = time.time()
+                previous = connection.execute('SELECT size FROM llm_responses WHERE key = ?', (key,)).fetchone()
+                connection.execute(
+                    'INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, model, serialized, size, now, now)
+                )
+                self._disk_bytes += size - (previous[0] if previous else 0)
+                self._evict_disk(connection)
+            except sqlite3.Error as e:
+                logger.warning("LLM response cache store failed: %s", str(e))
+
+    def _evict_disk(self, connection: sqlite3.Connection) -> None:
+        """Delete least recently used rows until the disk tier fits its budget"""
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = connection.execute(
+                'SELECT key, size FROM llm_responses ORDER BY last_access LIMIT 32'
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                return
+            for key, size in rows:
+                connection.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                self._disk_bytes -= size
+                self.stats['evictions'] += 1
+                if self._disk_bytes <= self.max_disk_bytes:
+                    return
+
+    def invalidate_model(self, model: str) -> int:
+        """Remove every cached response of a model from both tiers
+
+        Args:
+            model: Model name
+
+        Returns:
+            Number of removed on-disk entries
+        """
+        with self._lock:
+            for key in [k for k, (m, _) in self._memory.items() if m == model]:
+                self._memory_bytes -= len(self._memory.pop(key)[1])
+
+            connection = self._get_connection()
+            freed = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses WHERE model = ?', (model,)).fetchone()
+            connection.execute('DELETE FROM llm_responses WHERE model = ?', (model,))
+            self._disk_bytes -= freed[1]
+            logger.info("Invalidated %d cached LLM responses for model %s", freed[0], model)
+            return freed[0]
+
+    def clear(self) -> None:
+        """Remove all cached responses"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._get_connection().execute('DELETE FROM llm_responses')
+            self._disk_bytes = 0
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get hit/miss counters and tier sizes
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        return {
+            'llm_cache_memory_hits_total': self.stats['memory_hits'],
+            'llm_cache_disk_hits_total': self.stats['disk_hits'],
+            'llm_cache_misses_total': self.stats['misses'],
+            'llm_cache_stores_total': self.stats['stores'],
+            'llm_cache_evictions_total': self.stats['evictions'],
+            'llm_cache_memory_entries': len(self._memory),
+            'llm_cache_memory_bytes': self._memory_bytes,
+            'llm_cache_disk_bytes': self._disk_bytes,
+            'llm_cache_hit_ratio': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Close the on-disk tier"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
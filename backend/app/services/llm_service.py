@@ -1,9 +1,90 @@
 import requests
 import json
 import os
-import re
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Iterator, Callable
 from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.services.config_values import get_config_value
+from app.services.llm_cache import LLMResponseCache
+from app.services.concurrency import map_llm_calls
+from app.services.passage_retrieval import passage_retriever
+from app.services.rule_extractors import rule_extractors
+from app.services.validation import extract_json, strip_thinking, validate_values
+from app.services.text_chunking import estimate_tokens, split_into_windows, merge_extractions, as_confidence
+
+class ThinkTagFilter:
+    """Incrementally removes <think>...</think> blocks from streamed text
+    
+    Text outside thinking blocks is released as soon as it can no longer be the
+    start of a tag, so the first useful characters are not held back until the
+    whole response has arrived.
+    """
+    
+    OPEN_TAG = '<think>'
+    CLOSE_TAG = '</think>'
+    
+    def __init__(self):
+        self._buffer = ''
+        self._inside = False
+        self._strip_leading = True
+    
+    def _partial_tag_length(self, text: str, tag: str) -> int:
+        """Length of the longest suffix of text that is a prefix of tag"""
+        lowered = text[-len(tag):].lower()
+        for length in range(min(len(tag) - 1, len(lowered)), 0, -1):
+            if lowered.endswith(tag[:length]):
+                return length
+        return 0
+    
+    def _release(self, text: str) -> str:
+        """Drop whitespace that directly follows a thinking block"""
+        if self._strip_leading:
+            text = text.lstrip()
+            if text:
+                self._strip_leading = False
+        return text
+    
+    def feed(self, chunk: str) -> str:
+        """Add a streamed chunk and return the text that is safe to emit
+        
+        Args:
+            chunk: Next piece of the raw model output
+            
+        Returns:
+            Visible text (may be empty)
+        """
+        self._buffer += chunk
+        output = []
+        while self._buffer:
+            if self._inside:
+                index = self._buffer.lower().find(self.CLOSE_TAG)
+                if index < 0:
+                    keep = self._partial_tag_length(self._buffer, self.CLOSE_TAG)
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                self._buffer = self._buffer[index + len(self.CLOSE_TAG):]
+                self._inside = False
+                self._strip_leading = True
+            else:
+                index = self._buffer.lower().find(self.OPEN_TAG)
+                if index < 0:
+                    keep = self._partial_tag_length(self._buffer, self.OPEN_TAG)
+                    output.append(self._release(self._buffer[:len(self._buffer) - keep]))
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                output.append(self._release(self._buffer[:index]))
+                self._buffer = self._buffer[index + len(self.OPEN_TAG):]
+                self._inside = True
+        return ''.join(output)
+    
+    def flush(self) -> str:
+        """Return any buffered text once the stream has ended"""
+        text = '' if self._inside else self._release(self._buffer)
+        self._buffer = ''
+        return text
 
 class OllamaService:
     """Service for interacting with Ollama LLM API"""
@@ -16,6 +97,30 @@ class OllamaService:
         """
         self.base_url = None  # Will be set when used within application context
         
+        # Pooled HTTP session shared by all request threads (created lazily)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._timeouts = (3.05, 300.0)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        
+        # Caps concurrent generate/chat calls so parallel callers don't overload Ollama
+        self._generation_slots = None
+        
+        # Cached status/model catalogue shared by all callers
+        self._catalogue = None
+        self._catalogue_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        
+        # Opt-in response cache for deterministic prompts (created lazily)
+        self._response_cache = None
+        
+        # Trained context length per model, from /api/show
+        self._context_lengths = {}
+        # Time of the last failed /api/show per model, so the fallback is cached briefly
+        self._context_length_misses = {}
+        
     def _clean_thinking_tags(self, text: str) -> str:
         """Remove <think>...</think> tags from LLM responses and return only the content after them
         
@@ -25,23 +130,7 @@ class OllamaService:
         Returns:
             Cleaned text with thinking tags removed
         """
-        if not text:
-            return text
-            
-        # Remove <think>...</think> blocks and everything before the last closing tag
-        think_pattern = r'<think>.*?</think>\s*'
-        
-        # Find all thinking blocks
-        matches = list(re.finditer(think_pattern, text, re.DOTALL | re.IGNORECASE))
-        
-        if matches:
-            # Get the position after the last thinking block
-            last_match = matches[-1]
-            # Return everything after the last thinking block
-            cleaned_text = text[last_match.end():].strip()
-            return cleaned_text if cleaned_text else text
-        
-        return text
+        return strip_thinking(text)
         
     def _get_base_url(self) -> str:
         """Get the base URL for Ollama API, using application config if available"""
@@ -52,6 +141,190 @@ class OllamaService:
                 # Not in application context, use environment variable
                 return os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
         return self.base_url
+    
+    def _get_session(self) -> requests.Session:
+        """Get the pooled keep-alive session, creating it on first use
+        
+        The session keeps connections to Ollama open between calls and retries
+        connection errors with exponential backoff. Pool size, timeouts and retry
+        behaviour are read from the application config once.
+        
+        Returns:
+            Shared requests session
+        """
+        if self._session is not None:
+            return self._session
+        
+        with self._session_lock:
+            if self._session is None:
+                pool_size = get_config_value('OLLAMA_POOL_SIZE', 10)
+                max_retries = get_config_value('OLLAMA_MAX_RETRIES', 3)
+                backoff = get_config_value('OLLAMA_RETRY_BACKOFF', 0.5)
+                self._timeouts = (
+                    get_config_value('OLLAMA_CONNECT_TIMEOUT', 3.05),
+                    get_config_value('OLLAMA_READ_TIMEOUT', 300.0)
+                )
+                
+                # Only retry failures to establish a connection - generate/chat
+                # calls are not idempotent once the request has been sent
+                retry = Retry(
+                    total=max_retries,
+                    connect=max_retries,
+                    read=0,
+                    status=0,
+                    redirect=0,
+                    other=0,
+                    backoff_factor=backoff
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=pool_size,
+                    max_retries=retry,
+                    pool_block=False
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+        return self._session
+    
+    def _request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[Tuple[float, float]] = None,
+        **kwargs
+    ) -> requests.Response:
+        """Send a request to the Ollama API over the pooled session
+        
+        Args:
+            method: HTTP method
+            path: API path, e.g. '/api/tags'
+            timeout: (connect, read) timeout tuple, defaults to the configured timeouts
+            **kwargs: Additional arguments passed to requests
+            
+        Returns:
+            HTTP response
+        """
+        session = self._get_session()
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            return session.request(
+                method,
+                f"{self._get_base_url()}{path}",
+                timeout=timeout or self._timeouts,
+                **kwargs
+            )
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+    
+    def _get_generation_slots(self) -> threading.BoundedSemaphore:
+        """Get the semaphore bounding concurrent generate/chat requests"""
+        if self._generation_slots is None:
+            with self._session_lock:
+                if self._generation_slots is None:
+                    self._generation_slots = threading.BoundedSemaphore(
+                        max(1, get_config_value('OLLAMA_MAX_CONCURRENCY', 2))
+                    )
+        return self._generation_slots
+    
+    def _probe_timeout(self, read_timeout: float) -> Tuple[float, float]:
+        """Short timeout for status probes that should never block a request"""
+        self._get_session()
+        return (self._timeouts[0], read_timeout)
+    
+    def get_pool_metrics(self) -> Dict[str, float]:
+        """Get connection pool metrics for the Ollama HTTP session
+        
+        Returns:
+            Dictionary with open/idle connection counts, request totals and reuse ratio
+        """
+        metrics = {
+            'ollama_http_pool_size': 0,
+            'ollama_http_open_connections': 0,
+            'ollama_http_idle_connections': 0,
+            'ollama_http_in_flight_requests': self._in_flight,
+            'ollama_http_connections_created_total': 0,
+            'ollama_http_requests_total': 0,
+            'ollama_http_connection_reuse_ratio': 0.0
+        }
+        
+        if self._session is None:
+            return metrics
+        
+        adapter = self._session.get_adapter('http://')
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            metrics['ollama_http_pool_size'] += pool.pool.maxsize if pool.pool else 0
+            metrics['ollama_http_idle_connections'] += idle
+            metrics['ollama_http_connections_created_total'] += pool.num_connections
+            metrics['ollama_http_requests_total'] += pool.num_requests
+        
+        metrics['ollama_http_open_connections'] = metrics['ollama_http_idle_connections'] + self._in_flight
+        if metrics['ollama_http_requests_total']:
+            metrics['ollama_http_connection_reuse_ratio'] = round(
+                1.0 - metrics['ollama_http_connections_created_total'] / metrics['ollama_http_requests_total'], 4
+            )
+        return metrics
+    
+    def close(self) -> None:
+        """Close the pooled session, kept-alive connections and the response cache"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._response_cache is not None:
+                self._response_cache.close()
+                self._response_cache = None
+        
+    def get_response_cache(self) -> Optional[LLMResponseCache]:
+        """Get the LLM response cache, or None when it is disabled
+        
+        Returns:
+            Shared response cache instance
+        """
+        if not get_config_value('LLM_CACHE_ENABLED', True):
+            return None
+        
+        if self._response_cache is None:
+            with self._session_lock:
+                if self._response_cache is None:
+                    instance_path = get_config_value(
+                        'INSTANCE_PATH',
+                        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance')
+                    )
+                    self._response_cache = LLMResponseCache(
+                        db_path=get_config_value('LLM_CACHE_PATH', None) or os.path.join(instance_path, 'llm_cache.sqlite3'),
+                        max_memory_bytes=get_config_value('LLM_CACHE_MEMORY_BYTES', 8 * 1024 * 1024),
+                        max_disk_bytes=get_config_value('LLM_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+                    )
+        return self._response_cache
+    
+    def invalidate_cached_responses(self, model: str) -> int:
+        """Drop all cached responses of a model, e.g. after it was re-pulled
+        
+        Args:
+            model: Model name
+            
+        Returns:
+            Number of removed on-disk entries
+        """
+        cache = self.get_response_cache()
+        return cache.invalidate_model(model) if cache is not None else 0
+    
+    def get_cache_metrics(self) -> Dict[str, float]:
+        """Get response cache hit/miss counters
+        
+        Returns:
+            Dictionary of metric name to value (empty before first use)
+        """
+        return self._response_cache.get_metrics() if self._response_cache is not None else {}
         
     def _get_default_model(self) -> str:
         """Get the default model from application config if available"""
@@ -61,83 +334,233 @@ class OllamaService:
             # Not in application context, use environment variable
             return os.getenv("DEFAULT_LLM_MODEL", "qwen3:0.6b")
     
-    def is_ollama_available(self) -> bool:
-        """Check if Ollama is installed and running
+    def get_context_length(self, model: str = None) -> int:
+        """Get the context window used for prompts to a model
+        
+        The model's trained context length is read from /api/show once per model
+        and capped at LLM_NUM_CTX, the context Ollama is asked to allocate. When
+        it cannot be read, LLM_NUM_CTX is used and the lookup is not retried for
+        OLLAMA_STATUS_NEGATIVE_TTL seconds.
         
+        Args:
+            model: Model name (default: from config)
+            
         Returns:
-            True if Ollama is available, False otherwise
+            Context length in tokens
         """
-        try:
-            response = requests.get(f"{self._get_base_url()}/api/tags", timeout=5)
-            return response.status_code == 200
-        except Exception as e:
-            current_app.logger.debug(f"Ollama not available: {str(e)}")
-            return False
+        model = model or self._get_default_model()
+        num_ctx = get_config_value('LLM_NUM_CTX', 4096)
+        if model not in self._context_lengths:
+            missed_at = self._context_length_misses.get(model)
+            if missed_at is not None and time.monotonic() - missed_at < get_config_value('OLLAMA_STATUS_NEGATIVE_TTL', 5.0):
+                return num_ctx
+            try:
+                response = self._request('POST', '/api/show', json={'model': model}, timeout=self._probe_timeout(10.0))
+                response.raise_for_status()
+                model_info = response.json().get('model_info') or {}
+                lengths = [value for key, value in model_info.items() if key.endswith('.context_length')]
+                if not lengths:
+                    raise ValueError("no context length in model info")
+                self._context_lengths[model] = int(lengths[0])
+            except (requests.RequestException, ValueError) as e:
+                current_app.logger.warning(f"Could not read context length of {model}: {str(e)}")
+                self._context_length_misses[model] = time.monotonic()
+                return num_ctx
+            self._context_length_misses.pop(model, None)
+        return min(num_ctx, self._context_lengths[model])
     
-    def get_ollama_status(self) -> Dict[str, Any]:
-        """Get comprehensive Ollama status information
+    def document_windows(
+        self,
+        document_text: str,
+        prompt: str,
+        max_tokens: int,
+        model: str = None,
+        truncate_chars: int = 4000
+    ) -> Tuple[List[str], Optional[int]]:
+        """Split a document into the windows sent with one prompt each
+        
+        In the default 'chunked' LLM_EXTRACTION_MODE every window fits into the
+        model's context together with the prompt and the answer, and windows
+        overlap by LLM_CHUNK_OVERLAP_TOKENS. In 'truncate' mode only the first
+        truncate_chars characters are used, as before.
         
+        Args:
+            document_text: Full document text
+            prompt: System and user prompt without the document text
+            max_tokens: Tokens reserved for the answer
+            model: Model name (default: from config)
+            truncate_chars: Characters kept in 'truncate' mode
+            
         Returns:
-            Dictionary with installation status, version, and available models
+            Tuple of (windows, num_ctx to request or None for the Ollama default)
         """
-        status = {
+        if get_config_value('LLM_EXTRACTION_MODE', 'chunked') == 'truncate':
+            return [document_text[:truncate_chars]], None
+        
+        chars_per_token = get_config_value('LLM_CHARS_PER_TOKEN', 3.5)
+        context_length = self.get_context_length(model)
+        # Keep a margin for the estimate being off and the chat template tokens
+        budget = int(context_length * 0.9) - max_tokens - estimate_tokens(prompt, chars_per_token)
+        window_chars = int(max(budget, 256) * chars_per_token)
+        overlap_chars = int(get_config_value('LLM_CHUNK_OVERLAP_TOKENS', 200) * chars_per_token)
+        windows = split_into_windows(document_text, window_chars, overlap_chars)
+        
+        max_chunks = get_config_value('LLM_MAX_CHUNKS', 16)
+        if len(windows) > max_chunks:
+            current_app.logger.warning(
+                f"Document needs {len(windows)} windows of {window_chars} characters, "
+                f"only the first {max_chunks} are sent (LLM_MAX_CHUNKS)"
+            )
+            windows = windows[:max_chunks]
+        return windows, context_length
+    
+    def _fetch_catalogue(self) -> Dict[str, Any]:
+        """Fetch Ollama status, version and model list in a single pass
+        
+        Returns:
+            Snapshot dictionary with status, models and their text/image categorisation
+        """
+        snapshot = {
             'installed': False,
             'version': None,
             'models': [],
-            'error': None
+            'error': None,
+            'categorized': {'text': [], 'image': []},
+            'fetched_at': time.monotonic()
         }
         
         try:
             # Check if Ollama is available
-            response = requests.get(f"{self._get_base_url()}/api/tags", timeout=5)
+            response = self._request('GET', '/api/tags', timeout=self._probe_timeout(5))
             if response.status_code == 200:
-                status['installed'] = True
-                status['models'] = response.json().get("models", [])
+                snapshot['installed'] = True
+                snapshot['models'] = response.json().get("models", [])
                 
                 # Try to get version information
                 try:
-                    version_response = requests.get(f"{self._get_base_url()}/api/version", timeout=3)
+                    version_response = self._request('GET', '/api/version', timeout=self._probe_timeout(3))
                     if version_response.status_code == 200:
-                        status['version'] = version_response.json().get('version', 'unknown')
+                        snapshot['version'] = version_response.json().get('version', 'unknown')
                 except Exception:
                     pass  # Version endpoint might not be available in all versions
                     
             else:
-                status['error'] = f"Ollama responded with status {response.status_code}"
+                snapshot['error'] = f"Ollama responded with status {response.status_code}"
                 
         except requests.exceptions.ConnectionError:
-            status['error'] = "Cannot connect to Ollama. Please ensure Ollama is installed and running."
+            snapshot['error'] = "Cannot connect to Ollama. Please ensure Ollama is installed and running."
         except requests.exceptions.Timeout:
-            status['error'] = "Timeout connecting to Ollama."
+            snapshot['error'] = "Timeout connecting to Ollama."
         except Exception as e:
-            status['error'] = f"Error checking Ollama status: {str(e)}"
-            
-        return status
+            snapshot['error'] = f"Error checking Ollama status: {str(e)}"
+        
+        if snapshot['error']:
+            current_app.logger.debug(f"Ollama not available: {snapshot['error']}")
+        
+        snapshot['categorized'] = self._categorize(snapshot['models'])
+        return snapshot
     
-    def get_models(self) -> List[Dict[str, Any]]:
-        """Get list of available models
+    def _catalogue_ttl(self, snapshot: Dict[str, Any]) -> float:
+        """TTL for a snapshot - failed probes expire sooner so recovery is noticed quickly"""
+        if snapshot['installed']:
+            return get_config_value('OLLAMA_STATUS_TTL', 30.0)
+        return get_config_value('OLLAMA_STATUS_NEGATIVE_TTL', 5.0)
+    
+    def _get_catalogue(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """Get the cached status/model snapshot, refreshing it when it expired
+        
+        Fresh snapshots are returned directly. Snapshots that expired less than
+        OLLAMA_STATUS_STALE_TTL seconds ago are returned as-is while a background
+        thread refreshes them. Older or missing snapshots are fetched synchronously,
+        with concurrent callers waiting for a single fetch.
         
+        Args:
+            force_refresh: Bypass the cache and fetch a new snapshot
+            
         Returns:
-            List of model information dictionaries
+            Snapshot dictionary
         """
+        snapshot = self._catalogue
+        if snapshot and not force_refresh:
+            age = time.monotonic() - snapshot['fetched_at']
+            ttl = self._catalogue_ttl(snapshot)
+            if age < ttl:
+                return snapshot
+            if snapshot['installed'] and age < ttl + get_config_value('OLLAMA_STATUS_STALE_TTL', 60.0):
+                self._refresh_catalogue_in_background()
+                return snapshot
+        
+        with self._catalogue_lock:
+            # Another thread may have refreshed the snapshot while we waited
+            current = self._catalogue
+            if current is not None and current is not snapshot and not force_refresh:
+                return current
+            self._catalogue = self._fetch_catalogue()
+            return self._catalogue
+    
+    def _refresh_catalogue_in_background(self) -> None:
+        """Start a single background refresh of the catalogue snapshot"""
         try:
-            response = requests.get(f"{self._get_base_url()}/api/tags")
-            if response.status_code == 200:
-                return response.json().get("models", [])
-            else:
-                current_app.logger.error(f"Failed to get models: {response.text}")
-                return []
-        except Exception as e:
-            current_app.logger.error(f"Error fetching models: {str(e)}")
-            return []
+            app = current_app._get_current_object()
+        except RuntimeError:
+            return
+        
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            
+            def refresh():
+                with app.app_context():
+                    snapshot = self._fetch_catalogue()
+                    with self._catalogue_lock:
+                        self._catalogue = snapshot
+            
+            self._refresh_thread = threading.Thread(target=refresh, name='ollama-catalogue-refresh', daemon=True)
+            self._refresh_thread.start()
     
-    def categorize_models(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Categorize available models into text and image models
+    def invalidate_catalogue(self) -> None:
+        """Drop the cached status/model snapshot so the next call probes Ollama again"""
+        self._catalogue = None
+    
+    def is_ollama_available(self) -> bool:
+        """Check if Ollama is installed and running
         
         Returns:
-            Dictionary with 'text' and 'image' keys containing respective model lists
+            True if Ollama is available, False otherwise
         """
-        models = self.get_models()
+        return self._get_catalogue()['installed']
+    
+    def get_ollama_status(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """Get comprehensive Ollama status information
+        
+        Args:
+            force_refresh: Bypass the cached snapshot
+            
+        Returns:
+            Dictionary with installation status, version, and available models
+        """
+        snapshot = self._get_catalogue(force_refresh)
+        return {
+            'installed': snapshot['installed'],
+            'version': snapshot['version'],
+            'models': list(snapshot['models']),
+            'error': snapshot['error']
+        }
+    
+    def get_models(self) -> List[Dict[str, Any]]:
+        """Get list of available models
+        
+        Returns:
+            List of model information dictionaries
+        """
+        snapshot = self._get_catalogue()
+        if snapshot['error']:
+            current_app.logger.error(f"Error fetching models: {snapshot['error']}")
+        return list(snapshot['models'])
+    
+    @staticmethod
+    def _categorize(models: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Split a model list into text and image models"""
         categorized = {
             'text': [],
             'image': []
@@ -159,6 +582,15 @@ class OllamaService:
         
         return categorized
     
+    def categorize_models(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Categorize available models into text and image models
+        
+        Returns:
+            Dictionary with 'text' and 'image' keys containing respective model lists
+        """
+        categorized = self._get_catalogue()['categorized']
+        return {key: list(models) for key, models in categorized.items()}
+    
     def get_recommended_models(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get recommended models for different performance levels
         
@@ -187,7 +619,9 @@ class OllamaService:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 500,
-        stream: bool = False
+        stream: bool = False,
+        use_cache: bool = False,
+        num_ctx: Optional[int] = None
     ) -> Dict[str, Any]:
         """Generate text completion using Ollama API
         
@@ -198,15 +632,27 @@ class OllamaService:
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
             stream: Whether to stream the response
+            use_cache: Serve identical non-streaming requests from the response cache
+            num_ctx: Context window to allocate (default: the model's Ollama default)
             
         Returns:
             API response containing generated text and metadata
         """
-        url = f"{self._get_base_url()}/api/generate"
-        
         if model is None:
             model = self._get_default_model()
         
+        cache = self.get_response_cache() if use_cache and not stream else None
+        cache_key = None
+        if cache is not None:
+            parameters = {"temperature": temperature, "num_predict": max_tokens}
+            if num_ctx:
+                parameters["num_ctx"] = num_ctx
+            cache_key = cache.make_key(model, system_prompt, prompt, parameters)
+            cached_response = cache.get(cache_key)
+            if cached_response is not None:
+                cached_response["cache_hit"] = True
+                return cached_response
+        
         payload = {
             "model": model,
             "prompt": prompt,
@@ -217,9 +663,12 @@ class OllamaService:
         
         if system_prompt:
             payload["system"] = system_prompt
+        if num_ctx:
+            payload["options"] = {"num_ctx": num_ctx}
             
         try:
-            response = requests.post(url, json=payload)
+            with self._get_generation_slots():
+                response = self._request('POST', '/api/generate', json=payload, stream=stream)
             
             if response.status_code == 200:
                 if stream:
@@ -228,17 +677,92 @@ class OllamaService:
                 # Clean thinking tags from the response
                 if "response" in response_data:
                     response_data["response"] = self._clean_thinking_tags(response_data["response"])
+                if cache is not None:
+                    cache.put(cache_key, model, response_data)
                 return response_data
             else:
                 error_msg = f"Ollama API error: {response.status_code} - {response.text}"
                 current_app.logger.error(error_msg)
+                self.invalidate_catalogue()
                 return {"error": error_msg}
                 
         except Exception as e:
             error_msg = f"Failed to communicate with Ollama: {str(e)}"
             current_app.logger.error(error_msg)
+            self.invalidate_catalogue()
             return {"error": error_msg}
     
+    def stream_completion(
+        self,
+        prompt: str,
+        model: str = None,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        num_ctx: Optional[int] = None
+    ) -> Iterator[str]:
+        """Stream a text completion with thinking blocks removed on the fly
+        
+        Args:
+            prompt: The user prompt to generate completion for
+            model: Model name to use (default: from config)
+            system_prompt: Optional system prompt to set context
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            num_ctx: Context window to allocate (default: the model's Ollama default)
+            
+        Yields:
+            Visible text chunks as they are generated
+            
+        Raises:
+            RuntimeError: If Ollama returns an error or cannot be reached
+        """
+        if model is None:
+            model = self._get_default_model()
+        
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "temperature": temperature,
+            "num_predict": max_tokens,
+            "stream": True
+        }
+        
+        if system_prompt:
+            payload["system"] = system_prompt
+        if num_ctx:
+            payload["options"] = {"num_ctx": num_ctx}
+        
+        think_filter = ThinkTagFilter()
+        # Hold a generation slot for the whole stream, not just until the headers arrive
+        with self._get_generation_slots():
+            try:
+                response = self._request('POST', '/api/generate', json=payload, stream=True)
+            except requests.RequestException as e:
+                self.invalidate_catalogue()
+                raise RuntimeError(f"Failed to communicate with Ollama: {str(e)}") from e
+            
+            with response:
+                if response.status_code != 200:
+                    self.invalidate_catalogue()
+                    raise RuntimeError(f"Ollama API error: {response.status_code} - {response.text}")
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"Ollama API error: {chunk['error']}")
+                    text = think_filter.feed(chunk.get("response", ""))
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        break
+        
+        text = think_filter.flush()
+        if text:
+            yield text
+    
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -259,8 +783,6 @@ class OllamaService:
         Returns:
             API response containing generated chat completion
         """
-        url = f"{self._get_base_url()}/api/chat"
-        
         if model is None:
             model = self._get_default_model()
         
@@ -273,7 +795,8 @@ class OllamaService:
         }
             
         try:
-            response = requests.post(url, json=payload)
+            with self._get_generation_slots():
+                response = self._request('POST', '/api/chat', json=payload, stream=stream)
             
             if response.status_code == 200:
                 if stream:
@@ -286,12 +809,14 @@ class OllamaService:
             else:
                 error_msg = f"Ollama API error: {response.status_code} - {response.text}"
                 current_app.logger.error(error_msg)
+                self.invalidate_catalogue()
                 return {"error": error_msg}
             
                 
         except Exception as e:
             error_msg = f"Failed to communicate with Ollama: {str(e)}"
             current_app.logger.error(error_msg)
+            self.invalidate_catalogue()
             return {"error": error_msg}
         
     def extract_placeholders(self, document: str, placeholders: List[str]) -> Dict[str, Any]:
@@ -320,6 +845,10 @@ class OllamaService:
     ) -> Dict[str, Any]:
         """Extract template placeholders from document text using AI
         
+        Fields a rule extractor resolves with high confidence are filled
+        locally; only the remaining ones are sent to the LLM, and no call is
+        made when none remain.
+        
         Args:
             document_text: The text content of the document
             placeholders: List of placeholder definitions with name, type, required fields
@@ -344,12 +873,60 @@ class OllamaService:
                 "message": "No non-client fields to extract"
             }
         
+        # Fill structured fields (IBANs, dates next to their label, ...) by rule
+        resolved, unresolved = rule_extractors.extract(document_text, non_client_placeholders)
+        rule_values = self._validate_extracted_values(
+            {name: extraction.value for name, extraction in resolved.items()},
+            non_client_placeholders
+        )
+        rule_confidence = {name: resolved[name].confidence for name in rule_values}
+        unresolved += [p for p in non_client_placeholders if p['name'] in resolved and p['name'] not in rule_values]
+        if not unresolved:
+            rule_extractors.record_avoided_call()
+            return {
+                "extracted_values": rule_values,
+                "field_confidence": rule_confidence,
+                "confidence": round(sum(rule_confidence.values()) / len(rule_confidence), 3),
+                "rule_extracted": sorted(rule_values),
+                "llm_skipped": True
+            }
+        
+        # Only the fields the rules left open go to the LLM
+        result = self._extract_placeholders_with_llm(document_text, unresolved, model)
+        if not rule_values:
+            return result
+        field_confidence = dict(result.get("field_confidence") or {})
+        for name in result.get("extracted_values", {}):
+            field_confidence.setdefault(name, result.get("confidence", 0.0))
+        field_confidence.update(rule_confidence)
+        result["extracted_values"] = {**result.get("extracted_values", {}), **rule_values}
+        result["field_confidence"] = field_confidence
+        result["confidence"] = round(sum(field_confidence.values()) / len(field_confidence), 3)
+        result["rule_extracted"] = sorted(rule_values)
+        return result
+    
+    def _extract_placeholders_with_llm(
+        self,
+        document_text: str,
+        placeholders: List[Dict[str, Any]],
+        model: str
+    ) -> Dict[str, Any]:
+        """Extract placeholders with the LLM, window by window
+        
+        Args:
+            document_text: The text content of the document
+            placeholders: Non-client placeholder definitions to extract
+            model: Model name to use
+            
+        Returns:
+            Dictionary containing extracted values and metadata
+        """
         # Build extraction prompt
         system_prompt = """You are an expert document analyst specializing in extracting specific information from legal and business documents. Your task is to identify and extract only the requested information with high accuracy."""
         
         # Build field descriptions
         field_descriptions = []
-        for placeholder in non_client_placeholders:
+        for placeholder in placeholders:
             field_desc = f"- {placeholder['name']} ({placeholder.get('type', 'text')})"
             if placeholder.get('required'):
                 field_desc += " [REQUIRED]"
@@ -357,7 +934,8 @@ class OllamaService:
                 field_desc += f": {placeholder['description']}"
             field_descriptions.append(field_desc)
         
-        user_prompt = f"""
+        def build_prompt(text: str) -> str:
+            return f"""
 Analyze the following document and extract ONLY the requested information. 
 Return the results in valid JSON format.
 
@@ -365,7 +943,7 @@ FIELDS TO EXTRACT:
 {chr(10).join(field_descriptions)}
 
 DOCUMENT TEXT:
-{document_text[:4000]}  # Limit text to avoid token limits
+{text}
 
 INSTRUCTIONS:
 1. Extract only the specific fields listed above
@@ -381,18 +959,88 @@ Return ONLY a JSON object in this format:
     "field_name": "extracted_value",
     ...
   }},
+  "field_confidence": {{
+    "field_name": 0.9,
+    ...
+  }},
   "confidence": 0.85,
   "notes": "Any relevant observations"
 }}
 """
         
+        # Send only the passages relevant to the requested fields
+        if (get_config_value('PASSAGE_RETRIEVAL_ENABLED', True)
+                and len(document_text) > get_config_value('PASSAGE_CONTEXT_CHARS', 6000)):
+            selected = passage_retriever.select(document_text, placeholders)
+            if selected:
+                document_text = selected
+        
+        windows, num_ctx = self.document_windows(
+            document_text, system_prompt + build_prompt(''), max_tokens=1000, model=model
+        )
+        results = map_llm_calls(
+            lambda window: self._extract_placeholders_window(
+                build_prompt(window), system_prompt, placeholders, model, num_ctx
+            ),
+            windows
+        )
+        if len(results) == 1:
+            return results[0]
+        
+        # Merge the windows that produced an answer
+        answered = [result for result in results if not result.get("errors")]
+        if not answered:
+            return results[0]
+        values, field_confidence = merge_extractions([
+            {
+                "values": result["extracted_values"],
+                "field_confidence": result.get("field_confidence"),
+                "confidence": result["confidence"]
+            }
+            for result in answered
+        ])
+        merged = {
+            "extracted_values": values,
+            "field_confidence": field_confidence,
+            "confidence": round(sum(field_confidence.values()) / len(field_confidence), 3) if field_confidence else 0.0,
+            "notes": " ".join(result["notes"] for result in answered if result.get("notes")),
+            "ai_model": model or self._get_default_model(),
+            "chunks": len(windows)
+        }
+        errors = [error for result in results for error in result.get("errors", [])]
+        if errors:
+            merged["errors"] = errors
+        return merged
+    
+    def _extract_placeholders_window(
+        self,
+        user_prompt: str,
+        system_prompt: str,
+        placeholders: List[Dict[str, Any]],
+        model: str,
+        num_ctx: Optional[int]
+    ) -> Dict[str, Any]:
+        """Run the placeholder extraction prompt for one document window
+        
+        Args:
+            user_prompt: Extraction prompt including the window text
+            system_prompt: System prompt
+            placeholders: Placeholder definitions to extract
+            model: Model name
+            num_ctx: Context window to allocate, or None for the Ollama default
+            
+        Returns:
+            Dictionary containing extracted values and metadata
+        """
         try:
             response = self.generate_completion(
                 prompt=user_prompt,
                 model=model,
                 system_prompt=system_prompt,
                 temperature=0.1,  # Low temperature for consistency
-                max_tokens=1000
+                max_tokens=1000,
+                use_cache=True,
+                num_ctx=num_ctx
             )
             
             if "error" in response:
@@ -407,33 +1055,29 @@ Return ONLY a JSON object in this format:
             # Clean thinking tags from AI response
             ai_text = self._clean_thinking_tags(ai_text)
             
-            # Try to extract JSON from the response
-            import re
-            import json
-            
             # Look for JSON in the response
-            json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group())
-                    
-                    # Validate and clean the extracted values
-                    cleaned_values = self._validate_extracted_values(
-                        result.get("extracted_values", {}),
-                        non_client_placeholders
-                    )
-                    
-                    return {
-                        "extracted_values": cleaned_values,
-                        "confidence": result.get("confidence", 0.5),
-                        "notes": result.get("notes", ""),
-                        "ai_model": model or self._get_default_model()
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    current_app.logger.error(f"Failed to parse AI JSON response: {str(e)}")
-                    current_app.logger.debug(f"AI response was: {ai_text}")
-                    
+            result = extract_json(ai_text)
+            if result is not None:
+                # Validate and clean the extracted values
+                extracted_values = result.get("extracted_values")
+                cleaned_values = self._validate_extracted_values(
+                    extracted_values if isinstance(extracted_values, dict) else {},
+                    placeholders
+                )
+                field_confidence = result.get("field_confidence")
+                
+                return {
+                    "extracted_values": cleaned_values,
+                    "field_confidence": {
+                        name: as_confidence(value) for name, value in field_confidence.items() if name in cleaned_values
+                    } if isinstance(field_confidence, dict) else {},
+                    "confidence": as_confidence(result.get("confidence", 0.5)),
+                    "notes": result.get("notes", ""),
+                    "ai_model": model or self._get_default_model()
+                }
+            
+            current_app.logger.error("Failed to parse AI JSON response")
+            current_app.logger.debug(f"AI response was: {ai_text}")
             return {
                 "extracted_values": {},
                 "confidence": 0.0,
@@ -463,93 +1107,14 @@ Return ONLY a JSON object in this format:
         Returns:
             Cleaned and validated values
         """
-        cleaned_values = {}
-        placeholder_map = {p['name']: p for p in placeholders}
-        
-        for field_name, value in extracted_values.items():
-            if field_name not in placeholder_map:
-                continue  # Skip unknown fields
-                
-            placeholder = placeholder_map[field_name]
-            field_type = placeholder.get('type', 'text')
-            
-            if value is None or value == "":
-                continue  # Skip empty values
-                
-            try:
-                # Type conversion and validation
-                if field_type == 'number':
-                    if isinstance(value, str):
-                        # Try to extract number from string
-                        import re
-                        number_match = re.search(r'-?\d+\.?\d*', str(value))
-                        if number_match:
-                            value = float(number_match.group()) if '.' in number_match.group() else int(number_match.group())
-                        else:
-                            continue
-                    cleaned_values[field_name] = float(value) if isinstance(value, (int, float)) else None
-                    
-                elif field_type == 'date':
-                    if isinstance(value, str):
-                        # Try to normalize date format
-                        import re
-                        from datetime import datetime
-                        
-                        # Look for date patterns
-                        date_patterns = [
-                            r'(\d{4}-\d{2}-\d{2})',  # YYYY-MM-DD
-                            r'(\d{2})\.(\d{2})\.(\d{4})',  # DD.MM.YYYY
-                            r'(\d{1,2})\.(\d{1,2})\.(\d{4})',  # D.M.YYYY
-                            r'(\d{2})/(\d{2})/(\d{4})',  # MM/DD/YYYY
-                        ]
-                        
-                        for pattern in date_patterns:
-                            match = re.search(pattern, value)
-                            if match:
-                                try:
-                                    if pattern == date_patterns[0]:  # YYYY-MM-DD
-                                        cleaned_values[field_name] = match.group(1)
-                                    elif pattern in [date_patterns[1], date_patterns[2]]:  # DD.MM.YYYY
-                                        day, month, year = match.groups()
-                                        cleaned_values[field_name] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                                    elif pattern == date_patterns[3]:  # MM/DD/YYYY
-                                        month, day, year = match.groups()
-                                        cleaned_values[field_name] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                                    break
-                                except ValueError:
-                                    continue
-                                    
-                elif field_type == 'checkbox':
-                    if isinstance(value, str):
-                        value = value.lower() in ['true', '1', 'yes', 'ja', 'wahr']
-                    cleaned_values[field_name] = bool(value)
-                    
-                elif field_type == 'select':
-                    # Validate against options if available
-                    options = placeholder.get('options', [])
-                    if options and value not in options:
-                        # Try fuzzy matching
-                        value_lower = str(value).lower()
-                        for option in options:
-                            if value_lower in option.lower() or option.lower() in value_lower:
-                                value = option
-                                break
-                    cleaned_values[field_name] = str(value)
-                    
-                else:  # text and other types
-                    cleaned_values[field_name] = str(value).strip()
-                    
-            except Exception as e:
-                current_app.logger.warning(f"Failed to validate field {field_name}: {str(e)}")
-                continue
-                
-        return cleaned_values
-
+        return validate_values(extracted_values, placeholders)
+    
     def summarize_document_content(
         self, 
         document_text: str, 
         max_summary_length: int = 500,
-        model: str = None
+        model: str = None,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """Generate a summary of document content
         
@@ -557,6 +1122,7 @@ Return ONLY a JSON object in this format:
             document_text: The text content to summarize
             max_summary_length: Maximum length of summary
             model: Model name to use
+            on_token: Optional callback receiving summary text as it is streamed
             
         Returns:
             Dictionary with summary and metadata
@@ -566,7 +1132,8 @@ Return ONLY a JSON object in this format:
         
         system_prompt = """You are an expert document analyst. Create concise, professional summaries of business and legal documents."""
         
-        user_prompt = f"""
+        def build_prompt(text: str, length: int = max_summary_length) -> str:
+            return f"""
 Summarize the following document in German. Focus on:
 1. Document type and purpose
 2. Key dates and deadlines  
@@ -574,22 +1141,63 @@ Summarize the following document in German. Focus on:
 4. Main legal or business obligations
 5. Critical information for processing
 
-Keep the summary under {max_summary_length} characters and use professional language.
+Keep the summary under {length} characters and use professional language.
 
 DOCUMENT:
-{document_text[:3000]}
+{text}
 
 SUMMARY:
 """
         
         try:
-            response = self.generate_completion(
-                prompt=user_prompt,
-                model=model,
-                system_prompt=system_prompt,
-                temperature=0.3,
-                max_tokens=200
+            windows, num_ctx = self.document_windows(
+                document_text, system_prompt + build_prompt(''), max_tokens=200, model=model, truncate_chars=3000
             )
+            if len(windows) > 1:
+                # Map: summarize every window; reduce: summarize the partial summaries
+                partials = map_llm_calls(
+                    lambda window: self.generate_completion(
+                        prompt=build_prompt(window),
+                        model=model,
+                        system_prompt=system_prompt,
+                        temperature=0.3,
+                        max_tokens=200,
+                        num_ctx=num_ctx
+                    ),
+                    windows
+                )
+                errors = [partial["error"] for partial in partials if "error" in partial]
+                if len(errors) == len(partials):
+                    return {"summary": "", "error": errors[0], "confidence": 0.0}
+                user_prompt = build_prompt('\n\n'.join(
+                    f"Teil {index}: {self._clean_thinking_tags(partial.get('response', '')).strip()}"
+                    for index, partial in enumerate(partials, 1) if "error" not in partial
+                ))
+            else:
+                user_prompt = build_prompt(windows[0])
+            
+            if on_token is not None:
+                chunks = []
+                for chunk in self.stream_completion(
+                    prompt=user_prompt,
+                    model=model,
+                    system_prompt=system_prompt,
+                    temperature=0.3,
+                    max_tokens=200,
+                    num_ctx=num_ctx
+                ):
+                    chunks.append(chunk)
+                    on_token(chunk)
+                response = {"response": ''.join(chunks)}
+            else:
+                response = self.generate_completion(
+                    prompt=user_prompt,
+                    model=model,
+                    system_prompt=system_prompt,
+                    temperature=0.3,
+                    max_tokens=200,
+                    num_ctx=num_ctx
+                )
             
             if "error" in response:
                 return {"summary": "", "error": response["error"], "confidence": 0.0}
@@ -598,12 +1206,15 @@ SUMMARY:
             # Clean thinking tags from AI response
             summary = self._clean_thinking_tags(summary)
             
-            return {
+            result = {
                 "summary": summary[:max_summary_length],
                 "word_count": len(document_text.split()),
                 "confidence": 0.8 if len(summary) > 50 else 0.4,
                 "ai_model": model or self._get_default_model()
             }
+            if len(windows) > 1:
+                result["chunks"] = len(windows)
+            return result
             
         except Exception as e:
             current_app.logger.error(f"Error generating summary: {str(e)}")
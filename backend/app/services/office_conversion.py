@@ -0,0 +1,455 @@
+import os
+import sys
+import atexit
+import time
+import queue
+import shutil
+import signal
+import socket
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Optional
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class OfficeConversionError(Exception):
+    """Raised when a document could not be converted by LibreOffice"""
+
+class ConversionQueueFullError(OfficeConversionError):
+    """Raised when the conversion queue has no free slot"""
+
+class ConversionTimeoutError(OfficeConversionError):
+    """Raised when LibreOffice did not finish within the job timeout"""
+
+def find_soffice() -> Optional[str]:
+    """Locate the LibreOffice binary
+
+    Returns:
+        Path of SOFFICE_BINARY if configured, otherwise of soffice/libreoffice
+        on the PATH, or None if LibreOffice is not installed
+    """
+    configured = get_config_value('SOFFICE_BINARY', '')
+    if configured:
+        return configured if os.path.exists(configured) else shutil.which(configured)
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+def _uno_available() -> bool:
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Kill soffice together with the soffice.bin child it forks"""
+    if process.poll() is not None:
+        return
+    try:
+        if sys.platform != 'win32':
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        pass
+
+class SofficeWorker:
+    """One LibreOffice instance with its own user profile
+
+    In listener mode a headless soffice process accepts UNO connections and
+    stays alive across conversions. Without the UNO Python bridge each
+    conversion runs soffice --convert-to, still with the worker's persistent
+    profile so LibreOffice does not re-create it on every call. Either way the
+    process is killed on timeout and restarted after a crash.
+    """
+
+    def __init__(self, binary: str, profile_dir: str, listener: bool):
+        """Initialize the worker
+
+        Args:
+            binary: Path of the soffice binary
+            profile_dir: Directory of this worker's LibreOffice user profile
+            listener: Keep a long-lived UNO listener instead of one process per job
+        """
+        self.binary = binary
+        self.profile_dir = profile_dir
+        self.listener = listener
+        self.restarts = 0
+        self._process = None
+        self._port = None
+        self._desktop = None
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def _base_args(self) -> List[str]:
+        profile_url = 'file://' + os.path.abspath(self.profile_dir).replace(os.sep, '/')
+        return [
+            self.binary, '--headless', '--invisible', '--nologo', '--norestore',
+            '--nodefault', '--nolockcheck', f'-env:UserInstallation={profile_url}'
+        ]
+
+    def _start_listener(self, startup_timeout: float) -> None:
+        """Start the soffice listener and connect to it over UNO"""
+        import uno
+
+        self._port = _free_port()
+        accept = f'socket,host=127.0.0.1,port={self._port};urp;StarOffice.ComponentContext'
+        self._process = subprocess.Popen(
+            self._base_args() + [f'--accept={accept}'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_context
+        )
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                context = resolver.resolve(f'uno:{accept}')
+                break
+            except Exception:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise OfficeConversionError('LibreOffice listener did not start')
+                time.sleep(0.25)
+        self._desktop = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+        logger.info("Started LibreOffice listener on port %d (profile %s)", self._port, self.profile_dir)
+
+    def _convert_with_listener(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        """Convert one document through the UNO connection"""
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            item = PropertyValue()
+            item.Name, item.Value = name, value
+            return item
+
+        if self._process is None or self._process.poll() is not None:
+            if self._process is not None:
+                self.restarts += 1
+                logger.warning("LibreOffice listener exited, restarting")
+            self._start_listener(timeout)
+
+        # UNO calls cannot be interrupted, so a watchdog kills the process on timeout
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            self.stop()
+
+        watchdog = threading.Timer(timeout, expire)
+        watchdog.start()
+        try:
+            document = self._desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(docx_path)), '_blank', 0, (prop('Hidden', True),)
+            )
+            try:
+                document.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(pdf_path)), (prop('FilterName', 'writer_pdf_Export'),)
+                )
+            finally:
+                document.close(True)
+        except Exception as e:
+            self.stop()
+            if timed_out.is_set():
+                raise ConversionTimeoutError(f'LibreOffice conversion timed out after {timeout:.0f}s')
+            raise OfficeConversionError(f'LibreOffice conversion failed: {e}')
+        finally:
+            watchdog.cancel()
+
+    def _convert_with_cli(self, docx_paths: List[str], output_dir: str, timeout: float) -> None:
+        """Convert documents with one soffice --convert-to run"""
+        process = subprocess.Popen(
+            self._base_args() + ['--convert-to', 'pdf', '--outdir', output_dir] + docx_paths,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_process_group(process)
+            raise ConversionTimeoutError(f'LibreOffice conversion timed out after {timeout:.0f}s')
+        if process.returncode != 0:
+            message = (stderr or b'').decode('utf-8', errors='replace').strip()
+            raise OfficeConversionError(f'soffice exited with code {process.returncode}: {message}')
+
+    def convert(self, docx_paths: List[str], output_dir: str, timeout: float) -> None:
+        """Convert documents to PDF files in output_dir
+
+        A crashed conversion is retried once on a fresh process; timeouts are not
+        retried.
+
+        Args:
+            docx_paths: Documents to convert
+            output_dir: Directory for the PDF files (named like the inputs)
+            timeout: Seconds allowed for the whole batch
+        """
+        for attempt in range(2):
+            try:
+                if self.listener:
+                    deadline = time.monotonic() + timeout
+                    for path in docx_paths:
+                        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + '.pdf')
+                        self._convert_with_listener(path, pdf_path, max(1.0, deadline - time.monotonic()))
+                else:
+                    self._convert_with_cli(docx_paths, output_dir, timeout)
+                return
+            except ConversionTimeoutError:
+                raise
+            except OfficeConversionError as e:
+                if attempt:
+                    raise
+                self.restarts += 1
+                self.stop()
+                # A crash can leave a stale lock in the profile
+                lock_file = os.path.join(self.profile_dir, 'user', '.lock')
+                if os.path.exists(lock_file):
+                    os.unlink(lock_file)
+                logger.warning("LibreOffice conversion failed, retrying on a fresh process: %s", str(e))
+
+    def stop(self) -> None:
+        """Stop the listener process, if any"""
+        process, self._process = self._process, None
+        self._desktop = None
+        if process is not None:
+            _kill_process_group(process)
+
+class OfficeConverterPool:
+    """Pool of LibreOffice workers for DOCX to PDF conversion
+
+    Each worker thread owns one SofficeWorker. Jobs wait in a bounded queue;
+    when it is full, submit() fails fast instead of piling up requests, while
+    convert() waits up to queue_timeout seconds for a slot.
+    """
+
+    def __init__(
+        self,
+        binary: str,
+        workers: int = 2,
+        queue_size: int = 16,
+        timeout: float = 60.0,
+        batch_size: int = 20,
+        queue_timeout: float = 30.0,
+        profile_root: Optional[str] = None,
+        listener: Optional[bool] = None
+    ):
+        """Initialize the pool
+
+        Args:
+            binary: Path of the soffice binary
+            workers: Number of LibreOffice instances
+            queue_size: Jobs that may wait beyond the ones being converted
+            timeout: Seconds allowed per document
+            batch_size: Documents per soffice run in convert_batch()
+            queue_timeout: Seconds convert() waits for a queue slot
+            profile_root: Directory for the per-worker user profiles
+            listener: Use long-lived UNO listeners (default: when the UNO bridge is importable)
+        """
+        self.binary = binary
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.queue_timeout = queue_timeout
+        self.listener = _uno_available() if listener is None else listener
+        self.profile_root = profile_root or os.path.join(tempfile.gettempdir(), f'office-profiles-{os.getpid()}')
+
+        workers = max(1, workers)
+        self._idle = queue.Queue()
+        for index in range(workers):
+            self._idle.put(SofficeWorker(binary, os.path.join(self.profile_root, f'worker-{index}'), self.listener))
+        self._workers = list(self._idle.queue)
+        self._slots = threading.BoundedSemaphore(workers + max(0, queue_size))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='soffice-worker')
+        self._stats_lock = threading.Lock()
+        self.stats = {'conversions': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+        logger.info(
+            "Started LibreOffice conversion pool with %d workers (%s mode)",
+            workers, 'listener' if self.listener else 'cli'
+        )
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _run(self, docx_paths: List[str], output_dir: str) -> List[str]:
+        worker = self._idle.get()
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            worker.convert(docx_paths, output_dir, self.timeout * len(docx_paths))
+            self._count('conversions', len(docx_paths))
+        except OfficeConversionError as e:
+            self._count('failures', len(docx_paths))
+            if isinstance(e, ConversionTimeoutError):
+                self._count('timeouts')
+            raise
+        finally:
+            self._idle.put(worker)
+            self._slots.release()
+        return [os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + '.pdf') for path in docx_paths]
+
+    def submit(
+        self,
+        docx_paths: List[str],
+        output_dir: str,
+        block: bool = False,
+        timeout: Optional[float] = None
+    ) -> Future:
+        """Queue a conversion job
+
+        Args:
+            docx_paths: Documents converted together in one LibreOffice run
+            output_dir: Directory for the PDF files
+            block: Wait for a queue slot instead of failing when the queue is full
+            timeout: Seconds to wait when blocking (default: until a slot is free)
+
+        Returns:
+            Future of the list of PDF paths
+
+        Raises:
+            ConversionQueueFullError: If all workers are busy and the queue stayed full
+        """
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            self._count('rejected')
+            raise ConversionQueueFullError('LibreOffice conversion queue is full')
+        try:
+            return self._executor.submit(self._run, list(docx_paths), output_dir)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def convert(self, docx_path: str, output_dir: Optional[str] = None) -> str:
+        """Convert one document to PDF
+
+        Args:
+            docx_path: Path to the DOCX file
+            output_dir: Directory for the PDF (default: next to the DOCX)
+
+        Returns:
+            Path of the PDF file
+
+        Raises:
+            ConversionQueueFullError: If no queue slot became free within queue_timeout
+        """
+        output_dir = output_dir or os.path.dirname(os.path.abspath(docx_path))
+        # Wait briefly for a slot, a burst of previews should not fall back to DOCX at once
+        pdf_path = self.submit([docx_path], output_dir, block=True, timeout=self.queue_timeout).result()[0]
+        if not os.path.exists(pdf_path):
+            raise OfficeConversionError(f'LibreOffice did not create {pdf_path}')
+        return pdf_path
+
+    def convert_batch(self, docx_paths: List[str], output_dir: str) -> Dict[str, Dict[str, Any]]:
+        """Convert many documents, several per LibreOffice run
+
+        Documents are split into chunks of batch_size that are converted in
+        parallel by the workers. Input names must be unique, as the PDFs are
+        named after them.
+
+        Args:
+            docx_paths: Documents to convert
+            output_dir: Directory for the PDF files
+
+        Returns:
+            Dictionary keyed by input path with either 'path' or 'error'
+        """
+        names = [os.path.splitext(os.path.basename(path))[0] for path in docx_paths]
+        if len(set(names)) != len(names):
+            raise ValueError('Batch conversion needs unique file names')
+
+        chunks = [docx_paths[start:start + self.batch_size] for start in range(0, len(docx_paths), self.batch_size)]
+        # Wait for free slots instead of failing, the caller asked for the whole batch
+        futures = [(chunk, self.submit(chunk, output_dir, block=True)) for chunk in chunks]
+
+        results = {}
+        for chunk, future in futures:
+            try:
+                pdf_paths = future.result()
+                error = None
+            except OfficeConversionError as e:
+                pdf_paths, error = [None] * len(chunk), str(e)
+            for docx_path, pdf_path in zip(chunk, pdf_paths):
+                if pdf_path and os.path.exists(pdf_path):
+                    results[docx_path] = {'path': pdf_path}
+                else:
+                    results[docx_path] = {'error': error or 'PDF file not created'}
+        return results
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get conversion counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._stats_lock:
+            metrics = {
+                'office_conversions_total': self.stats['conversions'],
+                'office_conversion_failures_total': self.stats['failures'],
+                'office_conversion_timeouts_total': self.stats['timeouts'],
+                'office_conversion_rejected_total': self.stats['rejected']
+            }
+        metrics['office_worker_restarts_total'] = sum(worker.restarts for worker in self._workers)
+        return metrics
+
+    def shutdown(self) -> None:
+        """Stop the workers and their LibreOffice processes"""
+        self._executor.shutdown(wait=True)
+        for worker in self._workers:
+            worker.stop()
+
+def get_converter_pool() -> Optional[OfficeConverterPool]:
+    """Get the shared LibreOffice pool, created on first use
+
+    Returns:
+        The pool, or None if LibreOffice is not installed
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                binary = find_soffice()
+                if not binary:
+                    return None
+                mode = get_config_value('OFFICE_CONVERSION_MODE', 'auto')
+                _pool = OfficeConverterPool(
+                    binary,
+                    workers=get_config_value('OFFICE_CONVERSION_WORKERS', 2),
+                    queue_size=get_config_value('OFFICE_CONVERSION_QUEUE_SIZE', 16),
+                    timeout=get_config_value('OFFICE_CONVERSION_TIMEOUT', 60.0),
+                    batch_size=get_config_value('OFFICE_CONVERSION_BATCH_SIZE', 20),
+                    queue_timeout=get_config_value('OFFICE_CONVERSION_QUEUE_TIMEOUT', 30.0),
+                    profile_root=get_config_value('OFFICE_PROFILE_FOLDER', '') or None,
+                    listener=None if mode == 'auto' else mode == 'listener'
+                )
+                # Listener processes run in their own session and would outlive the server
+                atexit.register(shutdown_converter_pool)
+    return _pool
+
+def get_conversion_metrics() -> Dict[str, float]:
+    """Get the counters of the LibreOffice pool (empty before first use)"""
+    pool = _pool
+    return pool.get_metrics() if pool is not None else {}
+
+def shutdown_converter_pool() -> None:
+    """Stop the LibreOffice pool (it is recreated on next use)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
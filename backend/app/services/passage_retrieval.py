@@ -0,0 +1,265 @@
+"""
+Passage retrieval in front of LLM field extraction
+
+Splits document text into passages, scores them against each requested
+placeholder with BM25 over its name, description and type, boosted where a
+passage contains a value of the requested kind (dates, IBANs, amounts,
+Steuernummern, ...), and keeps only the best passages for the prompt.
+Tokenised passages are cached per document, so extracting fields for
+another template from the same upload does not re-tokenise it.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.config_values import get_config_value
+from app.services.field_patterns import FIELD_PATTERNS, fold, name_words, patterns_for_placeholder
+from app.services.text_chunking import split_into_windows
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'\w+')
+# Headers the agent puts in front of every file of a combined workflow text
+_DOCUMENT_HEADER = re.compile(r'^--- (?:Dokument|Document): .* ---$', re.MULTILINE)
+
+STOPWORDS = frozenset(fold(word) for word in (
+    'der die das des dem den ein eine eines einem einen und oder für von vom zum zur mit bei auf aus im in ist '
+    'sind wird werden nach über unter bis als auch nicht the of and or for to in on at by is are'
+).split())
+
+# Words that tend to stand next to values of a placeholder type
+TYPE_TERMS = {
+    'date': ('datum', 'vom', 'frist', 'bis', 'zum'),
+    'number': ('betrag', 'summe', 'eur', 'euro', 'nr'),
+    'checkbox': ('ja', 'nein'),
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Score added per requested value kind a passage contains
+PATTERN_BOOST = 2.0
+
+def tokenize(text: str) -> List[str]:
+    """Folded word tokens without stopwords and one-letter words"""
+    return [token for token in _TOKEN.findall(fold(text)) if len(token) > 1 and token not in STOPWORDS]
+
+class PassageIndex:
+    """Tokenised passages of one document"""
+
+    def __init__(self, text: str, header: str = '', max_chars: int = 800, min_chars: int = 200):
+        self.header = header
+        self.passages = self._split(text, max_chars, min_chars)
+        self.token_counts = [Counter(tokenize(passage)) for passage in self.passages]
+        self.lengths = [sum(counts.values()) for counts in self.token_counts]
+        self._pattern_hits: Dict[str, List[bool]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _split(text: str, max_chars: int, min_chars: int) -> List[str]:
+        """Paragraphs, long ones split at sentence boundaries and short ones joined"""
+        pieces = []
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            if paragraph:
+                pieces.extend(split_into_windows(paragraph, max_chars))
+        passages = []
+        for piece in pieces:
+            # Keep a label line such as 'Aktenzeichen:' together with the value below it
+            if passages and len(passages[-1]) < min_chars and len(passages[-1]) + len(piece) <= max_chars:
+                passages[-1] = f"{passages[-1]}\n\n{piece}"
+            else:
+                passages.append(piece)
+        return passages
+
+    def pattern_hits(self, kind: str) -> List[bool]:
+        """Whether each passage contains a value matched by FIELD_PATTERNS[kind]"""
+        hits = self._pattern_hits.get(kind)
+        if hits is None:
+            hits = [bool(FIELD_PATTERNS[kind].search(passage)) for passage in self.passages]
+            with self._lock:
+                self._pattern_hits[kind] = hits
+        return hits
+
+class PassageRetriever:
+    """Selects the passages of a document text relevant to a set of placeholders"""
+
+    def __init__(self):
+        self._indexes: 'OrderedDict[str, PassageIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'cache_hits': 0, 'builds': 0, 'chars_in': 0, 'chars_out': 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def get_index(self, text: str, header: str = '') -> PassageIndex:
+        """Get the passage index of one document, building it on first use
+
+        Args:
+            text: Document text
+            header: Line naming the document, repeated before its passages in prompts
+
+        Returns:
+            Cached passage index
+        """
+        key = hashlib.sha1(f"{header}\0{text}".encode('utf-8')).hexdigest()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return index
+        index = PassageIndex(
+            text, header,
+            max_chars=get_config_value('PASSAGE_MAX_CHARS', 800),
+            min_chars=get_config_value('PASSAGE_MIN_CHARS', 200)
+        )
+        with self._lock:
+            self._indexes[key] = index
+            self.stats['builds'] += 1
+            while len(self._indexes) > get_config_value('PASSAGE_INDEX_CACHE_SIZE', 64):
+                self._indexes.popitem(last=False)
+        return index
+
+    def _documents(self, text: str) -> List[Tuple[str, str]]:
+        """Split a combined workflow text into (header, text) per file"""
+        headers = list(_DOCUMENT_HEADER.finditer(text))
+        if not headers:
+            return [('', text)]
+        documents = []
+        if text[:headers[0].start()].strip():
+            documents.append(('', text[:headers[0].start()]))
+        for position, header in enumerate(headers):
+            end = headers[position + 1].start() if position + 1 < len(headers) else len(text)
+            documents.append((header.group(), text[header.end():end]))
+        return documents
+
+    def rank(self, indexes: List[PassageIndex], placeholder: Dict[str, Any]) -> List[Tuple[float, int, int]]:
+        """Score every passage against one placeholder
+
+        Args:
+            indexes: Passage indexes of the documents
+            placeholder: Placeholder definition with name, type and description
+
+        Returns:
+            (score, document position, passage position) of passages scoring above zero, best first
+        """
+        weights: Dict[str, float] = {}
+        for term in name_words(placeholder.get('name', '')) + tokenize(placeholder.get('name', '')):
+            if len(term) > 1 and term not in STOPWORDS:
+                weights[term] = 1.0
+        for term in tokenize(placeholder.get('description') or ''):
+            weights.setdefault(term, 0.5)
+        for term in TYPE_TERMS.get(placeholder.get('type', 'text'), ()):
+            weights.setdefault(term, 0.3)
+
+        count = sum(len(index.passages) for index in indexes)
+        if not count:
+            return []
+        average_length = sum(sum(index.lengths) for index in indexes) / count or 1.0
+        vocabulary = set()
+        for index in indexes:
+            for counts in index.token_counts:
+                vocabulary.update(counts)
+        # German compounds: 'frist' also matches 'einspruchsfrist', 'steuernummer' also 'steuer'
+        expansions = {
+            term: [word for word in vocabulary if word == term or (len(term) >= 4 and len(word) >= 4 and (term in word or word in term))]
+            for term in weights
+        }
+        document_frequency = {
+            term: sum(1 for index in indexes for counts in index.token_counts if any(word in counts for word in words))
+            for term, words in expansions.items()
+        }
+        kinds = patterns_for_placeholder(placeholder)
+
+        ranked = []
+        for document_position, index in enumerate(indexes):
+            hits = [index.pattern_hits(kind) for kind in kinds]
+            for position, counts in enumerate(index.token_counts):
+                score = 0.0
+                length_norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[position] / average_length)
+                for term, weight in weights.items():
+                    frequency = sum(counts[word] for word in expansions[term] if word in counts)
+                    if frequency:
+                        df = document_frequency[term]
+                        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                        score += weight * idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+                score += PATTERN_BOOST * sum(kind_hits[position] for kind_hits in hits)
+                if score > 0:
+                    ranked.append((score, document_position, position))
+        ranked.sort(key=lambda item: -item[0])
+        return ranked
+
+    def select(self, text: str, placeholders: List[Dict[str, Any]], max_chars: Optional[int] = None) -> Optional[str]:
+        """Keep the passages of a text that are most relevant to the placeholders
+
+        Passages are taken round-robin from each placeholder's ranking (every
+        placeholder's best passage first) until max_chars is reached, and are
+        returned in document order under their document header.
+
+        Args:
+            text: Document text, possibly several files joined by the agent
+            placeholders: Placeholder definitions to extract
+            max_chars: Size of the selected text (default: PASSAGE_CONTEXT_CHARS)
+
+        Returns:
+            The selected passages, or None if no passage matches any placeholder
+        """
+        max_chars = max_chars or get_config_value('PASSAGE_CONTEXT_CHARS', 6000)
+        per_field = get_config_value('PASSAGE_TOP_K', 3)
+        indexes = [self.get_index(document, header) for header, document in self._documents(text)]
+        rankings = [self.rank(indexes, placeholder)[:per_field] for placeholder in placeholders]
+        self._count('queries')
+        self._count('chars_in', len(text))
+
+        selected = set()
+        used = 0
+        for rank in range(per_field):
+            for ranking in rankings:
+                if rank >= len(ranking):
+                    continue
+                _, document_position, position = ranking[rank]
+                key = (document_position, position)
+                size = len(indexes[document_position].passages[position])
+                if key in selected or used + size > max_chars:
+                    continue
+                selected.add(key)
+                used += size
+        if not selected:
+            return None
+
+        parts = []
+        current_document = None
+        for document_position, position in sorted(selected):
+            index = indexes[document_position]
+            if document_position != current_document and index.header:
+                parts.append(index.header)
+            current_document = document_position
+            parts.append(index.passages[position])
+        result = '\n\n'.join(parts)
+        self._count('chars_out', len(result))
+        logger.debug("Selected %d passages (%d of %d characters) for %d placeholders",
+                     len(selected), len(result), len(text), len(placeholders))
+        return result
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get retrieval counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'passage_retrieval_queries_total': self.stats['queries'],
+                'passage_index_builds_total': self.stats['builds'],
+                'passage_index_cache_hits_total': self.stats['cache_hits'],
+                'passage_retrieval_chars_in_total': self.stats['chars_in'],
+                'passage_retrieval_chars_out_total': self.stats['chars_out']
+            }
+
+# Singleton instance
+passage_retriever = PassageRetriever()
@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _default_workers() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str, float, str]]:
+    """Extract the text of pages [start, end) of a PDF
+
+    Runs in a worker process. Pages that PyPDF2 cannot read, or that come back
+    empty, are retried with pdfplumber when it is installed.
+
+    Args:
+        file_path: Path to the PDF file
+        start: First page index (inclusive)
+        end: Last page index (exclusive)
+
+    Returns:
+        List of (page index, text, seconds, method) tuples
+    """
+    import PyPDF2
+
+    results = []
+    plumber_pdf = None
+    try:
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            for page_num in range(start, end):
+                started = time.perf_counter()
+                method = 'pypdf2'
+                try:
+                    page_text = reader.pages[page_num].extract_text() or ''
+                except Exception as page_error:
+                    logger.warning("PyPDF2 failed on page %d: %s", page_num, str(page_error))
+                    page_text = ''
+
+                if not page_text.strip():
+                    try:
+                        if plumber_pdf is None:
+                            import pdfplumber
+                            plumber_pdf = pdfplumber.open(file_path)
+                        page_text = plumber_pdf.pages[page_num].extract_text() or ''
+                        method = 'pdfplumber'
+                    except ImportError:
+                        pass
+                    except Exception as page_error:
+                        logger.warning("Failed to extract text from page %d: %s", page_num, str(page_error))
+
+                results.append((page_num, page_text, time.perf_counter() - started, method))
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+    return results
+
+def _get_pool(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Get the shared extraction process pool, created on first use
+
+    Workers are spawned rather than forked, because forking a multi-threaded
+    server process can copy held locks into the children.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                    logger.info("Started PDF extraction pool with %d processes", max_workers)
+                except (OSError, ValueError) as e:
+                    logger.warning("Could not start PDF extraction pool, extracting serially: %s", str(e))
+                    return None
+    return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _page_ranges(page_count: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split page indices into contiguous ranges of near-equal size"""
+    size = -(-page_count // chunks)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def extract_pdf_text(file_path: str, parallel: Optional[bool] = None, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Extract the text of a PDF, page-parallel for long documents
+
+    Args:
+        file_path: Path to the PDF file
+        parallel: Force (True) or disable (False) the process pool; by default it
+            is used from PDF_PARALLEL_MIN_PAGES pages on
+        max_workers: Number of worker processes (default: PDF_EXTRACTION_WORKERS)
+
+    Returns:
+        Dictionary with the joined text, per-page timings, page count, whether the
+        pool was used and the total elapsed time
+    """
+    import PyPDF2
+
+    started = time.perf_counter()
+    with open(file_path, 'rb') as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+
+    if max_workers is None:
+        max_workers = get_config_value('PDF_EXTRACTION_WORKERS', _default_workers())
+    if parallel is None:
+        parallel = max_workers > 1 and page_count >= get_config_value('PDF_PARALLEL_MIN_PAGES', 16)
+
+    pool = _get_pool(max_workers) if parallel and page_count > 1 else None
+    pages = None
+    if pool is not None:
+        # A few ranges per worker keeps the processes busy when pages differ in cost
+        ranges = _page_ranges(page_count, min(page_count, max_workers * 2))
+        try:
+            futures = [pool.submit(_extract_page_range, file_path, start, end) for start, end in ranges]
+            pages = [page for future in futures for page in future.result()]
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); the pool cannot be used again
+            logger.warning("PDF extraction pool is broken, extracting %s serially: %s", file_path, str(e))
+            _discard_pool(pool)
+            pool = None
+    if pages is None:
+        pages = _extract_page_range(file_path, 0, page_count)
+
+    pages.sort(key=lambda page: page[0])
+    text = '\n'.join(page_text for _, page_text, _, _ in pages if page_text.strip())
+
+    return {
+        'text': text,
+        'page_count': page_count,
+        'parallel': pool is not None,
+        'elapsed': time.perf_counter() - started,
+        'pages': [
+            {'page': page_num + 1, 'seconds': round(seconds, 6), 'method': method, 'chars': len(page_text)}
+            for page_num, page_text, seconds, method in pages
+        ]
+    }
+
+def shutdown_pool() -> None:
+    """Stop the extraction process pool (it is recreated on next use)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
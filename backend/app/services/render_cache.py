@@ -0,0 +1,232 @@
+import os
+import json
+import errno
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from flask import current_app
+from app.services.config_values import get_config_value
+
+logger = logging.getLogger(__name__)
+
+RENDER_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+class RenderCache:
+    """Disk cache of rendered documents
+
+    Artifacts are stored as <root>/<document id>/<key><ext>, where the key is a
+    SHA-256 of (template id, template file hash, canonical placeholder values,
+    output format). Files are written to a temporary name and moved into place
+    with os.replace, so readers never see a partial file. The total size is
+    bounded in bytes; the least recently used artifacts are evicted first, with
+    the file mtime as the recency stamp so the order survives restarts.
+    """
+
+    def __init__(self):
+        self._index = OrderedDict()  # artifact path -> size in bytes
+        self._index_root = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def is_enabled(self) -> bool:
+        """Whether rendered documents should be cached"""
+        return get_config_value('RENDER_CACHE_ENABLED', True) and self._get_max_bytes() > 0
+
+    def _get_max_bytes(self) -> int:
+        return get_config_value('RENDER_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+    def _get_root(self) -> str:
+        """Get the cache directory and load its index on first use"""
+        root = get_config_value('RENDER_CACHE_FOLDER', '') or os.path.join(
+            current_app.config.get('INSTANCE_PATH', current_app.instance_path), 'render_cache'
+        )
+        root = os.path.abspath(root)
+        if root != self._index_root:
+            self._load_index(root)
+        return root
+
+    def _load_index(self, root: str) -> None:
+        """Rebuild the LRU index from the files on disk, oldest first"""
+        entries = []
+        for folder, _, files in os.walk(root):
+            for name in files:
+                if os.path.splitext(name)[1] not in RENDER_MIME_TYPES:
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._total_bytes = sum(self._index.values())
+        self._index_root = root
+
+    @staticmethod
+    def make_key(document_id: int, file_hash: str, placeholder_values: Dict[str, Any], output_format: str) -> str:
+        """Build the cache key of a rendered document
+
+        Values are canonicalised the way the renderer sees them: keys and values
+        as strings, None dropped, keys sorted.
+
+        Args:
+            document_id: ID of the document template
+            file_hash: SHA-256 of the template file
+            placeholder_values: Dictionary of placeholder values keyed by placeholder name
+            output_format: Requested output format, e.g. 'pdf' or 'docx'
+
+        Returns:
+            Hex encoded SHA-256 digest
+        """
+        values = {str(key): str(value) for key, value in placeholder_values.items() if value is not None}
+        material = json.dumps([document_id, file_hash, values, output_format], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, document_id: int, key: str) -> Optional[str]:
+        """Look up a rendered document
+
+        Args:
+            document_id: ID of the document template
+            key: Cache key from make_key()
+
+        Returns:
+            Path of the cached file, or None on a miss
+        """
+        with self._lock:
+            folder = os.path.join(self._get_root(), str(document_id))
+            for extension in RENDER_MIME_TYPES:
+                path = os.path.join(folder, key + extension)
+                if os.path.exists(path):
+                    if path not in self._index:
+                        # Stored by another worker process sharing the directory
+                        size = os.path.getsize(path)
+                        self._index[path] = size
+                        self._total_bytes += size
+                    self._index.move_to_end(path)
+                    self.stats['hits'] += 1
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    return path
+            self.stats['misses'] += 1
+            return None
+
+    def store(self, document_id: int, key: str, source_path: str, move: bool = False) -> Optional[str]:
+        """Put a rendered file into the cache
+
+        Args:
+            document_id: ID of the document template
+            key: Cache key from make_key()
+            source_path: Rendered file; its extension selects the stored format
+            move: Whether the caller hands over source_path; it is then renamed
+                into the cache instead of copied, and only copied when the
+                cache is on another file system
+
+        Returns:
+            Path of the cached file, or None if it could not be stored
+        """
+        extension = os.path.splitext(source_path)[1].lower()
+        if extension not in RENDER_MIME_TYPES:
+            return None
+        size = os.path.getsize(source_path)
+        max_bytes = self._get_max_bytes()
+        if size > max_bytes:
+            logger.debug("Rendered file %s exceeds the render cache budget", source_path)
+            return None
+
+        with self._lock:
+            folder = os.path.join(self._get_root(), str(document_id))
+            path = os.path.join(folder, key + extension)
+            tmp_path = None
+            try:
+                os.makedirs(folder, exist_ok=True)
+                moved = False
+                if move:
+                    try:
+                        os.replace(source_path, path)
+                        moved = True
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            raise
+                if not moved:
+                    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+                    with os.fdopen(fd, 'wb') as target, open(source_path, 'rb') as source:
+                        shutil.copyfileobj(source, target)
+                    os.replace(tmp_path, path)
+                    if move:
+                        os.unlink(source_path)
+            except OSError as e:
+                logger.warning("Could not store rendered document in cache: %s", str(e))
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                return None
+
+            self._total_bytes -= self._index.pop(path, 0)
+            self._index[path] = size
+            self._total_bytes += size
+            self.stats['stores'] += 1
+            self._evict(max_bytes)
+            return path
+
+    def _evict(self, max_bytes: int) -> None:
+        """Delete least recently used artifacts until the budget is met"""
+        while self._total_bytes > max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def invalidate(self, document_id: int) -> None:
+        """Delete all rendered artifacts of a template
+
+        Args:
+            document_id: ID of the document template
+        """
+        with self._lock:
+            folder = os.path.join(self._get_root(), str(document_id))
+            for path in [p for p in self._index if os.path.dirname(p) == folder]:
+                self._total_bytes -= self._index.pop(path)
+            shutil.rmtree(folder, ignore_errors=True)
+        logger.debug("Invalidated rendered documents of template %s", document_id)
+
+    def clear(self) -> None:
+        """Delete all rendered artifacts"""
+        with self._lock:
+            root = self._get_root()
+            shutil.rmtree(root, ignore_errors=True)
+            self._index.clear()
+            self._total_bytes = 0
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get hit/miss counters and the cache size
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'render_cache_hits_total': self.stats['hits'],
+                'render_cache_misses_total': self.stats['misses'],
+                'render_cache_stores_total': self.stats['stores'],
+                'render_cache_evictions_total': self.stats['evictions'],
+                'render_cache_entries': len(self._index),
+                'render_cache_bytes': self._total_bytes,
+                'render_cache_hit_ratio': round(self.stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+# Singleton instance
+render_cache = RenderCache()
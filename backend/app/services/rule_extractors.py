@@ -0,0 +1,301 @@
+"""
+Rule-based extraction of structured fields before the LLM
+
+IBANs, VAT IDs, Steuernummern, emails, phone numbers, postal codes, dates,
+amounts and checkboxes follow fixed formats, so they are found with
+patterns and validators instead of a prompt. A value is accepted when it is
+unambiguous: the only valid value of its kind in the text (for kinds with a
+checksum or a distinctive format) or the only one standing next to a label
+such as the placeholder's name. Fields resolved this way are not sent to
+Ollama; when all are resolved the LLM call is skipped.
+
+Extractors for further kinds or single placeholders are added with
+rule_extractors.register().
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from app.services.config_values import get_config_value
+from app.services.field_patterns import FIELD_PATTERNS, fold, name_words, patterns_for_placeholder
+from app.services.validation import compact, digits, parse_amount, parse_bool, parse_date, parse_number
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+# Characters before a value searched for a label
+LABEL_DISTANCE = 80
+
+class Extraction(NamedTuple):
+    """A field value found by a rule"""
+    value: Any
+    confidence: float
+    extractor: str
+
+class FieldExtractor:
+    """Finds values of one kind in a text
+
+    Subclasses set kind (a FIELD_PATTERNS key unless pattern is given) and
+    override normalize() to validate and convert a match.
+    """
+
+    kind = ''
+    pattern: Optional['re.Pattern'] = None
+    # Words that label a value of this kind, in addition to the placeholder's name
+    labels: Tuple[str, ...] = ()
+    # Whether a single distinct value is accepted without a label
+    unique_is_confident = False
+    unique_confidence = 0.95
+    labeled_confidence = 0.92
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+    def normalize(self, raw: str) -> Optional[Any]:
+        """Convert a match to the field value, or None if it is not valid"""
+        return raw.strip()
+
+    def value_for(self, value: Any, raw: str, placeholder: Dict[str, Any]) -> Any:
+        """The value to fill into a placeholder, given the normalized value and the matched text"""
+        return value
+
+    def candidates(self, text: str) -> Iterator[Tuple[Any, str, int, int]]:
+        """Valid values in a text with the matched text and its start and end"""
+        for match in (self.pattern or FIELD_PATTERNS[self.kind]).finditer(text):
+            value = self.normalize(match.group())
+            if value is not None:
+                yield value, match.group().strip(), match.start(), match.end()
+
+    def extract(self, text: str, placeholder: Dict[str, Any]) -> Optional[Extraction]:
+        """Find the value of a placeholder
+
+        Args:
+            text: Document text
+            placeholder: Placeholder definition with name, type and description
+
+        Returns:
+            The extraction, or None if no value or several are possible
+        """
+        labels = label_words(placeholder) + list(self.labels)
+        raw_text: Dict[Any, str] = {}
+        labeled: List[Any] = []
+        previous_end = 0
+        for value, raw, start, end in self.candidates(text):
+            raw_text.setdefault(value, raw)
+            # A label belongs to the nearest value after it
+            if value not in labeled and is_labeled(text[max(previous_end, start - LABEL_DISTANCE):start], labels):
+                labeled.append(value)
+            previous_end = end
+        if not raw_text:
+            return None
+
+        if len(labeled) == 1:
+            value, confidence = labeled[0], self.labeled_confidence
+        elif len(raw_text) == 1 and self.unique_is_confident:
+            value, confidence = next(iter(raw_text)), self.unique_confidence
+        else:
+            return None
+        return Extraction(self.value_for(value, raw_text[value], placeholder), confidence, self.name)
+
+def label_words(placeholder: Dict[str, Any]) -> List[str]:
+    """Folded words of a placeholder's name and the longer words of its description"""
+    words = [word for word in name_words(placeholder.get('name', '')) if len(word) > 2]
+    words += [word for word in _WORD.findall(fold(placeholder.get('description') or '')) if len(word) >= 5]
+    return words
+
+def is_labeled(text: str, labels: List[str]) -> bool:
+    """Whether one of the labels occurs in the text before a value
+
+    A text word matches a label it starts with, or, for words of five or
+    more letters, a label it is the head of, so 'Einspruch' labels an
+    'Einspruchsfrist' field. A word inside or at the end of a compound
+    label does not: a generic 'Datum' is no label for 'Geburtsdatum'.
+    """
+    for word in _WORD.findall(fold(text)):
+        for label in labels:
+            if word.startswith(label) or (len(word) >= 5 and label.startswith(word)):
+                return True
+    return False
+
+class IbanExtractor(FieldExtractor):
+    kind = 'iban'
+    labels = ('iban', 'bankverbindung', 'konto')
+    unique_is_confident = True
+    unique_confidence = 0.97
+    labeled_confidence = 0.99
+
+    def normalize(self, raw: str) -> Optional[str]:
+        iban = compact(raw).upper()
+        if not 15 <= len(iban) <= 34:
+            return None
+        # ISO 13616 check digits: the rearranged number modulo 97 is 1
+        digits = ''.join(str(int(character, 36)) for character in iban[4:] + iban[:4])
+        return iban if int(digits) % 97 == 1 else None
+
+class VatIdExtractor(FieldExtractor):
+    kind = 'vat_id'
+    labels = ('ust', 'umsatzsteuer', 'vat')
+    unique_is_confident = True
+
+    def normalize(self, raw: str) -> Optional[str]:
+        return compact(raw).upper()
+
+class TaxNumberExtractor(FieldExtractor):
+    kind = 'tax_number'
+    pattern = re.compile(r'\b\d{2,3}/\d{3,4}/\d{4,5}\b|\b\d{10,13}\b')
+    labels = ('steuernummer', 'steuer', 'stnr')
+
+class EmailExtractor(FieldExtractor):
+    kind = 'email'
+    labels = ('mail',)
+    unique_is_confident = True
+
+    def normalize(self, raw: str) -> Optional[str]:
+        return raw.strip().lower()
+
+class PhoneExtractor(FieldExtractor):
+    kind = 'phone'
+    labels = ('tel', 'fon', 'mobil', 'phone', 'handy')
+
+    def normalize(self, raw: str) -> Optional[str]:
+        return raw.strip() if 6 <= len(digits(raw)) <= 15 else None
+
+class PostalCodeExtractor(FieldExtractor):
+    kind = 'postal_code'
+    # A postal code is followed by the city name
+    pattern = re.compile(r'\b\d{5}(?=\s+[A-ZÄÖÜ][a-zäöüß])')
+    labels = ('plz', 'postleitzahl')
+
+class DateExtractor(FieldExtractor):
+    kind = 'date'
+
+    def value_for(self, value: str, raw: str, placeholder: Dict[str, Any]) -> str:
+        # ISO dates for date fields, the date as written for text fields
+        return value if placeholder.get('type') == 'date' else raw
+
+    def normalize(self, raw: str) -> Optional[str]:
+        return parse_date(raw)
+
+class AmountExtractor(FieldExtractor):
+    kind = 'amount'
+
+    def value_for(self, value: float, raw: str, placeholder: Dict[str, Any]) -> Any:
+        return value if placeholder.get('type') == 'number' else raw
+
+    def normalize(self, raw: str) -> Optional[float]:
+        return parse_amount(raw)
+
+class NumberExtractor(AmountExtractor):
+    kind = 'number'
+
+    def normalize(self, raw: str) -> Optional[float]:
+        return parse_number(raw)
+
+class CheckboxExtractor(FieldExtractor):
+    kind = 'checkbox'
+    pattern = re.compile(r'(?<!\w)(?:ja|nein|yes|no|☒|☑|☐|\[x\]|\[ \])(?!\w)', re.IGNORECASE)
+    labeled_confidence = 0.9
+
+    def normalize(self, raw: str) -> Optional[bool]:
+        return parse_bool(raw)
+
+class RuleExtractorRegistry:
+    """Extractors by value kind and by placeholder name"""
+
+    def __init__(self):
+        self._by_kind: Dict[str, FieldExtractor] = {}
+        self._by_name: Dict[str, FieldExtractor] = {}
+        self._lock = threading.Lock()
+        self.stats = {'resolved': 0, 'unresolved': 0, 'calls_avoided': 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def register(self, extractor: FieldExtractor, names: Tuple[str, ...] = ()) -> FieldExtractor:
+        """Register an extractor for its kind, or only for the given placeholder names
+
+        Args:
+            extractor: Extractor instance
+            names: Placeholder names it handles; they take precedence over kinds
+
+        Returns:
+            The extractor
+        """
+        if names:
+            for name in names:
+                self._by_name[fold(name)] = extractor
+        else:
+            self._by_kind[extractor.kind] = extractor
+        return extractor
+
+    def extractor_for(self, placeholder: Dict[str, Any]) -> Optional[FieldExtractor]:
+        """The extractor handling a placeholder, if any"""
+        extractor = self._by_name.get(fold(placeholder.get('name', '')))
+        if extractor is not None:
+            return extractor
+        # A checkbox holds a yes/no answer whatever its name suggests
+        kinds = ['checkbox'] if placeholder.get('type') == 'checkbox' else patterns_for_placeholder(placeholder)
+        for kind in kinds:
+            if kind in self._by_kind:
+                return self._by_kind[kind]
+        return None
+
+    def extract(
+        self,
+        text: str,
+        placeholders: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Extraction], List[Dict[str, Any]]]:
+        """Resolve the placeholders a rule can fill with high confidence
+
+        Args:
+            text: Document text
+            placeholders: Placeholder definitions
+
+        Returns:
+            Tuple of (extractions by placeholder name, placeholders left for the LLM)
+        """
+        if not get_config_value('RULE_EXTRACTION_ENABLED', True) or not text:
+            return {}, list(placeholders)
+        min_confidence = get_config_value('RULE_EXTRACTION_MIN_CONFIDENCE', 0.9)
+        resolved, unresolved = {}, []
+        for placeholder in placeholders:
+            extractor = self.extractor_for(placeholder)
+            extraction = extractor.extract(text, placeholder) if extractor is not None else None
+            if extraction is not None and extraction.confidence >= min_confidence:
+                resolved[placeholder['name']] = extraction
+            else:
+                unresolved.append(placeholder)
+        self._count('resolved', len(resolved))
+        self._count('unresolved', len(unresolved))
+        if resolved:
+            logger.debug("Rules resolved %s; %d fields left for the LLM", sorted(resolved), len(unresolved))
+        return resolved, unresolved
+
+    def record_avoided_call(self) -> None:
+        """Count an LLM call that was not made because rules resolved every field"""
+        self._count('calls_avoided')
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get rule extraction counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'rule_extraction_fields_resolved_total': self.stats['resolved'],
+                'rule_extraction_fields_unresolved_total': self.stats['unresolved'],
+                'rule_extraction_llm_calls_avoided_total': self.stats['calls_avoided']
+            }
+
+# Singleton instance with the built-in extractors
+rule_extractors = RuleExtractorRegistry()
+for _extractor in (
+    IbanExtractor(), VatIdExtractor(), TaxNumberExtractor(), EmailExtractor(), PhoneExtractor(),
+    PostalCodeExtractor(), DateExtractor(), AmountExtractor(), NumberExtractor(), CheckboxExtractor()
+):
+    rule_extractors.register(_extractor)
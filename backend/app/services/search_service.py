@@ -0,0 +1,427 @@
+import os
+import html
+import logging
+import threading
+from typing import Dict, Any, List, Iterable, Optional
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session, object_session, selectinload
+from app import db
+from app.models import Document, Placeholder
+from app.models.document_search import DOCUMENT_SEARCH_FTS_TABLE, DOCUMENT_SEARCH_TABLE
+from app.services.config_values import get_config_value
+from app.services.document_service import document_service
+
+logger = logging.getLogger(__name__)
+
+# Marks around matched terms in snippets; replaced by <mark> after HTML-escaping the text
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# Document attributes whose change requires re-indexing
+INDEXED_ATTRIBUTES = ('title', 'content', 'placeholders', 'file_path')
+
+# Placeholder definition keys that hold no searchable text
+PLACEHOLDER_SKIP_KEYS = {'type', 'required', 'id'}
+
+# Session.info keys collecting the changes of the running transaction
+PENDING_KEY = 'search_index_pending'
+REMOVED_KEY = 'search_index_removed'
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the database has no full-text search backend"""
+
+class SearchBackend:
+    """Full-text index of documents on one kind of database
+
+    Each indexed document is a row with title, description, placeholders and
+    body (the extracted file text). search() returns (document_id, score,
+    snippet) tuples, best match first, with matched terms between MATCH_START
+    and MATCH_END.
+    """
+
+    def available(self, connection) -> bool:
+        raise NotImplementedError
+
+    def write(self, connection, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def delete(self, connection, document_ids: List[int]) -> None:
+        raise NotImplementedError
+
+    def clear(self, connection) -> None:
+        raise NotImplementedError
+
+    def is_empty(self, connection) -> bool:
+        raise NotImplementedError
+
+    def search(self, connection, query: str, filters: Dict[str, int], limit: int) -> List[tuple]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _filter_sql(filters: Dict[str, int]) -> str:
+        return ''.join(f" AND d.{column} = :{column}" for column in filters)
+
+class SqliteFtsBackend(SearchBackend):
+    """SQLite FTS5 table ranked with bm25, title matches weighing most"""
+
+    table = DOCUMENT_SEARCH_FTS_TABLE
+    # bm25 weights of title, description, placeholders and body
+    weights = (10.0, 4.0, 4.0, 1.0)
+
+    def available(self, connection) -> bool:
+        if connection.dialect.name != 'sqlite':
+            return False
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+        ).first() is not None
+
+    def write(self, connection, rows):
+        connection.execute(
+            text(f"INSERT INTO {self.table} (rowid, title, description, placeholders, body) "
+                 "VALUES (:id, :title, :description, :placeholders, :body)"),
+            rows
+        )
+
+    def delete(self, connection, document_ids):
+        connection.execute(
+            text(f"DELETE FROM {self.table} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(document_ids)}
+        )
+
+    def clear(self, connection):
+        connection.exec_driver_sql(f"DELETE FROM {self.table}")
+
+    def is_empty(self, connection):
+        return connection.exec_driver_sql(f"SELECT 1 FROM {self.table} LIMIT 1").first() is None
+
+    def _match_expression(self, query: str) -> str:
+        """FTS5 query of the words, all required; each word is a phrase of its tokens
+
+        A word like 143/815/08156 thereby matches the tokens in that order, and
+        the last word also matches as a prefix.
+        """
+        words = ['"{}"'.format(word.replace('"', '""')) for word in query.split()]
+        if words:
+            words[-1] += '*'
+        return ' '.join(words)
+
+    def search(self, connection, query, filters, limit):
+        weights = ', '.join(str(weight) for weight in self.weights)
+        statement = text(
+            f"SELECT d.id, -bm25({self.table}, {weights}) AS score, "
+            f"snippet({self.table}, -1, :start, :end, '…', 16) "
+            f"FROM {self.table} JOIN documents d ON d.id = {self.table}.rowid "
+            f"WHERE {self.table} MATCH :match{self._filter_sql(filters)} "
+            "ORDER BY score DESC, d.id LIMIT :limit"
+        )
+        params = dict(filters, match=self._match_expression(query), start=MATCH_START, end=MATCH_END, limit=limit)
+        return [tuple(row) for row in connection.execute(statement, params)]
+
+class PostgresTsvectorBackend(SearchBackend):
+    """PostgreSQL table with a generated, weighted tsvector behind a GIN index"""
+
+    table = DOCUMENT_SEARCH_TABLE
+    headline_options = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=20, MinWords=8, MaxFragments=1'
+
+    def available(self, connection) -> bool:
+        if connection.dialect.name != 'postgresql':
+            return False
+        return connection.execute(text("SELECT to_regclass(:table)"), {'table': self.table}).scalar() is not None
+
+    def write(self, connection, rows):
+        connection.execute(
+            text(f"INSERT INTO {self.table} (document_id, title, description, placeholders, body) "
+                 "VALUES (:id, :title, :description, :placeholders, :body)"),
+            rows
+        )
+
+    def delete(self, connection, document_ids):
+        connection.execute(
+            text(f"DELETE FROM {self.table} WHERE document_id IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(document_ids)}
+        )
+
+    def clear(self, connection):
+        connection.execute(text(f"DELETE FROM {self.table}"))
+
+    def is_empty(self, connection):
+        return connection.execute(text(f"SELECT 1 FROM {self.table} LIMIT 1")).first() is None
+
+    def search(self, connection, query, filters, limit):
+        statement = text(
+            "SELECT d.id, ts_rank(s.search_vector, q) AS score, "
+            "ts_headline('german', concat_ws(' ', s.title, s.description, s.placeholders, s.body), q, :options) "
+            f"FROM {self.table} s JOIN documents d ON d.id = s.document_id, "
+            "websearch_to_tsquery('german', :query) q "
+            f"WHERE s.search_vector @@ q{self._filter_sql(filters)} "
+            "ORDER BY score DESC, d.id LIMIT :limit"
+        )
+        params = dict(filters, query=query, options=self.headline_options, limit=limit)
+        return [tuple(row) for row in connection.execute(statement, params)]
+
+class SearchService:
+    """Full-text search over documents
+
+    Indexes each document's title, description, placeholder definitions and
+    values, and the text of its file as extracted (and cached) by
+    DocumentService. Changes to documents and placeholders are collected per
+    transaction and indexed once it commits, so uploads, replaced files and
+    deletes are reflected without re-indexing everything. The backend is
+    chosen by database: SQLite FTS5 or a PostgreSQL tsvector.
+    """
+
+    def __init__(self, backends: Optional[List[SearchBackend]] = None):
+        self.backends = backends or [SqliteFtsBackend(), PostgresTsvectorBackend()]
+        self._built_for = set()
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'indexed': 0, 'removed': 0, 'errors': 0, 'rebuilds': 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def backend(self, connection) -> Optional[SearchBackend]:
+        """The backend whose index exists on this connection's database, if any"""
+        for backend in self.backends:
+            if backend.available(connection):
+                return backend
+        return None
+
+    def _resolve_file_path(self, file_path: Optional[str]) -> Optional[str]:
+        """Path of a document file; work order documents store it relative to UPLOAD_FOLDER"""
+        if not file_path:
+            return None
+        resolved = document_service.resolve_file_path(file_path)
+        return resolved if os.path.exists(resolved) else None
+
+    def _placeholder_text(self, document: Document) -> str:
+        parts = []
+        for placeholder in document.placeholders or []:
+            if isinstance(placeholder, dict):
+                parts.extend(str(value) for key, value in placeholder.items()
+                             if key not in PLACEHOLDER_SKIP_KEYS and isinstance(value, (str, int, float)) and value != '')
+        for placeholder in document.document_placeholders:
+            parts.extend(value for value in (placeholder.name, placeholder.description, placeholder.value) if value)
+        return ' '.join(parts)
+
+    def _body_text(self, document: Document) -> str:
+        file_path = self._resolve_file_path(document.file_path)
+        if file_path is None:
+            return ''
+        try:
+            return document_service.get_document_text(file_path)
+        except Exception as e:
+            logger.warning("Could not extract text of document %d for search: %s", document.id, str(e))
+            self._count('errors')
+            return ''
+
+    def document_row(self, document: Document) -> Dict[str, Any]:
+        """Indexed fields of a document"""
+        return {
+            'id': document.id,
+            'title': document.title or '',
+            'description': document.content or '',
+            'placeholders': self._placeholder_text(document),
+            'body': self._body_text(document)
+        }
+
+    def index_documents(self, document_ids: Iterable[int]) -> int:
+        """(Re-)index documents, dropping those that no longer exist
+
+        Args:
+            document_ids: IDs of new or changed documents
+
+        Returns:
+            Number of indexed documents
+        """
+        ids = sorted(set(document_ids))
+        if not ids:
+            return 0
+        with Session(bind=db.engine) as session:
+            backend = self.backend(session.connection())
+            if backend is None:
+                return 0
+            documents = session.query(Document).options(selectinload(Document.document_placeholders)).filter(
+                Document.id.in_(ids)
+            ).all()
+            # Extract first: text extraction writes its cache in a session of its own
+            rows = [self.document_row(document) for document in documents]
+            connection = session.connection()
+            backend.delete(connection, ids)
+            if rows:
+                backend.write(connection, rows)
+            session.commit()
+        self._count('indexed', len(rows))
+        logger.debug("Indexed %d documents for search", len(rows))
+        return len(rows)
+
+    def remove_documents(self, document_ids: Iterable[int]) -> None:
+        """Drop deleted documents from the index
+
+        Args:
+            document_ids: IDs of deleted documents
+        """
+        ids = sorted(set(document_ids))
+        if not ids:
+            return
+        with Session(bind=db.engine) as session:
+            backend = self.backend(session.connection())
+            if backend is None:
+                return
+            backend.delete(session.connection(), ids)
+            session.commit()
+        self._count('removed', len(ids))
+
+    def apply_changes(self, changed: Iterable[int], removed: Iterable[int]) -> None:
+        """Bring the index up to date with a committed transaction; failures are logged only"""
+        try:
+            self.remove_documents(removed)
+            self.index_documents(changed)
+        except Exception as e:
+            logger.error("Failed to update the search index: %s", str(e), exc_info=True)
+            self._count('errors')
+
+    def search(self, query: str, client_id: Optional[int] = None, work_order_id: Optional[int] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find documents matching a query
+
+        Args:
+            query: Search words; all must occur, the last one also as a prefix
+            client_id: Only documents of this client
+            work_order_id: Only documents of this work order
+            limit: Maximum number of results (default: SEARCH_DEFAULT_LIMIT)
+
+        Returns:
+            List of dictionaries with document_id, score and snippet (HTML with
+            matches in <mark>), best match first
+
+        Raises:
+            SearchUnavailableError: If the database has no search index
+        """
+        max_limit = get_config_value('SEARCH_MAX_LIMIT', 100)
+        limit = min(limit or get_config_value('SEARCH_DEFAULT_LIMIT', 20), max_limit)
+        self.ensure_built()
+        connection = db.session.connection()
+        backend = self.backend(connection)
+        if backend is None:
+            raise SearchUnavailableError("Full-text search is not available on this database")
+
+        filters = {}
+        if client_id is not None:
+            filters['client_id'] = client_id
+        if work_order_id is not None:
+            filters['work_order_id'] = work_order_id
+        rows = backend.search(connection, query, filters, limit)
+        self._count('queries')
+        return [
+            {'document_id': document_id, 'score': round(float(score), 4), 'snippet': self._snippet_html(snippet)}
+            for document_id, score, snippet in rows
+        ]
+
+    def _snippet_html(self, snippet: Optional[str]) -> str:
+        return html.escape(snippet or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+    def ensure_built(self) -> None:
+        """Build the index once for databases whose documents predate it"""
+        engine_key = str(db.engine.url)
+        if engine_key in self._built_for:
+            return
+        with self._lock:
+            if engine_key in self._built_for:
+                return
+            connection = db.session.connection()
+            backend = self.backend(connection)
+            needs_build = (
+                backend is not None and backend.is_empty(connection)
+                and db.session.query(Document.id).first() is not None
+            )
+            self._built_for.add(engine_key)
+        if needs_build:
+            logger.info("Search index is empty, building it")
+            self.rebuild()
+
+    def rebuild(self, batch_size: int = 200) -> int:
+        """Recreate the index of all documents
+
+        Args:
+            batch_size: Documents indexed per transaction
+
+        Returns:
+            Number of indexed documents
+        """
+        with Session(bind=db.engine) as session:
+            backend = self.backend(session.connection())
+            if backend is None:
+                raise SearchUnavailableError("Full-text search is not available on this database")
+            backend.clear(session.connection())
+            session.commit()
+            ids = [document_id for document_id, in session.query(Document.id).order_by(Document.id)]
+        count = 0
+        for start in range(0, len(ids), batch_size):
+            count += self.index_documents(ids[start:start + batch_size])
+        self._count('rebuilds')
+        logger.info("Indexed %d documents for search", count)
+        return count
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get search and indexing counters
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'search_queries_total': self.stats['queries'],
+                'search_indexed_documents_total': self.stats['indexed'],
+                'search_removed_documents_total': self.stats['removed'],
+                'search_index_errors_total': self.stats['errors'],
+                'search_rebuilds_total': self.stats['rebuilds']
+            }
+
+# Singleton instance
+search_service = SearchService()
+
+def _changes(session, key):
+    return session.info.setdefault(key, set())
+
+@event.listens_for(Document, 'after_insert')
+def _track_new_document(mapper, connection, document):
+    session = object_session(document)
+    if session is not None:
+        _changes(session, PENDING_KEY).add(document.id)
+
+@event.listens_for(Document, 'after_update')
+def _track_changed_document(mapper, connection, document):
+    """Queue documents whose indexed content changed; status updates and the like are skipped."""
+    state = inspect(document)
+    session = object_session(document)
+    if session is not None and any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES):
+        _changes(session, PENDING_KEY).add(document.id)
+
+@event.listens_for(Document, 'after_delete')
+def _track_deleted_document(mapper, connection, document):
+    session = object_session(document)
+    if session is not None:
+        _changes(session, PENDING_KEY).discard(document.id)
+        _changes(session, REMOVED_KEY).add(document.id)
+
+@event.listens_for(Placeholder, 'after_insert')
+@event.listens_for(Placeholder, 'after_update')
+@event.listens_for(Placeholder, 'after_delete')
+def _track_placeholder(mapper, connection, placeholder):
+    session = object_session(placeholder)
+    if session is not None and placeholder.document_id is not None:
+        _changes(session, PENDING_KEY).add(placeholder.document_id)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    """Index the documents changed by the committed transaction."""
+    changed = session.info.pop(PENDING_KEY, set())
+    removed = session.info.pop(REMOVED_KEY, set())
+    if changed or removed:
+        search_service.apply_changes(changed - removed, removed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(REMOVED_KEY, None)
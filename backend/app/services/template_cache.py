@@ -0,0 +1,258 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from xml.sax.saxutils import escape, unescape
+from app.services.config_values import get_config_value
+from app.services.docx_render import iter_paragraph_elements, replace_in_paragraph
+
+logger = logging.getLogger(__name__)
+
+# Private-use characters that mark a placeholder in the compiled XML
+_SLOT_OPEN = '\ue000'
+_SLOT_CLOSE = '\ue001'
+_SLOT_PATTERN = re.compile(_SLOT_OPEN + '([^' + _SLOT_CLOSE + ']*)' + _SLOT_CLOSE)
+
+# Characters that are not allowed in XML 1.0 text
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+class RenderPlan:
+    """Immutable, pre-parsed form of a DOCX template
+
+    Every placeholder token of the template has been normalised into a single
+    text node and the XML parts holding tokens are stored as alternating
+    static text and placeholder names. All other package parts are kept as
+    their original bytes, so a render only splices escaped values into the
+    templated parts and writes the zip.
+    """
+
+    __slots__ = ('_entries', 'placeholders')
+
+    def __init__(self, entries: Tuple[Tuple[zipfile.ZipInfo, Any], ...], placeholders: frozenset):
+        """Initialize the plan
+
+        Args:
+            entries: Zip entries in package order, each with either the original
+                bytes or a tuple of segments (even index: static text, odd
+                index: placeholder name)
+            placeholders: Names of all placeholders in the template
+        """
+        self._entries = entries
+        self.placeholders = placeholders
+
+    @property
+    def templated_parts(self) -> List[str]:
+        """Names of the package parts that contain placeholders"""
+        return [info.filename for info, content in self._entries if isinstance(content, tuple)]
+
+    def _render_part(self, segments: Tuple[str, ...], values: Dict[str, str]) -> bytes:
+        """Join the segments of one templated part with the given values"""
+        pieces = []
+        for index, segment in enumerate(segments):
+            if index % 2 == 0:
+                pieces.append(segment)
+                continue
+            value = values.get(segment)
+            if value is None:
+                # Unfilled placeholders stay in the document as tokens
+                value = '{{' + segment + '}}'
+            pieces.append(escape(_INVALID_XML_CHARS.sub('', value)))
+        return ''.join(pieces).encode('utf-8')
+
+    def render_to_file(self, placeholder_values: Dict[str, Any], output_path: str) -> int:
+        """Write the template with placeholders filled in to a DOCX file
+
+        Args:
+            placeholder_values: Dictionary of placeholder values keyed by placeholder name
+            output_path: Path of the DOCX file to write
+
+        Returns:
+            Number of filled placeholder names
+        """
+        values = {key: str(value) for key, value in placeholder_values.items() if value is not None}
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as package:
+            for info, content in self._entries:
+                if isinstance(content, tuple):
+                    content = self._render_part(content, values)
+                # writestr() records offsets and sizes on the ZipInfo, so plans shared
+                # between threads must never hand out their own instances
+                entry = zipfile.ZipInfo(info.filename, info.date_time)
+                entry.compress_type = info.compress_type
+                entry.external_attr = info.external_attr
+                package.writestr(entry, content)
+        return len(self.placeholders.intersection(values))
+
+def compile_template(file_path: str) -> RenderPlan:
+    """Parse a DOCX template into a render plan
+
+    The run-level replacement of docx_render is applied once with slot markers
+    instead of values, so tokens split across runs are merged exactly as in a
+    regular render.
+
+    Args:
+        file_path: Path to the DOCX template
+
+    Returns:
+        The compiled render plan
+    """
+    import docx
+
+    doc = docx.Document(file_path)
+    placeholders = set()
+
+    def mark(name: str) -> str:
+        placeholders.add(name)
+        return _SLOT_OPEN + name + _SLOT_CLOSE
+
+    templated_roots = set()
+    for paragraph in iter_paragraph_elements(doc):
+        if replace_in_paragraph(paragraph, mark):
+            templated_roots.add(id(paragraph.getroottree().getroot()))
+
+    # Serialize each part that received markers and split it into segments
+    segments_by_name = {}
+    parts = [doc.part] + [
+        rel.target_part for rel in doc.part.rels.values() if not rel.is_external
+    ]
+    for part in parts:
+        if id(getattr(part, '_element', None)) not in templated_roots:
+            continue
+        xml = part.blob.decode('utf-8')
+        segments = []
+        position = 0
+        for match in _SLOT_PATTERN.finditer(xml):
+            segments.append(xml[position:match.start()])
+            segments.append(unescape(match.group(1)))
+            position = match.end()
+        segments.append(xml[position:])
+        segments_by_name[part.partname.lstrip('/')] = tuple(segments)
+
+    entries = []
+    with zipfile.ZipFile(file_path) as package:
+        for info in package.infolist():
+            content = segments_by_name.get(info.filename)
+            if content is None:
+                content = package.read(info)
+            entries.append((info, content))
+
+    logger.debug("Compiled template %s: %d placeholders in %d parts", file_path, len(placeholders), len(segments_by_name))
+    return RenderPlan(tuple(entries), frozenset(placeholders))
+
+class TemplateCache:
+    """LRU of compiled DOCX templates
+
+    Plans are keyed by (document id, SHA-256 of the template file). The hash is
+    remembered per path together with the file's mtime and size, so a lookup
+    for an unchanged file costs one stat call, and a replaced file is never
+    served from a stale plan.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum number of plans kept (default: TEMPLATE_CACHE_SIZE)
+        """
+        self.max_entries = max_entries
+        self._plans = OrderedDict()  # (document id, file hash) -> RenderPlan
+        self._hashes = {}  # path -> (mtime, size, file hash)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _get_max_entries(self) -> int:
+        """Get the configured number of cached plans"""
+        if self.max_entries is not None:
+            return self.max_entries
+        return get_config_value('TEMPLATE_CACHE_SIZE', 32)
+
+    def file_hash(self, file_path: str) -> str:
+        """Get the SHA-256 of a file, rehashing only when mtime or size change"""
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        with self._lock:
+            known = self._hashes.get(key)
+        if known is not None and known[0] == stat.st_mtime and known[1] == stat.st_size:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(key, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+        with self._lock:
+            self._hashes[key] = (stat.st_mtime, stat.st_size, file_hash)
+        return file_hash
+
+    def get_plan(self, document_id: int, file_path: str) -> RenderPlan:
+        """Get the render plan of a template, compiling it on first use
+
+        Args:
+            document_id: ID of the document template
+            file_path: Path to the DOCX template
+
+        Returns:
+            The compiled render plan
+        """
+        key = (document_id, self.file_hash(file_path))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.stats['hits'] += 1
+                return plan
+            self.stats['misses'] += 1
+
+        plan = compile_template(file_path)
+
+        with self._lock:
+            # Plans of an older version of the same template can never be hit again
+            for stale in [k for k in self._plans if k[0] == document_id and k != key]:
+                del self._plans[stale]
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            max_entries = max(1, self._get_max_entries())
+            while len(self._plans) > max_entries:
+                self._plans.popitem(last=False)
+                self.stats['evictions'] += 1
+        return plan
+
+    def invalidate(self, document_id: int, file_path: Optional[str] = None) -> None:
+        """Drop the plans of a template that was changed or deleted
+
+        Args:
+            document_id: ID of the document template
+            file_path: Path to the template file, whose remembered hash is dropped too
+        """
+        with self._lock:
+            for key in [k for k in self._plans if k[0] == document_id]:
+                del self._plans[key]
+            if file_path:
+                self._hashes.pop(os.path.abspath(file_path), None)
+        logger.debug("Invalidated compiled template for document %s", document_id)
+
+    def clear(self) -> None:
+        """Drop all cached plans"""
+        with self._lock:
+            self._plans.clear()
+            self._hashes.clear()
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get hit/miss counters and the number of cached plans
+
+        Returns:
+            Dictionary of metric name to value
+        """
+        with self._lock:
+            return {
+                'template_cache_hits_total': self.stats['hits'],
+                'template_cache_misses_total': self.stats['misses'],
+                'template_cache_evictions_total': self.stats['evictions'],
+                'template_cache_entries': len(self._plans)
+            }
+
+# Singleton instance
+template_cache = TemplateCache()
@@ -0,0 +1,161 @@
+"""
+Token-budgeted text windows and merging of per-window LLM results
+
+Long documents are split into overlapping windows that fit into the model's
+context next to the prompt. Each window is sent on its own, and the answers
+for each field are merged by confidence, so values from any page of a
+document are found instead of only those on the first few pages.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Placeholder answers small models copy from the JSON template instead of null
+_EMPTY_VALUES = {'', 'null', 'none', 'n/a', 'unknown', 'unbekannt'}
+_WHITESPACE = re.compile(r'\s+')
+
+# Preferred window boundaries, best first: paragraph, line, sentence, word
+_BREAKS = ('\n\n', '\n', '. ', ' ')
+
+def estimate_tokens(text: str, chars_per_token: float = 3.5) -> int:
+    """Estimate the number of tokens of a text
+
+    Ollama has no tokenizer endpoint; German business text averages about
+    3.5 characters per token with the common BPE vocabularies.
+
+    Args:
+        text: Text to measure
+        chars_per_token: Average characters per token
+
+    Returns:
+        Estimated token count, rounded up
+    """
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+def split_into_windows(text: str, window_chars: int, overlap_chars: int = 0) -> List[str]:
+    """Split text into overlapping windows of at most window_chars characters
+
+    Windows end at a paragraph, line, sentence or word boundary in their
+    second half where there is one, and the next window starts overlap_chars
+    earlier, so a value cut by one boundary is complete in the other window.
+
+    Args:
+        text: Text to split
+        window_chars: Maximum characters per window
+        overlap_chars: Characters repeated at the start of the next window
+
+    Returns:
+        List of windows; the text itself if it fits into one
+    """
+    if len(text) <= window_chars:
+        return [text]
+    overlap_chars = min(overlap_chars, window_chars // 2)
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(start + window_chars, len(text))
+        if end < len(text):
+            end = _break_position(text, start + window_chars // 2, end)
+        windows.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = max(end - overlap_chars, start + 1)
+        if next_start < end:
+            # Start the overlap at a word boundary
+            space = text.find(' ', next_start, end)
+            next_start = space + 1 if space != -1 else next_start
+        start = next_start
+    return windows
+
+def _break_position(text: str, lower: int, upper: int) -> int:
+    for separator in _BREAKS:
+        position = text.rfind(separator, lower, upper)
+        if position != -1:
+            return position + len(separator)
+    return upper
+
+def as_confidence(value: Any, default: float = 0.5) -> float:
+    """Read a model-reported confidence as a number between 0 and 1"""
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return default
+    if confidence > 1:
+        # Some models answer in percent
+        confidence /= 100
+    return min(max(confidence, 0.0), 1.0)
+
+def is_empty_value(value: Any) -> bool:
+    """Whether an extracted value means 'not found'"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        return normalized in _EMPTY_VALUES or normalized.endswith('_or_null')
+    return False
+
+def _normalize(value: Any) -> str:
+    return _WHITESPACE.sub(' ', str(value)).strip().lower()
+
+def merge_extractions(results: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Merge the field values extracted from several windows
+
+    Each field takes the value with the highest combined confidence. Windows
+    that agree on a value combine their confidences (1 - prod(1 - c)), so a
+    value found on several pages beats a single guess.
+
+    Args:
+        results: Per-window results with 'values' ({field: value}), the window
+            'confidence' and optionally 'field_confidence' ({field: confidence})
+
+    Returns:
+        Tuple of (merged values, confidence per merged field)
+    """
+    candidates: Dict[str, Dict[str, List[Any]]] = {}
+    for result in results:
+        window_confidence = as_confidence(result.get('confidence'))
+        field_confidence = result.get('field_confidence') or {}
+        for field, value in (result.get('values') or {}).items():
+            if is_empty_value(value):
+                continue
+            confidence = as_confidence(field_confidence.get(field), window_confidence)
+            entry = candidates.setdefault(field, {}).setdefault(_normalize(value), [value, []])
+            entry[1].append(confidence)
+
+    merged, confidences = {}, {}
+    for field, options in candidates.items():
+        scored = [
+            (1 - math.prod(1 - confidence for confidence in found), max(found), value)
+            for value, found in options.values()
+        ]
+        combined, _, value = max(scored, key=lambda item: (item[0], item[1]))
+        merged[field] = value
+        confidences[field] = round(combined, 3)
+    return merged, confidences
+
+def flatten(values: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Flatten nested dictionaries to dotted keys ({'a': {'b': 1}} -> {'a.b': 1})"""
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def unflatten(values: Dict[str, Any], template: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Inverse of flatten(); keys of template missing in values are set to None"""
+    nested: Dict[str, Any] = {}
+    for key in flatten(template or {}):
+        _set_path(nested, key, None)
+    for key, value in values.items():
+        _set_path(nested, key, value)
+    return nested
+
+def _set_path(nested: Dict[str, Any], key: str, value: Any) -> None:
+    *parents, leaf = key.split('.')
+    for parent in parents:
+        nested = nested.setdefault(parent, {})
+    nested[leaf] = value
@@ -95,13 +95,16 @@ class UserService:
         return user.to_dict()
     
     @staticmethod
-    def get_available_models() -> Dict[str, Any]:
+    def get_available_models(force_refresh: bool = False) -> Dict[str, Any]:
         """Get available Ollama models and system status
         
+        Args:
+            force_refresh: Bypass the cached Ollama status snapshot
+            
         Returns:
             Dictionary containing Ollama status and available models
         """
-        ollama_status = ollama_service.get_ollama_status()
+        ollama_status = ollama_service.get_ollama_status(force_refresh=force_refresh)
         
         result = {
             'ollama_status': ollama_status,
@@ -0,0 +1,260 @@
+"""
+Validation and normalisation of extracted field values
+
+Precompiled patterns and type-dispatched validators for values coming from
+the LLM or from the rule extractors: German and ISO dates, decimal-comma
+numbers, currency amounts, checkboxes and select options. Also holds the
+helpers the LLM service and the agent use on every response (removing
+<think> blocks, finding the JSON object in an answer, keeping only digits).
+"""
+
+import json
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_THINK_BLOCK = re.compile(r'<think>.*?</think>\s*', re.DOTALL | re.IGNORECASE)
+_NON_DIGIT = re.compile(r'\D')
+_WHITESPACE = re.compile(r'\s+')
+_JSON_DECODER = json.JSONDecoder()
+
+_MONTHS = {
+    'januar': 1, 'jan': 1, 'februar': 2, 'feb': 2, 'maerz': 3, 'märz': 3, 'mär': 3, 'mrz': 3, 'april': 4, 'apr': 4,
+    'mai': 5, 'juni': 6, 'jun': 6, 'juli': 7, 'jul': 7, 'august': 8, 'aug': 8, 'september': 9, 'sep': 9, 'sept': 9,
+    'oktober': 10, 'okt': 10, 'november': 11, 'nov': 11, 'dezember': 12, 'dez': 12
+}
+_MONTH_NAMES = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+
+# Date formats in order of preference: pattern and the order of its (year, month, day) groups
+DATE_FORMATS: Tuple[Tuple['re.Pattern', Tuple[int, int, int]], ...] = (
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), (1, 2, 3)),                        # YYYY-MM-DD
+    (re.compile(r'(\d{1,2})\.\s?(\d{1,2})\.\s?(\d{4}|\d{2})(?!\d)'), (3, 2, 1)),    # DD.MM.YYYY, D.M.YY
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), (3, 1, 2)),                        # MM/DD/YYYY
+    (re.compile(rf'(\d{{1,2}})\.?\s*({_MONTH_NAMES})\.?\s+(\d{{4}})', re.IGNORECASE), (3, 2, 1)),  # 5. Mai 2025
+)
+
+# A number with optional thousands separators (point, space or comma) and decimals
+_NUMBER = re.compile(r'-?\d{1,3}(?:[.\s]\d{3})+(?:,\d+)?(?!\d)|-?\d{1,3}(?:,\d{3})+(?:\.\d+)?(?!\d)|-?\d+(?:[.,]\d+)?')
+_CURRENCY = re.compile(r'€|\bEUR\b|\bEuro\b', re.IGNORECASE)
+
+TRUE_WORDS = frozenset(('true', '1', 'yes', 'ja', 'wahr', 'x', '[x]', '☒', '☑'))
+
+def strip_thinking(text: str) -> str:
+    """Return the text after the last <think>...</think> block, or the text if nothing follows it"""
+    if not text or '</' not in text:
+        return text
+    last = None
+    for last in _THINK_BLOCK.finditer(text):
+        pass
+    if last is None:
+        return text
+    cleaned = text[last.end():].strip()
+    return cleaned if cleaned else text
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Decode the first JSON object in a model answer
+
+    Unlike a greedy '{.*}' search, text after the object (or a second
+    object) does not break decoding, and nothing past the object is scanned.
+
+    Args:
+        text: Model answer
+
+    Returns:
+        The object, or None if the answer holds none
+    """
+    start = text.find('{') if text else -1
+    while start != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find('{', start + 1)
+    return None
+
+@lru_cache(maxsize=4096)
+def digits(value: str) -> str:
+    """The digits of a phone number or identifier"""
+    return _NON_DIGIT.sub('', value)
+
+def compact(value: str) -> str:
+    """A value without whitespace, e.g. a formatted IBAN"""
+    return _WHITESPACE.sub('', value)
+
+def parse_date(value: Any) -> Optional[str]:
+    """Normalise a date to YYYY-MM-DD
+
+    Accepts ISO dates, German numeric dates (31.05.2025, 1.6.25), US
+    slashed dates (05/31/2025) and dates with German month names
+    (31. Mai 2025) anywhere in the value. A match that is no valid date,
+    such as 31.02.2025, is skipped in favour of later matches and formats.
+
+    Returns:
+        The ISO date, or None if the value holds no valid date
+    """
+    if not isinstance(value, str):
+        return value.isoformat() if isinstance(value, date) else None
+    for pattern, (year_group, month_group, day_group) in DATE_FORMATS:
+        for match in pattern.finditer(value):
+            month = match.group(month_group)
+            month = int(month) if month.isdigit() else _MONTHS.get(month.lower())
+            year = int(match.group(year_group))
+            if year < 100:
+                year += 2000
+            try:
+                return date(year, month, int(match.group(day_group))).isoformat()
+            except (TypeError, ValueError):
+                continue
+    return None
+
+def _to_float(token: str, amount: bool = False) -> Optional[float]:
+    """Convert a number token with German or English separators
+
+    Points separate thousands when there are several groups or a decimal
+    comma follows. A single point before three digits is a decimal point
+    (3.141), except in amounts, whose decimals are cents (1.250 € is 1250),
+    and never after a zero integer part (0.250).
+    """
+    token = _WHITESPACE.sub('', token)
+    if ',' in token and '.' in token:
+        # The separator that comes last marks the decimals
+        if token.rfind(',') > token.rfind('.'):
+            token = token.replace('.', '').replace(',', '.')
+        else:
+            token = token.replace(',', '')
+    elif ',' in token:
+        # Several commas separate thousands (1,250,000); a single one marks the decimals
+        head, _, tail = token.rpartition(',')
+        token = token.replace(',', '') if len(tail) == 3 and token.count(',') > 1 else f"{head.replace(',', '')}.{tail}"
+    elif token.count('.') > 1:
+        token = token.replace('.', '')
+    elif amount and '.' in token:
+        head, _, tail = token.partition('.')
+        if len(tail) == 3 and head.lstrip('-') != '0':
+            token = head + tail
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+def _parse(value: Any, amount: bool) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    if amount:
+        value = _CURRENCY.sub('', value)
+    match = _NUMBER.search(value)
+    return _to_float(match.group(), amount) if match else None
+
+def parse_number(value: Any) -> Optional[float]:
+    """Convert a value to a number, reading decimal commas and thousands points
+
+    Returns:
+        The number, or None if the value holds none
+    """
+    return _parse(value, amount=False)
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Convert a currency amount (1.250,00 €, 1.250 €, EUR 99, -12,5) to euros rounded to cents"""
+    number = _parse(value, amount=True)
+    return round(number, 2) if number is not None else None
+
+def parse_bool(value: Any) -> bool:
+    """Read a checkbox value (true, ja, X, ☒, 1, ...)"""
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_WORDS
+    return bool(value)
+
+class OptionIndex:
+    """Select options prepared for matching extracted values"""
+
+    def __init__(self, options: Tuple[str, ...]):
+        self.options = options
+        self._exact = frozenset(options)
+        self._folded = [(option.lower(), option) for option in options]
+        self._by_folded = {}
+        for folded, option in self._folded:
+            self._by_folded.setdefault(folded, option)
+
+    def match(self, value: Any) -> str:
+        """The option a value stands for
+
+        An exact or case-insensitive match wins; otherwise the first option
+        containing the value or contained in it. Values matching no option
+        are returned unchanged.
+        """
+        value = str(value)
+        if value in self._exact:
+            return value
+        folded = value.lower()
+        option = self._by_folded.get(folded)
+        if option is not None:
+            return option
+        for option_folded, option in self._folded:
+            if folded in option_folded or option_folded in folded:
+                return option
+        return value
+
+@lru_cache(maxsize=256)
+def option_index(options: Tuple[str, ...]) -> OptionIndex:
+    """Get the prepared index of a set of select options"""
+    return OptionIndex(options)
+
+def _validate_select(value: Any, placeholder: Dict[str, Any]) -> Optional[str]:
+    options = placeholder.get('options') or ()
+    if not options:
+        return str(value)
+    return option_index(tuple(str(option) for option in options)).match(value)
+
+# Validators by placeholder type; each returns the cleaned value or None to drop it
+VALIDATORS: Dict[str, Callable[[Any, Dict[str, Any]], Any]] = {
+    'number': lambda value, placeholder: parse_number(value),
+    'amount': lambda value, placeholder: parse_amount(value),
+    'date': lambda value, placeholder: parse_date(value),
+    'checkbox': lambda value, placeholder: parse_bool(value),
+    'select': _validate_select
+}
+
+def _validate_text(value: Any, placeholder: Dict[str, Any]) -> str:
+    return str(value).strip()
+
+def validate_value(value: Any, placeholder: Dict[str, Any]) -> Any:
+    """Clean one extracted value according to its placeholder's type
+
+    Args:
+        value: Extracted value
+        placeholder: Placeholder definition with type and, for selects, options
+
+    Returns:
+        The cleaned value, or None if it is empty or not valid for the type
+    """
+    if value is None or value == "":
+        return None
+    return VALIDATORS.get(placeholder.get('type', 'text'), _validate_text)(value, placeholder)
+
+def validate_values(values: Dict[str, Any], placeholders: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Clean extracted values, dropping unknown fields and invalid or empty values
+
+    Args:
+        values: Extracted values by placeholder name
+        placeholders: Placeholder definitions
+
+    Returns:
+        Cleaned values by placeholder name
+    """
+    placeholder_map = {placeholder['name']: placeholder for placeholder in placeholders}
+    cleaned = {}
+    for name, value in values.items():
+        placeholder = placeholder_map.get(name)
+        if placeholder is None:
+            continue
+        value = validate_value(value, placeholder)
+        if value is not None:
+            cleaned[name] = value
+    return cleaned
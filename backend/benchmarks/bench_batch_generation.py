@@ -0,0 +1,82 @@
+"""Measure batch document generation throughput in documents per second.
+
+Compares one parse-fill-save per document (what a create-from-template call
+per client costs) with the batch service, which splices every document into a
+single compiled template on a worker pool.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_batch_generation --documents 200 --workers 1 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import docx
+
+from app import create_app
+from app.services.batch_service import BatchGenerationService
+from app.services.docx_render import render_placeholders
+from app.services.template_cache import compile_template
+from benchmarks.synthetic_docs import build_docx_template
+
+
+def per_document_parse(template_path, items, output_dir):
+    for item in items:
+        document = docx.Document(template_path)
+        render_placeholders(document, item['values'])
+        document.save(os.path.join(output_dir, f"{item['index']}.docx"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--placeholders', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    template, names = build_docx_template(args.pages, args.placeholders)
+    items = [
+        {'index': index, 'client_id': None, 'label': f'dokument_{index}',
+         'values': {name: f'Mandant {index} {name}' for name in names}}
+        for index in range(args.documents)
+    ]
+
+    app = create_app()
+    folder = tempfile.mkdtemp(prefix='bench-batch-')
+    try:
+        template_path = os.path.join(folder, 'template.docx')
+        with open(template_path, 'wb') as f:
+            f.write(template)
+        print(f"{args.documents} documents, {args.pages} pages, {args.placeholders} placeholders each")
+        print(f"{'mode':<24} {'seconds':>9} {'docs/sec':>10}")
+
+        output_dir = os.path.join(folder, 'baseline')
+        os.makedirs(output_dir)
+        started = time.perf_counter()
+        per_document_parse(template_path, items, output_dir)
+        elapsed = time.perf_counter() - started
+        print(f"{'parse per document':<24} {elapsed:>9.3f} {args.documents / elapsed:>10.1f}")
+
+        plan = compile_template(template_path)
+        for workers in args.workers:
+            app.config['BATCH_MAX_WORKERS'] = workers
+            service = BatchGenerationService()
+            output_dir = os.path.join(folder, f'batch_{workers}')
+            os.makedirs(output_dir)
+            with app.app_context():
+                started = time.perf_counter()
+                results = list(service.render_items(plan, items, output_dir))
+                elapsed = time.perf_counter() - started
+            failed = sum(1 for result in results if 'error' in result)
+            label = f"batch, {workers} workers"
+            print(f"{label:<24} {elapsed:>9.3f} {args.documents / elapsed:>10.1f}" + (f"  ({failed} failed)" if failed else ''))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Compare placeholder extraction modes on long documents.
+
+Builds multi-page German documents with field values planted in sentences on
+random pages and extracts them with LLM_EXTRACTION_MODE=truncate (the first
+4000 characters), LLM_EXTRACTION_MODE=chunked (token-budgeted windows of the
+whole text, merged by confidence), chunked with passage retrieval (only
+the passages ranked highest for the fields are sent) and retrieval behind
+the rule extractors (labelled dates and Steuernummern are filled without the
+LLM and only the remaining fields are prompted for). Reports field
+accuracy, LLM calls, prompt tokens and wall-clock time per document for each
+document length.
+
+Without --ollama a simulated model answers: it finds exactly the planted
+values present in the prompt it receives and takes --latency-ms plus
+--ms-per-1k-tokens per thousand prompt tokens, so the numbers show what
+truncation loses and what the extra calls cost. With --ollama the real model
+is used and accuracy also reflects the model.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_chunked_extraction --documents 10 --pages 2 10 30
+    python -m benchmarks.bench_chunked_extraction --ollama http://localhost:11434 --model qwen3:0.6b
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import create_app
+from app.services.llm_service import OllamaService
+from app.services.text_chunking import estimate_tokens
+
+def _date(rng):
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    return f"{day:02d}.{month:02d}.2025", f"2025-{month:02d}-{day:02d}"
+
+
+def _identifier(template):
+    def make(rng):
+        value = template(rng)
+        return value, value
+    return make
+
+
+# name: (type, description, value generator -> (text, expected), sentence, pattern the simulated model finds)
+FIELDS = {
+    'Aktenzeichen': (
+        'text', 'Zeichen des Vorgangs', _identifier(lambda rng: f"AZ-{rng.randint(1000, 9999)}-{rng.randint(10, 99)}"),
+        "Bitte geben Sie bei Rückfragen unser Zeichen {} an.", r"AZ-\d{4}-\d{2}"
+    ),
+    'Steuernummer': (
+        'text', '', _identifier(lambda rng: f"{rng.randint(100, 999)}/{rng.randint(100, 999)}/{rng.randint(10000, 99999)}"),
+        "Der Bescheid ergeht unter der Steuer-Nr. {} an Sie.", r"\d{3}/\d{3}/\d{5}"
+    ),
+    'Einspruchsfrist': (
+        'date', 'Ende der Frist für einen Einspruch', _date,
+        "Ein Einspruch ist bis zum {} schriftlich einzulegen.", r"\d{2}\.\d{2}\.\d{4}"
+    ),
+    'Rechnungsbetrag': (
+        'text', 'Zu zahlender Betrag in Euro', _identifier(lambda rng: f"{rng.randint(100, 999)}.{rng.randint(100, 999)},{rng.randint(10, 99)} €"),
+        "Bitte überweisen Sie {} innerhalb von zwei Wochen.", r"\d{3}\.\d{3},\d{2} €"
+    )
+}
+PLACEHOLDERS = [{'name': name, 'type': spec[0], 'description': spec[1]} for name, spec in FIELDS.items()]
+MODES = {
+    'truncate': {'LLM_EXTRACTION_MODE': 'truncate', 'PASSAGE_RETRIEVAL_ENABLED': False, 'RULE_EXTRACTION_ENABLED': False},
+    'chunked': {'LLM_EXTRACTION_MODE': 'chunked', 'PASSAGE_RETRIEVAL_ENABLED': False, 'RULE_EXTRACTION_ENABLED': False},
+    'retrieval': {'LLM_EXTRACTION_MODE': 'chunked', 'PASSAGE_RETRIEVAL_ENABLED': True, 'RULE_EXTRACTION_ENABLED': False},
+    'rules': {'LLM_EXTRACTION_MODE': 'chunked', 'PASSAGE_RETRIEVAL_ENABLED': True, 'RULE_EXTRACTION_ENABLED': True}
+}
+SENTENCES = [
+    "Die Kanzlei bestätigt den Eingang der Unterlagen vom Vormonat.",
+    "Nach Prüfung der Belege ergeben sich keine weiteren Rückfragen.",
+    "Bitte reichen Sie fehlende Nachweise zeitnah bei uns ein.",
+    "Die Angaben wurden mit den Vorjahreswerten abgeglichen.",
+    "Für Rückfragen steht Ihnen Ihr Ansprechpartner gerne zur Verfügung."
+]
+
+
+def build_document(rng, pages):
+    """A document of about 2500 characters per page with every field planted once."""
+    page_texts = []
+    for page in range(pages):
+        sentences = [rng.choice(SENTENCES) for _ in range(40)]
+        page_texts.append(f"Seite {page + 1}\n" + " ".join(sentences))
+    expected = {}
+    for name, (_, _, make_value, sentence, _) in FIELDS.items():
+        text, expected[name] = make_value(rng)
+        page = rng.randrange(pages)
+        page_texts[page] += "\n\n" + sentence.format(text)
+    return "\n\n".join(page_texts), expected
+
+
+def start_simulated_model(latency_ms, ms_per_1k_tokens, context_length):
+    """Serve /api/show and /api/generate like a model that reads only its prompt."""
+    patterns = {name: re.compile(spec[4]) for name, spec in FIELDS.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/api/show':
+                body = {'model_info': {'simulated.context_length': context_length}}
+            else:
+                prompt = payload.get('prompt', '')
+                time.sleep((latency_ms + ms_per_1k_tokens * estimate_tokens(prompt) / 1000) / 1000)
+                values = {}
+                for name, pattern in patterns.items():
+                    match = pattern.search(prompt)
+                    values[name] = match.group() if match else None
+                found = sum(value is not None for value in values.values())
+                body = {'response': json.dumps({
+                    'extracted_values': values,
+                    'confidence': 0.9 if found else 0.2
+                }), 'done': True}
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_mode(app, mode, documents, model):
+    app.config.update(MODES[mode])
+    with app.app_context():
+        service = OllamaService()
+        generate_completion = service.generate_completion
+        counts = {'calls': 0, 'tokens': 0}
+        lock = threading.Lock()
+
+        def counted(prompt, system_prompt=None, **kwargs):
+            with lock:
+                counts['calls'] += 1
+                counts['tokens'] += estimate_tokens(prompt + (system_prompt or ''))
+            return generate_completion(prompt, system_prompt=system_prompt, **kwargs)
+
+        service.generate_completion = counted
+        correct = 0
+        started = time.perf_counter()
+        try:
+            for text, expected in documents:
+                result = service.extract_placeholders_from_text(text, PLACEHOLDERS, model=model)
+                values = result.get('extracted_values', {})
+                correct += sum(str(values.get(name, '')).strip() == value for name, value in expected.items())
+        finally:
+            service.close()
+        elapsed = time.perf_counter() - started
+    total = len(documents) * len(FIELDS)
+    return {
+        'accuracy': correct / total,
+        'calls': counts['calls'] / len(documents),
+        'tokens': counts['tokens'] / len(documents),
+        'seconds': elapsed / len(documents)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=10, help='documents per length')
+    parser.add_argument('--pages', type=int, nargs='+', default=[2, 10, 30])
+    parser.add_argument('--ollama', help='Ollama URL; default is the simulated model')
+    parser.add_argument('--model', default='qwen3:0.6b')
+    parser.add_argument('--num-ctx', type=int, default=4096, help='LLM_NUM_CTX')
+    parser.add_argument('--concurrency', type=int, default=2, help='OLLAMA_MAX_CONCURRENCY')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='simulated time per call')
+    parser.add_argument('--ms-per-1k-tokens', type=float, default=150.0, help='simulated prompt processing time')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.ollama
+    if base_url is None:
+        server, base_url = start_simulated_model(args.latency_ms, args.ms_per_1k_tokens, 40960)
+
+    app = create_app()
+    app.config.update(
+        OLLAMA_API_BASE=base_url,
+        LLM_CACHE_ENABLED=False,
+        LLM_NUM_CTX=args.num_ctx,
+        OLLAMA_MAX_CONCURRENCY=args.concurrency
+    )
+    rng = random.Random(42)
+    try:
+        print(f"{'simulated model' if server else base_url}, {args.model}, num_ctx {args.num_ctx}, "
+              f"concurrency {args.concurrency}, {args.documents} documents per length")
+        print(f"{'pages':>5} {'chars':>8} {'mode':<9} {'accuracy':>9} {'calls/doc':>10} {'tokens/doc':>11} {'s/doc':>7}")
+        for pages in args.pages:
+            documents = [build_document(rng, pages) for _ in range(args.documents)]
+            chars = sum(len(text) for text, _ in documents) // len(documents)
+            for mode in MODES:
+                row = run_mode(app, mode, documents, args.model)
+                print(f"{pages:>5} {chars:>8} {mode:<9} {row['accuracy']:>9.1%} {row['calls']:>10.1f} "
+                      f"{row['tokens']:>11.0f} {row['seconds']:>7.2f}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
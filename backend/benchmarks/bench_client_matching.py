@@ -0,0 +1,112 @@
+"""Measure client matching against a large synthetic client base.
+
+Compares the previous approach (load every client, score each one in
+Python) with candidate retrieval from the client match index followed by
+the same scorer. Lookups use identifiers in other notations and partial
+names, and both approaches must pick the same client.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_client_matching --clients 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app import create_app
+from app.db import db
+from app.models import Client
+from app.services.agent_service import AIAgentService
+from app.services.client_index import ClientMatchIndex
+
+FIRST_NAMES = ['Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hannes', 'Ida', 'Jonas', 'Karla', 'Lukas']
+LAST_NAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann']
+COMPANY_WORDS = ['Bau', 'Technik', 'Handel', 'Logistik', 'Consulting', 'Medien', 'Holz', 'Elektro', 'Garten', 'Reise']
+
+
+def synthetic_clients(count, seed=7):
+    rng = random.Random(seed)
+    for index in range(count):
+        row = {
+            'client_type': 'company' if index % 2 else 'natural',
+            'tax_number': f'{rng.randint(100, 999)}/{rng.randint(100, 999)}/{index:05d}',
+            'email': f'kontakt{index}@mandant{index % 997}.de',
+            'address_zip': f'{rng.randint(10000, 99999)}',
+            'address_city': 'Musterstadt',
+            'company_name': None, 'contact_last_name': None, 'contact_phone': None,
+            'first_name': None, 'last_name': None
+        }
+        if index % 2:
+            row['company_name'] = f'{rng.choice(COMPANY_WORDS)} {rng.choice(LAST_NAMES)} {index:06d} GmbH'
+            row['contact_last_name'] = rng.choice(LAST_NAMES)
+            row['contact_phone'] = f'+49 30 {index:08d}'
+        else:
+            row['first_name'] = rng.choice(FIRST_NAMES)
+            row['last_name'] = f'{rng.choice(LAST_NAMES)}-{index:06d}'
+        yield row
+
+
+def lookups(count):
+    """Extracted client profiles with their expected client row index."""
+    sample = list(synthetic_clients(count))
+    picks = [count // 7, count // 3, count // 2 + 1, count - 2]
+    profiles = []
+    for index in picks:
+        row = sample[index]
+        digits = row['tax_number'].replace('/', '')
+        profiles.append(('tax number', index, {'identification': {'tax_number': digits}}))
+        profiles.append(('email', index, {'contact_info': {'email': row['email'].upper()}}))
+        if row['client_type'] == 'company':
+            profiles.append(('company name', index, {'company_info': {'company_name': row['company_name'].split(' GmbH')[0]}}))
+        else:
+            profiles.append(('person name', index, {'person_info': {'first_name': row['first_name'], 'last_name': row['last_name']}}))
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100000)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench-clients-')
+    try:
+        app = create_app()
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(folder, 'clients.db')}"
+        with app.app_context():
+            db.create_all()
+            rows = list(synthetic_clients(args.clients))
+            for start in range(0, len(rows), 10000):
+                db.session.execute(Client.__table__.insert(), rows[start:start + 10000])
+            db.session.commit()
+
+            index = ClientMatchIndex()
+            started = time.perf_counter()
+            index.rebuild()
+            print(f"{args.clients} clients, index built in {time.perf_counter() - started:.1f}s")
+
+            agent = AIAgentService()
+            print(f"{'lookup':<14} {'full scan ms':>13} {'index ms':>9} {'candidates':>11} {'same match':>11}")
+            for label, expected, profile in lookups(args.clients):
+                db.session.expunge_all()
+                started = time.perf_counter()
+                full = agent._find_best_client_match(profile, Client.query.all())
+                full_ms = (time.perf_counter() - started) * 1000
+
+                db.session.expunge_all()
+                started = time.perf_counter()
+                candidates = index.candidates(profile)
+                indexed = agent._find_best_client_match(profile, candidates)
+                index_ms = (time.perf_counter() - started) * 1000
+
+                same = full['client'] is not None and indexed['client'] is not None and full['client'].id == indexed['client'].id
+                print(f"{label:<14} {full_ms:>13.1f} {index_ms:>9.2f} {len(candidates):>11} {str(same):>11}")
+                assert same and indexed['client'].id == expected + 1
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
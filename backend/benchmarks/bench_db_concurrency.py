@@ -0,0 +1,141 @@
+"""Measure concurrent database access with the plain and tuned engine profiles.
+
+Runs writer threads that create clients through the ORM (including the
+client match index they maintain) next to reader threads that page through
+clients and count documents, all against a SQLite file. Reports operations
+per second, 95th percentile latencies and "database is locked" errors for
+each engine profile (see app/db/engine_profile.py).
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_db_concurrency --writers 4 --readers 8 --seconds 10
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.db import db
+from app.models import Client, Document
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run_profile(profile, folder, writers, readers, seconds, busy_timeout_ms):
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(folder, f'{profile}.db')}"
+    app.config['DB_ENGINE_PROFILE'] = profile
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = busy_timeout_ms
+    if profile == 'plain':
+        # The same lock wait through the driver's timeout
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': busy_timeout_ms / 1000}}
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            Client(client_type='company', company_name=f'Bestand {index} GmbH', email=f'bestand{index}@firma.de')
+            for index in range(500)
+        )
+        db.session.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'writes': [], 'reads': [], 'lock_errors': 0, 'other_errors': 0}
+
+    def record(kind, elapsed):
+        with lock:
+            results[kind].append(elapsed)
+
+    def record_error(error):
+        with lock:
+            if 'locked' in str(error):
+                results['lock_errors'] += 1
+            else:
+                results['other_errors'] += 1
+
+    def writer(number):
+        with app.app_context():
+            sequence = 0
+            while not stop.is_set():
+                sequence += 1
+                started = time.perf_counter()
+                try:
+                    db.session.add(Client(
+                        client_type='company', company_name=f'Neu {number}-{sequence} GmbH',
+                        email=f'neu{number}-{sequence}@firma.de', address_zip=f'{10000 + sequence % 89999}'
+                    ))
+                    db.session.commit()
+                    record('writes', time.perf_counter() - started)
+                except OperationalError as e:
+                    db.session.rollback()
+                    record_error(e)
+            db.session.remove()
+
+    def reader(number):
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    Client.query.order_by(Client.id.desc()).limit(50).all()
+                    Document.query.filter_by(status='draft').count()
+                    db.session.commit()
+                    record('reads', time.perf_counter() - started)
+                except OperationalError as e:
+                    db.session.rollback()
+                    record_error(e)
+            db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        pool = type(db.engine.pool).__name__
+        db.engine.dispose()
+    return {
+        'profile': profile,
+        'pool': pool,
+        'writes_per_s': len(results['writes']) / elapsed,
+        'reads_per_s': len(results['reads']) / elapsed,
+        'write_p95_ms': percentile(results['writes'], 0.95) * 1000,
+        'read_p95_ms': percentile(results['reads'], 0.95) * 1000,
+        'lock_errors': results['lock_errors'],
+        'other_errors': results['other_errors']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--busy-timeout-ms', type=int, default=5000, help='how long a connection waits for a lock')
+    parser.add_argument('--profiles', nargs='+', default=['plain', 'tuned'])
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench-db-')
+    try:
+        print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile")
+        print(f"{'profile':<8} {'pool':<10} {'writes/s':>9} {'reads/s':>9} {'write p95 ms':>13} {'read p95 ms':>12} {'locked':>7} {'other':>6}")
+        for profile in args.profiles:
+            row = run_profile(profile, folder, args.writers, args.readers, args.seconds, args.busy_timeout_ms)
+            print(f"{row['profile']:<8} {row['pool']:<10} {row['writes_per_s']:>9.1f} {row['reads_per_s']:>9.1f} "
+                  f"{row['write_p95_ms']:>13.1f} {row['read_p95_ms']:>12.1f} {row['lock_errors']:>7} {row['other_errors']:>6}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
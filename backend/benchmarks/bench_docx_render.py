@@ -0,0 +1,75 @@
+"""Compare the single-pass placeholder engine with the previous per-key loop.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_docx_render --pages 50 --placeholders 500
+"""
+import argparse
+import io
+import statistics
+import time
+
+import docx
+
+from app.services.docx_render import render_placeholders
+from benchmarks.synthetic_docs import build_docx_template
+
+
+def legacy_render(document, values):
+    """The previous implementation: every paragraph and cell times every key."""
+    replacements = 0
+    for paragraph in document.paragraphs:
+        for key, value in values.items():
+            placeholder = '{{' + key + '}}'
+            if placeholder in paragraph.text:
+                paragraph.text = paragraph.text.replace(placeholder, str(value))
+                replacements += 1
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for key, value in values.items():
+                    placeholder = '{{' + key + '}}'
+                    if placeholder in cell.text:
+                        cell.text = cell.text.replace(placeholder, str(value))
+                        replacements += 1
+    return replacements
+
+
+def remaining_tokens(document):
+    text = [p.text for p in document.paragraphs]
+    text += [p.text for s in document.sections for p in s.header.paragraphs + s.footer.paragraphs]
+    text += [c.text for t in document.tables for c in t._cells]
+    return sum(chunk.count('{{') for chunk in text)
+
+
+def time_render(render, template, values, repeat):
+    timings = []
+    for _ in range(repeat):
+        document = docx.Document(io.BytesIO(template))
+        started = time.perf_counter()
+        render(document, values)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), remaining_tokens(document)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--placeholders', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    template, names = build_docx_template(args.pages, args.placeholders)
+    values = {name: f"Wert {index}" for index, name in enumerate(names)}
+    print(f"template: {args.pages} pages, {args.placeholders} placeholders, {len(template) / 1024:.0f} KiB")
+
+    legacy, legacy_left = time_render(legacy_render, template, values, args.repeat)
+    single, single_left = time_render(render_placeholders, template, values, args.repeat)
+    print(f"{'engine':<12} {'seconds':>9} {'tokens left':>12}")
+    print(f"{'legacy':<12} {legacy:>9.3f} {legacy_left:>12}")
+    print(f"{'single-pass':<12} {single:>9.3f} {single_left:>12}")
+    print(f"speedup: {legacy / single:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Measure list endpoint latency as the documents table grows.
+
+For each table size the benchmark times the first page and a page near the
+end of GET /api/documents with keyset pagination (limit/after). It also
+times the query behind that deep page against the same page fetched with
+LIMIT/OFFSET. Keyset pages should stay flat; OFFSET pages grow with the
+offset.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_list_pagination --rows 10000 100000 --limit 50
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.db import db
+from app.models import Document
+from app.routes.routes import DOCUMENT_LIST
+
+
+def fill(rows):
+    started = datetime(2020, 1, 1)
+    statuses = ['draft', 'final', 'archived']
+    db.session.execute(Document.__table__.insert(), [
+        {'title': f'Dokument {index}', 'status': statuses[index % 3], 'document_type': 'tax_return',
+         'created_at': started + timedelta(minutes=index // 2), 'updated_at': started}
+        for index in range(rows)
+    ])
+    db.session.commit()
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench-pagination-')
+    try:
+        url = f'/api/documents?status=final&sort=-created_at&limit={args.limit}'
+        print(f"GET {url}, best of {args.repeat} (ms)")
+        print(f"{'rows':>8} {'first page':>11} {'deep page':>10} {'keyset query':>13} {'offset query':>13}")
+        for rows in args.rows:
+            app = create_app()
+            app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(folder, f'{rows}.db')}"
+            with app.app_context():
+                db.create_all()
+                fill(rows)
+                client = app.test_client()
+                first = best_of(args.repeat, lambda: get(client, url))
+
+                # Cursor of the row just before the last page
+                matching = Document.query.filter_by(status='final')
+                last = matching.order_by(Document.created_at.asc(), Document.id.asc()).offset(args.limit).first()
+                cursor = DOCUMENT_LIST._encode_cursor('-created_at', last.created_at, last.id)
+                deep = best_of(args.repeat, lambda: get(client, f'{url}&after={cursor}'))
+
+                params = {'status': 'final', 'sort': '-created_at', 'after': cursor}
+                keyset = best_of(args.repeat, lambda: [
+                    segment.limit(args.limit).all() for segment in DOCUMENT_LIST.build_queries(Document.query, params)
+                ])
+                offset = max(matching.count() - 2 * args.limit, 0)
+                offset_ms = best_of(args.repeat, lambda: matching.order_by(
+                    Document.created_at.desc(), Document.id.desc()
+                ).offset(offset).limit(args.limit).all())
+                db.session.remove()
+            print(f"{rows:>8} {first:>11.2f} {deep:>10.2f} {keyset:>13.2f} {offset_ms:>13.2f}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
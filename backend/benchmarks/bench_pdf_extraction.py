@@ -0,0 +1,58 @@
+"""Compare serial and page-parallel PDF text extraction.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_pdf_extraction --pages 50 200 --workers 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.services.pdf_extraction import extract_pdf_text, shutdown_pool
+from benchmarks.synthetic_docs import build_pdf
+
+
+def time_extraction(path, parallel, workers, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = extract_pdf_text(path, parallel=parallel, max_workers=workers)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 100, 200])
+    parser.add_argument('--lines', type=int, default=40, help='text lines per page')
+    parser.add_argument('--workers', type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Start the worker processes before timing so spawn cost is not measured
+    with tempfile.TemporaryDirectory() as folder:
+        warmup = os.path.join(folder, 'warmup.pdf')
+        with open(warmup, 'wb') as f:
+            f.write(build_pdf(args.workers * 2, lines_per_page=1))
+        extract_pdf_text(warmup, parallel=True, max_workers=args.workers)
+
+        print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8} {'slowest page s':>15}")
+        for page_count in args.pages:
+            path = os.path.join(folder, f'synthetic_{page_count}.pdf')
+            with open(path, 'wb') as f:
+                f.write(build_pdf(page_count, lines_per_page=args.lines))
+
+            serial, serial_result = time_extraction(path, False, args.workers, args.repeat)
+            parallel, parallel_result = time_extraction(path, True, args.workers, args.repeat)
+            assert serial_result['text'] == parallel_result['text'], 'page order differs'
+
+            slowest = max(page['seconds'] for page in parallel_result['pages'])
+            print(f"{page_count:>6} {serial:>10.3f} {parallel:>11.3f} {serial / parallel:>7.2f}x {slowest:>15.4f}")
+
+    shutdown_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare a full parse-fill-save render with splicing into a compiled plan.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_template_cache --pages 50 --placeholders 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import docx
+
+from app.services.docx_render import render_placeholders
+from app.services.template_cache import compile_template
+from benchmarks.synthetic_docs import build_docx_template
+
+
+def parse_and_render(template_path, values, output_path):
+    """What every preview did before: open, fill and save the template."""
+    document = docx.Document(template_path)
+    render_placeholders(document, values)
+    document.save(output_path)
+
+
+def median_seconds(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--placeholders', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    template, names = build_docx_template(args.pages, args.placeholders)
+    values = {name: f"Wert {index}" for index, name in enumerate(names)}
+
+    with tempfile.TemporaryDirectory() as folder:
+        template_path = os.path.join(folder, 'template.docx')
+        output_path = os.path.join(folder, 'output.docx')
+        with open(template_path, 'wb') as f:
+            f.write(template)
+        print(f"template: {args.pages} pages, {args.placeholders} placeholders, {len(template) / 1024:.0f} KiB")
+
+        full = median_seconds(lambda: parse_and_render(template_path, values, output_path), args.repeat)
+        started = time.perf_counter()
+        plan = compile_template(template_path)
+        compile_seconds = time.perf_counter() - started
+        spliced = median_seconds(lambda: plan.render_to_file(values, output_path), args.repeat)
+
+    print(f"{'render':<16} {'seconds':>9}")
+    print(f"{'parse+fill+save':<16} {full:>9.3f}")
+    print(f"{'compile (once)':<16} {compile_seconds:>9.3f}")
+    print(f"{'plan splice':<16} {spliced:>9.3f}")
+    print(f"speedup per render: {full / spliced:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
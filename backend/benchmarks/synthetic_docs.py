@@ -0,0 +1,123 @@
+"""Generators for synthetic documents used by the benchmarks and tests.
+
+The files are assembled by hand so that no document toolchain beyond the
+application's own requirements is needed.
+"""
+
+
+def build_pdf(page_count, lines_per_page=40, words_per_line=12):
+    """Build a multi-page text PDF in memory.
+
+    Args:
+        page_count: Number of pages
+        lines_per_page: Text lines per page
+        words_per_line: Words per line
+
+    Returns:
+        PDF file content as bytes
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page in range(1, page_count + 1):
+        lines = [b"BT /F1 10 Tf 14 TL 50 800 Td"]
+        for line in range(lines_per_page):
+            words = " ".join(f"Seite{page}Zeile{line}Wort{word}" for word in range(words_per_line))
+            lines.append(f"({words}) '".encode("latin-1"))
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+def build_docx_template(pages, placeholders, paragraphs_per_page=25, split_every=3):
+    """Build a DOCX template in memory.
+
+    Placeholders {{field_0}} .. {{field_<n-1>}} are spread over the body, a
+    table with a nested table, the header and the footer. Every split_every-th
+    token is split across two differently formatted runs, as Word does after
+    editing.
+
+    Args:
+        pages: Number of pages (separated by page breaks)
+        placeholders: Number of distinct placeholders
+        paragraphs_per_page: Body paragraphs per page
+        split_every: Split every n-th token across runs (0 disables splitting)
+
+    Returns:
+        Tuple of (DOCX content as bytes, placeholder names)
+    """
+    import io
+    import docx
+    from docx.enum.text import WD_BREAK
+
+    names = [f"field_{index}" for index in range(placeholders)]
+    document = docx.Document()
+    counter = 0
+
+    def add_token(paragraph):
+        nonlocal counter
+        name = names[counter % len(names)]
+        if split_every and counter % split_every == 0:
+            paragraph.add_run('{{' + name[:3])
+            paragraph.add_run(name[3:] + '}}').bold = True
+        else:
+            paragraph.add_run('{{' + name + '}}')
+        counter += 1
+
+    section = document.sections[0]
+    add_token(section.header.paragraphs[0])
+    add_token(section.footer.paragraphs[0])
+
+    table = document.add_table(rows=2, cols=2)
+    for cell in table._cells:
+        add_token(cell.paragraphs[0])
+    nested = table.cell(1, 1).add_table(rows=1, cols=2)
+    for cell in nested._cells:
+        add_token(cell.paragraphs[0])
+
+    for page in range(pages):
+        for line in range(paragraphs_per_page):
+            paragraph = document.add_paragraph(f"Absatz {line} auf Seite {page}: ")
+            add_token(paragraph)
+            paragraph.add_run(' Lorem ipsum dolor sit amet, consectetur adipiscing elit. ')
+            add_token(paragraph)
+        document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+    # Make sure every placeholder occurs at least once
+    while counter < len(names):
+        add_token(document.add_paragraph())
+
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue(), names
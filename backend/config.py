@@ -13,6 +13,10 @@ class Config:
     # Upload settings  
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     
+    # Content-addressed upload storage (default: <UPLOAD_FOLDER>/blobs) and the streaming chunk size
+    BLOB_FOLDER = os.getenv('BLOB_FOLDER', '')
+    BLOB_CHUNK_SIZE = int(os.getenv('BLOB_CHUNK_SIZE', 1024 * 1024))
+    
     # Database settings - absolute path
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     INSTANCE_PATH = os.path.join(BASE_DIR, 'instance')
@@ -20,9 +24,113 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', f'sqlite:///{os.path.join(INSTANCE_PATH, "app.db")}')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Database engine profile ('tuned' or 'plain' for SQLAlchemy defaults), see app/db/engine_profile.py
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'tuned')
+    
+    # Pragmas set on every SQLite connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+    
+    # Connection pool (PostgreSQL and SQLite files); pre-ping and recycle apply to server databases
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
     # Ollama LLM settings
     OLLAMA_API_BASE = os.getenv('OLLAMA_API_BASE', 'http://localhost:11434')
     DEFAULT_LLM_MODEL = os.getenv('DEFAULT_LLM_MODEL', 'qwen3:0.6b')
+    
+    # Ollama HTTP connection pool (shared keep-alive session)
+    OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '10'))
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '3.05'))
+    OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', '300'))
+    OLLAMA_MAX_RETRIES = int(os.getenv('OLLAMA_MAX_RETRIES', '3'))
+    OLLAMA_RETRY_BACKOFF = float(os.getenv('OLLAMA_RETRY_BACKOFF', '0.5'))
+    
+    # Cached Ollama status/model catalogue (seconds)
+    OLLAMA_STATUS_TTL = float(os.getenv('OLLAMA_STATUS_TTL', '30'))
+    OLLAMA_STATUS_NEGATIVE_TTL = float(os.getenv('OLLAMA_STATUS_NEGATIVE_TTL', '5'))
+    OLLAMA_STATUS_STALE_TTL = float(os.getenv('OLLAMA_STATUS_STALE_TTL', '60'))
+    
+    # Bounded fan-out of the AI agent pipeline
+    AGENT_MAX_WORKERS = int(os.getenv('AGENT_MAX_WORKERS', '4'))
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '2'))
+    
+    # Long documents: 'chunked' sends token-budgeted windows of the whole text, 'truncate' only its start
+    LLM_EXTRACTION_MODE = os.getenv('LLM_EXTRACTION_MODE', 'chunked')
+    LLM_NUM_CTX = int(os.getenv('LLM_NUM_CTX', '4096'))
+    LLM_CHUNK_OVERLAP_TOKENS = int(os.getenv('LLM_CHUNK_OVERLAP_TOKENS', '200'))
+    LLM_MAX_CHUNKS = int(os.getenv('LLM_MAX_CHUNKS', '16'))
+    LLM_CHARS_PER_TOKEN = float(os.getenv('LLM_CHARS_PER_TOKEN', '3.5'))
+    
+    # Placeholder extraction sends only the passages most relevant to the requested fields
+    PASSAGE_RETRIEVAL_ENABLED = os.getenv('PASSAGE_RETRIEVAL_ENABLED', 'true').lower() == 'true'
+    PASSAGE_CONTEXT_CHARS = int(os.getenv('PASSAGE_CONTEXT_CHARS', '6000'))
+    PASSAGE_TOP_K = int(os.getenv('PASSAGE_TOP_K', '3'))
+    PASSAGE_MAX_CHARS = int(os.getenv('PASSAGE_MAX_CHARS', '800'))
+    PASSAGE_MIN_CHARS = int(os.getenv('PASSAGE_MIN_CHARS', '200'))
+    PASSAGE_INDEX_CACHE_SIZE = int(os.getenv('PASSAGE_INDEX_CACHE_SIZE', '64'))
+    
+    # Rule-based extraction of structured fields (IBAN, dates, amounts, ...) before the LLM
+    RULE_EXTRACTION_ENABLED = os.getenv('RULE_EXTRACTION_ENABLED', 'true').lower() == 'true'
+    RULE_EXTRACTION_MIN_CONFIDENCE = float(os.getenv('RULE_EXTRACTION_MIN_CONFIDENCE', '0.9'))
+    # Match score from rule-extracted identifiers at which the AI client extraction is skipped
+    RULE_CLIENT_MATCH_MIN_CONFIDENCE = float(os.getenv('RULE_CLIENT_MATCH_MIN_CONFIDENCE', '0.4'))
+    
+    # Background jobs for the /ai-agent endpoints
+    JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', '2'))
+    JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', '24'))
+    JOB_SPOOL_FOLDER = os.getenv('JOB_SPOOL_FOLDER', os.path.join(INSTANCE_PATH, 'jobs'))
+    # Seconds between job heartbeats, and without one after which another process fails the job
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '30'))
+    JOB_HEARTBEAT_TIMEOUT = float(os.getenv('JOB_HEARTBEAT_TIMEOUT', '120'))
+    
+    # Keyset pagination of the list endpoints (default limit 0 returns all rows)
+    PAGINATION_DEFAULT_LIMIT = int(os.getenv('PAGINATION_DEFAULT_LIMIT', '0'))
+    PAGINATION_MAX_LIMIT = int(os.getenv('PAGINATION_MAX_LIMIT', '500'))
+
+    # Candidate clients retrieved from the client match index per upload
+    CLIENT_MATCH_MAX_CANDIDATES = int(os.getenv('CLIENT_MATCH_MAX_CANDIDATES', '50'))
+
+    # Results of the full-text document search per request
+    SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', '20'))
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+
+    # Batch document generation from one template
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '4'))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '1000'))
+    
+    # Page-parallel PDF text extraction
+    PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(max(1, min(4, os.cpu_count() or 1)))))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '16'))
+    
+    # Compiled DOCX templates kept in memory (LRU, number of templates)
+    TEMPLATE_CACHE_SIZE = int(os.getenv('TEMPLATE_CACHE_SIZE', '32'))
+    
+    # Headless LibreOffice pool for DOCX to PDF conversion
+    SOFFICE_BINARY = os.getenv('SOFFICE_BINARY', '')  # default: soffice/libreoffice on the PATH
+    OFFICE_CONVERSION_MODE = os.getenv('OFFICE_CONVERSION_MODE', 'auto')  # auto, listener or cli
+    OFFICE_CONVERSION_WORKERS = int(os.getenv('OFFICE_CONVERSION_WORKERS', '2'))
+    OFFICE_CONVERSION_QUEUE_SIZE = int(os.getenv('OFFICE_CONVERSION_QUEUE_SIZE', '16'))
+    OFFICE_CONVERSION_TIMEOUT = float(os.getenv('OFFICE_CONVERSION_TIMEOUT', '60'))
+    OFFICE_CONVERSION_BATCH_SIZE = int(os.getenv('OFFICE_CONVERSION_BATCH_SIZE', '20'))
+    OFFICE_PROFILE_FOLDER = os.getenv('OFFICE_PROFILE_FOLDER', os.path.join(INSTANCE_PATH, 'office_profiles'))
+    
+    # Disk cache of rendered previews/downloads (LRU by total size)
+    RENDER_CACHE_ENABLED = os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+    RENDER_CACHE_FOLDER = os.getenv('RENDER_CACHE_FOLDER', os.path.join(INSTANCE_PATH, 'render_cache'))
+    RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    
+    # Response cache for deterministic LLM prompts (memory LRU + SQLite file)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(INSTANCE_PATH, 'llm_cache.sqlite3'))
+    LLM_CACHE_MEMORY_BYTES = int(os.getenv('LLM_CACHE_MEMORY_BYTES', str(8 * 1024 * 1024)))
+    LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
 
 class DevelopmentConfig(Config):
     DEBUG = True
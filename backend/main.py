@@ -257,6 +257,56 @@ def delete_doc_command(id):
     db.session.commit()
     click.echo("Document deleted.")
 
+@app.cli.command("purge-jobs")
+@click.option("--hours", default=None, type=float, help="Retention in hours (default: JOB_RETENTION_HOURS).")
+def purge_jobs_command(hours):
+    """Delete finished background jobs older than the retention period."""
+    from app.services.job_service import job_service
+    deleted = job_service.purge_finished_jobs(retention_hours=hours)
+    click.echo(f"Deleted {deleted} finished jobs.")
+
+@app.cli.command("clear-llm-cache")
+@click.option("--model", default=None, help="Only drop responses of this model (e.g. after re-pulling it).")
+def clear_llm_cache_command(model):
+    """Clear the LLM response cache."""
+    from app.services.llm_service import ollama_service
+    cache = ollama_service.get_response_cache()
+    if cache is None:
+        click.echo("LLM response cache is disabled.")
+        return
+    if model:
+        removed = cache.invalidate_model(model)
+        click.echo(f"Removed {removed} cached responses for {model}.")
+    else:
+        cache.clear()
+        click.echo("Cleared the LLM response cache.")
+
+@app.cli.command("clear-render-cache")
+@click.option("--document-id", type=int, default=None, help="Only drop rendered output of this template.")
+def clear_render_cache_command(document_id):
+    """Clear the cache of rendered documents."""
+    from app.services.render_cache import render_cache
+    if document_id is not None:
+        render_cache.invalidate(document_id)
+        click.echo(f"Removed rendered documents of template {document_id}.")
+    else:
+        render_cache.clear()
+        click.echo("Cleared the rendered document cache.")
+
+@app.cli.command("rebuild-client-index")
+def rebuild_client_index_command():
+    """Rebuild the client match index from the clients table."""
+    from app.services.client_index import client_match_index
+    count = client_match_index.rebuild()
+    click.echo(f"Indexed {count} clients.")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Rebuild the full-text document search index."""
+    from app.services.search_service import search_service
+    count = search_service.rebuild()
+    click.echo(f"Indexed {count} documents.")
+
 if __name__ == '__main__':
     app.logger.info('Application start')
     app.run(debug=True)
@@ -51,6 +51,22 @@ def get_metadata():
     return target_db.metadata
 
 
+# Search indexes created with raw SQL in their migrations (SQLite FTS5
+# tables with their shadow tables, the PostgreSQL tsvector table); they have
+# no models, so autogenerate must not drop them
+UNMANAGED_TABLE_PREFIXES = ('client_name_fts', 'document_search_fts')
+UNMANAGED_TABLES = ('document_search',)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    table_name = object.table.name if type_ in ('column', 'index') else name
+    if type_ in ('table', 'column', 'index') and table_name and (
+        table_name in UNMANAGED_TABLES or table_name.startswith(UNMANAGED_TABLE_PREFIXES)
+    ):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +81,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -97,6 +114,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
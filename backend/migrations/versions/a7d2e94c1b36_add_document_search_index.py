@@ -0,0 +1,49 @@
+"""Add the full-text document search index
+
+Revision ID: a7d2e94c1b36
+Revises: f3c61e9a8d27
+Create Date: 2026-10-18 18:40:51.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2e94c1b36'
+down_revision = 'f3c61e9a8d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite uses FTS5 (rowid = document ID), PostgreSQL a generated weighted tsvector with a GIN index
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        if bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar() == 1:
+            op.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts "
+                "USING fts5(title, description, placeholders, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+    elif bind.dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS document_search ("
+            " document_id INTEGER PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,"
+            " title TEXT, description TEXT, placeholders TEXT, body TEXT,"
+            " search_vector tsvector GENERATED ALWAYS AS ("
+            "  setweight(to_tsvector('german', coalesce(title, '')), 'A') ||"
+            "  setweight(to_tsvector('german', coalesce(description, '')), 'B') ||"
+            "  setweight(to_tsvector('german', coalesce(placeholders, '')), 'B') ||"
+            "  setweight(to_tsvector('german', coalesce(body, '')), 'C')"
+            " ) STORED)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_document_search_vector ON document_search USING GIN (search_vector)")
+    # Rows are filled on first search or with `flask rebuild-search-index`
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS document_search_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP TABLE IF EXISTS document_search")
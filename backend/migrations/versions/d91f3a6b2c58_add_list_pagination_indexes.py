@@ -0,0 +1,45 @@
+"""Add composite indexes for keyset pagination of the list endpoints
+
+Revision ID: d91f3a6b2c58
+Revises: c4d8e2f61a7b
+Create Date: 2026-10-18 14:21:45.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91f3a6b2c58'
+down_revision = 'c4d8e2f61a7b'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns)
+INDEXES = [
+    ('clients', 'ix_clients_created_at_id', ['created_at', 'id']),
+    ('clients', 'ix_clients_company_name_id', ['company_name', 'id']),
+    ('clients', 'ix_clients_last_name_id', ['last_name', 'id']),
+    ('documents', 'ix_documents_created_at_id', ['created_at', 'id']),
+    ('documents', 'ix_documents_updated_at_id', ['updated_at', 'id']),
+    ('documents', 'ix_documents_title_id', ['title', 'id']),
+    ('documents', 'ix_documents_status_created_at_id', ['status', 'created_at', 'id']),
+    ('documents', 'ix_documents_document_type_created_at_id', ['document_type', 'created_at', 'id']),
+    ('work_orders', 'ix_work_orders_created_at_id', ['created_at', 'id']),
+    ('work_orders', 'ix_work_orders_due_date_id', ['due_date', 'id']),
+    ('work_orders', 'ix_work_orders_status_due_date_id', ['status', 'due_date', 'id']),
+    ('tax_advisors', 'ix_tax_advisors_name_id', ['name', 'id']),
+    ('placeholders', 'ix_placeholders_name_id', ['name', 'id']),
+]
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,42 @@
+"""Add indexes for foreign keys and filtered columns
+
+Revision ID: e5b8c07d4f19
+Revises: d91f3a6b2c58
+Create Date: 2026-10-18 15:06:32.904217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c07d4f19'
+down_revision = 'd91f3a6b2c58'
+branch_labels = None
+depends_on = None
+
+# Document.status/document_type and WorkOrder.status are served by the
+# composite pagination indexes of d91f3a6b2c58, which lead with them.
+INDEXED_COLUMNS = [
+    ('clients', 'email'),
+    ('clients', 'tax_number'),
+    ('documents', 'client_id'),
+    ('documents', 'tax_advisor_id'),
+    ('documents', 'work_order_id'),
+    ('work_orders', 'client_id'),
+    ('work_orders', 'tax_advisor_id'),
+    ('work_orders', 'template_id'),
+    ('placeholders', 'document_id'),
+]
+
+
+def upgrade():
+    for table, column in INDEXED_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table}_{column}'), [column], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(INDEXED_COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_{column}'))
@@ -0,0 +1,48 @@
+"""Add client match keys and the FTS5 client name index
+
+Revision ID: f3c61e9a8d27
+Revises: e5b8c07d4f19
+Create Date: 2026-10-18 16:12:08.377512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c61e9a8d27'
+down_revision = 'e5b8c07d4f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('client_match_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=120), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('client_match_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_client_match_keys_client_id'), ['client_id'], unique=False)
+        batch_op.create_index('ix_client_match_keys_kind_value', ['kind', 'value'], unique=False)
+
+    # Trigram tokens need SQLite 3.34+; elsewhere names fall back to substring filters
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        version = tuple(int(part) for part in bind.exec_driver_sql('SELECT sqlite_version()').scalar().split('.'))
+        if version >= (3, 34, 0):
+            op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS client_name_fts USING fts5(name, contact, tokenize='trigram')")
+    # Rows are filled on first use or with `flask rebuild-client-index`
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS client_name_fts")
+    with op.batch_alter_table('client_match_keys', schema=None) as batch_op:
+        batch_op.drop_index('ix_client_match_keys_kind_value')
+        batch_op.drop_index(batch_op.f('ix_client_match_keys_client_id'))
+
+    op.drop_table('client_match_keys')
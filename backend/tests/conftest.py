@@ -4,11 +4,16 @@ from app.db import db as _db
 import os
 
 @pytest.fixture(scope='session')
-def app():
+def app(tmp_path_factory):
     """Create application for the tests."""
     app = create_app()
     app.config['TESTING'] = True
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    # Keep caches and stored files of the tests out of the instance and uploads folders
+    app.config['RENDER_CACHE_FOLDER'] = str(tmp_path_factory.mktemp('render_cache'))
+    app.config['LLM_CACHE_PATH'] = str(tmp_path_factory.mktemp('llm_cache') / 'llm_cache.sqlite3')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path_factory.mktemp('uploads'))
+    app.config['BLOB_FOLDER'] = str(tmp_path_factory.mktemp('blobs'))
     return app
 
 @pytest.fixture(scope='session')
@@ -32,4 +37,111 @@ def session(db):
 
     transaction.rollback()
     connection.close()
-    session.remove() 
\ No newline at end of file
+    session.remove() 
+
+class FakeOllamaServer:
+    """Minimal in-process stand-in for the Ollama HTTP API."""
+
+    def __init__(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        server_state = self
+        self.requests = []
+        self.models = [{'name': 'qwen3:0.6b'}, {'name': 'qwen2.5vl:3b'}]
+        self.generate_response = '<think>reasoning</think>{"answer": 42}'
+        # Optional callable(payload) -> response text, e.g. to answer depending on the prompt
+        self.generate_handler = None
+        self.context_length = 40960
+        self.generate_delay = 0.0
+        self.active_generations = 0
+        self.max_active_generations = 0
+        state_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, model, text, chunk_size=3):
+                lines = [
+                    json.dumps({'model': model, 'response': text[i:i + chunk_size], 'done': False})
+                    for i in range(0, len(text), chunk_size)
+                ]
+                lines.append(json.dumps({'model': model, 'response': '', 'done': True}))
+                body = ('\n'.join(lines) + '\n').encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                server_state.requests.append(('GET', self.path, None))
+                if self.path == '/api/tags':
+                    self._send({'models': server_state.models})
+                elif self.path == '/api/version':
+                    self._send({'version': '0.0-test'})
+                else:
+                    self._send({'error': 'not found'}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                server_state.requests.append(('POST', self.path, payload))
+                if self.path == '/api/generate':
+                    with state_lock:
+                        server_state.active_generations += 1
+                        server_state.max_active_generations = max(
+                            server_state.max_active_generations, server_state.active_generations
+                        )
+                    time.sleep(server_state.generate_delay)
+                    with state_lock:
+                        server_state.active_generations -= 1
+                    text = server_state.generate_response
+                    if server_state.generate_handler is not None:
+                        text = server_state.generate_handler(payload)
+                    if payload.get('stream'):
+                        self._send_stream(payload.get('model'), text)
+                    else:
+                        self._send({'model': payload.get('model'), 'response': text, 'done': True})
+                elif self.path == '/api/show':
+                    self._send({'model_info': {'qwen3.context_length': server_state.context_length}})
+                elif self.path == '/api/chat':
+                    self._send({'message': {'role': 'assistant', 'content': server_state.generate_response}, 'done': True})
+                else:
+                    self._send({'error': 'not found'}, status=404)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def count(self, method, path):
+        return sum(1 for m, p, _ in self.requests if m == method and p == path)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def fake_ollama(app):
+    """Start a fake Ollama API and point the application config at it."""
+    server = FakeOllamaServer()
+    previous = app.config.get('OLLAMA_API_BASE')
+    app.config['OLLAMA_API_BASE'] = server.url
+    yield server
+    app.config['OLLAMA_API_BASE'] = previous
+    server.stop()
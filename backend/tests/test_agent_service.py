@@ -0,0 +1,100 @@
+import json
+import io
+import time
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.services.agent_service import AIAgentService
+from app.services.llm_service import OllamaService
+
+@pytest.fixture
+def agent(app, fake_ollama):
+    """Create an agent with its own Ollama service talking to the fake API."""
+    with app.app_context():
+        agent = AIAgentService()
+        agent.ollama_service = OllamaService()
+        yield agent
+        agent.ollama_service.close()
+
+def make_files(count):
+    return [
+        FileStorage(stream=io.BytesIO(f"Rechnung Nr. {i} für Max Mustermann".encode('utf-8')), filename=f"doc_{i}.txt")
+        for i in range(count)
+    ]
+
+class TestAgentPipelineConcurrency:
+    """Test suite for the concurrent fan-out of the agent pipeline."""
+
+    def test_file_summaries_run_in_parallel(self, app, agent, fake_ollama, monkeypatch):
+        """Per-file extraction and summaries should overlap up to the concurrency cap."""
+        monkeypatch.setitem(app.config, 'OLLAMA_MAX_CONCURRENCY', 4)
+        fake_ollama.generate_delay = 0.3
+
+        started = time.perf_counter()
+        result = agent._extract_and_analyze_documents(make_files(4))
+        elapsed = time.perf_counter() - started
+
+        assert result['success'] is True
+        assert [s['filename'] for s in result['document_summaries']] == [f"doc_{i}.txt" for i in range(4)]
+        assert fake_ollama.count('POST', '/api/generate') == 4
+        assert fake_ollama.max_active_generations > 1
+        assert elapsed < 4 * 0.3
+
+    def test_concurrency_cap_is_respected(self, app, agent, fake_ollama, monkeypatch):
+        """No more than OLLAMA_MAX_CONCURRENCY generations should reach Ollama at once."""
+        monkeypatch.setitem(app.config, 'OLLAMA_MAX_CONCURRENCY', 1)
+        fake_ollama.generate_delay = 0.05
+
+        result = agent._extract_and_analyze_documents(make_files(3))
+
+        assert result['success'] is True
+        assert fake_ollama.max_active_generations == 1
+
+    def test_client_matching_runs_alongside_template_selection(self, app, db, agent, fake_ollama):
+        """The full pipeline should still return both branch results."""
+        result = agent.process_documents_intelligently(make_files(2))
+
+        assert result['success'] is True
+        assert 'client_match' in result['client_match']
+        assert result['template_selection']['selected_template'] is None
+
+    def test_stream_endpoint_emits_stage_events(self, app, db, fake_ollama):
+        """The SSE endpoint should stream intermediate events and end with the result."""
+        response = app.test_client().post(
+            '/api/ai-agent/process-documents/stream',
+            data={'documents': (io.BytesIO(b'Rechnung Nr. 1'), 'rechnung.txt')},
+            content_type='multipart/form-data'
+        )
+        assert response.mimetype == 'text/event-stream'
+        events = [block.split('\n')[0][len('event: '):] for block in response.get_data(as_text=True).split('\n\n') if block]
+        assert events[0] == 'stage'
+        assert 'file_extracted' in events
+        assert 'summary_token' in events
+        assert {'client_matched', 'template_selected', 'document_ready'} <= set(events)
+        assert events[-1] == 'result'
+
+class TestChunkedClientExtraction:
+    """Test suite for client extraction over documents longer than the model context."""
+
+    def test_fields_from_all_windows_are_merged(self, app, agent, fake_ollama, monkeypatch):
+        monkeypatch.setitem(app.config, 'LLM_NUM_CTX', 2048)
+        monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+        filler = "Gemäß den vorliegenden Unterlagen ergeben sich keine weiteren Änderungen. " * 40
+
+        def answer(payload):
+            prompt = payload['prompt']
+            company = 'Muster Bau GmbH' if 'Muster Bau GmbH' in prompt else None
+            vat_id = 'DE123456789' if 'DE123456789' in prompt else None
+            hints = ['Rechnung'] if company else ['Vertrag']
+            return (f'{{"company_info": {{"company_name": {json.dumps(company)}, "legal_form": "extracted_value_or_null"}}, '
+                    f'"identification": {{"vat_id": {json.dumps(vat_id)}}}, '
+                    f'"document_type_hints": {json.dumps(hints)}, "confidence": 0.8}}')
+
+        fake_ollama.generate_handler = answer
+        text = f"Rechnung der Muster Bau GmbH\n\n{filler}\n\n{filler}\n\nUSt-IdNr.: DE123456789"
+        result = agent._extract_client_information(text)
+
+        assert result['chunks'] > 1
+        assert result['company_info'] == {'company_name': 'Muster Bau GmbH', 'legal_form': None, 'contact_person': None}
+        assert result['identification']['vat_id'] == 'DE123456789'
+        assert result['document_type_hints'] == ['Rechnung', 'Vertrag']
+        assert result['confidence'] == 0.8
@@ -0,0 +1,120 @@
+import io
+import os
+import json
+import shutil
+import threading
+import zipfile
+import docx
+import pytest
+from app.models import Client, Document
+
+@pytest.fixture
+def letter_template(app, db, tmp_path):
+    """A DOCX reminder letter template with one required placeholder."""
+    path = tmp_path / 'erinnerung.docx'
+    template = docx.Document()
+    template.add_paragraph('Sehr geehrte Damen und Herren der {{client_name}},')
+    template.add_paragraph('die Frist endet am {{frist}}.')
+    template.save(str(path))
+    with app.app_context():
+        document = Document(
+            title='Fristerinnerung',
+            document_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            file_path=str(path),
+            placeholders=[{'name': 'client_name', 'required': True}, {'name': 'frist'}]
+        )
+        db.session.add(document)
+        db.session.commit()
+        yield document.id
+        db.session.delete(document)
+        db.session.commit()
+
+def document_text(data):
+    return '\n'.join(p.text for p in docx.Document(io.BytesIO(data)).paragraphs)
+
+class TestBatchGeneration:
+    """Test suite for bulk document generation from one template."""
+
+    def test_value_sets_stream_zip_with_manifest(self, app, letter_template):
+        """Every value set becomes a file; failures are listed in the manifest."""
+        client = app.test_client()
+        response = client.post(f'/api/documents/batch/{letter_template}', json={
+            'value_sets': [{'client_name': 'Muster GmbH'}, {'frist': 'fehlt'}, {'client_name': 'Beispiel AG'}],
+            'values': {'frist': '31.07.2025'}
+        })
+        assert response.status_code == 200
+        assert response.mimetype == 'application/zip'
+
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        manifest = json.loads(archive.read('manifest.json'))
+        assert manifest['total'] == 3
+        assert [item['index'] for item in manifest['generated']] == [0, 2]
+        assert manifest['failed'][0]['error'] == 'Missing required placeholders: client_name'
+
+        first = archive.read(manifest['generated'][0]['file'])
+        assert 'der Muster GmbH,' in document_text(first)
+        assert '31.07.2025' in document_text(first)
+
+    def test_zip_streams_without_app_context(self, app, letter_template):
+        """The body is read after the request; the session-wide app context must not be needed."""
+        result = {}
+
+        def request_and_read():
+            # A new thread starts without the app context pushed by the db fixture
+            try:
+                response = app.test_client().post(f'/api/documents/batch/{letter_template}', json={
+                    'value_sets': [{'client_name': 'Muster GmbH', 'frist': '31.07.2025'}]
+                }, buffered=False)
+                result['body'] = b''.join(response.response)
+                response.close()
+            except Exception as e:
+                result['error'] = e
+
+        reader = threading.Thread(target=request_and_read)
+        reader.start()
+        reader.join()
+        assert 'error' not in result, result.get('error')
+        manifest = json.loads(zipfile.ZipFile(io.BytesIO(result['body'])).read('manifest.json'))
+        assert manifest['total'] == 1 and not manifest['failed']
+
+    def test_client_filter_writes_to_upload_folder(self, app, db, letter_template, tmp_path, monkeypatch):
+        """Clients selected by filter are rendered into a batch folder."""
+        monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+        with app.app_context():
+            clients = [
+                Client(client_type='company', company_name='Nord GmbH', address_city='Kiel'),
+                Client(client_type='company', company_name='Sued GmbH', address_city='Passau'),
+                Client(client_type='natural', first_name='Erika', last_name='Muster', address_city='Kiel')
+            ]
+            db.session.add_all(clients)
+            db.session.commit()
+            client_ids = [c.id for c in clients]
+
+        try:
+            response = app.test_client().post(f'/api/documents/batch/{letter_template}', json={
+                'client_filter': {'address_city': 'Kiel'},
+                'values': {'frist': '15.08.2025'},
+                'output': 'folder'
+            })
+            assert response.status_code == 200
+            summary = response.get_json()
+            assert summary['failed'] == []
+            assert [item['label'] for item in summary['generated']] == ['Nord GmbH', 'Erika Muster']
+            assert summary['docs_per_second'] > 0
+            assert sorted(os.listdir(summary['folder'])) == ['0001_Nord_GmbH.docx', '0002_Erika_Muster.docx']
+            with open(os.path.join(summary['folder'], '0002_Erika_Muster.docx'), 'rb') as f:
+                assert 'der Erika Muster,' in document_text(f.read())
+        finally:
+            with app.app_context():
+                Client.query.filter(Client.id.in_(client_ids)).delete(synchronize_session=False)
+                db.session.commit()
+            shutil.rmtree(tmp_path / 'uploads', ignore_errors=True)
+
+    def test_invalid_requests(self, app, letter_template):
+        """Unknown templates, filters and empty selections are rejected."""
+        client = app.test_client()
+        assert client.post('/api/documents/batch/999999', json={'value_sets': [{}]}).status_code == 404
+        assert client.post(f'/api/documents/batch/{letter_template}', json={}).status_code == 400
+        assert client.post(
+            f'/api/documents/batch/{letter_template}', json={'client_filter': {'email': 'x'}}
+        ).status_code == 400
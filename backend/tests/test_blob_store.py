@@ -0,0 +1,144 @@
+import hashlib
+import io
+import os
+import tracemalloc
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.models import Document
+from app.services.blob_store import BlobStore, SpooledUpload
+from app.services.document_service import document_service
+
+PDF = 'application/pdf'
+
+@pytest.fixture
+def blob_folder(app, tmp_path, monkeypatch):
+    """Uploads and blobs in a temporary directory."""
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(app.config, 'BLOB_FOLDER', str(tmp_path / 'blobs'))
+    # Stored files are not real PDFs; skip text extraction on save
+    monkeypatch.setattr(document_service, 'cache_document_text', lambda *args, **kwargs: None)
+    return tmp_path / 'blobs'
+
+def upload(data, filename='bescheid.pdf'):
+    return FileStorage(stream=io.BytesIO(data), filename=filename, content_type=PDF)
+
+class ChunkStream(io.RawIOBase):
+    """A readable stream of a given size that never holds more than one chunk."""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.remaining)
+        buffer[:count] = b'x' * count
+        self.remaining -= count
+        return count
+
+class TestBlobStore:
+    """Test suite for streamed, content-addressed upload storage."""
+
+    def test_spool_hashes_and_keeps_extension(self, app, blob_folder):
+        data = b'%PDF-1.4 Steuerbescheid'
+        store = BlobStore()
+        with app.app_context():
+            with store.spooled(upload(data, 'Bescheid.PDF')) as spooled:
+                assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+                assert spooled.size == len(data)
+                assert spooled.path.endswith('.pdf')
+                assert spooled.read() == data
+                path = spooled.path
+            assert not os.path.exists(path)
+            assert store.get_metrics()['blob_spooled_bytes_total'] == len(data)
+
+    def test_identical_content_shares_one_blob(self, app, blob_folder):
+        """Same content is stored once; same name with other content does not overwrite."""
+        store = BlobStore()
+        with app.app_context():
+            with store.spooled(upload(b'Inhalt A')) as first:
+                first_path = store.store(first)
+            with store.spooled(upload(b'Inhalt A', 'kopie.pdf')) as second:
+                assert store.store(second) == first_path
+            with store.spooled(upload(b'Inhalt B')) as third:
+                other_path = store.store(third)
+        assert other_path != first_path
+        assert open(first_path, 'rb').read() == b'Inhalt A'
+        assert open(other_path, 'rb').read() == b'Inhalt B'
+        assert os.listdir(blob_folder / '.spool') == []
+        metrics = store.get_metrics()
+        assert (metrics['blob_stored_total'], metrics['blob_dedup_hits_total']) == (2, 1)
+        assert metrics['blob_dedup_bytes_total'] == len(b'Inhalt A')
+
+    def test_spooling_memory_is_bounded(self, app, blob_folder, monkeypatch):
+        """A 32 MiB upload is spooled with memory for a few chunks only."""
+        monkeypatch.setitem(app.config, 'BLOB_CHUNK_SIZE', 256 * 1024)
+        store = BlobStore()
+        with app.app_context():
+            tracemalloc.start()
+            try:
+                spooled = store.spool(io.BufferedReader(ChunkStream(32 * 1024 * 1024)), 'gross.pdf', PDF)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            spooled.release()
+        assert spooled.size == 32 * 1024 * 1024
+        assert peak < 4 * 256 * 1024
+
+    def test_shared_blob_survives_deleting_one_document(self, app, db, blob_folder):
+        client = app.test_client()
+        with app.app_context():
+            path = document_service.save_document(upload(b'Vorlage'), 'vorlage.pdf', PDF)
+            assert document_service.save_document(upload(b'Vorlage'), 'vorlage-kopie.pdf', PDF) == path
+            documents = [Document(title=f'Vorlage {index}', file_path=path, document_type=PDF) for index in range(2)]
+            db.session.add_all(documents)
+            db.session.commit()
+            ids = [document.id for document in documents]
+
+        assert client.delete(f'/api/documents/{ids[0]}').status_code == 200
+        assert os.path.exists(path)
+        assert client.delete(f'/api/documents/{ids[1]}').status_code == 200
+        assert not os.path.exists(path)
+
+    def test_pdf_rendition_is_released_with_its_docx(self, app, db, blob_folder):
+        docx = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        with app.app_context():
+            path = document_service.save_document(upload(b'Vorlage', 'vorlage.docx'), 'vorlage.docx', docx)
+            rendition = f"{path}.pdf"
+            with open(rendition, 'wb') as f:
+                f.write(b'%PDF')
+            source = Document(title='Vorlage', file_path=path, document_type=docx)
+            converted = Document(title='Vorlage (PDF)', file_path=rendition, document_type=PDF)
+            db.session.add_all([source, converted])
+            db.session.commit()
+
+            # The rendition stays while a document uses it
+            assert document_service.release_document_file(source) is True
+            assert not os.path.exists(path) and os.path.exists(rendition)
+
+            document_service.release_document_file(converted)
+            assert not os.path.exists(rendition)
+            db.session.delete(source)
+            db.session.delete(converted)
+            db.session.commit()
+
+            path = document_service.save_document(upload(b'Entwurf', 'entwurf.docx'), 'entwurf.docx', docx)
+            with open(f"{path}.pdf", 'wb') as f:
+                f.write(b'%PDF')
+            assert document_service.release_document_file(Document(id=-1, file_path=path)) is True
+            assert not os.path.exists(f"{path}.pdf")
+
+    def test_consumers_share_one_spool(self, app, blob_folder, monkeypatch):
+        """Text extraction reads a spooled upload in place instead of copying it again."""
+        store = BlobStore()
+        read_paths = []
+        monkeypatch.setattr(document_service, 'extract_text_from_file', lambda path: read_paths.append(path) or 'Text')
+        with app.app_context():
+            spooled = store.spool(upload(b'Beleg'))
+            try:
+                assert document_service.extract_text_from_uploaded_file(spooled) == 'Text'
+                assert isinstance(spooled, SpooledUpload) and os.path.exists(spooled.path)
+            finally:
+                spooled.release()
+        assert read_paths == [spooled.path]
@@ -0,0 +1,120 @@
+import json
+import pytest
+from app.models import Client, ClientMatchKey
+from app.services.client_index import ClientMatchIndex
+
+@pytest.fixture
+def clients(app, db):
+    """A company and a natural person, removed through the ORM afterwards."""
+    with app.app_context():
+        created = [
+            Client(client_type='company', company_name='Bäckerei Sonnenschein GmbH', tax_number='143/815/08156',
+                   email='Info@Sonnenschein-Backwaren.de', contact_last_name='Lindner', contact_phone='+49 (89) 1234-5678',
+                   address_zip='80331', address_city='München'),
+            Client(client_type='natural', first_name='Erika', last_name='Mustermann', tax_id='12 345 678 901',
+                   email='erika@example.org', address_zip='20095', address_city='Hamburg')
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+        ids = [client.id for client in created]
+    yield ids
+    with app.app_context():
+        for client in Client.query.filter(Client.id.in_(ids)).all():
+            db.session.delete(client)
+        db.session.commit()
+
+def candidate_ids(index, client_info):
+    return [client.id for client in index.candidates(client_info)]
+
+class TestClientMatchIndex:
+    """Test suite for candidate retrieval in client matching."""
+
+    def test_identifiers_in_other_notations(self, app, clients):
+        """Tax numbers, emails and phone numbers match after normalisation."""
+        company, person = clients
+        index = ClientMatchIndex()
+        with app.app_context():
+            assert candidate_ids(index, {'identification': {'tax_number': '14381508156'}}) == [company]
+            assert candidate_ids(index, {'contact_info': {'email': 'info@sonnenschein-backwaren.DE'}}) == [company]
+            assert candidate_ids(index, {'contact_info': {'phone': '089 12345678'}}) == [company]
+            assert candidate_ids(index, {'identification': {'tax_number': '12345678901'}}) == [person]
+            # The client sharing more identifiers ranks first
+            assert candidate_ids(index, {'contact_info': {'email': 'erika@example.org', 'postal_code': '80331'}})[0] == person
+            assert candidate_ids(index, {'identification': {'tax_number': '999/999/99999'}}) == []
+
+    def test_partial_names(self, app, clients):
+        """Names are found by substrings through the trigram index."""
+        company, person = clients
+        index = ClientMatchIndex()
+        with app.app_context():
+            assert company in candidate_ids(index, {'company_info': {'company_name': 'Sonnenschein Backwaren GmbH'}})
+            assert company in candidate_ids(index, {'company_info': {'contact_person': 'Herr Lindner'}})
+            assert person in candidate_ids(index, {'person_info': {'full_name': 'Frau Erika Mustermann-Schulz'}})
+            assert candidate_ids(index, {'person_info': {'last_name': 'null'}}) == []
+
+    def test_index_follows_client_changes(self, app, db, clients):
+        """Updates replace a client's keys and deletes remove them."""
+        company, _ = clients
+        index = ClientMatchIndex()
+        with app.app_context():
+            client = Client.query.get(company)
+            client.email = 'buchhaltung@sonnenschein.de'
+            client.company_name = 'Konditorei Regenbogen GmbH'
+            db.session.commit()
+            assert candidate_ids(index, {'contact_info': {'email': 'info@sonnenschein-backwaren.de'}}) == []
+            assert candidate_ids(index, {'contact_info': {'email': 'buchhaltung@sonnenschein.de'}}) == [company]
+            assert candidate_ids(index, {'company_info': {'company_name': 'Regenbogen'}}) == [company]
+            assert candidate_ids(index, {'company_info': {'company_name': 'Sonnenschein'}}) == []
+
+            db.session.delete(client)
+            db.session.commit()
+            assert ClientMatchKey.query.filter_by(client_id=company).count() == 0
+            assert candidate_ids(index, {'company_info': {'company_name': 'Regenbogen'}}) == []
+
+    def test_rebuild_indexes_bulk_inserted_clients(self, app, db, clients):
+        """Rows written without the ORM are picked up by a rebuild."""
+        index = ClientMatchIndex()
+        with app.app_context():
+            result = db.session.execute(Client.__table__.insert().values(
+                client_type='company', company_name='Direktimport KG', email='import@direkt.de'
+            ))
+            db.session.commit()
+            imported = result.inserted_primary_key[0]
+            try:
+                assert candidate_ids(index, {'contact_info': {'email': 'import@direkt.de'}}) == []
+                assert index.rebuild() >= 3
+                assert candidate_ids(index, {'contact_info': {'email': 'import@direkt.de'}}) == [imported]
+            finally:
+                db.session.delete(Client.query.get(imported))
+                db.session.commit()
+
+    def test_agent_scores_only_candidates(self, app, db, clients, fake_ollama):
+        """The agent matches a natural person without loading every client."""
+        from sqlalchemy import event
+        from app.services.agent_service import AIAgentService
+        from app.services.llm_service import OllamaService
+
+        _, person = clients
+        fake_ollama.generate_response = json.dumps({
+            'person_info': {'first_name': 'Erika', 'last_name': 'Mustermann'},
+            'contact_info': {'email': 'erika@example.org'}
+        })
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(' '.join(statement.split()))
+
+        with app.app_context():
+            agent = AIAgentService()
+            agent.ollama_service = OllamaService()
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                result = agent._analyze_and_match_clients('Sehr geehrte Frau Mustermann', [])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+                agent.ollama_service.close()
+        assert result['client_match']['id'] == person
+        assert result['match_confidence'] == pytest.approx(0.6)
+        # Full client rows are only loaded for the candidates
+        row_selects = [s for s in statements if 'clients.client_type' in s and 'FROM clients' in s]
+        assert row_selects and all(' WHERE ' in s for s in row_selects)
@@ -0,0 +1,28 @@
+import threading
+from app.services.config_values import get_config_value
+
+class TestConfigValues:
+    """Test suite for the shared configuration lookup."""
+
+    def test_values_are_converted_to_the_default_type(self, app, monkeypatch):
+        monkeypatch.setitem(app.config, 'SOME_FLAG', 'false')
+        monkeypatch.setitem(app.config, 'SOME_LIMIT', '12')
+        monkeypatch.setitem(app.config, 'SOME_RATIO', 'viel')
+        with app.app_context():
+            assert get_config_value('SOME_FLAG', True) is False
+            assert get_config_value('SOME_LIMIT', 4) == 12
+            # Values that cannot be converted give the default
+            assert get_config_value('SOME_RATIO', 0.5) == 0.5
+            assert get_config_value('SOME_FOLDER', '') == ''
+
+    def test_environment_is_used_outside_the_app_context(self, monkeypatch):
+        monkeypatch.setenv('SOME_FLAG', 'True')
+        monkeypatch.setenv('SOME_LIMIT', '7')
+        results = []
+        # A new thread has no app context, like a worker thread or process
+        worker = threading.Thread(target=lambda: results.extend(
+            [get_config_value('SOME_FLAG', False), get_config_value('SOME_LIMIT', 4), get_config_value('SOME_MISSING', None)]
+        ))
+        worker.start()
+        worker.join()
+        assert results == [True, 7, None]
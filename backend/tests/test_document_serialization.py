@@ -0,0 +1,101 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.models import Client, Document, TaxAdvisor
+from app.routes.serialization import parse_fields, project
+
+@contextmanager
+def count_queries(engine):
+    """Count the SQL statements executed on the engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+@pytest.fixture
+def make_documents(app, db):
+    """Create n documents, each with its own client and tax advisor."""
+    created = []
+
+    def make(n):
+        with app.app_context():
+            for index in range(n):
+                suffix = f'{len(created)}-{index}'
+                client = Client(client_type='company', company_name=f'Firma {suffix}', email=f'info{suffix}@firma.de')
+                advisor = TaxAdvisor(name=f'Berater {suffix}', email=f'berater{suffix}@kanzlei.de')
+                db.session.add_all([client, advisor])
+                db.session.flush()
+                document = Document(
+                    title=f'Bescheid {suffix}', content='Langer Text ' * 50, status='draft',
+                    client_id=client.id, tax_advisor_id=advisor.id
+                )
+                db.session.add(document)
+                db.session.commit()
+                created.append((document.id, client.id, advisor.id))
+
+    yield make
+
+    with app.app_context():
+        Document.query.filter(Document.id.in_([ids[0] for ids in created])).delete(synchronize_session=False)
+        Client.query.filter(Client.id.in_([ids[1] for ids in created])).delete(synchronize_session=False)
+        TaxAdvisor.query.filter(TaxAdvisor.id.in_([ids[2] for ids in created])).delete(synchronize_session=False)
+        db.session.commit()
+
+class TestDocumentSerialization:
+    """Test suite for document list views and field projection."""
+
+    @pytest.mark.parametrize('query', ['', '?view=full', '?fields=id,client.company_name,tax_advisor'])
+    def test_list_queries_do_not_grow_with_rows(self, app, db, make_documents, query):
+        """The document list uses the same number of queries for 3 and 12 rows."""
+        client = app.test_client()
+        counts = []
+        for n in (3, 9):
+            make_documents(n)
+            with app.app_context():
+                with count_queries(db.engine) as statements:
+                    response = client.get(f'/api/documents{query}')
+            assert response.status_code == 200
+            counts.append(len(statements))
+        assert counts[0] == counts[1]
+        assert counts[0] <= 3
+
+    def test_list_view_leaves_out_content(self, app, make_documents):
+        """The default list is the lightweight view, view=full keeps the old shape."""
+        make_documents(1)
+        client = app.test_client()
+
+        listed = client.get('/api/documents').get_json()[-1]
+        assert set(listed) == set(Document.LIST_FIELDS)
+        assert listed['client_name'].startswith('Firma ')
+
+        full = client.get('/api/documents?view=full').get_json()[-1]
+        assert full['content'].startswith('Langer Text')
+        assert full['client']['company_name'] == listed['client_name']
+        assert full['tax_advisor']['name'].startswith('Berater ')
+
+    def test_field_projection(self, app, make_documents):
+        """Only requested fields, including nested ones, are returned."""
+        make_documents(1)
+        client = app.test_client()
+        document = client.get('/api/documents?fields=id,title,client.email,client.address.city').get_json()[-1]
+        assert set(document) == {'id', 'title', 'client'}
+        assert document['client'] == {'email': document['client']['email'], 'address': {'city': None}}
+
+        single = client.get(f"/api/documents/{document['id']}?fields=status,tax_advisor.email").get_json()
+        assert single == {'status': 'draft', 'tax_advisor': {'email': single['tax_advisor']['email']}}
+
+    def test_project_helpers(self):
+        """parse_fields drops blanks and duplicates; project ignores unknown keys."""
+        assert parse_fields(None) is None
+        assert parse_fields(' , ') is None
+        assert parse_fields('id, title,id') == ['id', 'title']
+        data = {'id': 1, 'client': None, 'tax_advisor': {'name': 'A', 'email': 'a@b.de'}}
+        assert project(data, ['id', 'client.email', 'tax_advisor.name', 'unknown']) == {
+            'id': 1, 'client': None, 'tax_advisor': {'name': 'A'}
+        }
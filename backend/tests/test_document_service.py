@@ -0,0 +1,326 @@
+import os
+import time
+import pytest
+from app.models import DocumentText
+from app.services.document_service import DocumentService
+
+@pytest.fixture
+def service(app, db):
+    """Create a document service inside an app context."""
+    with app.app_context():
+        yield DocumentService()
+
+class TestExtractedTextCache:
+    """Test suite for the persistent extracted-text cache."""
+
+    def test_repeat_reads_skip_extraction(self, service, tmp_path, monkeypatch):
+        """Only the first read of an unchanged file should parse it."""
+        path = tmp_path / 'brief.txt'
+        path.write_text('Sehr geehrte Damen und Herren', encoding='utf-8')
+        calls = []
+        original = service.extract_text_from_file
+        monkeypatch.setattr(service, 'extract_text_from_file', lambda p: calls.append(p) or original(p))
+
+        assert service.get_document_text(str(path)) == 'Sehr geehrte Damen und Herren'
+        assert service.get_document_text(str(path)) == 'Sehr geehrte Damen und Herren'
+        assert len(calls) == 1
+        assert DocumentText.query.filter_by(file_path=str(path)).count() == 1
+
+    def test_changed_file_is_extracted_again(self, service, tmp_path):
+        """A file with a new mtime and content should not be served stale text."""
+        path = tmp_path / 'brief.txt'
+        path.write_text('alt', encoding='utf-8')
+        service.get_document_text(str(path))
+
+        path.write_text('neuer Inhalt', encoding='utf-8')
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        assert service.get_document_text(str(path)) == 'neuer Inhalt'
+
+    def test_identical_content_is_reused_and_invalidation(self, service, tmp_path, monkeypatch):
+        """Copies share one extraction; invalidation removes the entry."""
+        first, second = tmp_path / 'a.txt', tmp_path / 'b.txt'
+        first.write_text('gleich', encoding='utf-8')
+        second.write_text('gleich', encoding='utf-8')
+        service.get_document_text(str(first))
+
+        monkeypatch.setattr(service, 'extract_text_from_file', lambda p: pytest.fail('should reuse cached text'))
+        assert service.get_document_text(str(second)) == 'gleich'
+
+        service.invalidate_document_text(str(first))
+        assert DocumentText.query.filter_by(file_path=str(first)).count() == 0
+
+    def test_failed_pdf_extraction_is_not_cached(self, service, tmp_path, monkeypatch):
+        """A PDF that cannot be read should raise, and be extracted again on the next read."""
+        from app.services import pdf_extraction
+        from benchmarks.synthetic_docs import build_pdf
+
+        path = tmp_path / 'bescheid.pdf'
+        path.write_bytes(build_pdf(1, lines_per_page=1, words_per_line=1))
+        original = pdf_extraction.extract_pdf_text
+
+        def broken(file_path):
+            raise OSError('Datei gesperrt')
+
+        monkeypatch.setattr(pdf_extraction, 'extract_pdf_text', broken)
+        with pytest.raises(Exception, match='Datei gesperrt'):
+            service.get_document_text(str(path))
+        assert DocumentText.query.filter_by(file_path=str(path)).count() == 0
+
+        monkeypatch.setattr(pdf_extraction, 'extract_pdf_text', original)
+        assert service.get_document_text(str(path)) == 'Seite1Zeile0Wort0'
+        assert DocumentText.query.filter_by(file_path=str(path)).count() == 1
+
+class TestParallelPdfExtraction:
+    """Test suite for page-parallel PDF text extraction."""
+
+    def test_parallel_matches_serial_in_page_order(self, tmp_path):
+        """Pages extracted by the process pool should be reassembled in order."""
+        from app.services.pdf_extraction import extract_pdf_text, shutdown_pool
+        from benchmarks.synthetic_docs import build_pdf
+
+        path = tmp_path / 'bericht.pdf'
+        path.write_bytes(build_pdf(9, lines_per_page=3, words_per_line=2))
+        try:
+            serial = extract_pdf_text(str(path), parallel=False)
+            parallel = extract_pdf_text(str(path), parallel=True, max_workers=2)
+        finally:
+            shutdown_pool()
+
+        assert parallel['parallel'] is True
+        assert parallel['text'] == serial['text']
+        assert [page['page'] for page in parallel['pages']] == list(range(1, 10))
+        assert parallel['text'].index('Seite2Zeile0') < parallel['text'].index('Seite9Zeile0')
+        assert all(page['method'] == 'pypdf2' and page['seconds'] >= 0 for page in parallel['pages'])
+
+    def test_broken_pool_falls_back_and_is_replaced(self, tmp_path):
+        """A dead worker breaks the pool once; the call is served serially and the pool recreated."""
+        from app.services import pdf_extraction
+        from benchmarks.synthetic_docs import build_pdf
+
+        path = tmp_path / 'bericht.pdf'
+        path.write_bytes(build_pdf(4, lines_per_page=1, words_per_line=1))
+        try:
+            pool = pdf_extraction._get_pool(2)
+            pool.submit(os.getpid).result()
+            for process in list(pool._processes.values()):
+                process.kill()
+                process.join()
+            # The executor's manager thread marks the pool broken shortly after
+            deadline = time.monotonic() + 10
+            while not pool._broken and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            fallback = pdf_extraction.extract_pdf_text(str(path), parallel=True, max_workers=2)
+            assert fallback['parallel'] is False
+            assert fallback['text'].split('\n')[0] == 'Seite1Zeile0Wort0'
+            assert pdf_extraction._pool is not pool
+
+            again = pdf_extraction.extract_pdf_text(str(path), parallel=True, max_workers=2)
+            assert again['parallel'] is True and again['text'] == fallback['text']
+        finally:
+            pdf_extraction.shutdown_pool()
+
+    def test_document_service_uses_page_extraction(self, service, tmp_path):
+        """_extract_text_from_pdf should return the joined page text."""
+        from benchmarks.synthetic_docs import build_pdf
+
+        path = tmp_path / 'kurz.pdf'
+        path.write_bytes(build_pdf(2, lines_per_page=1, words_per_line=1))
+        assert service._extract_text_from_pdf(str(path)).split('\n') == ['Seite1Zeile0Wort0', 'Seite2Zeile0Wort0']
+
+class TestRenderedDocumentStreaming:
+    """Test suite for streaming rendered documents instead of base64 JSON."""
+
+    @pytest.fixture
+    def pdf_template(self, app, db, tmp_path):
+        from app.models import Document
+        from benchmarks.synthetic_docs import build_pdf
+
+        path = tmp_path / 'vorlage.pdf'
+        path.write_bytes(build_pdf(3))
+        with app.app_context():
+            document = Document(title='Vorlage', document_type='application/pdf', file_path=str(path), placeholders=[])
+            db.session.add(document)
+            db.session.commit()
+            yield document.id, path.read_bytes()
+            db.session.delete(document)
+            db.session.commit()
+
+    def test_download_streams_file_with_range_support(self, app, pdf_template):
+        """Downloads should be served from disk and honour Range requests."""
+        document_id, content = pdf_template
+        client = app.test_client()
+
+        full = client.post(f'/api/documents/download/{document_id}', json={'name': 'x'})
+        assert full.status_code == 200
+        assert full.mimetype == 'application/pdf'
+        assert full.data == content
+
+        partial = client.get(f'/api/documents/download/{document_id}?name=x', headers={'Range': 'bytes=0-99'})
+        assert partial.status_code == 206
+        assert partial.data == content[:100]
+
+    def test_base64_preview_is_opt_in(self, app, pdf_template):
+        """The JSON base64 preview should only be returned with ?format=base64."""
+        import base64
+        document_id, content = pdf_template
+        client = app.test_client()
+
+        streamed = client.post(f'/api/documents/preview/{document_id}', json={'name': 'x'})
+        assert streamed.mimetype == 'application/pdf'
+        assert streamed.data == content
+
+        legacy = client.post(f'/api/documents/preview/{document_id}?format=base64', json={'name': 'x'})
+        assert base64.b64decode(legacy.get_json()['preview_data']) == content
+
+    def test_temporary_preview_streams_the_upload(self, app, db):
+        """An unsaved upload should be streamed back and its spool file deleted afterwards."""
+        import base64
+        import io
+        import json
+        from app.services.blob_store import blob_store
+        from benchmarks.synthetic_docs import build_pdf
+
+        content = build_pdf(2)
+        client = app.test_client()
+
+        def preview(query=''):
+            return client.post(f'/api/documents/preview-temp{query}', data={
+                'file': (io.BytesIO(content), 'entwurf.pdf'), 'placeholders': json.dumps({'name': 'x'})
+            }, content_type='multipart/form-data')
+
+        streamed = preview()
+        assert streamed.mimetype == 'application/pdf'
+        assert 'entwurf_preview.pdf' in streamed.headers['Content-Disposition']
+        assert streamed.data == content
+        streamed.close()
+        with app.app_context():
+            assert os.listdir(blob_store.get_spool_folder()) == []
+
+        legacy = preview('?format=base64')
+        assert base64.b64decode(legacy.get_json()['preview_data']) == content
+
+class TestRenderedOutputCache:
+    """Test suite for the disk cache of rendered documents."""
+
+    @pytest.fixture
+    def docx_template(self, app, db, tmp_path, monkeypatch):
+        import docx
+        from app.models import Document
+        from app.services.document_service import document_service
+
+        path = tmp_path / 'brief.docx'
+        template = docx.Document()
+        template.add_paragraph('Sehr geehrte(r) {{name}}')
+        template.save(str(path))
+
+        conversions = []
+
+        def fake_convert(docx_path):
+            conversions.append(docx_path)
+            pdf_path = os.path.splitext(docx_path)[0] + '.pdf'
+            with open(pdf_path, 'wb') as f:
+                f.write(b'%PDF-1.4 ' + open(docx_path, 'rb').read()[:64])
+            return True, pdf_path, ''
+
+        monkeypatch.setattr(document_service, '_try_convert_docx_to_pdf', fake_convert)
+        with app.app_context():
+            document = Document(
+                title='Brief',
+                document_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                file_path=str(path),
+                placeholders=[]
+            )
+            db.session.add(document)
+            db.session.commit()
+            yield document.id, conversions
+            document_service.invalidate_template(document.id, str(path))
+            db.session.delete(document)
+            db.session.commit()
+
+    def test_download_after_preview_is_a_cache_hit(self, app, docx_template):
+        """The second render with the same values should not convert again."""
+        document_id, conversions = docx_template
+        client = app.test_client()
+
+        preview = client.post(f'/api/documents/preview/{document_id}', json={'name': 'Frau Muster'})
+        download = client.post(f'/api/documents/download/{document_id}', json={'name': 'Frau Muster'})
+        assert preview.status_code == download.status_code == 200
+        assert download.mimetype == 'application/pdf'
+        assert download.data == preview.data
+        assert len(conversions) == 1
+
+        client.post(f'/api/documents/download/{document_id}', json={'name': 'Herr Muster'})
+        assert len(conversions) == 2
+
+    def test_template_change_invalidates(self, app, docx_template):
+        """Invalidating a template removes its rendered artifacts."""
+        from app.services.document_service import document_service
+        from app.services.render_cache import render_cache
+
+        document_id, conversions = docx_template
+        with app.app_context():
+            rendered = document_service.render_document(document_id, {'name': 'A'})
+            document_service.release_rendered_document(rendered)
+            folder = os.path.join(app.config['RENDER_CACHE_FOLDER'], str(document_id))
+            assert len(os.listdir(folder)) == 1
+
+            document_service.invalidate_template(document_id)
+            assert not os.path.exists(folder)
+            assert render_cache.get_metrics()['render_cache_entries'] == 0
+
+    def test_rendered_file_is_moved_into_the_cache(self, app, docx_template):
+        """A fresh render is served from its cache entry, not from a second copy."""
+        from app.services.document_service import document_service
+
+        document_id, conversions = docx_template
+        with app.app_context():
+            rendered = document_service.render_document(document_id, {'name': 'B'})
+            assert rendered['temporary'] is False
+            assert os.path.dirname(rendered['path']) == os.path.join(app.config['RENDER_CACHE_FOLDER'], str(document_id))
+            assert not os.path.exists(conversions[0]) and not os.path.exists(os.path.splitext(conversions[0])[0] + '.pdf')
+            document_service.release_rendered_document(rendered)
+            assert os.path.exists(rendered['path'])
+
+    def test_docx_fallback_is_not_cached_as_pdf(self, app, docx_template, monkeypatch):
+        """A failed conversion is retried on the next render instead of serving the cached DOCX."""
+        from app.services.document_service import document_service
+
+        document_id, conversions = docx_template
+        convert = document_service._try_convert_docx_to_pdf
+        monkeypatch.setattr(
+            document_service, '_try_convert_docx_to_pdf',
+            lambda path: (False, '', 'LibreOffice conversion queue is full')
+        )
+        with app.app_context():
+            fallback = document_service.render_document(document_id, {'name': 'C'})
+            assert fallback['path'].endswith('.docx') and fallback['temporary'] is True
+            document_service.release_rendered_document(fallback)
+
+            monkeypatch.setattr(document_service, '_try_convert_docx_to_pdf', convert)
+            retried = document_service.render_document(document_id, {'name': 'C'})
+            assert retried['mime_type'] == 'application/pdf' and retried['temporary'] is False
+            assert len(conversions) == 1
+
+    def test_key_canonicalisation_and_size_budget(self, app, tmp_path, monkeypatch):
+        """Equivalent values share a key; the byte budget evicts the oldest files."""
+        from app.services.render_cache import RenderCache
+
+        assert RenderCache.make_key(1, 'h', {'a': 1, 'b': None, 'c': 'x'}, 'pdf') == \
+            RenderCache.make_key(1, 'h', {'c': 'x', 'a': '1'}, 'pdf')
+        assert RenderCache.make_key(1, 'h', {'a': 1}, 'pdf') != RenderCache.make_key(1, 'h', {'a': 1}, 'docx')
+
+        monkeypatch.setitem(app.config, 'RENDER_CACHE_FOLDER', str(tmp_path / 'cache'))
+        monkeypatch.setitem(app.config, 'RENDER_CACHE_MAX_BYTES', 250)
+        source = tmp_path / 'out.pdf'
+        source.write_bytes(b'x' * 100)
+        cache = RenderCache()
+        with app.app_context():
+            paths = [cache.store(7, f"key{index}", str(source)) for index in range(3)]
+            assert cache.get(7, 'key0') is None
+            assert cache.get(7, 'key2') == paths[2]
+            assert open(paths[2], 'rb').read() == b'x' * 100
+            assert not [name for name in os.listdir(tmp_path / 'cache' / '7') if name.endswith('.tmp')]
+            metrics = cache.get_metrics()
+            assert metrics['render_cache_evictions_total'] == 1
+            assert metrics['render_cache_bytes'] == 200
@@ -0,0 +1,172 @@
+import io
+import docx
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from app.services.docx_render import render_placeholders, rename_placeholder
+from benchmarks.synthetic_docs import build_docx_template
+
+def reload(document):
+    output = io.BytesIO()
+    document.save(output)
+    return docx.Document(io.BytesIO(output.getvalue()))
+
+class TestDocxRender:
+    """Test suite for the single-pass placeholder engine."""
+
+    def test_split_tokens_keep_run_formatting(self):
+        """Tokens split across runs are replaced without touching other runs."""
+        document = docx.Document()
+        paragraph = document.add_paragraph()
+        paragraph.add_run('Sehr geehrter ')
+        paragraph.add_run('{{na')
+        paragraph.add_run('me}}').bold = True
+        paragraph.add_run(', Ihr Termin: ').italic = True
+        paragraph.add_run('{{datum}}').underline = True
+
+        assert render_placeholders(document, {'name': 'Herr Muster', 'datum': '01.02.2025'}) == 2
+
+        runs = reload(document).paragraphs[0].runs
+        assert ''.join(run.text for run in runs) == 'Sehr geehrter Herr Muster, Ihr Termin: 01.02.2025'
+        assert runs[3].italic is True
+        assert runs[4].text == '01.02.2025' and runs[4].underline is True
+
+    def test_headers_footers_nested_tables_are_covered(self):
+        """Every placeholder of the synthetic template should be filled."""
+        template, names = build_docx_template(pages=2, placeholders=30, paragraphs_per_page=5)
+        document = docx.Document(io.BytesIO(template))
+        values = {name: f"<{name}>" for name in names}
+
+        render_placeholders(document, values)
+
+        document = reload(document)
+        section = document.sections[0]
+        assert section.header.paragraphs[0].text == '<field_0>'
+        assert section.footer.paragraphs[0].text == '<field_1>'
+        nested = document.tables[0].cell(1, 1).tables[0]
+        assert nested.cell(0, 0).paragraphs[0].text == '<field_6>'
+        assert all('{{' not in p.text for p in document.paragraphs)
+
+    def test_text_boxes_and_unknown_tokens(self):
+        """Text box content is replaced; tokens without a value stay as they are."""
+        document = docx.Document()
+        paragraph = document.add_paragraph('{{unbekannt}} ')
+        paragraph._p.append(parse_xml(
+            f'<w:r {nsdecls("w")} xmlns:v="urn:schemas-microsoft-com:vml"><w:pict><v:shape><v:textbox><w:txbxContent>'
+            '<w:p><w:r><w:t>{{firma}}</w:t></w:r></w:p>'
+            '</w:txbxContent></v:textbox></v:shape></w:pict></w:r>'
+        ))
+
+        assert render_placeholders(document, {'firma': 'Muster GmbH'}) == 1
+        assert paragraph.text.startswith('{{unbekannt}}')
+        assert document.element.body.xpath('.//w:txbxContent//w:t')[0].text == 'Muster GmbH'
+
+    def test_rename_placeholder(self):
+        """Renaming should only touch the matching token."""
+        document = docx.Document()
+        document.add_paragraph('{{alt}} und {{bleibt}}')
+
+        assert rename_placeholder(document, 'alt', 'neu') == 1
+        assert document.paragraphs[0].text == '{{neu}} und {{bleibt}}'
+
+def paragraph_texts(document):
+    """All paragraph texts of body, nested tables, header and footer."""
+    from app.services.docx_render import iter_paragraph_elements
+    return [''.join(paragraph.xpath('.//w:t/text()')) for paragraph in iter_paragraph_elements(document)]
+
+class TestTemplateCache:
+    """Test suite for compiled render plans."""
+
+    def test_plan_render_matches_direct_render(self, tmp_path):
+        """Splicing into a plan should give the same document as a direct render."""
+        from app.services.template_cache import compile_template
+
+        template, names = build_docx_template(pages=2, placeholders=30, paragraphs_per_page=5)
+        path = tmp_path / 'vorlage.docx'
+        path.write_bytes(template)
+        values = {name: f"{name} & <Wert>" for name in names[:-1]}
+
+        direct = docx.Document(str(path))
+        render_placeholders(direct, values)
+
+        plan = compile_template(str(path))
+        output = tmp_path / 'ausgabe.docx'
+        assert plan.render_to_file(values, str(output)) == len(values)
+        assert set(plan.placeholders) == set(names)
+        assert len(plan.templated_parts) == 3
+
+        assert paragraph_texts(docx.Document(str(output))) == paragraph_texts(reload(direct))
+        assert '{{' + names[-1] + '}}' in ''.join(paragraph_texts(docx.Document(str(output))))
+
+    def test_lru_hits_file_changes_and_invalidation(self, tmp_path):
+        """Plans are reused until the file or the template is changed."""
+        from app.services.template_cache import TemplateCache
+
+        cache = TemplateCache(max_entries=2)
+        path = tmp_path / 'vorlage.docx'
+        document = docx.Document()
+        document.add_paragraph('{{alt}}')
+        document.save(str(path))
+
+        first = cache.get_plan(1, str(path))
+        assert cache.get_plan(1, str(path)) is first
+
+        document = docx.Document()
+        document.add_paragraph('{{neu}} Text')
+        document.save(str(path))
+        changed = cache.get_plan(1, str(path))
+        assert changed.placeholders == frozenset({'neu'})
+        assert cache.get_metrics()['template_cache_entries'] == 1
+
+        cache.invalidate(1, str(path))
+        assert cache.get_plan(1, str(path)) is not changed
+        cache.get_plan(2, str(path))
+        cache.get_plan(3, str(path))
+        metrics = cache.get_metrics()
+        assert metrics['template_cache_entries'] == 2
+        assert metrics['template_cache_evictions_total'] == 1
+        assert metrics['template_cache_hits_total'] == 1
+
+    def test_service_compiles_at_upload_and_rename_invalidates(self, app, db, tmp_path):
+        """Uploads are compiled eagerly; renaming a placeholder recompiles the plan."""
+        from app.services.document_service import DocumentService
+        from app.services.template_cache import template_cache
+
+        path = tmp_path / 'brief.docx'
+        document = docx.Document()
+        document.add_paragraph('Hallo {{name}}')
+        document.save(str(path))
+
+        with app.app_context():
+            service = DocumentService()
+            saved = service.save_document_with_placeholders(
+                {'name': 'Brief', 'file_path': str(path)}, [{'name': 'name'}]
+            )
+            misses = template_cache.get_metrics()['template_cache_misses_total']
+            rendered = service.render_document(saved.id, {'name': 'Muster'})
+            try:
+                assert template_cache.get_metrics()['template_cache_misses_total'] == misses
+            finally:
+                service.release_rendered_document(rendered)
+
+            service.update_placeholder_name(saved.id, 'name', 'empfaenger')
+            assert template_cache.get_plan(saved.id, str(path)).placeholders == frozenset({'empfaenger'})
+            db.session.delete(saved)
+            db.session.commit()
+
+    def test_shared_plan_renders_concurrently(self, tmp_path):
+        """Threads rendering from one plan must not corrupt each other's archives."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.template_cache import compile_template
+
+        template, names = build_docx_template(pages=2, placeholders=20, paragraphs_per_page=5)
+        path = tmp_path / 'vorlage.docx'
+        path.write_bytes(template)
+        plan = compile_template(str(path))
+
+        def render(index):
+            output = tmp_path / f'ausgabe_{index}.docx'
+            plan.render_to_file({names[0]: f'Wert {index}'}, str(output))
+            return docx.Document(str(output)).sections[0].header.paragraphs[0].text
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert list(executor.map(render, range(8))) == [f'Wert {index}' for index in range(8)]
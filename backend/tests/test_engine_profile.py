@@ -0,0 +1,85 @@
+import threading
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+from app import create_app
+from app.db import db
+from app.db.engine_profile import PRAGMAS_OPTION, engine_options
+from app.models import Client
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An application on a SQLite file with its own engine."""
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'profile.db'}"
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def pragma(name):
+    return db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+
+class TestEngineProfile:
+    """Test suite for the database engine profiles."""
+
+    def test_postgres_pool_settings(self, app):
+        options = engine_options(app.config, make_url('postgresql://kanzlei@db/kanzlei'))
+        assert options == {
+            'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30.0,
+            'pool_recycle': 1800, 'pool_pre_ping': True, 'pool_use_lifo': True
+        }
+        assert engine_options(dict(app.config, DB_ENGINE_PROFILE='plain'), make_url('postgresql://db/kanzlei')) == {}
+
+    def test_memory_database_keeps_static_pool(self, app, db):
+        options = engine_options(app.config, make_url('sqlite:///:memory:'))
+        assert 'poolclass' not in options
+        assert [name for name, _ in options[PRAGMAS_OPTION]] == ['synchronous', 'busy_timeout', 'cache_size']
+        with app.app_context():
+            assert isinstance(db.engine.pool, StaticPool)
+            assert pragma('busy_timeout') == 5000
+
+    def test_sqlite_file_pragmas_and_pool(self, file_app):
+        """Every pooled connection to a SQLite file runs in WAL mode with the tuned pragmas."""
+        with file_app.app_context():
+            assert isinstance(db.engine.pool, QueuePool)
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('busy_timeout') == 5000
+            assert pragma('cache_size') == -64 * 1024
+            assert pragma('mmap_size') == 256 * 1024 * 1024
+
+    def test_explicit_engine_options_win(self, file_app, monkeypatch):
+        monkeypatch.setitem(file_app.config, 'SQLALCHEMY_ENGINE_OPTIONS', {'pool_size': 3})
+        monkeypatch.setitem(file_app.config, 'SQLITE_SYNCHRONOUS', 'FULL')
+        # A changed URI makes Flask-SQLAlchemy create a new engine
+        monkeypatch.setitem(file_app.config, 'SQLALCHEMY_DATABASE_URI', file_app.config['SQLALCHEMY_DATABASE_URI'] + '?mode=rwc')
+        with file_app.app_context():
+            assert db.engine.pool.size() == 3
+            assert pragma('synchronous') == 2  # FULL
+            db.engine.dispose()
+
+    def test_concurrent_writers_do_not_hit_locks(self, file_app):
+        """Writers on separate threads wait for the lock instead of failing."""
+        errors = []
+
+        def write(number):
+            with file_app.app_context():
+                try:
+                    for index in range(20):
+                        db.session.add(Client(client_type='company', company_name=f'Parallel {number}-{index}'))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=write, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        with file_app.app_context():
+            assert Client.query.filter(Client.company_name.like('Parallel %')).count() == 80
@@ -0,0 +1,128 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+import threading
+import pytest
+from datetime import datetime, timedelta
+from app.models import Job
+from app.services.job_service import job_service
+
+@pytest.fixture
+def jobs(app, db, tmp_path, monkeypatch):
+    """Run jobs against a temporary spool folder."""
+    monkeypatch.setitem(app.config, 'JOB_SPOOL_FOLDER', str(tmp_path / 'jobs'))
+    return job_service
+
+def wait_for(client, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = client.get(f'/api/jobs/{job_id}').get_json()
+        if data['status'] in Job.FINISHED_STATUSES:
+            return data
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+class TestJobService:
+    """Test suite for background jobs of the AI agent endpoints."""
+
+    def test_async_processing_returns_job(self, app, jobs, fake_ollama):
+        """An async request should return 202 and finish in the background."""
+        client = app.test_client()
+        response = client.post(
+            '/api/ai-agent/process-documents?async=true',
+            data={'documents': (io.BytesIO('Rechnung für Max Mustermann'.encode('utf-8')), 'rechnung.txt')},
+            content_type='multipart/form-data'
+        )
+        assert response.status_code == 202
+        job_id = response.get_json()['id']
+        assert response.headers['Location'].endswith(f'/api/jobs/{job_id}')
+
+        data = wait_for(client, job_id)
+        assert data['status'] == 'completed'
+        assert data['progress']['extracting_text'] == 'done'
+        assert data['result']['metadata']['processed_documents'][0]['filename'] == 'rechnung.txt'
+
+    def test_running_job_can_be_cancelled(self, app, jobs):
+        """Cancellation should stop a running job at the next stage boundary."""
+        started, release = threading.Event(), threading.Event()
+
+        def pipeline(uploaded_files, progress_callback):
+            progress_callback('first')
+            started.set()
+            release.wait(5)
+            progress_callback('second')
+            return {'success': True}
+
+        with app.app_context():
+            job_id = jobs.submit('test', pipeline, []).id
+        assert started.wait(5)
+        client = app.test_client()
+        assert client.post(f'/api/jobs/{job_id}/cancel').get_json()['cancel_requested'] is True
+        release.set()
+
+        data = wait_for(client, job_id)
+        assert data['status'] == 'cancelled'
+        assert data['stage'] == 'first'
+
+    def test_failed_pipeline_and_retention(self, app, jobs):
+        """Errors should be recorded and old finished jobs purged."""
+        def pipeline(uploaded_files, progress_callback):
+            raise ValueError('boom')
+
+        with app.app_context():
+            job_id = jobs.submit('test', pipeline, []).id
+        data = wait_for(app.test_client(), job_id)
+        assert data['status'] == 'failed'
+        assert data['error'] == 'boom'
+
+        with app.app_context():
+            Job.query.get(job_id).finished_at = datetime.utcnow() - timedelta(hours=48)
+            jobs.purge_finished_jobs(retention_hours=24)
+        assert app.test_client().get(f'/api/jobs/{job_id}').status_code == 404
+
+    def test_only_jobs_of_gone_owners_are_recovered(self, app, db, jobs):
+        """Jobs of live workers sharing the database should survive recovery."""
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        host = socket.gethostname()
+        now = datetime.utcnow()
+        with app.app_context():
+            live = Job(job_type='test', status='running', owner=f'{host}:{os.getppid()}', heartbeat_at=now)
+            other_host = Job(job_type='test', status='queued', owner='worker-2:4711', heartbeat_at=now)
+            dead = Job(job_type='test', status='running', owner=f'{host}:{exited.pid}', heartbeat_at=now)
+            stale = Job(job_type='test', status='running', owner='worker-2:4712',
+                        heartbeat_at=now - timedelta(minutes=10))
+            db.session.add_all([live, other_host, dead, stale])
+            db.session.commit()
+            os.makedirs(jobs._get_spool_folder(dead.id))
+
+            assert jobs.recover_orphaned_jobs() == 2
+            assert [job.status for job in (live, other_host, dead, stale)] == ['running', 'queued', 'failed', 'failed']
+            assert not os.path.exists(jobs._get_spool_folder(dead.id))
+            for job in (live, other_host):
+                job.status = 'cancelled'
+                job.finished_at = now
+            db.session.commit()
+
+    def test_heartbeat_refreshes_own_jobs(self, app, db, jobs):
+        """beat() should touch the jobs this process is running."""
+        started, release = threading.Event(), threading.Event()
+
+        def pipeline(uploaded_files, progress_callback):
+            started.set()
+            release.wait(5)
+            return {'success': True}
+
+        with app.app_context():
+            job = jobs.submit('test', pipeline, [])
+            assert job.owner == f'{socket.gethostname()}:{os.getpid()}'
+            assert started.wait(5)
+            Job.query.get(job.id).heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+            db.session.commit()
+            assert jobs.beat() == 1
+            assert jobs.recover_orphaned_jobs() == 0
+        release.set()
+        assert wait_for(app.test_client(), job.id)['status'] == 'completed'
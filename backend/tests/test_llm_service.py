@@ -0,0 +1,236 @@
+import pytest
+from app.services.llm_service import OllamaService
+from app.services.text_chunking import merge_extractions, split_into_windows
+
+@pytest.fixture
+def service(app, fake_ollama):
+    """Create an isolated Ollama service talking to the fake API."""
+    with app.app_context():
+        service = OllamaService()
+        yield service
+        service.close()
+
+class TestOllamaConnectionPool:
+    """Test suite for the pooled Ollama HTTP transport."""
+
+    def test_connections_are_reused(self, service, fake_ollama):
+        """Repeated calls should share one kept-alive connection."""
+        for _ in range(5):
+            result = service.generate_completion("Hallo", model='qwen3:0.6b')
+            assert result['response'] == '{"answer": 42}'
+
+        metrics = service.get_pool_metrics()
+        assert metrics['ollama_http_requests_total'] == 5
+        assert metrics['ollama_http_connections_created_total'] == 1
+        assert metrics['ollama_http_connection_reuse_ratio'] == pytest.approx(0.8)
+        assert metrics['ollama_http_idle_connections'] == 1
+
+    def test_configured_timeouts_are_applied(self, app, service, monkeypatch):
+        """Generate/chat calls should no longer run without a read timeout."""
+        monkeypatch.setitem(app.config, 'OLLAMA_READ_TIMEOUT', 42.0)
+        service.close()
+        service.generate_completion("Hallo", model='qwen3:0.6b')
+        assert service._timeouts[1] == 42.0
+
+    def test_connection_errors_return_error_dict(self, app, monkeypatch):
+        """An unreachable Ollama should fail fast with an error instead of raising."""
+        monkeypatch.setitem(app.config, 'OLLAMA_MAX_RETRIES', 0)
+        with app.app_context():
+            service = OllamaService()
+            service.base_url = 'http://127.0.0.1:9'
+            assert 'error' in service.generate_completion("Hallo", model='qwen3:0.6b')
+            assert service.is_ollama_available() is False
+            service.close()
+
+    def test_metrics_endpoint(self, app, service):
+        """Pool metrics should be exposed in Prometheus text format."""
+        response = app.test_client().get('/api/metrics')
+        assert response.status_code == 200
+        assert b'# TYPE ollama_http_requests_total counter' in response.data
+        assert b'ollama_http_connection_reuse_ratio' in response.data
+
+class TestOllamaCatalogueCache:
+    """Test suite for the cached Ollama status and model catalogue."""
+
+    def test_status_models_and_categories_share_one_snapshot(self, service, fake_ollama):
+        """Repeated status/model lookups should hit /api/tags only once."""
+        assert service.is_ollama_available() is True
+        assert service.get_ollama_status()['version'] == '0.0-test'
+        assert [m['name'] for m in service.get_models()] == ['qwen3:0.6b', 'qwen2.5vl:3b']
+        categorized = service.categorize_models()
+        assert [m['name'] for m in categorized['image']] == ['qwen2.5vl:3b']
+        for _ in range(10):
+            service.is_ollama_available()
+        assert fake_ollama.count('GET', '/api/tags') == 1
+
+    def test_expired_snapshot_refreshes(self, app, service, fake_ollama, monkeypatch):
+        """An expired snapshot should be fetched again."""
+        monkeypatch.setitem(app.config, 'OLLAMA_STATUS_TTL', 0.0)
+        monkeypatch.setitem(app.config, 'OLLAMA_STATUS_STALE_TTL', 0.0)
+        service.is_ollama_available()
+        service.is_ollama_available()
+        assert fake_ollama.count('GET', '/api/tags') == 2
+
+    def test_stale_snapshot_is_served_while_refreshing(self, app, service, fake_ollama, monkeypatch):
+        """A recently expired snapshot should be returned and refreshed in the background."""
+        service.is_ollama_available()
+        monkeypatch.setitem(app.config, 'OLLAMA_STATUS_TTL', 0.0)
+        fake_ollama.models = [{'name': 'llava:7b'}]
+        assert [m['name'] for m in service.get_models()] == ['qwen3:0.6b', 'qwen2.5vl:3b']
+        service._refresh_thread.join(timeout=5)
+        monkeypatch.setitem(app.config, 'OLLAMA_STATUS_TTL', 30.0)
+        assert [m['name'] for m in service.get_models()] == ['llava:7b']
+
+    def test_failed_call_invalidates_snapshot(self, app, service, fake_ollama, monkeypatch):
+        """A failed completion should force the next status check to probe again."""
+        monkeypatch.setitem(app.config, 'OLLAMA_MAX_RETRIES', 0)
+        service.is_ollama_available()
+        service.generate_completion("Hallo", model='qwen3:0.6b')
+        fake_ollama._server.shutdown()
+        fake_ollama._server.server_close()
+        service.close()
+        assert 'error' in service.generate_completion("Hallo", model='qwen3:0.6b')
+        assert service.is_ollama_available() is False
+
+class TestLLMResponseCache:
+    """Test suite for the LLM response cache."""
+
+    @pytest.fixture(autouse=True)
+    def cache_path(self, app, tmp_path, monkeypatch):
+        monkeypatch.setitem(app.config, 'LLM_CACHE_PATH', str(tmp_path / 'llm_cache.sqlite3'))
+
+    def test_identical_request_is_served_from_cache(self, service, fake_ollama):
+        """A repeated deterministic prompt should not reach Ollama again."""
+        first = service.generate_completion("Hallo", model='qwen3:0.6b', temperature=0.1, use_cache=True)
+        second = service.generate_completion("Hallo", model='qwen3:0.6b', temperature=0.1, use_cache=True)
+        assert second['response'] == first['response'] == '{"answer": 42}'
+        assert second['cache_hit'] is True
+        assert fake_ollama.count('POST', '/api/generate') == 1
+        assert service.get_cache_metrics()['llm_cache_memory_hits_total'] == 1
+
+    def test_parameters_are_part_of_the_key(self, service, fake_ollama):
+        """Different sampling parameters or uncached calls should always hit Ollama."""
+        service.generate_completion("Hallo", model='qwen3:0.6b', temperature=0.1, use_cache=True)
+        service.generate_completion("Hallo", model='qwen3:0.6b', temperature=0.2, use_cache=True)
+        service.generate_completion("Hallo", model='qwen3:0.6b', temperature=0.1)
+        assert fake_ollama.count('POST', '/api/generate') == 3
+
+    def test_disk_tier_survives_restart(self, app, service, fake_ollama):
+        """Responses should be reused by a new service instance via the SQLite tier."""
+        service.generate_completion("Hallo", model='qwen3:0.6b', use_cache=True)
+        restarted = OllamaService()
+        try:
+            assert restarted.generate_completion("Hallo", model='qwen3:0.6b', use_cache=True)['cache_hit'] is True
+            assert restarted.get_cache_metrics()['llm_cache_disk_hits_total'] == 1
+        finally:
+            restarted.close()
+        assert fake_ollama.count('POST', '/api/generate') == 1
+
+    def test_invalidate_model_and_kill_switch(self, app, service, fake_ollama, monkeypatch):
+        """Invalidation should drop a model's responses; disabling the cache bypasses it."""
+        service.generate_completion("Hallo", model='qwen3:0.6b', use_cache=True)
+        assert service.invalidate_cached_responses('qwen3:0.6b') == 1
+        service.generate_completion("Hallo", model='qwen3:0.6b', use_cache=True)
+        monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+        service.generate_completion("Hallo", model='qwen3:0.6b', use_cache=True)
+        assert fake_ollama.count('POST', '/api/generate') == 3
+
+class TestOllamaStreaming:
+    """Test suite for streamed completions."""
+
+    def test_think_blocks_are_stripped_incrementally(self, service, fake_ollama):
+        """Streamed chunks should never contain thinking content."""
+        fake_ollama.generate_response = '<think>lange Überlegung</think>\n\nDies ist eine Rechnung.'
+        chunks = list(service.stream_completion("Fasse zusammen", model='qwen3:0.6b'))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == 'Dies ist eine Rechnung.'
+        assert fake_ollama.requests[-1][2]['stream'] is True
+
+    def test_summary_reports_tokens(self, service, fake_ollama):
+        """summarize_document_content should stream through on_token when given."""
+        fake_ollama.generate_response = '<think>x</think>Kurze Zusammenfassung'
+        tokens = []
+        result = service.summarize_document_content("Text", on_token=tokens.append)
+        assert ''.join(tokens) == result['summary'] == 'Kurze Zusammenfassung'
+
+def long_document(pages=12):
+    """A multi-page German text with a file number on the last page only."""
+    filler = "Die Kanzlei bestätigt den Eingang der Unterlagen und prüft die Angaben sorgfältig. " * 12
+    body = "\n\n".join(f"Seite {page}\n{filler}" for page in range(1, pages + 1))
+    return body + "\n\nAktenzeichen: AZ-2024-0815"
+
+class TestChunkedExtraction:
+    """Test suite for map-reduce extraction over long documents."""
+
+    PLACEHOLDERS = [{'name': 'Aktenzeichen', 'type': 'text'}, {'name': 'Frist', 'type': 'date'}]
+
+    @pytest.fixture(autouse=True)
+    def small_context(self, app, monkeypatch):
+        monkeypatch.setitem(app.config, 'LLM_NUM_CTX', 2048)
+        monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+        monkeypatch.setitem(app.config, 'PASSAGE_RETRIEVAL_ENABLED', False)
+
+    def test_windows_fit_overlap_and_cover_the_text(self):
+        text = long_document()
+        windows = split_into_windows(text, 2000, 300)
+        assert len(windows) > 1
+        assert all(len(window) <= 2000 for window in windows)
+        assert windows[0].endswith('\n\n')
+        assert windows[-1].endswith('AZ-2024-0815')
+        for previous, window in zip(windows, windows[1:]):
+            assert window[:50] in previous
+
+    def test_merge_prefers_agreeing_and_confident_values(self):
+        values, confidence = merge_extractions([
+            {'values': {'Frist': '2024-05-31', 'Aktenzeichen': 'null'}, 'confidence': 0.6},
+            {'values': {'Frist': '2024-06-30'}, 'confidence': 0.7},
+            {'values': {'Frist': '2024-05-31 ', 'Aktenzeichen': 'AZ 1'}, 'confidence': 0.6,
+             'field_confidence': {'Aktenzeichen': 0.9}}
+        ])
+        assert values == {'Frist': '2024-05-31', 'Aktenzeichen': 'AZ 1'}
+        assert confidence == {'Frist': 0.84, 'Aktenzeichen': 0.9}
+
+    def test_context_length_is_read_once_per_model(self, app, service, fake_ollama, monkeypatch):
+        fake_ollama.context_length = 1024
+        assert service.get_context_length('qwen3:0.6b') == 1024
+        monkeypatch.setitem(app.config, 'LLM_NUM_CTX', 512)
+        assert service.get_context_length('qwen3:0.6b') == 512
+        assert fake_ollama.count('POST', '/api/show') == 1
+
+    def test_context_length_fallback_is_cached_briefly(self, app, service, fake_ollama, monkeypatch):
+        fake_ollama.context_length = 'unbekannt'
+        monkeypatch.setitem(app.config, 'LLM_NUM_CTX', 512)
+        assert [service.get_context_length('qwen3:0.6b') for _ in range(3)] == [512] * 3
+        assert fake_ollama.count('POST', '/api/show') == 1
+
+        # Once the negative TTL has passed the model is asked again
+        monkeypatch.setitem(app.config, 'OLLAMA_STATUS_NEGATIVE_TTL', 0)
+        fake_ollama.context_length = 256
+        assert service.get_context_length('qwen3:0.6b') == 256
+        assert fake_ollama.count('POST', '/api/show') == 2
+
+    def test_value_beyond_the_truncation_limit_is_found(self, app, service, fake_ollama, monkeypatch):
+        """A field on the last page is extracted from its window; truncation misses it."""
+        def answer(payload):
+            if 'AZ-2024-0815' in payload['prompt']:
+                return '{"extracted_values": {"Aktenzeichen": "AZ-2024-0815", "Frist": null}, "confidence": 0.9}'
+            return '{"extracted_values": {"Aktenzeichen": null, "Frist": null}, "confidence": 0.3}'
+
+        fake_ollama.generate_handler = answer
+        result = service.extract_placeholders_from_text(long_document(), self.PLACEHOLDERS)
+        calls = [payload for method, path, payload in fake_ollama.requests if path == '/api/generate']
+        assert result['extracted_values'] == {'Aktenzeichen': 'AZ-2024-0815'}
+        assert result['chunks'] == len(calls) > 1
+        assert all(payload['options'] == {'num_ctx': 2048} for payload in calls)
+
+        monkeypatch.setitem(app.config, 'LLM_EXTRACTION_MODE', 'truncate')
+        result = service.extract_placeholders_from_text(long_document(), self.PLACEHOLDERS)
+        assert result['extracted_values'] == {}
+        assert 'options' not in fake_ollama.requests[-1][2]
+
+    def test_long_summary_is_reduced_from_window_summaries(self, service, fake_ollama):
+        fake_ollama.generate_handler = lambda payload: 'Gesamt' if 'Teil 2:' in payload['prompt'] else 'Abschnitt'
+        tokens = []
+        result = service.summarize_document_content(long_document(), on_token=tokens.append)
+        assert result['summary'] == ''.join(tokens) == 'Gesamt'
+        assert fake_ollama.count('POST', '/api/generate') == result['chunks'] + 1
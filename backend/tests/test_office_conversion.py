@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import pytest
+from app.services.office_conversion import (
+    OfficeConverterPool, OfficeConversionError, ConversionQueueFullError, ConversionTimeoutError,
+    find_soffice, shutdown_converter_pool
+)
+
+# Mimics `soffice --convert-to pdf --outdir DIR FILE...`; file names steer its behaviour
+STUB_SOFFICE = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+outdir = args[args.index('--outdir') + 1]
+files = [arg for arg in args if arg.endswith('.docx')]
+profile = [arg for arg in args if arg.startswith('-env:UserInstallation=')][0]
+with open(os.environ['SOFFICE_STUB_LOG'], 'a') as log:
+    log.write(profile + ' ' + str(len(files)) + '\\n')
+for path in files:
+    name = os.path.basename(path)
+    if 'slow' in name:
+        time.sleep(30)
+    if 'crash' in name and not os.path.exists(path + '.crashed'):
+        open(path + '.crashed', 'w').close()
+        sys.exit(134)
+    if 'broken' in name:
+        sys.exit(1)
+    with open(os.path.join(outdir, os.path.splitext(name)[0] + '.pdf'), 'wb') as pdf:
+        pdf.write(b'%PDF-1.4 ' + name.encode())
+'''
+
+def real_soffice():
+    """Use a local LibreOffice when SOFFICE_TEST_BINARY points to one."""
+    return os.getenv('SOFFICE_TEST_BINARY')
+
+@pytest.fixture
+def soffice(tmp_path, monkeypatch):
+    """Path of a stub soffice binary, plus the log of its invocations."""
+    binary = real_soffice()
+    log = tmp_path / 'soffice.log'
+    log.touch()
+    monkeypatch.setenv('SOFFICE_STUB_LOG', str(log))
+    if binary:
+        return binary, None
+    stub = tmp_path / 'soffice'
+    stub.write_text(STUB_SOFFICE.format(python=sys.executable))
+    stub.chmod(0o755)
+    return str(stub), log
+
+def make_docx(folder, name):
+    import docx
+    path = os.path.join(folder, name)
+    document = docx.Document()
+    document.add_paragraph(name)
+    document.save(path)
+    return path
+
+class TestOfficeConverterPool:
+    """Test suite for the LibreOffice conversion pool."""
+
+    def test_convert_and_batch(self, soffice, tmp_path):
+        """Single documents and batches are converted, batches in few soffice runs."""
+        binary, log = soffice
+        pool = OfficeConverterPool(binary, workers=2, batch_size=3, profile_root=str(tmp_path / 'profiles'), listener=False)
+        try:
+            single = make_docx(tmp_path, 'brief.docx')
+            assert pool.convert(single) == str(tmp_path / 'brief.pdf')
+            assert (tmp_path / 'brief.pdf').read_bytes().startswith(b'%PDF')
+
+            batch_dir = tmp_path / 'batch'
+            batch_dir.mkdir()
+            paths = [make_docx(batch_dir, f'dok{index}.docx') for index in range(7)]
+            results = pool.convert_batch(paths, str(tmp_path / 'out'))
+            assert all(os.path.exists(results[path]['path']) for path in paths)
+            if log is not None:
+                runs = log.read_text().splitlines()
+                assert sorted(line.split()[-1] for line in runs[1:]) == ['1', '3', '3']
+                assert all('worker-' in line for line in runs)
+        finally:
+            pool.shutdown()
+
+    def test_timeout_and_crash_restart(self, soffice, tmp_path):
+        """Hung conversions are killed; a crashed run is retried once."""
+        binary, log = soffice
+        if log is None:
+            pytest.skip('needs the stub converter')
+        pool = OfficeConverterPool(binary, workers=1, timeout=1, profile_root=str(tmp_path / 'profiles'), listener=False)
+        try:
+            started = time.monotonic()
+            with pytest.raises(ConversionTimeoutError):
+                pool.convert(make_docx(tmp_path, 'slow.docx'))
+            assert time.monotonic() - started < 10
+
+            assert pool.convert(make_docx(tmp_path, 'crash.docx')).endswith('crash.pdf')
+            with pytest.raises(OfficeConversionError):
+                pool.convert(make_docx(tmp_path, 'broken.docx'))
+
+            metrics = pool.get_metrics()
+            assert metrics['office_conversion_timeouts_total'] == 1
+            assert metrics['office_worker_restarts_total'] == 2
+            assert metrics['office_conversions_total'] == 1
+        finally:
+            pool.shutdown()
+
+    def test_bounded_queue_rejects(self, soffice, tmp_path):
+        """With every worker busy and the queue full, submissions fail fast."""
+        binary, log = soffice
+        if log is None:
+            pytest.skip('needs the stub converter')
+        pool = OfficeConverterPool(binary, workers=1, queue_size=1, timeout=1, profile_root=str(tmp_path / 'profiles'), listener=False)
+        try:
+            slow = make_docx(tmp_path, 'slow.docx')
+            running = pool.submit([slow], str(tmp_path))
+            queued = pool.submit([make_docx(tmp_path, 'a.docx')], str(tmp_path))
+            with pytest.raises(ConversionQueueFullError):
+                pool.submit([make_docx(tmp_path, 'b.docx')], str(tmp_path))
+            assert pool.get_metrics()['office_conversion_rejected_total'] == 1
+            with pytest.raises(ConversionTimeoutError):
+                running.result()
+            assert queued.result()[0].endswith('a.pdf')
+        finally:
+            pool.shutdown()
+
+    def test_single_conversion_waits_for_a_slot(self, soffice, tmp_path):
+        """convert() waits up to queue_timeout for a slot before giving up."""
+        binary, log = soffice
+        if log is None:
+            pytest.skip('needs the stub converter')
+        pool = OfficeConverterPool(
+            binary, workers=1, queue_size=0, timeout=1, queue_timeout=0.2,
+            profile_root=str(tmp_path / 'profiles'), listener=False
+        )
+        try:
+            running = pool.submit([make_docx(tmp_path, 'slow.docx')], str(tmp_path))
+            with pytest.raises(ConversionQueueFullError):
+                pool.convert(make_docx(tmp_path, 'a.docx'))
+
+            # The slot frees up once the hung conversion is killed
+            pool.queue_timeout = 10
+            assert pool.convert(make_docx(tmp_path, 'b.docx')).endswith('b.pdf')
+            with pytest.raises(ConversionTimeoutError):
+                running.result()
+            assert pool.get_metrics()['office_conversion_rejected_total'] == 1
+        finally:
+            pool.shutdown()
+
+    def test_pdf_batch_is_converted_in_groups(self, app, soffice, tmp_path, monkeypatch):
+        """Batch PDF export passes batch_size documents to each LibreOffice run."""
+        from app.services.batch_service import batch_service
+        from app.services.template_cache import compile_template
+
+        binary, log = soffice
+        if log is None:
+            pytest.skip('needs the stub converter')
+        monkeypatch.setitem(app.config, 'SOFFICE_BINARY', binary)
+        monkeypatch.setitem(app.config, 'OFFICE_CONVERSION_MODE', 'cli')
+        monkeypatch.setitem(app.config, 'OFFICE_CONVERSION_BATCH_SIZE', 2)
+        monkeypatch.setitem(app.config, 'OFFICE_PROFILE_FOLDER', str(tmp_path / 'profiles'))
+        shutdown_converter_pool()
+        output_dir = tmp_path / 'out'
+        output_dir.mkdir()
+        items = [{'index': index, 'client_id': None, 'label': f'Mandant {index}', 'values': {}} for index in range(5)]
+        try:
+            with app.app_context():
+                plan = compile_template(make_docx(tmp_path, 'vorlage.docx'))
+                results = list(batch_service.render_items(plan, items, str(output_dir), 'pdf'))
+        finally:
+            shutdown_converter_pool()
+        assert sorted(result['index'] for result in results) == list(range(5))
+        assert all(result['path'].endswith('.pdf') and os.path.exists(result['path']) for result in results)
+        assert sorted(os.listdir(output_dir)) == sorted(os.path.basename(result['path']) for result in results)
+        assert sorted(line.split()[-1] for line in log.read_text().splitlines()) == ['1', '2', '2']
+
+    def test_document_service_prefers_libreoffice(self, app, soffice, tmp_path, monkeypatch):
+        """The conversion chain should use the pool when soffice is available."""
+        from app.services.document_service import DocumentService
+
+        binary, _ = soffice
+        monkeypatch.setitem(app.config, 'SOFFICE_BINARY', binary)
+        monkeypatch.setitem(app.config, 'OFFICE_CONVERSION_MODE', 'cli')
+        monkeypatch.setitem(app.config, 'OFFICE_PROFILE_FOLDER', str(tmp_path / 'profiles'))
+        shutdown_converter_pool()
+        try:
+            with app.app_context():
+                assert find_soffice() == binary
+                success, pdf_path, error = DocumentService()._try_convert_docx_to_pdf(make_docx(tmp_path, 'vorlage.docx'))
+            assert success and error == ''
+            assert pdf_path == str(tmp_path / 'vorlage.pdf')
+        finally:
+            shutdown_converter_pool()
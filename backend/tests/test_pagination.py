@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import Client, Document, TaxAdvisor, WorkOrder
+
+@pytest.fixture
+def work_orders(app, db):
+    """Eight work orders of one client with duplicate and missing due dates."""
+    with app.app_context():
+        client = Client(client_type='company', company_name='Paging GmbH')
+        advisor = TaxAdvisor(name='Paging Berater', email='paging@kanzlei.de')
+        db.session.add_all([client, advisor])
+        db.session.flush()
+        base = datetime(2025, 3, 1)
+        due_dates = [base, base + timedelta(days=2), None, base, base + timedelta(days=1), None, base + timedelta(days=2), base]
+        orders = [
+            WorkOrder(
+                title=f'Auftrag {index}', client_id=client.id, tax_advisor_id=advisor.id, due_date=due,
+                status='open' if index % 2 else 'completed', priority='high' if index < 3 else 'low'
+            )
+            for index, due in enumerate(due_dates)
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+        ids = [order.id for order in orders]
+        yield {'client_id': client.id, 'ids': ids, 'due_dates': dict(zip(ids, due_dates))}
+
+        WorkOrder.query.filter(WorkOrder.id.in_(ids)).delete(synchronize_session=False)
+        db.session.delete(advisor)
+        db.session.delete(client)
+        db.session.commit()
+
+def fetch_all_pages(client, url):
+    """Follow X-Next-Cursor until the last page, returning the pages."""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url + (f'&after={cursor}' if cursor else ''))
+        assert response.status_code == 200, response.get_json()
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+class TestKeysetPagination:
+    """Test suite for cursor pagination, filters and sort keys of list endpoints."""
+
+    @pytest.mark.parametrize('sort', ['due_date', '-due_date', 'id', '-id'])
+    def test_pages_cover_every_row_once(self, app, work_orders, sort):
+        """Paging with ties and NULLs returns each row once, in sort order."""
+        client = app.test_client()
+        pages = fetch_all_pages(client, f"/api/work-orders?client_id={work_orders['client_id']}&limit=3&sort={sort}")
+        assert [len(page) for page in pages] == [3, 3, 2]
+
+        ids = [order['id'] for page in pages for order in page]
+        due_dates = work_orders['due_dates']
+        key = sort.lstrip('-')
+        descending = sort.startswith('-')
+        if key == 'id':
+            expected = sorted(due_dates, reverse=descending)
+        else:
+            # NULL sorts as the smallest value, ties are broken by id
+            expected = sorted(due_dates, key=lambda i: (due_dates[i] is not None, due_dates[i] or datetime.min, i), reverse=descending)
+        assert ids == expected
+
+    def test_filters(self, app, work_orders):
+        """Equality, multi-value and date range filters combine with AND."""
+        client = app.test_client()
+        base = f"/api/work-orders?client_id={work_orders['client_id']}"
+        ids = work_orders['ids']
+
+        assert [o['id'] for o in client.get(base + '&status=open').get_json()] == ids[1::2]
+        assert [o['id'] for o in client.get(base + '&status=open,completed&priority=high').get_json()] == ids[:3]
+        in_range = client.get(base + '&due_after=2025-03-02&due_before=2025-03-03').get_json()
+        assert [o['id'] for o in in_range] == [ids[4]]
+
+    def test_without_limit_returns_all_rows(self, app, work_orders):
+        """Requests without limit keep the unpaginated response."""
+        response = app.test_client().get(f"/api/work-orders?client_id={work_orders['client_id']}")
+        assert len(response.get_json()) == 8
+        assert 'X-Next-Cursor' not in response.headers
+
+    def test_invalid_parameters(self, app, work_orders):
+        """Bad limits, sort keys, filter values and cursors are rejected."""
+        client = app.test_client()
+        first = client.get('/api/work-orders?limit=2&sort=due_date')
+        cursor = first.headers['X-Next-Cursor']
+
+        assert client.get('/api/work-orders?limit=0').status_code == 400
+        assert client.get('/api/work-orders?limit=100000').status_code == 400
+        assert client.get('/api/work-orders?sort=description').status_code == 400
+        assert client.get('/api/work-orders?client_id=abc').status_code == 400
+        assert client.get('/api/work-orders?due_after=tomorrow').status_code == 400
+        assert client.get('/api/work-orders?after=not-a-cursor').status_code == 400
+        assert client.get(f'/api/work-orders?after={cursor}&sort=-due_date').status_code == 400
+
+    def test_other_list_endpoints_paginate(self, app, db, work_orders):
+        """Clients, documents, templates, tax advisors and placeholders accept limit/after."""
+        with app.app_context():
+            documents = [Document(title=f'Vorlage {i}', content='Text', status='draft') for i in range(3)]
+            db.session.add_all(documents)
+            db.session.commit()
+            document_ids = [d.id for d in documents]
+        try:
+            client = app.test_client()
+            for url in ('/api/clients?sort=-created_at', '/api/documents?status=draft', '/api/documents/templates?sort=title',
+                        '/api/tax-advisors?sort=name', '/api/placeholders?sort=name'):
+                pages = fetch_all_pages(client, url + '&limit=1')
+                ids = [row['id'] for page in pages for row in page]
+                assert len(ids) == len(set(ids))
+                assert ids == [row['id'] for row in client.get(url).get_json()]
+        finally:
+            with app.app_context():
+                Document.query.filter(Document.id.in_(document_ids)).delete(synchronize_session=False)
+                db.session.commit()
+
+    def test_keyset_query_reads_the_index(self, app, db, work_orders):
+        """A filtered page deep in the list is an index range scan without sorting."""
+        from app.routes.routes import WORK_ORDER_LIST
+        from werkzeug.datastructures import MultiDict
+
+        cursor = app.test_client().get('/api/work-orders?status=open&sort=-due_date&limit=1').headers['X-Next-Cursor']
+        args = MultiDict({'status': 'open', 'sort': '-due_date', 'after': cursor})
+        with app.app_context():
+            plans = []
+            for query in WORK_ORDER_LIST.build_queries(WorkOrder.query, args):
+                statement = query.limit(20).statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+                plans.append(' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}'))))
+        assert len(plans) == 2
+        assert all('USING INDEX ix_work_orders_status_due_date_id' in plan for plan in plans)
+        assert not any('TEMP B-TREE' in plan for plan in plans)
@@ -0,0 +1,66 @@
+import pytest
+from app.services.llm_service import OllamaService
+from app.services.passage_retrieval import PassageRetriever
+
+FILLER = "Die Kanzlei bestätigt den Eingang der Unterlagen und prüft die Angaben sorgfältig. " * 8
+
+def workflow_text():
+    """Two files as the agent joins them, with the values far from the start."""
+    bescheid = "\n\n".join([FILLER] * 10 + [
+        "Gegen diesen Bescheid kann Einspruch eingelegt werden.\n\nDie Einspruchsfrist endet am 31.05.2025.",
+    ] + [FILLER] * 5)
+    rechnung = "\n\n".join([FILLER] * 6 + [
+        "Bitte überweisen Sie den Betrag von 1.250,00 € auf folgendes Konto:\n\nIBAN: DE89 3704 0044 0532 0130 00"
+    ])
+    return f"--- Dokument: bescheid.pdf ---\n{bescheid}\n\n--- Dokument: rechnung.pdf ---\n{rechnung}"
+
+class TestPassageRetrieval:
+    """Test suite for the passage pre-filter in front of field extraction."""
+
+    def test_passage_indexes_are_cached_per_document(self, app):
+        retriever = PassageRetriever()
+        with app.app_context():
+            first = retriever.select(workflow_text(), [{'name': 'Frist', 'type': 'date'}])
+            # The same files in another combination reuse their indexes
+            text = workflow_text().split('--- Dokument: rechnung.pdf ---')[0]
+            retriever.select(text, [{'name': 'Frist', 'type': 'date'}])
+        metrics = retriever.get_metrics()
+        assert metrics['passage_index_builds_total'] == 2
+        assert metrics['passage_index_cache_hits_total'] == 1
+        assert first.startswith('--- Dokument: bescheid.pdf ---')
+
+    def test_ranking_uses_names_compounds_and_value_patterns(self, app):
+        retriever = PassageRetriever()
+        with app.app_context():
+            text = workflow_text()
+            indexes = [retriever.get_index(document, header) for header, document in retriever._documents(text)]
+
+            def best(placeholder):
+                _, document, position = retriever.rank(indexes, placeholder)[0]
+                return indexes[document].passages[position]
+
+            assert '31.05.2025' in best({'name': 'Frist', 'type': 'date'})
+            # No word of the name occurs in the passage, the IBAN pattern finds it
+            assert 'DE89' in best({'name': 'Bankverbindung', 'type': 'text'})
+            assert '1.250,00 €' in best({'name': 'Rechnungsbetrag', 'type': 'number'})
+
+    def test_prompt_holds_only_relevant_passages(self, app, fake_ollama, monkeypatch):
+        monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+        monkeypatch.setitem(app.config, 'PASSAGE_CONTEXT_CHARS', 2000)
+        monkeypatch.setitem(app.config, 'RULE_EXTRACTION_ENABLED', False)
+        fake_ollama.generate_handler = lambda payload: (
+            '{"extracted_values": {"Frist": "31.05.2025"}, "confidence": 0.9}'
+            if '31.05.2025' in payload['prompt'] else '{"extracted_values": {}, "confidence": 0.1}'
+        )
+        text = workflow_text()
+        with app.app_context():
+            service = OllamaService()
+            try:
+                result = service.extract_placeholders_from_text(text, [{'name': 'Frist', 'type': 'date'}])
+            finally:
+                service.close()
+        prompts = [payload['prompt'] for method, path, payload in fake_ollama.requests if path == '/api/generate']
+        assert result['extracted_values'] == {'Frist': '2025-05-31'}
+        assert len(prompts) == 1
+        assert len(prompts[0]) < len(text) / 3
+        assert 'IBAN' not in prompts[0]
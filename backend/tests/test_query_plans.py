@@ -0,0 +1,63 @@
+import re
+import pytest
+from app.models import Client, Document, DocumentText, Placeholder, TaxAdvisor, User, WorkOrder
+
+# Lookups the routes and services run per request
+HOT_QUERIES = {
+    'documents of a work order': lambda: Document.query.filter_by(work_order_id=1),
+    'document of a work order': lambda: Document.query.filter_by(id=1, work_order_id=1),
+    'documents of a client': lambda: Document.query.filter_by(client_id=1),
+    'documents of a tax advisor': lambda: Document.query.filter_by(tax_advisor_id=1),
+    'documents by status': lambda: Document.query.filter_by(status='draft'),
+    'documents by type': lambda: Document.query.filter_by(document_type='application/pdf'),
+    'work orders of a client': lambda: WorkOrder.query.filter_by(client_id=1),
+    'work orders of a tax advisor': lambda: WorkOrder.query.filter_by(tax_advisor_id=1),
+    'work orders of a template': lambda: WorkOrder.query.filter_by(template_id=1),
+    'work orders by status': lambda: WorkOrder.query.filter_by(status='open'),
+    'placeholders of a document': lambda: Placeholder.query.filter_by(document_id=1),
+    'client by tax number': lambda: Client.query.filter_by(tax_number='143/123/45678'),
+    'client by email': lambda: Client.query.filter_by(email='info@muster.de'),
+    'clients of documents (selectin)': lambda: Client.query.filter(Client.id.in_([1, 2, 3])),
+    'tax advisors of documents (selectin)': lambda: TaxAdvisor.query.filter(TaxAdvisor.id.in_([1, 2, 3])),
+    'cached text by path': lambda: DocumentText.query.filter_by(file_path='/tmp/a.pdf'),
+    'cached text by hash': lambda: DocumentText.query.filter_by(content_hash='0' * 64),
+    'user by email': lambda: User.query.filter_by(email='user@kanzlei.de'),
+}
+
+# A full table scan reads "SCAN <table>"; index scans read "SCAN <table> USING [COVERING] INDEX ..."
+TABLE_SCAN = re.compile(r'^SCAN \w+$')
+
+def query_plan(db, query):
+    """EXPLAIN QUERY PLAN details of an ORM query."""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}'))]
+
+class TestQueryPlans:
+    """Test suite guarding the indexes behind frequent queries."""
+
+    @pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+    def test_hot_query_uses_an_index(self, app, db, name):
+        """Every hot query is answered from an index, not a table scan."""
+        with app.app_context():
+            plan = query_plan(db, HOT_QUERIES[name]())
+        assert plan
+        assert not [step for step in plan if TABLE_SCAN.match(step)], f"{name}: {plan}"
+
+    @pytest.mark.parametrize('spec_name, model', [
+        ('CLIENT_LIST', Client), ('DOCUMENT_LIST', Document), ('WORK_ORDER_LIST', WorkOrder),
+        ('TAX_ADVISOR_LIST', TaxAdvisor), ('PLACEHOLDER_LIST', Placeholder)
+    ])
+    def test_sorted_list_pages_use_an_index(self, app, db, spec_name, model):
+        """Every sort key of the list endpoints reads its index instead of sorting the table."""
+        from app.routes import routes
+
+        spec = getattr(routes, spec_name)
+        with app.app_context():
+            for sort in spec.sort_keys:
+                for direction in ('', '-'):
+                    for query in spec.build_queries(model.query, {'sort': direction + sort}):
+                        plan = query_plan(db, query.limit(50))
+                        # Walking the table in rowid order is how an id-sorted page is read
+                        scans = [step for step in plan if TABLE_SCAN.match(step) and sort != 'id']
+                        sorts = [step for step in plan if 'TEMP B-TREE' in step]
+                        assert not scans and not sorts, f"{spec_name} sort={direction}{sort}: {plan}"
@@ -0,0 +1,110 @@
+import pytest
+from app.models import Client
+from app.services.agent_service import AIAgentService
+from app.services.llm_service import OllamaService
+from app.services.rule_extractors import rule_extractors
+
+LETTER = """Finanzamt München, 80335 München
+
+Steuernummer: 143/815/08156
+Bescheid vom 02.04.2025
+
+Die Einspruchsfrist endet am 05.05.2025. Der festgesetzte Betrag: 1.250,00 €
+ist bis zum 15.05.2025 zu zahlen.
+
+Bankverbindung: DE89 3704 0044 0532 0130 00
+Vorauszahlungen angepasst: ja
+"""
+
+@pytest.fixture
+def service(app, fake_ollama, monkeypatch):
+    monkeypatch.setitem(app.config, 'LLM_CACHE_ENABLED', False)
+    with app.app_context():
+        service = OllamaService()
+        yield service
+        service.close()
+
+def generate_prompts(fake_ollama):
+    return [payload['prompt'] for method, path, payload in fake_ollama.requests if path == '/api/generate']
+
+class TestRuleExtractors:
+    """Test suite for the rule-based field extraction in front of the LLM."""
+
+    def test_values_need_a_checksum_or_a_label(self, app):
+        with app.app_context():
+            resolved, unresolved = rule_extractors.extract(LETTER, [
+                {'name': 'IBAN', 'type': 'text'},
+                {'name': 'Einspruchsfrist', 'type': 'date'},
+                {'name': 'Zahlbetrag', 'type': 'number', 'description': 'Festgesetzter Betrag'},
+                {'name': 'Vorauszahlungen', 'type': 'checkbox'},
+                {'name': 'Steuernummer', 'type': 'text'},
+                # Three dates and none labelled as appointment
+                {'name': 'Termin', 'type': 'date'},
+                {'name': 'Telefon', 'type': 'text'}
+            ])
+            assert {name: extraction.value for name, extraction in resolved.items()} == {
+                'IBAN': 'DE89370400440532013000',
+                'Einspruchsfrist': '2025-05-05',
+                'Zahlbetrag': 1250.0,
+                'Vorauszahlungen': True,
+                'Steuernummer': '143/815/08156'
+            }
+            assert [placeholder['name'] for placeholder in unresolved] == ['Termin', 'Telefon']
+
+            wrong_iban = LETTER.replace('DE89 3704', 'DE88 3704')
+            resolved, _ = rule_extractors.extract(wrong_iban, [{'name': 'IBAN', 'type': 'text'}])
+            assert resolved == {}
+
+    def test_generic_word_does_not_label_a_compound_field(self, app):
+        text = "Finanzamt München, Datum: 18.10.2026\nFrist bis 30.11.2026"
+        with app.app_context():
+            resolved, unresolved = rule_extractors.extract(text, [
+                {'name': 'Geburtsdatum', 'type': 'date'}, {'name': 'Bescheiddatum', 'type': 'date'}
+            ])
+            assert resolved == {} and len(unresolved) == 2
+
+            resolved, _ = rule_extractors.extract(text, [{'name': 'Datum', 'type': 'date'}])
+            assert resolved['Datum'].value == '2026-10-18'
+
+    def test_llm_is_skipped_when_every_field_is_resolved(self, app, service, fake_ollama):
+        avoided = rule_extractors.get_metrics()['rule_extraction_llm_calls_avoided_total']
+        result = service.extract_placeholders_from_text(LETTER, [
+            {'name': 'IBAN', 'type': 'text'}, {'name': 'Einspruchsfrist', 'type': 'date'}
+        ])
+        assert result['extracted_values'] == {'IBAN': 'DE89370400440532013000', 'Einspruchsfrist': '2025-05-05'}
+        assert result['llm_skipped'] is True
+        assert generate_prompts(fake_ollama) == []
+        assert rule_extractors.get_metrics()['rule_extraction_llm_calls_avoided_total'] == avoided + 1
+
+    def test_only_unresolved_fields_are_sent_to_the_llm(self, app, service, fake_ollama):
+        fake_ollama.generate_response = (
+            '{"extracted_values": {"Sachbearbeiter": "Frau Huber", "IBAN": "DE00"}, "confidence": 0.7}'
+        )
+        result = service.extract_placeholders_from_text(LETTER, [
+            {'name': 'IBAN', 'type': 'text'}, {'name': 'Sachbearbeiter', 'type': 'text'}
+        ])
+        prompts = generate_prompts(fake_ollama)
+        assert len(prompts) == 1
+        assert '- Sachbearbeiter (text)' in prompts[0] and '- IBAN' not in prompts[0]
+        # Rule values win over what the model answers
+        assert result['extracted_values'] == {'Sachbearbeiter': 'Frau Huber', 'IBAN': 'DE89370400440532013000'}
+        assert result['rule_extracted'] == ['IBAN']
+        assert result['field_confidence'] == {'Sachbearbeiter': 0.7, 'IBAN': 0.99}
+
+    def test_client_matched_by_tax_number_without_llm(self, app, db, fake_ollama):
+        with app.app_context():
+            client = Client(client_type='company', company_name='Bäckerei Sonnenschein GmbH', tax_number='143/815/08156')
+            db.session.add(client)
+            db.session.commit()
+            client_id = client.id
+            agent = AIAgentService()
+            agent.ollama_service = OllamaService()
+            try:
+                result = agent._analyze_and_match_clients(LETTER, [])
+            finally:
+                agent.ollama_service.close()
+                db.session.delete(Client.query.get(client_id))
+                db.session.commit()
+        assert result['client_match']['id'] == client_id
+        assert result['extracted_client_info']['identification'] == {'tax_number': '143/815/08156'}
+        assert generate_prompts(fake_ollama) == []
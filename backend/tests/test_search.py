@@ -0,0 +1,140 @@
+import os
+import time
+import pytest
+from app.models import Client, Document, Placeholder, TaxAdvisor, WorkOrder
+from app.services.search_service import SearchService, SqliteFtsBackend
+
+@pytest.fixture
+def workflow(app, db, tmp_path, monkeypatch):
+    """A client with a work order holding two text documents and a template."""
+    upload_folder = tmp_path / 'uploads'
+    upload_folder.mkdir()
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(upload_folder))
+    (upload_folder / 'bescheid.txt').write_text(
+        'Einkommensteuerbescheid 2023 zur Steuernummer 143/815/08156, Aktenzeichen ESt-4711', encoding='utf-8'
+    )
+    (upload_folder / 'beleg.txt').write_text('Spendenquittung des Fördervereins', encoding='utf-8')
+    with app.app_context():
+        client = Client(client_type='company', company_name='Suchtest GmbH')
+        other = Client(client_type='company', company_name='Andere AG')
+        advisor = TaxAdvisor(name='Suchtest Berater', email='suchtest@kanzlei.de')
+        db.session.add_all([client, other, advisor])
+        db.session.flush()
+        work_order = WorkOrder(title='Jahresabschluss 2023', client_id=client.id, tax_advisor_id=advisor.id)
+        db.session.add(work_order)
+        db.session.flush()
+        documents = [
+            # Work order uploads store the path relative to UPLOAD_FOLDER
+            Document(title='bescheid.pdf', file_path='bescheid.txt', status='uploaded',
+                     client_id=client.id, work_order_id=work_order.id),
+            Document(title='beleg.pdf', file_path='beleg.txt', status='uploaded',
+                     client_id=client.id, work_order_id=work_order.id),
+            Document(title='Mahnung Vorlage', content='Zahlungserinnerung für Mandanten', status='active',
+                     client_id=other.id, placeholders=[{'name': 'Aktenzeichen', 'description': 'Gerichtliches Zeichen'}])
+        ]
+        db.session.add_all(documents)
+        db.session.commit()
+        ids = {
+            'client': client.id, 'other': other.id, 'advisor': advisor.id, 'work_order': work_order.id,
+            'documents': [document.id for document in documents]
+        }
+    yield ids
+    with app.app_context():
+        for document in Document.query.filter(Document.id.in_(ids['documents'])).all():
+            db.session.delete(document)
+        db.session.delete(WorkOrder.query.get(ids['work_order']))
+        for client_id in (ids['client'], ids['other']):
+            db.session.delete(Client.query.get(client_id))
+        db.session.delete(TaxAdvisor.query.get(ids['advisor']))
+        db.session.commit()
+
+def search_ids(client, **params):
+    response = client.get('/api/search', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return [item['id'] for item in response.get_json()]
+
+class TestDocumentSearch:
+    """Test suite for full-text search over documents."""
+
+    def test_finds_identifiers_in_extracted_text(self, app, workflow):
+        """Steuernummer and Aktenzeichen in file text are found, with a marked snippet."""
+        bescheid = workflow['documents'][0]
+        client = app.test_client()
+        response = client.get('/api/search', query_string={'q': '143/815/08156'})
+        results = response.get_json()
+        assert response.status_code == 200
+        assert [item['id'] for item in results] == [bescheid]
+        assert results[0]['title'] == 'bescheid.pdf'
+        assert 'Steuernummer <mark>143/815/08156</mark>,' in results[0]['snippet']
+        assert results[0]['score'] > 0
+        assert search_ids(client, q='ESt-4711') == [bescheid]
+        # Umlauts fold and the last word matches as a prefix
+        assert search_ids(client, q='Forderver') == [workflow['documents'][1]]
+
+    def test_ranking_and_filters(self, app, workflow):
+        """Title matches rank first; client and work order filters narrow the results."""
+        bescheid, _, template = workflow['documents']
+        client = app.test_client()
+        # The template has Aktenzeichen as a placeholder, the upload only in its text
+        assert search_ids(client, q='Aktenzeichen') == [template, bescheid]
+        assert search_ids(client, q='Aktenzeichen', client_id=workflow['client']) == [bescheid]
+        assert search_ids(client, q='Aktenzeichen', work_order_id=workflow['work_order']) == [bescheid]
+        assert search_ids(client, q='Aktenzeichen', limit=1) == [template]
+        assert search_ids(client, q='Zahlungserinnerung Mandanten') == [template]
+        assert search_ids(client, q='nirgendwo') == []
+
+    def test_invalid_requests(self, app, workflow):
+        client = app.test_client()
+        assert client.get('/api/search').status_code == 400
+        assert client.get('/api/search', query_string={'q': 'a', 'client_id': 'x'}).status_code == 400
+        assert client.get('/api/search', query_string={'q': 'a', 'limit': '0'}).status_code == 400
+        # FTS5 syntax in the query is searched for literally
+        assert client.get('/api/search', query_string={'q': 'NOT "( AND *'}).status_code == 200
+
+    def test_index_follows_changes(self, app, db, workflow):
+        """Replaced files, renamed titles, placeholder rows and deletes are indexed on commit."""
+        bescheid, beleg, template = workflow['documents']
+        client = app.test_client()
+        upload_folder = app.config['UPLOAD_FOLDER']
+        with app.app_context():
+            path = os.path.join(upload_folder, 'bescheid.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('Änderungsbescheid nach Einspruch')
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            # Only a change of an indexed attribute triggers re-indexing
+            document = Document.query.get(bescheid)
+            document.status = 'processed'
+            db.session.commit()
+            assert search_ids(client, q='Einspruch') == []
+
+            document.file_path = path
+            db.session.commit()
+            assert search_ids(client, q='Einspruch') == [bescheid]
+            assert search_ids(client, q='08156') == []
+
+            Document.query.get(beleg).title = 'Spendenbeleg Kirchengemeinde'
+            db.session.add(Placeholder(name='Vereinsregister', value='VR 12345', document_id=template))
+            db.session.commit()
+            assert search_ids(client, q='Kirchengemeinde') == [beleg]
+            assert search_ids(client, q='VR 12345') == [template]
+
+            Placeholder.query.filter_by(document_id=template).delete()
+            db.session.delete(Document.query.get(beleg))
+            db.session.commit()
+            workflow['documents'].remove(beleg)
+            assert search_ids(client, q='Spendenquittung') == []
+
+    def test_rebuild_indexes_existing_documents(self, app, db, workflow):
+        """Documents written without the ORM are picked up by a rebuild."""
+        service = SearchService([SqliteFtsBackend()])
+        with app.app_context():
+            result = db.session.execute(Document.__table__.insert().values(title='Direktimport Grundsteuer'))
+            db.session.commit()
+            imported = result.inserted_primary_key[0]
+            workflow['documents'].append(imported)
+            assert service.search('Grundsteuer') == []
+            assert service.rebuild() >= 4
+            hits = service.search('Grundsteuer')
+            assert [hit['document_id'] for hit in hits] == [imported]
+            assert hits[0]['snippet'] == 'Direktimport <mark>Grundsteuer</mark>'
+            assert service.get_metrics()['search_rebuilds_total'] == 1
@@ -0,0 +1,134 @@
+import json
+import random
+import time
+import pytest
+from app.models import Client
+from app.services.agent_service import AIAgentService
+from app.services.validation import (
+    extract_json, option_index, parse_amount, parse_date, parse_number, strip_thinking, validate_values
+)
+
+BATCH_SIZE = 10000
+OPTIONS = [f"Option {letter}{number}" for letter in 'ABCDE' for number in range(10)] + ['Einkommensteuer', 'Umsatzsteuer']
+PLACEHOLDERS = [
+    {'name': 'Datum', 'type': 'date'},
+    {'name': 'Betrag', 'type': 'number'},
+    {'name': 'Bestaetigt', 'type': 'checkbox'},
+    {'name': 'Steuerart', 'type': 'select', 'options': OPTIONS},
+    {'name': 'Aktenzeichen', 'type': 'text'}
+]
+RAW_VALUES = {
+    'Datum': ['31.05.2025', '2025-05-31', '1.6.25', '3. März 2024', 'am 05/31/2025', 'unbekannt'],
+    'Betrag': ['1.250,00 €', 'EUR 99', '-12,5', 1250, '3.5', 'keine Angabe'],
+    'Bestaetigt': ['ja', 'nein', True, 'X'],
+    'Steuerart': ['Umsatzsteuer', 'umsatzsteuer', 'Einkommen', 'Option C7', 'Sonstiges'],
+    'Aktenzeichen': ['  AZ-2024-0815 ', 'St 12/345']
+}
+
+def field_batch(size, seed=7):
+    """size extracted values spread over the placeholders, one dict per five fields."""
+    rng = random.Random(seed)
+    names = [placeholder['name'] for placeholder in PLACEHOLDERS]
+    return [{name: rng.choice(RAW_VALUES[name]) for name in names} for _ in range(size // len(names))]
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+class TestValidation:
+    """Test suite for the shared validators of extracted values."""
+
+    def test_german_dates_numbers_and_amounts(self):
+        assert [parse_date(value) for value in RAW_VALUES['Datum']] == [
+            '2025-05-31', '2025-05-31', '2025-06-01', '2024-03-03', '2025-05-31', None
+        ]
+        assert parse_date('31.02.2025') is None
+        # An impossible date does not hide a valid one in another format or further on
+        assert parse_date('Az. 2025-31-05, zugestellt am 05/31/2025') == '2025-05-31'
+        assert parse_date('31.02.2025, korrigiert 28.02.2025') == '2025-02-28'
+        assert [parse_number(value) for value in RAW_VALUES['Betrag']] == [1250.0, 99.0, -12.5, 1250.0, 3.5, None]
+        assert parse_number('1.250.000') == 1250000.0 and parse_number('1,250.50') == 1250.5
+        # A single point is a decimal point unless it separates thousands of an amount
+        assert [parse_number(value) for value in ('0.250', '-0.250', '3.141', '1.250')] == [0.25, -0.25, 3.141, 1.25]
+        assert [parse_amount(value) for value in ('1.250 €', '0.250 €', '1.250,5')] == [1250.0, 0.25, 1250.5]
+        assert parse_amount('12.345,678 EUR') == 12345.68
+
+    def test_values_are_dispatched_by_type(self):
+        cleaned = validate_values({
+            'Datum': '31.05.2025', 'Betrag': '1.250,00 €', 'Bestaetigt': 'Ja', 'Steuerart': 'umsatzsteuer',
+            'Aktenzeichen': ' AZ-1 ', 'Unbekannt': 'x'
+        }, PLACEHOLDERS)
+        assert cleaned == {
+            'Datum': '2025-05-31', 'Betrag': 1250.0, 'Bestaetigt': True, 'Steuerart': 'Umsatzsteuer', 'Aktenzeichen': 'AZ-1'
+        }
+        # Values without a date or number are dropped, unmatched options kept as given
+        assert validate_values({'Datum': 'bald', 'Betrag': 'viel', 'Steuerart': 'Sonstiges'}, PLACEHOLDERS) == {
+            'Steuerart': 'Sonstiges'
+        }
+        assert option_index(tuple(OPTIONS)) is option_index(tuple(OPTIONS))
+
+    def test_json_and_thinking_blocks_in_answers(self):
+        answer = '<think>{"draft": 1}</think>\nHier das Ergebnis: {"extracted_values": {"a": "{x}"}} Hinweis: {ignoriert}'
+        assert extract_json(strip_thinking(answer)) == {'extracted_values': {'a': '{x}'}}
+        assert extract_json('{kein json} {"confidence": 0.5}') == {'confidence': 0.5}
+        assert extract_json('Keine Angaben gefunden.') is None
+        assert strip_thinking('<think>nur Gedanken</think>') == '<think>nur Gedanken</think>'
+
+class TestValidationBenchmarks:
+    """Micro-benchmarks over batches of 10k fields; run with -s to see the timings."""
+
+    @pytest.fixture(autouse=True)
+    def report(self):
+        self.timings = []
+        yield
+        for label, count, seconds in self.timings:
+            print(f"\n{label:<32} {count:>6} fields {seconds * 1000:>8.1f} ms {count / seconds:>12,.0f} fields/s")
+
+    def test_validate_batch(self):
+        batch = field_batch(BATCH_SIZE)
+        results, seconds = timed(lambda: [validate_values(values, PLACEHOLDERS) for values in batch])
+        self.timings.append(('validate_values', BATCH_SIZE, seconds))
+        assert len(results) * len(PLACEHOLDERS) == BATCH_SIZE
+        assert seconds < 5
+
+    def test_select_options_batch(self):
+        rng = random.Random(3)
+        values = [rng.choice(RAW_VALUES['Steuerart']) for _ in range(BATCH_SIZE)]
+        index = option_index(tuple(OPTIONS))
+        matched, seconds = timed(lambda: [index.match(value) for value in values])
+        self.timings.append(('select option matching', BATCH_SIZE, seconds))
+        assert set(matched) <= set(OPTIONS) | {'Sonstiges'}
+        assert seconds < 5
+
+    def test_parse_answers_batch(self):
+        answers = [
+            f"<think>Die Felder stehen auf Seite {position}.</think>\n"
+            + json.dumps({'extracted_values': values, 'confidence': 0.8}) + "\nHinweis: {keine}"
+            for position, values in enumerate(field_batch(BATCH_SIZE))
+        ]
+        parsed, seconds = timed(lambda: [extract_json(strip_thinking(answer)) for answer in answers])
+        self.timings.append(('strip_thinking + extract_json', BATCH_SIZE, seconds))
+        assert all(result['confidence'] == 0.8 for result in parsed)
+        assert seconds < 5
+
+    def test_client_matching_batch(self, app):
+        clients = [
+            Client(client_type='company', company_name=f"Firma {number} GmbH", tax_number=f"143/815/{number:05d}",
+                   email=f"info{number}@example.org", contact_phone=f"+49 (89) {number:04d}-5678",
+                   address_city='München', address_zip='80331')
+            for number in range(50)
+        ]
+        client_info = {
+            'company_info': {'company_name': 'Firma 42 GmbH'},
+            'contact_info': {'email': 'INFO42@example.org', 'phone': '0042-5678', 'city': 'München'},
+            'identification': {'tax_number': '14381500042'}
+        }
+        agent = AIAgentService()
+        requests = BATCH_SIZE // len(clients)
+        with app.app_context():
+            matches, seconds = timed(lambda: [agent._find_best_client_match(client_info, clients) for _ in range(requests)])
+        self.timings.append(('client match comparisons', requests * len(clients), seconds))
+        assert all(match['client'] is clients[42] for match in matches)
+        assert matches[0]['confidence'] == pytest.approx(1.1)
+        assert seconds < 10
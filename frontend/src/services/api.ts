@@ -76,7 +76,7 @@ export const DocumentAPI = {
         return api.get(`/api/documents/${documentId}/text`);
     },
     
-    // Get temporary preview without saving
+    // Get temporary preview without saving (the rendered file as a Blob)
     getTemporaryPreview: async (file: File, placeholderValues: Record<string, any>) => {
         const formData = new FormData();
         formData.append('file', file);
@@ -87,6 +87,7 @@ export const DocumentAPI = {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
+            responseType: 'blob'
         });
     },
 
@@ -141,9 +142,11 @@ export const DocumentAPI = {
         return api.post(`/api/documents/create-from-template/${templateId}`, placeholderValues);
     },
 
-    // Get document preview by ID
+    // Get document preview by ID (the rendered file as a Blob)
     getDocumentPreview: async (documentId: number, placeholderValues: Record<string, any>) => {
-        return api.post(`/api/documents/preview/${documentId}`, placeholderValues);
+        return api.post(`/api/documents/preview/${documentId}`, placeholderValues, {
+            responseType: 'blob'
+        });
     },
 
     // Download document